@@ -1,12 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from ..services.market_data_service import MarketDataFetcher
 from ..services import akshare_service
-from ..utils.technical_indicators import TechnicalIndicators
+from ..services.adjust_factors import normalize_adjust
+from ..services.indicator_cache import indicator_cache
+from ..services import screener
+from ..utils.indicator_graph import describe_indicators, output_names, parse_indicator_specs
+import base64
 import numpy as np
-import pandas as pd
 
 market_data_bp = Blueprint('market_data', __name__, url_prefix='/api/market_data')
 
+# 指标数值列的编码方式：list 为 JSON 数组（NaN 编码为 null），base64 为小端 float64 原始字节（NaN 保留原值）
+COLUMN_ENCODINGS = ('list', 'base64')
+# 选股接口的面板交易日数上限与返回条数上限
+MAX_SCREEN_LOOKBACK = 1000
+MAX_SCREEN_RESULTS = 500
+
+
+def _encode_column(values, encoding: str = 'list'):
+    """将一列数值编码为 JSON 可序列化的值；整列一次向量化处理，不逐元素递归"""
+    arr = np.asarray(values, dtype=np.float64)
+    if encoding == 'base64':
+        return base64.b64encode(np.ascontiguousarray(arr, dtype='<f8').tobytes()).decode('ascii')
+    out = arr.astype(object)
+    out[np.isnan(arr)] = None
+    return out.tolist()
+
 @market_data_bp.route('/historical', methods=['GET'])
 def get_historical_data():
     try:
@@ -16,9 +35,13 @@ def get_historical_data():
 
         if not all([symbol, start_date, end_date]):
             return jsonify({'error': '缺少必要参数'}), 400
+        try:
+            adjust = normalize_adjust(request.args.get('adjust', 'qfq'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         fetcher = MarketDataFetcher()
-        data = fetcher.fetch_stock_data(symbol, start_date, end_date)
+        data = fetcher.fetch_stock_data(symbol, start_date, end_date, adjust=adjust)
         
         if data is None or data.empty:
             return jsonify({'error': '未获取到数据'}), 404
@@ -33,7 +56,19 @@ def get_historical_data():
 
 @market_data_bp.route('/latest_price', methods=['GET'])
 def get_latest_price():
+    """
+    获取最新价格。
+    参数: symbol（单只）或 symbols（逗号分隔的多只，返回 {'data': {symbol: 价格信息}}）
+    """
     try:
+        symbols = request.args.get('symbols')
+        if symbols:
+            symbol_list = [s.strip() for s in symbols.split(',') if s.strip()]
+            if not symbol_list:
+                return jsonify({'error': '缺少股票代码'}), 400
+            fetcher = MarketDataFetcher()
+            return jsonify({'data': fetcher.fetch_latest_prices(symbol_list)})
+
         symbol = request.args.get('symbol')
         if not symbol:
             return jsonify({'error': '缺少股票代码'}), 400
@@ -52,22 +87,54 @@ def get_latest_price():
 def get_stock_list():
     """
     获取最新A股股票列表（ts_code, name），返回JSON。
+    列表按天缓存，支持 ETag / If-None-Match，未变化时返回 304。
     """
     try:
-        stock_list = akshare_service.get_stock_list()
+        stock_list, etag = akshare_service.stock_universe.get()
         if stock_list is None:
             return jsonify({'error': '获取股票列表失败'}), 500
-        return jsonify({'data': stock_list})
+        if etag and etag in request.if_none_match:
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+        response = jsonify({'data': stock_list})
+        if etag:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         import logging
         logging.getLogger(__name__).error(f'获取股票列表API异常: {e}')
         return jsonify({'error': str(e)}), 500
 
+@market_data_bp.route('/stock_search', methods=['GET'])
+def search_stocks():
+    """
+    股票联想搜索，按代码、名称（及拼音）前缀匹配。
+    参数: q 搜索关键字, limit 返回条数（默认10，最大50）
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '缺少搜索关键字'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        except ValueError:
+            return jsonify({'error': 'limit 参数必须为整数'}), 400
+        results = akshare_service.stock_universe.search(query, limit)
+        if results is None:
+            return jsonify({'error': '获取股票列表失败'}), 500
+        return jsonify({'data': results})
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f'股票搜索API异常: {e}')
+        return jsonify({'error': str(e)}), 500
+
 @market_data_bp.route('/historical_data', methods=['GET'])
 def get_stock_historical_data_api():
     """
     获取指定股票的历史行情数据，支持日/周/月线。
-    参数: ts_code, period, start_date, end_date
+    参数: ts_code, period, start_date, end_date, 可选: adjust（qfq/hfq/raw，默认 qfq）
     返回: JSON 格式行情数据
     """
     try:
@@ -78,7 +145,11 @@ def get_stock_historical_data_api():
         if not all([ts_code, period, start_date, end_date]):
             return jsonify({'error': '缺少必要参数'}), 400
         try:
-            df = akshare_service.get_stock_historical_data(ts_code, period, start_date, end_date)
+            adjust = normalize_adjust(request.args.get('adjust', 'qfq'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            df = akshare_service.get_stock_historical_data(ts_code, period, start_date, end_date, adjust)
         except Exception as e:
             import logging
             logging.getLogger(__name__).error(f'获取历史行情API异常: {e}')
@@ -96,8 +167,12 @@ def get_stock_historical_data_api():
 @market_data_bp.route('/indicators', methods=['GET'])
 def get_indicators():
     """
-    获取指定股票的多项技术指标（OBV, VMA, VR, MFI, PMA等），返回标准化结构。
-    参数: ts_code, start_date, end_date, period, 可选: ma_windows, vma_windows
+    获取指定股票的技术指标，返回按列组织的结构。
+    参数: ts_code, start_date, end_date, period, 可选: indicators, ma_windows, vma_windows, adjust, encoding
+    - indicators: 指标声明列表，如 "rsi(14),macd(12,26,9),bollinger(20,2),ichimoku"（可用指标见 /indicators/catalog），
+      结果放在 indicators 字段，键为去掉空白的声明原文，多输出指标为 "声明.输出名"
+    - 未传 indicators 时返回 OBV、VMA、VR、MFI、PMA（键为 obv、vma_N、vr、mfi、pma_N）
+    - encoding: list（默认，NaN 为 null）或 base64（小端 float64 字节，NaN 保留）
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -108,7 +183,9 @@ def get_indicators():
         end_date = request.args.get('end_date')
         ma_windows = request.args.get('ma_windows', '5,20,60')
         vma_windows = request.args.get('vma_windows', '5')
-        logger.info(f"收到指标请求: ts_code={ts_code}, period={period}, start_date={start_date}, end_date={end_date}, ma_windows={ma_windows}, vma_windows={vma_windows}")
+        indicator_specs = request.args.get('indicators')
+        encoding = request.args.get('encoding', 'list')
+        logger.info(f"收到指标请求: ts_code={ts_code}, period={period}, start_date={start_date}, end_date={end_date}, ma_windows={ma_windows}, vma_windows={vma_windows}, indicators={indicator_specs}")
         if not all([ts_code, period, start_date, end_date]):
             logger.warning(f"参数缺失: ts_code={ts_code}, period={period}, start_date={start_date}, end_date={end_date}")
             return jsonify({'error': '缺少必要参数'}), 400
@@ -124,7 +201,30 @@ def get_indicators():
         except Exception as ex:
             logger.warning(f'日期格式错误: start_date={start_date}, end_date={end_date}, ex={ex}')
             return jsonify({'error': '日期格式错误，应为YYYYMMDD'}), 400
-        df = akshare_service.get_stock_historical_data(ts_code, period, start_date, end_date)
+        try:
+            adjust = normalize_adjust(request.args.get('adjust', 'qfq'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if encoding not in COLUMN_ENCODINGS:
+            return jsonify({'error': f'不支持的编码方式: {encoding}'}), 400
+        # 指标声明在取数前校验，格式错误不必访问行情数据
+        if indicator_specs is not None:
+            try:
+                specs = parse_indicator_specs(indicator_specs)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if not specs:
+                return jsonify({'error': '未指定指标'}), 400
+        else:
+            # 默认指标组合，键名与原接口一致
+            vma_list = list(dict.fromkeys(int(x) for x in vma_windows.split(',') if x.strip().isdigit() and int(x) > 0))
+            ma_list = list(dict.fromkeys(int(x) for x in ma_windows.split(',') if x.strip().isdigit() and int(x) > 0))
+            specs = [('obv', 'obv', {}), ('vr', 'vr', {'window': 5}), ('mfi', 'mfi', {'window': 14})]
+            if vma_list:
+                specs.append(('vma', 'vma_matrix', {'windows': vma_list}))
+            if ma_list:
+                specs.append(('pma', 'pma_matrix', {'windows': ma_list}))
+        df = akshare_service.get_stock_historical_data(ts_code, period, start_date, end_date, adjust)
         if df is None or df.empty:
             logger.info(f"无行情数据: ts_code={ts_code}, period={period}, start_date={start_date}, end_date={end_date}")
             return jsonify({'error': '未获取到行情数据'}), 404
@@ -133,35 +233,95 @@ def get_indicators():
             'trade_date': 'date', 'vol': 'volume', 'amount': 'amount'
         })
         df = df.sort_values('date')
+        # 一次声明全部指标：未命中缓存的指标在同一计算图中求值，共享中间量（如 VMA 与 VR 的成交量滚动和）；
+        # 图表缩放/平移重复请求时直接命中缓存，区间向后延伸时只计算新增尾部
+        values = indicator_cache.get_many(ts_code, period, adjust, [(name, params) for _, name, params in specs], df)
+        columns = {}
+        for (label, name, params), arr in zip(specs, values):
+            outputs = output_names(name, params)
+            if outputs is None:
+                columns[label] = _encode_column(arr, encoding)
+                continue
+            # 默认组合中矩阵类指标沿用原键名 vma_N / pma_N，其余多输出指标为 "声明.输出名"
+            sep = '_' if indicator_specs is None else '.'
+            for j, out in enumerate(outputs):
+                columns[f'{label}{sep}{out}'] = _encode_column(arr[:, j], encoding)
         result = {
             'dates': df['date'].tolist(),
-            'close': df['close'].tolist(),
-            'volume': df['volume'].tolist(),
+            'close': _encode_column(df['close'], encoding),
+            'volume': _encode_column(df['volume'], encoding),
         }
-        # OBV
-        result['obv'] = TechnicalIndicators.calculate_obv(df).tolist()
-        # VMA（支持多窗口）
-        for w in [int(x) for x in vma_windows.split(',') if x.strip().isdigit()]:
-            result[f'vma_{w}'] = TechnicalIndicators.calculate_vma(df, window=w).tolist()
-        # VR
-        result['vr'] = TechnicalIndicators.calculate_vr(df).tolist()
-        # MFI
-        result['mfi'] = TechnicalIndicators.calculate_mfi(df).tolist()
-        # PMA（支持多窗口）
-        for w in [int(x) for x in ma_windows.split(',') if x.strip().isdigit()]:
-            result[f'pma_{w}'] = TechnicalIndicators.calculate_pma(df, window=w).tolist()
-        # 递归将所有 NaN 替换为 None
-        def replace_nan_with_none(obj):
-            if isinstance(obj, list):
-                return [replace_nan_with_none(x) for x in obj]
-            elif isinstance(obj, dict):
-                return {k: replace_nan_with_none(v) for k, v in obj.items()}
-            elif isinstance(obj, float) and (np.isnan(obj) or pd.isna(obj)):
-                return None
-            else:
-                return obj
-        result = replace_nan_with_none(result)
+        if encoding != 'list':
+            result['encoding'] = encoding
+        if indicator_specs is None:
+            result.update(columns)
+        else:
+            result['indicators'] = columns
         return jsonify(result)
     except Exception as e:
         logger.error(f'获取技术指标API异常: {e}, ts_code={request.args.get("ts_code")}, period={request.args.get("period")}, start_date={request.args.get("start_date")}, end_date={request.args.get("end_date")}', exc_info=True)
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@market_data_bp.route('/indicators/catalog', methods=['GET'])
+def get_indicator_catalog():
+    """可用指标目录：名称、参数及默认值、输出名称，供 /indicators 的 indicators 参数使用"""
+    return jsonify({'indicators': describe_indicators()})
+
+@market_data_bp.route('/screen', methods=['POST'])
+def screen_stocks():
+    """
+    全市场条件选股：在本地已缓存日线拼成的 日期 × 股票 面板上一次计算全部条件，不请求上游行情。
+    请求体(JSON):
+    - conditions: 条件字符串列表（"且"关系），如 ["ma_cross(5,20)", "vr > 2", "mfi(14) < 20"]，语法见 services/screener
+    - 可选: sort_by（按某一项排序，默认按条件得分）, ascending（默认 false）, limit（默认 50，最大 500）,
+      lookback（面板交易日数，默认 250，需覆盖指标的最长窗口）, adjust（默认 qfq）, symbols（只在这些股票中筛选）
+    返回: {'date', 'universe', 'matched', 'data': [{'ts_code', 'name', 'score', 'close', 'values'}],
+          'unadjusted': 因缺少最新复权因子未参与筛选的股票}
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    try:
+        body = request.get_json(silent=True) or {}
+        try:
+            conditions = screener.parse_conditions(body.get('conditions'))
+            sort_by = body.get('sort_by')
+            if sort_by is not None and not isinstance(screener.parse_term(str(sort_by)), screener.Term):
+                raise ValueError(f'sort_by 须为字段或指标: {sort_by}')
+            limit = int(body.get('limit', 50))
+            lookback = int(body.get('lookback', 250))
+            adjust = normalize_adjust(body.get('adjust', 'qfq'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        if not 1 <= limit <= MAX_SCREEN_RESULTS:
+            return jsonify({'error': f'limit 需在 1 到 {MAX_SCREEN_RESULTS} 之间'}), 400
+        if not 2 <= lookback <= MAX_SCREEN_LOOKBACK:
+            return jsonify({'error': f'lookback 需在 2 到 {MAX_SCREEN_LOOKBACK} 之间'}), 400
+        symbols = body.get('symbols')
+        if symbols is not None and (not isinstance(symbols, list) or not symbols
+                                    or not all(isinstance(s, str) for s in symbols)):
+            return jsonify({'error': 'symbols 必须为非空股票代码列表'}), 400
+
+        universe = akshare_service.get_universe_panel(lookback, adjust, symbols)
+        if universe is None:
+            return jsonify({'error': '本地没有已缓存的行情数据'}), 404
+        if not universe.panels:
+            return jsonify({'error': '已缓存的股票都没有最新的复权因子', 'unadjusted': universe.unadjusted}), 404
+        try:
+            result = screener.screen(universe.panels, conditions, sort_by=sort_by, ascending=bool(body.get('ascending', False)),
+                                     limit=limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # 股票名称来自股票列表缓存，获取失败时不影响选股结果
+        try:
+            stock_list, _ = akshare_service.stock_universe.get()
+        except Exception as e:
+            logger.warning(f'获取股票列表失败，选股结果不含名称: {e}')
+            stock_list = None
+        names = {item['ts_code']: item['name'] for item in stock_list or []}
+        for item in result['data']:
+            item['name'] = names.get(item['ts_code'])
+        result['unadjusted'] = universe.unadjusted
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f'选股API异常: {e}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
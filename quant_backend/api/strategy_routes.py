@@ -1,19 +1,33 @@
 from flask import Blueprint, request, jsonify
-from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.services.strategy_service import ALLOCATIONS, MACrossPortfolio, MACrossStrategy, close_panel
+from quant_backend.services.strategy_sweep import sweep_ma_cross, window_range
+from quant_backend.services.walk_forward import ENGINES, walk_forward
+from quant_backend.services.robustness import METHODS, daily_returns, monte_carlo, trade_returns
 from quant_backend.services import akshare_service
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.bt_strategies.event_engine import EVENT_STRATEGIES
 import pandas as pd
 import logging
+import os
 from datetime import datetime, timedelta
 
-# 引入Backtrader回测模块
-try:
-    from quant_backend.bt_strategies.backtest_runner import run_backtest, check_backtrader_installed
-    BACKTRADER_AVAILABLE = True
-except ImportError:
-    BACKTRADER_AVAILABLE = False
+# 引入Backtrader回测模块（未安装Backtrader时仍可使用事件驱动引擎）
+from quant_backend.bt_strategies.backtest_runner import (
+    BACKTEST_ENGINES, BACKTRADER_AVAILABLE, run_backtest, run_backtest_returns, check_backtrader_installed
+)
 
 logger = logging.getLogger(__name__)
 strategy_bp = Blueprint('strategy', __name__, url_prefix='/api/strategy')
+# 组合回测单次请求的最大股票数
+MAX_PORTFOLIO_SYMBOLS = 500
+# 单次滚动前推请求最多使用的工作进程数（每个请求各自创建进程池），可通过环境变量 QUANT_WALK_FORWARD_ROUTE_WORKERS 配置
+WALK_FORWARD_ROUTE_WORKERS = int(os.environ.get('QUANT_WALK_FORWARD_ROUTE_WORKERS', '0')) or min(4, os.cpu_count() or 1)
+
+def _event_strategy_error(engine: str, strategy_name: str):
+    """事件引擎只支持 EVENT_STRATEGIES 中的策略，在获取行情前检查，不支持时返回 400 响应"""
+    if engine == 'event' and strategy_name not in EVENT_STRATEGIES:
+        return jsonify({'error': f'事件引擎不支持的策略: {strategy_name}，可选: {", ".join(EVENT_STRATEGIES)}'}), 400
+    return None
 
 @strategy_bp.route('/backtest', methods=['POST'])
 def backtest():
@@ -61,24 +75,18 @@ def backtest():
             
             # 向前多取一些数据，确保有足够数据计算指标
             fetch_start = (start - timedelta(days=long_window * 2)).strftime('%Y%m%d')
-            hist_data = akshare_service.get_stock_historical_data(
+            bars = akshare_service.get_stock_bars(
                 ts_code=symbol,
                 period='daily',
                 start_date=fetch_start,
                 end_date=end_date_fmt
             )
             
-            if hist_data is None or hist_data.empty:
+            if bars is None or len(bars) == 0:
                 return jsonify({'error': f'无法获取 {symbol} 的历史数据'}), 400
 
-            # 转换数据格式以适配策略
-            hist = pd.DataFrame({
-                'Open': hist_data['open'],
-                'High': hist_data['high'],
-                'Low': hist_data['low'],
-                'Close': hist_data['close'],
-                'Volume': hist_data['vol']
-            }, index=pd.to_datetime(hist_data['trade_date'], format='%Y%m%d'))
+            # 直接包装本地K线存储的数组视图，不复制数据
+            hist = bars_to_ohlcv(bars)
 
             # 确保数据充足
             if len(hist) < long_window * 2:
@@ -99,6 +107,374 @@ def backtest():
         logger.error(f'回测执行异常: {str(e)}', exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@strategy_bp.route('/sweep', methods=['POST'])
+def sweep():
+    """
+    均线交叉策略参数扫描，一次评估所有 short_window < long_window 的组合
+
+    请求参数:
+        symbol: 股票代码
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        initial_capital: 初始资金, 默认为 100000
+        short_windows: 短期窗口列表，或 {"start": 5, "stop": 30, "step": 5}（包含 stop）
+        long_windows: 长期窗口列表，或 {"start": 20, "stop": 120, "step": 10}
+
+    返回:
+        绩效网格（total_return / annual_return / max_drawdown / trades，按 [短期窗口][长期窗口] 排列）及最优组合
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': '请求数据不能为空'}), 400
+
+        required_fields = ['symbol', 'start_date', 'end_date', 'short_windows', 'long_windows']
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            return jsonify({'error': f'缺少必要参数: {", ".join(missing_fields)}'}), 400
+
+        symbol = data.get('symbol')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        try:
+            initial_capital = float(data.get('initial_capital', 100000))
+            short_windows = window_range(data.get('short_windows'))
+            long_windows = window_range(data.get('long_windows'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数无效: {e}'}), 400
+
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            if start > end:
+                return jsonify({'error': '开始日期不能晚于结束日期'}), 400
+            if end > datetime.now():
+                return jsonify({'error': '结束日期不能晚于今天'}), 400
+        except ValueError:
+            return jsonify({'error': '日期格式无效，应为 YYYY-MM-DD'}), 400
+
+        if initial_capital <= 0:
+            return jsonify({'error': '初始资金必须大于0'}), 400
+
+        # 向前多取一些数据，确保最长窗口也有足够数据计算均线
+        fetch_start = (start - timedelta(days=max(long_windows) * 2)).strftime('%Y%m%d')
+        bars = akshare_service.get_stock_bars(
+            ts_code=symbol,
+            period='daily',
+            start_date=fetch_start,
+            end_date=end_date.replace('-', '')
+        )
+        if bars is None or len(bars) == 0:
+            return jsonify({'error': f'无法获取 {symbol} 的历史数据'}), 400
+
+        try:
+            results = sweep_ma_cross(bars_to_ohlcv(bars), short_windows, long_windows, initial_capital)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.info(f'参数扫描完成: {symbol}, {results["combinations"]} 个组合')
+        return jsonify(results)
+
+    except Exception as e:
+        logger.error(f'参数扫描异常: {str(e)}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@strategy_bp.route('/portfolio_backtest', methods=['POST'])
+def portfolio_backtest():
+    """
+    多股票组合的均线交叉策略回测（面板向量化，一次完成所有股票）
+
+    请求参数:
+        symbols: 股票代码列表
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        initial_capital: 初始资金, 默认为 100000
+        short_window: 短期移动平均线周期, 默认为 20
+        long_window: 长期移动平均线周期, 默认为 50
+        allocation: 资金分配方式 'equal'（默认）/ 'volatility'
+        commission: 佣金费率, 默认为 0.0003
+        vol_window: 波动率窗口, 默认为 20
+
+    返回:
+        组合绩效指标、每只股票的交易统计和资金曲线
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': '请求数据不能为空'}), 400
+
+        required_fields = ['symbols', 'start_date', 'end_date']
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            return jsonify({'error': f'缺少必要参数: {", ".join(missing_fields)}'}), 400
+
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols or not all(isinstance(s, str) for s in symbols):
+            return jsonify({'error': 'symbols 必须为非空的股票代码列表'}), 400
+        symbols = list(dict.fromkeys(symbols))
+        if len(symbols) > MAX_PORTFOLIO_SYMBOLS:
+            return jsonify({'error': f'股票数量过多，最多 {MAX_PORTFOLIO_SYMBOLS} 只'}), 400
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        allocation = data.get('allocation', 'equal')
+        if allocation not in ALLOCATIONS:
+            return jsonify({'error': f'allocation 参数非法，可选: {", ".join(ALLOCATIONS)}'}), 400
+        try:
+            initial_capital = float(data.get('initial_capital', 100000))
+            strategy = MACrossPortfolio(
+                short_window=int(data.get('short_window', 20)),
+                long_window=int(data.get('long_window', 50)),
+                allocation=allocation,
+                commission=float(data.get('commission', 0.0003)),
+                vol_window=int(data.get('vol_window', 20))
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数无效: {e}'}), 400
+
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            if start > end:
+                return jsonify({'error': '开始日期不能晚于结束日期'}), 400
+            if end > datetime.now():
+                return jsonify({'error': '结束日期不能晚于今天'}), 400
+        except ValueError:
+            return jsonify({'error': '日期格式无效，应为 YYYY-MM-DD'}), 400
+
+        if initial_capital <= 0:
+            return jsonify({'error': '初始资金必须大于0'}), 400
+
+        # 向前多取一些数据，均线和波动率在 start_date 之前预热
+        warmup = max(strategy.long_window, strategy.vol_window) * 2
+        fetch_start = (start - timedelta(days=warmup)).strftime('%Y%m%d')
+        frames = akshare_service.get_stock_historical_data_batch(
+            symbols, period='daily', start_date=fetch_start, end_date=end_date.replace('-', ''))
+        if not frames:
+            return jsonify({'error': '无法获取任何股票的历史数据'}), 400
+
+        close = close_panel({symbol: frames[symbol] for symbol in symbols if symbol in frames})
+        try:
+            results = strategy.backtest(close, initial_capital=initial_capital, start_date=start_date)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        results['missing_symbols'] = [symbol for symbol in symbols if symbol not in frames]
+        logger.info(f'组合回测完成: {len(frames)} 只股票, 总收益率: {results["performance"]["total_return"]:.2%}')
+        return jsonify(results)
+
+    except Exception as e:
+        logger.error(f'组合回测异常: {str(e)}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@strategy_bp.route('/walk_forward', methods=['POST'])
+def walk_forward_optimize():
+    """
+    滚动前推参数优化：样本内优化参数，样本外检验，拼接各折样本外资金曲线
+
+    请求参数:
+        symbol: 股票代码
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        engine: 'vectorized'（默认，MACrossStrategy）、'backtrader' 或 'event'（事件驱动引擎，策略同 Backtrader）
+        strategy_name: Backtrader 策略名称, 默认为 'ma_cross'
+        param_grid: 参数网格。vectorized: {"short_window": [...] 或 {start, stop, step}, "long_window": ...}；
+                    backtrader / event: {参数名: 取值列表}
+        n_folds: 折数, 默认为 10
+        in_sample / out_of_sample: 样本内/样本外K线数（可选）
+        metric: 样本内优化目标, 默认为 'total_return'
+        initial_capital: 初始资金, 默认为 100000
+        commission: 佣金费率（backtrader / event 引擎）, 默认为 0.001
+
+    返回:
+        每折的最优参数与样本外绩效，以及拼接后的样本外绩效和资金曲线
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': '请求数据不能为空'}), 400
+
+        required_fields = ['symbol', 'start_date', 'end_date', 'param_grid']
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            return jsonify({'error': f'缺少必要参数: {", ".join(missing_fields)}'}), 400
+
+        symbol = data.get('symbol')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        engine = data.get('engine', 'vectorized')
+        if engine not in ENGINES:
+            return jsonify({'error': f'engine 参数非法，可选: {", ".join(ENGINES)}'}), 400
+        if engine == 'backtrader' and not BACKTRADER_AVAILABLE:
+            return jsonify({'error': '未安装Backtrader。请运行: pip install backtrader matplotlib==3.2.2'}), 500
+        strategy_name = str(data.get('strategy_name', 'ma_cross'))
+        error = _event_strategy_error(engine, strategy_name)
+        if error:
+            return error
+        param_grid = data.get('param_grid')
+        if not isinstance(param_grid, dict):
+            return jsonify({'error': 'param_grid 必须为对象'}), 400
+        try:
+            options = {
+                'engine': engine,
+                'strategy_name': strategy_name,
+                'n_folds': int(data.get('n_folds', 10)),
+                'in_sample': int(data['in_sample']) if data.get('in_sample') is not None else None,
+                'out_of_sample': int(data['out_of_sample']) if data.get('out_of_sample') is not None else None,
+                'metric': str(data.get('metric', 'total_return')),
+                'initial_capital': float(data.get('initial_capital', 100000)),
+                'commission': float(data.get('commission', 0.001)),
+            }
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数无效: {e}'}), 400
+
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            if start > end:
+                return jsonify({'error': '开始日期不能晚于结束日期'}), 400
+            if end > datetime.now():
+                return jsonify({'error': '结束日期不能晚于今天'}), 400
+        except ValueError:
+            return jsonify({'error': '日期格式无效，应为 YYYY-MM-DD'}), 400
+
+        if options['initial_capital'] <= 0:
+            return jsonify({'error': '初始资金必须大于0'}), 400
+
+        bars = akshare_service.get_stock_bars(
+            ts_code=symbol,
+            period='daily',
+            start_date=start_date.replace('-', ''),
+            end_date=end_date.replace('-', '')
+        )
+        if bars is None or len(bars) == 0:
+            return jsonify({'error': f'无法获取 {symbol} 的历史数据'}), 400
+
+        try:
+            results = walk_forward(bars, param_grid, max_workers=WALK_FORWARD_ROUTE_WORKERS, **options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.info(f'滚动前推优化完成: {symbol}, 样本外总收益率: {results["performance"]["total_return"]:.2%}')
+        return jsonify(results)
+
+    except Exception as e:
+        logger.error(f'滚动前推优化异常: {str(e)}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@strategy_bp.route('/monte_carlo', methods=['POST'])
+def monte_carlo_analysis():
+    """
+    回测结果的蒙特卡洛稳健性分析：对日收益率分块自助抽样或对逐笔交易重排/重抽样，
+    返回总收益率、最大回撤和夏普比率的分布
+
+    请求参数:
+        symbol: 股票代码
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        engine: 'vectorized'（默认，MACrossStrategy）、'backtrader' 或 'event'（事件驱动引擎，策略同 Backtrader）
+        short_window / long_window: 均线窗口（vectorized 引擎）, 默认为 20 / 50
+        strategy_name: Backtrader 策略名称, 默认为 'ma_cross'
+        strategy_params: Backtrader 策略参数（可选）
+        initial_capital: 初始资金, 默认为 100000
+        commission: 佣金费率（backtrader / event 引擎）, 默认为 0.001
+        method: 'block_bootstrap'（默认）/ 'trade_shuffle' / 'trade_bootstrap'
+        n_paths: 路径数, 默认为 10000
+        block_size: 分块长度, 默认为 20
+        seed: 随机种子（可选）
+
+    返回:
+        原始回测指标及各指标在全部路径上的分布
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': '请求数据不能为空'}), 400
+
+        required_fields = ['symbol', 'start_date', 'end_date']
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            return jsonify({'error': f'缺少必要参数: {", ".join(missing_fields)}'}), 400
+
+        symbol = data.get('symbol')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        engine = data.get('engine', 'vectorized')
+        method = data.get('method', 'block_bootstrap')
+        if engine not in ENGINES:
+            return jsonify({'error': f'engine 参数非法，可选: {", ".join(ENGINES)}'}), 400
+        if method not in METHODS:
+            return jsonify({'error': f'method 参数非法，可选: {", ".join(METHODS)}'}), 400
+        if engine == 'backtrader' and not BACKTRADER_AVAILABLE:
+            return jsonify({'error': '未安装Backtrader。请运行: pip install backtrader matplotlib==3.2.2'}), 500
+        strategy_name = str(data.get('strategy_name', 'ma_cross'))
+        error = _event_strategy_error(engine, strategy_name)
+        if error:
+            return error
+        strategy_params = data.get('strategy_params') or {}
+        if not isinstance(strategy_params, dict):
+            return jsonify({'error': 'strategy_params 必须为对象'}), 400
+        try:
+            initial_capital = float(data.get('initial_capital', 100000))
+            commission = float(data.get('commission', 0.001))
+            short_window = int(data.get('short_window', 20))
+            long_window = int(data.get('long_window', 50))
+            n_paths = int(data.get('n_paths', 10000))
+            block_size = int(data.get('block_size', 20))
+            seed = int(data['seed']) if data.get('seed') is not None else None
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数无效: {e}'}), 400
+
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            if start > end:
+                return jsonify({'error': '开始日期不能晚于结束日期'}), 400
+            if end > datetime.now():
+                return jsonify({'error': '结束日期不能晚于今天'}), 400
+        except ValueError:
+            return jsonify({'error': '日期格式无效，应为 YYYY-MM-DD'}), 400
+
+        if engine == 'vectorized' and short_window >= long_window:
+            return jsonify({'error': '短期窗口必须小于长期窗口'}), 400
+        if initial_capital <= 0:
+            return jsonify({'error': '初始资金必须大于0'}), 400
+
+        bars = akshare_service.get_stock_bars(
+            ts_code=symbol,
+            period='daily',
+            start_date=start_date.replace('-', ''),
+            end_date=end_date.replace('-', '')
+        )
+        if bars is None or len(bars) == 0:
+            return jsonify({'error': f'无法获取 {symbol} 的历史数据'}), 400
+
+        try:
+            hist = bars_to_ohlcv(bars)
+            if engine == 'vectorized':
+                result = MACrossStrategy(short_window, long_window).backtest(hist, initial_capital)
+                returns = daily_returns(result).to_numpy() if method == 'block_bootstrap' else trade_returns(result)
+            elif method == 'block_bootstrap':
+                _, returns = run_backtest_returns(bars, strategy_name, strategy_params, initial_capital, commission,
+                                                  engine=engine)
+                returns = returns.to_numpy()
+            else:
+                result = run_backtest(bars, strategy_name, strategy_params, initial_capital, commission, engine=engine)
+                returns = trade_returns(result, basis='price')
+            if method == 'block_bootstrap':
+                periods_per_year = 252
+            else:
+                # 逐笔交易收益按每年交易笔数年化夏普比率
+                years = max((hist.index[-1] - hist.index[0]).days / 365.25, 1 / 365.25)
+                periods_per_year = len(returns) / years
+
+            analysis = monte_carlo(returns, method=method, n_paths=n_paths, block_size=block_size,
+                                   periods_per_year=periods_per_year, seed=seed)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.info(f'蒙特卡洛分析完成: {symbol}, {method}, {n_paths} 条路径')
+        return jsonify(analysis)
+
+    except Exception as e:
+        logger.error(f'蒙特卡洛分析异常: {str(e)}', exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @strategy_bp.route('/backtest_bt', methods=['POST'])
 def backtest_bt():
     """
@@ -112,17 +488,12 @@ def backtest_bt():
         initial_capital: 初始资金, 默认为 100000
         short_window: 短期移动平均线周期 (对于MaCrossStrategy)
         long_window: 长期移动平均线周期 (对于MaCrossStrategy)
+        engine: 回测引擎, 'backtrader'（默认）或 'event'（基于数组的事件驱动引擎，结果格式相同、速度快得多）
         
     返回:
         回测结果字典，包含绩效指标和图表数据
     """
     try:
-        # 检查Backtrader是否可用
-        if not BACKTRADER_AVAILABLE:
-            return jsonify({
-                'error': '未安装Backtrader。请运行: pip install backtrader matplotlib==3.2.2'
-            }), 500
-        
         # 获取请求数据
         data = request.get_json()
         if not data:
@@ -140,6 +511,17 @@ def backtest_bt():
         end_date = data.get('end_date')  # 格式：YYYY-MM-DD
         strategy_name = data.get('strategy_name', 'ma_cross')
         initial_capital = float(data.get('initial_capital', 100000.0))
+        engine = data.get('engine', 'backtrader')
+        if engine not in BACKTEST_ENGINES:
+            return jsonify({'error': f'engine 参数非法，可选: {", ".join(BACKTEST_ENGINES)}'}), 400
+        # 检查Backtrader是否可用（事件驱动引擎不依赖Backtrader）
+        if engine == 'backtrader' and not BACKTRADER_AVAILABLE:
+            return jsonify({
+                'error': '未安装Backtrader。请运行: pip install backtrader matplotlib==3.2.2'
+            }), 500
+        error = _event_strategy_error(engine, strategy_name)
+        if error:
+            return error
         
         # 构造策略参数
         strategy_params = {}
@@ -174,25 +556,26 @@ def backtest_bt():
             fetch_start = (start - timedelta(days=strategy_params.get('long_ma', 60) * 2)).strftime('%Y%m%d')
             
             # 获取历史数据
-            hist_data = akshare_service.get_stock_historical_data(
+            bars = akshare_service.get_stock_bars(
                 ts_code=symbol,
                 period='daily',
                 start_date=fetch_start,
                 end_date=end_date_fmt
             )
             
-            if hist_data is None or hist_data.empty:
+            if bars is None or len(bars) == 0:
                 return jsonify({'error': f'无法获取 {symbol} 的历史数据'}), 400
             
             # 运行Backtrader回测
             results = run_backtest(
-                df=hist_data,
+                df=bars,
                 strategy_name=strategy_name,
                 strategy_params=strategy_params,
-                initial_capital=initial_capital
+                initial_capital=initial_capital,
+                engine=engine
             )
             
-            logger.info(f'Backtrader回测完成: {symbol}, 策略: {strategy_name}')
+            logger.info(f'Backtrader回测完成: {symbol}, 策略: {strategy_name}, 引擎: {engine}')
             return jsonify(results)
             
         except Exception as e:
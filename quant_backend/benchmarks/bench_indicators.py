@@ -0,0 +1,276 @@
+"""
+技术指标性能基准
+
+用法（在项目根目录）:
+    PYTHONPATH=. python -m quant_backend.benchmarks.bench_indicators [--sizes 10000,100000,1000000] [--repeat 3]
+
+- OBV：对比逐行循环的参考实现与向量化实现（先做一致性校验），输出耗时与加速比
+- 多窗口均线：对比逐窗口调用与一次计算全部窗口的矩阵版本
+- 滚动极值：对比 pandas rolling 写法与共享 RollingExtrema 的随机指标 + 一目均衡图 + 唐奇安通道
+- 指标计算图：对比逐个调用 TechnicalIndicators 与 IndicatorPlan 一次计算同一组指标
+- 面板指标：对比逐只股票循环与面板一次计算全市场
+- 计算精度：对比 float64 与 float32 面板的耗时与内存峰值
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.utils.indicator_graph import IndicatorPlan
+from quant_backend.utils.panel_indicators import PanelIndicators
+from quant_backend.utils.technical_indicators import RollingExtrema, TechnicalIndicators
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_WINDOWS = (5, 10, 20, 60, 120, 250)
+
+
+def obv_loop_reference(df: pd.DataFrame) -> pd.Series:
+    """逐行循环的 OBV 参考实现（原实现），用于一致性校验和性能对比"""
+    close = df['close']
+    volume = df['volume']
+    obv = [0]
+    for i in range(1, len(df)):
+        if pd.isna(close.iloc[i]) or pd.isna(close.iloc[i-1]) or pd.isna(volume.iloc[i]):
+            obv.append(obv[-1])
+        elif close.iloc[i] > close.iloc[i-1]:
+            obv.append(obv[-1] + volume.iloc[i])
+        elif close.iloc[i] < close.iloc[i-1]:
+            obv.append(obv[-1] - volume.iloc[i])
+        else:
+            obv.append(obv[-1])
+    return pd.Series(obv, index=df.index)
+
+
+def make_bars(n: int, nan_ratio: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """生成 n 根随机K线（close/volume），按 nan_ratio 随机置入缺失值"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n)).round(2)
+    volume = rng.integers(1_000, 100_000, n).astype(np.float64)
+    close[rng.random(n) < nan_ratio] = np.nan
+    volume[rng.random(n) < nan_ratio] = np.nan
+    index = pd.date_range('1990-01-01', periods=n, freq='min')
+    return pd.DataFrame({'close': close, 'volume': volume}, index=index)
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_obv(sizes=DEFAULT_SIZES, repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    对每个数据规模测量参考实现与向量化实现的最优耗时。
+    Returns:
+        [{'bars': n, 'loop_s': ..., 'vectorized_s': ..., 'speedup': ...}]
+    """
+    results = []
+    for n in sizes:
+        df = make_bars(n)
+        fast = TechnicalIndicators.calculate_obv(df)
+        # 循环实现很慢，只计时一次
+        start = time.perf_counter()
+        slow = obv_loop_reference(df)
+        loop_s = time.perf_counter() - start
+        np.testing.assert_allclose(fast.to_numpy(), slow.to_numpy(dtype=np.float64))
+        vectorized_s = _best_time(lambda: TechnicalIndicators.calculate_obv(df), repeat)
+        results.append({'bars': n, 'loop_s': loop_s, 'vectorized_s': vectorized_s,
+                        'speedup': loop_s / vectorized_s})
+    return results
+
+
+def bench_ma_matrix(sizes=DEFAULT_SIZES, windows=DEFAULT_WINDOWS, repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    对比逐窗口调用 calculate_pma/calculate_ema 与多窗口矩阵版本的耗时。
+    Returns:
+        [{'bars': n, 'pma_loop_s': ..., 'pma_matrix_s': ..., 'ema_loop_s': ..., 'ema_matrix_s': ...}]
+    """
+    results = []
+    for n in sizes:
+        df = make_bars(n, nan_ratio=0)
+        close = df['close']
+        results.append({
+            'bars': n,
+            'pma_loop_s': _best_time(lambda: [TechnicalIndicators.calculate_pma(df, w) for w in windows], repeat),
+            'pma_matrix_s': _best_time(lambda: TechnicalIndicators.calculate_pma_matrix(df, windows), repeat),
+            'ema_loop_s': _best_time(lambda: [TechnicalIndicators.calculate_ema(close, w) for w in windows], repeat),
+            'ema_matrix_s': _best_time(lambda: TechnicalIndicators.calculate_ema_matrix(close, windows), repeat),
+        })
+    return results
+
+
+def _extrema_rolling_reference(high: pd.Series, low: pd.Series, close: pd.Series):
+    """原写法：随机指标(9)、一目均衡图、唐奇安通道(26) 各自做 rolling().max()/min()"""
+    lowest, highest = low.rolling(9).min(), high.rolling(9).max()
+    k = 100 * ((close - lowest) / (highest - lowest))
+    mids = [(high.rolling(w).max() + low.rolling(w).min()) / 2 for w in (9, 26, 52)]
+    donchian = (high.rolling(26).max(), low.rolling(26).min())
+    return k, mids, donchian
+
+
+def _extrema_shared(high: pd.Series, low: pd.Series, close: pd.Series):
+    extrema = RollingExtrema(high, low)
+    k, _ = TechnicalIndicators.calculate_stochastic(high, low, close, k_window=9, extrema=extrema)
+    ichimoku = TechnicalIndicators.calculate_ichimoku(high, low, extrema=extrema)
+    donchian = TechnicalIndicators.calculate_donchian(high, low, 26, extrema=extrema)
+    return k, ichimoku, donchian
+
+
+def bench_extrema(sizes=DEFAULT_SIZES, repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    对比随机指标 + 一目均衡图 + 唐奇安通道的 pandas rolling 写法与共享滚动极值版本的耗时。
+    Returns:
+        [{'bars': n, 'rolling_s': ..., 'shared_s': ..., 'speedup': ...}]
+    """
+    results = []
+    for n in sizes:
+        df = make_bars(n, nan_ratio=0)
+        high, low, close = df['close'] + 0.5, df['close'] - 0.5, df['close']
+        rolling_s = _best_time(lambda: _extrema_rolling_reference(high, low, close), repeat)
+        shared_s = _best_time(lambda: _extrema_shared(high, low, close), repeat)
+        results.append({'bars': n, 'rolling_s': rolling_s, 'shared_s': shared_s, 'speedup': rolling_s / shared_s})
+    return results
+
+
+# 计算图基准使用的指标组合（常见看盘面板的一组指标）
+PLAN_SPECS = (
+    [('ma', {'window': w}) for w in (5, 20, 60)] + [('ema', {'window': w}) for w in (12, 26)]
+    + [(name, {}) for name in ('rsi', 'macd', 'bollinger', 'atr', 'stochastic', 'obv', 'mfi')]
+    + [('vma', {'window': 5}), ('vr', {'window': 5})]
+)
+
+
+def _plan_separately(df: pd.DataFrame):
+    T = TechnicalIndicators
+    close, high, low = df['close'], df['high'], df['low']
+    calls = {
+        'ma': lambda p: T.calculate_ma(close, **p), 'ema': lambda p: T.calculate_ema(close, **p),
+        'rsi': lambda p: T.calculate_rsi(close, **p), 'macd': lambda p: T.calculate_macd(close, **p),
+        'bollinger': lambda p: T.calculate_bollinger_bands(close, **p),
+        'atr': lambda p: T.calculate_atr(high, low, close, **p),
+        'stochastic': lambda p: T.calculate_stochastic(high, low, close, **p),
+        'obv': lambda p: T.calculate_obv(df), 'mfi': lambda p: T.calculate_mfi(df, **p),
+        'vma': lambda p: T.calculate_vma(df, **p), 'vr': lambda p: T.calculate_vr(df, **p),
+    }
+    return [calls[name](params) for name, params in PLAN_SPECS]
+
+
+def _plan_together(df: pd.DataFrame):
+    plan = IndicatorPlan()
+    for name, params in PLAN_SPECS:
+        plan.add(name, params)
+    return plan.compute(df)
+
+
+def bench_plan(sizes=DEFAULT_SIZES, repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    对比逐个调用 TechnicalIndicators 与计算图一次求值 PLAN_SPECS 中的全部指标。
+    Returns:
+        [{'bars': n, 'separate_s': ..., 'plan_s': ..., 'speedup': ...}]
+    """
+    results = []
+    for n in sizes:
+        df = make_bars(n, nan_ratio=0)
+        df['high'], df['low'] = df['close'] + 0.5, df['close'] - 0.5
+        separate_s = _best_time(lambda: _plan_separately(df), repeat)
+        plan_s = _best_time(lambda: _plan_together(df), repeat)
+        results.append({'bars': n, 'separate_s': separate_s, 'plan_s': plan_s, 'speedup': separate_s / plan_s})
+    return results
+
+
+def bench_panel(n_dates: int = 1_000, n_symbols: int = 5_000, suspended_ratio: float = 0.02) -> Dict[str, float]:
+    """
+    对比逐只股票循环调用与面板一次计算（RSI + MACD + MFI），面板按 suspended_ratio 随机置入停牌日。
+    """
+    rng = np.random.default_rng(0)
+    close = 50 + np.cumsum(rng.normal(0, 1, (n_dates, n_symbols)), axis=0)
+    close[rng.random(close.shape) < suspended_ratio] = np.nan
+    high, low = close + 0.5, close - 0.5
+    volume = rng.integers(1_000, 100_000, close.shape).astype(np.float64)
+
+    def loop():
+        for j in range(n_symbols):
+            df = pd.DataFrame({'high': high[:, j], 'low': low[:, j], 'close': close[:, j], 'volume': volume[:, j]})
+            df = df.dropna()
+            TechnicalIndicators.calculate_rsi(df['close'])
+            TechnicalIndicators.calculate_macd(df['close'])
+            TechnicalIndicators.calculate_mfi(df)
+
+    def panel():
+        PanelIndicators.rsi(close)
+        PanelIndicators.macd(close)
+        PanelIndicators.mfi(high, low, close, volume)
+
+    loop_s = _best_time(loop, 1)
+    panel_s = _best_time(panel, 1)
+    return {'dates': n_dates, 'symbols': n_symbols, 'loop_s': loop_s, 'panel_s': panel_s, 'speedup': loop_s / panel_s}
+
+
+def bench_precision(n_dates: int = 5_000, n_symbols: int = 1_000) -> List[Dict[str, float]]:
+    """
+    对比 float64 与 float32（成交量 int64）面板计算 RSI + MACD + MFI + 唐奇安通道的耗时与内存峰值（tracemalloc）。
+    """
+    rng = np.random.default_rng(0)
+    close = 50 + np.cumsum(rng.normal(0, 1, (n_dates, n_symbols)), axis=0)
+    high, low = close + 0.5, close - 0.5
+    volume = rng.integers(1_000, 100_000, close.shape)
+    rows = []
+    for precision, dtype in (('float64', np.float64), ('float32', np.float32)):
+        h, l, c = (pd.DataFrame(a.astype(dtype)) for a in (high, low, close))
+        v = pd.DataFrame(volume if dtype is np.float32 else volume.astype(np.float64))
+
+        def run():
+            PanelIndicators.rsi(c)
+            PanelIndicators.macd(c)
+            PanelIndicators.mfi(h, l, c, v)
+            PanelIndicators.donchian(h, l)
+
+        seconds = _best_time(run, 1)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows.append({'precision': precision, 'seconds': seconds, 'peak_mb': peak / 2 ** 20})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='技术指标性能基准')
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES),
+                        help='逗号分隔的K线数量')
+    parser.add_argument('--repeat', type=int, default=3, help='向量化实现重复次数（取最优）')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    print(f"{'bars':>10} {'loop(s)':>10} {'vectorized(s)':>14} {'speedup':>10}")
+    for row in bench_obv(sizes, args.repeat):
+        print(f"{row['bars']:>10} {row['loop_s']:>10.3f} {row['vectorized_s']:>14.5f} {row['speedup']:>9.0f}x")
+    print(f"\n多窗口均线（窗口 {','.join(str(w) for w in DEFAULT_WINDOWS)}）")
+    print(f"{'bars':>10} {'pma loop(s)':>12} {'pma matrix(s)':>14} {'ema loop(s)':>12} {'ema matrix(s)':>14}")
+    for row in bench_ma_matrix(sizes, repeat=args.repeat):
+        print(f"{row['bars']:>10} {row['pma_loop_s']:>12.5f} {row['pma_matrix_s']:>14.5f} "
+              f"{row['ema_loop_s']:>12.5f} {row['ema_matrix_s']:>14.5f}")
+    print("\n随机指标 + 一目均衡图 + 唐奇安通道（滚动极值）")
+    print(f"{'bars':>10} {'rolling(s)':>12} {'shared(s)':>12} {'speedup':>10}")
+    for row in bench_extrema(sizes, args.repeat):
+        print(f"{row['bars']:>10} {row['rolling_s']:>12.5f} {row['shared_s']:>12.5f} {row['speedup']:>9.1f}x")
+    print(f"\n指标计算图（{len(PLAN_SPECS)} 个指标）")
+    print(f"{'bars':>10} {'separate(s)':>12} {'plan(s)':>12} {'speedup':>10}")
+    for row in bench_plan(sizes, args.repeat):
+        print(f"{row['bars']:>10} {row['separate_s']:>12.5f} {row['plan_s']:>12.5f} {row['speedup']:>9.1f}x")
+    row = bench_panel()
+    print(f"\n面板指标 RSI+MACD+MFI（{row['dates']} 日 × {row['symbols']} 只）")
+    print(f"loop {row['loop_s']:.2f}s, panel {row['panel_s']:.2f}s, speedup {row['speedup']:.1f}x")
+    print("\n面板计算精度 RSI+MACD+MFI+唐奇安通道（5000 日 × 1000 只）")
+    print(f"{'precision':>10} {'time(s)':>10} {'peak(MB)':>10}")
+    for row in bench_precision():
+        print(f"{row['precision']:>10} {row['seconds']:>10.3f} {row['peak_mb']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Union, Type
+from typing import Dict, Any, List, Optional, Tuple, Union, Type
 
 # 检查backtrader是否已安装
 try:
@@ -15,12 +15,15 @@ except ImportError:
 
 # 引入内部模块
 from quant_backend.bt_strategies.bt_result_parser import BacktraderResultParser
-from quant_backend.bt_strategies.strategies.ma_cross_strategy import MaCrossStrategy
-from quant_backend.bt_strategies.strategies.volume_breakout_strategy import VolumeBreakoutStrategy
+from quant_backend.bt_strategies.event_engine import EventEngine, get_event_strategy_class
+from quant_backend.services.bar_file import bars_to_ohlcv
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 回测引擎：'backtrader' 为 Backtrader cerebro，'event' 为 event_engine 中基于数组的事件驱动引擎
+BACKTEST_ENGINES = ('backtrader', 'event')
+
 def check_backtrader_installed():
     """检查backtrader是否已安装"""
     if not BACKTRADER_AVAILABLE:
@@ -52,6 +55,16 @@ def prepare_data(
     返回:
         标准化的DataFrame
     """
+    # BAR_DTYPE 结构化数组（本地K线存储的内存映射视图）已是有序、去重的数值数据，
+    # 无缺失值时直接引用其字段，跳过日期解析和复制
+    if isinstance(df, np.ndarray):
+        bars = df
+        df = bars_to_ohlcv(bars)
+        if not any(np.isnan(bars[col]).any() for col in ('open', 'high', 'low', 'close', 'vol')):
+            return df
+        df = df.reset_index()
+        date_col = 'datetime'
+    
     df = df.copy()
     
     # 统一列名为小写
@@ -112,7 +125,7 @@ def prepare_data(
     
     return df
 
-def get_strategy_class(strategy_name: str) -> Type[bt.Strategy]:
+def get_strategy_class(strategy_name: str) -> 'Type[bt.Strategy]':
     """
     根据策略名称获取策略类
     
@@ -122,6 +135,10 @@ def get_strategy_class(strategy_name: str) -> Type[bt.Strategy]:
     返回:
         对应的策略类
     """
+    # Backtrader 策略依赖 backtrader，在此处导入，使 engine='event' 不需要安装 Backtrader
+    from quant_backend.bt_strategies.strategies.ma_cross_strategy import MaCrossStrategy
+    from quant_backend.bt_strategies.strategies.volume_breakout_strategy import VolumeBreakoutStrategy
+
     # 策略映射表
     strategies = {
         'ma_cross': MaCrossStrategy,
@@ -147,32 +164,20 @@ def get_strategy_class(strategy_name: str) -> Type[bt.Strategy]:
         # 默认使用MaCrossStrategy
         return MaCrossStrategy
 
-def run_backtest(
-    df: pd.DataFrame,
-    strategy_name: str = 'ma_cross',
-    strategy_params: Optional[Dict[str, Any]] = None,
-    initial_capital: float = 100000.0,
-    commission: float = 0.001
-) -> Dict[str, Any]:
+def _build_cerebro(
+    data: pd.DataFrame,
+    strategy_name: str,
+    strategy_params: Optional[Dict[str, Any]],
+    initial_capital: float,
+    commission: float
+) -> 'bt.Cerebro':
     """
-    运行回测主函数
+    创建已添加策略、数据源、资金/佣金设置和常用分析器的 cerebro 引擎
     
     参数:
-        df: 包含OHLCV数据的DataFrame
-        strategy_name: 策略名称
-        strategy_params: 策略参数字典
-        initial_capital: 初始资金
-        commission: 交易佣金比例
-        
-    返回:
-        回测结果字典
+        data: prepare_data 处理后的 DataFrame
+        其余参数同 run_backtest
     """
-    # 检查backtrader是否已安装
-    check_backtrader_installed()
-    
-    # 准备数据
-    data = prepare_data(df)
-    
     # 创建cerebro引擎
     cerebro = bt.Cerebro()
     
@@ -209,17 +214,102 @@ def run_backtest(
     cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
     cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
     cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trade')
+    return cerebro
+
+def _run_engine(
+    df: Union[pd.DataFrame, np.ndarray],
+    strategy_name: str,
+    strategy_params: Optional[Dict[str, Any]],
+    initial_capital: float,
+    commission: float,
+    engine: str,
+    daily_returns: bool = False
+):
+    """
+    准备数据并用指定引擎运行回测
     
+    返回:
+        (数据, cerebro 或 EventEngine 实例, 策略实例)
+    """
+    if engine not in BACKTEST_ENGINES:
+        raise ValueError(f'不支持的回测引擎: {engine}，可选: {", ".join(BACKTEST_ENGINES)}')
+    if engine == 'backtrader':
+        check_backtrader_installed()
+    data = prepare_data(df)
+    if engine == 'event':
+        runner = EventEngine(data, get_event_strategy_class(strategy_name), strategy_params,
+                             initial_capital, commission)
+        return data, runner, runner.run()
+    runner = _build_cerebro(data, strategy_name, strategy_params, initial_capital, commission)
+    if daily_returns:
+        runner.addanalyzer(bt.analyzers.TimeReturn, _name='time_return', timeframe=bt.TimeFrame.Days)
+    return data, runner, runner.run()[0]
+
+def run_backtest(
+    df: Union[pd.DataFrame, np.ndarray],
+    strategy_name: str = 'ma_cross',
+    strategy_params: Optional[Dict[str, Any]] = None,
+    initial_capital: float = 100000.0,
+    commission: float = 0.001,
+    engine: str = 'backtrader'
+) -> Dict[str, Any]:
+    """
+    运行回测主函数
+    
+    参数:
+        df: 包含OHLCV数据的DataFrame，或 BAR_DTYPE 结构化数组
+        strategy_name: 策略名称
+        strategy_params: 策略参数字典
+        initial_capital: 初始资金
+        commission: 交易佣金比例
+        engine: 回测引擎，见 BACKTEST_ENGINES；'event' 引擎支持 event_engine.EVENT_STRATEGIES 中的策略
+        
+    返回:
+        回测结果字典
+    """
     # 运行回测
-    logger.info(f'开始回测，初始资金: {initial_capital:.2f}')
-    results = cerebro.run()
-    strategy_instance = results[0]
+    logger.info(f'开始回测（{engine}），初始资金: {initial_capital:.2f}')
+    data, runner, strategy_instance = _run_engine(
+        df, strategy_name, strategy_params, initial_capital, commission, engine
+    )
     
     # 获取最终资金
-    final_value = cerebro.broker.getvalue()
+    final_value = runner.broker.getvalue()
     logger.info(f'回测完成，最终资金: {final_value:.2f}')
     
     # 解析并返回结果
     return BacktraderResultParser.parse_results(
-        cerebro, strategy_instance, data, initial_capital
+        runner, strategy_instance, data, initial_capital
+    )
+
+def run_backtest_returns(
+    df: Union[pd.DataFrame, np.ndarray],
+    strategy_name: str = 'ma_cross',
+    strategy_params: Optional[Dict[str, Any]] = None,
+    initial_capital: float = 100000.0,
+    commission: float = 0.001,
+    engine: str = 'backtrader'
+) -> Tuple[Dict[str, float], pd.Series]:
+    """
+    运行回测，返回绩效指标和按日的账户收益率序列（不生成图表数据，供参数优化等批量回测使用）
+    
+    参数:
+        同 run_backtest
+        
+    返回:
+        (绩效指标字典, 以日期为索引的账户日收益率 Series)
+    """
+    data, runner, strategy_instance = _run_engine(
+        df, strategy_name, strategy_params, initial_capital, commission, engine, daily_returns=True
+    )
+    performance = BacktraderResultParser._calculate_performance(
+        runner, strategy_instance, initial_capital, runner.broker.getvalue(), data
     )
+    if engine == 'event':
+        values = runner.values
+        # 首日相对初始资金，索引与 TimeReturn 分析器相同（按日、无名称）
+        index = pd.DatetimeIndex(data.index.normalize().to_numpy())
+        return performance, pd.Series(values / np.r_[initial_capital, values[:-1]] - 1, index=index, dtype=np.float64)
+    time_return = strategy_instance.analyzers.time_return.get_analysis()
+    returns = pd.Series(list(time_return.values()), index=pd.DatetimeIndex(list(time_return.keys())), dtype=np.float64)
+    return performance, returns
@@ -0,0 +1,493 @@
+"""
+轻量级事件驱动回测引擎
+
+与 backtest_runner 的 Backtrader 引擎撮合规则一致：
+- 逐根K线先由经纪商处理订单，再调用策略的 next()，指标全部有效（达到最小周期）之后才调用 next()；
+- 市价单在下一根K线开盘成交，提交时按创建时的收盘价检查资金，资金不足的订单以 Margin 状态拒绝；
+- 佣金按成交金额比例收取；buy()/sell() 不指定数量时为 1 股（与 Backtrader 默认 sizer 相同）。
+
+与 Backtrader 的区别在于实现方式：K线保存为 NumPy 数组，指标在回测开始前一次性向量化计算，
+策略在 next(i) 中按下标读取；订单、持仓使用 __slots__ 记录；分析器不逐根K线更新，而是在回测结束后
+由逐日账户价值数组一次计算。EventEngine 提供与 cerebro 相同的 broker.getvalue()、策略实例的
+params / analyzers / get_signals() 接口，回测结果直接交给 BacktraderResultParser 解析，格式与 Backtrader 引擎相同。
+"""
+import math
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+
+# 与 Backtrader SharpeRatio 分析器默认参数一致：年度收益、无风险利率 1%
+RISK_FREE_RATE = 0.01
+# 与 Backtrader Returns 分析器日线数据的年化系数一致
+TRADING_DAYS_PER_YEAR = 252
+
+
+class Order:
+    """市价单记录"""
+    __slots__ = ('ref', 'size', 'created', 'created_price', 'status',
+                 'executed', 'executed_size', 'executed_price', 'executed_comm')
+
+    Submitted, Accepted, Completed, Margin = range(4)
+
+    def __init__(self, ref: int, size: float, created: int, created_price: float):
+        self.ref = ref
+        self.size = size
+        self.created = created
+        self.created_price = created_price
+        self.status = Order.Submitted
+        self.executed = -1
+        self.executed_size = 0.0
+        self.executed_price = 0.0
+        self.executed_comm = 0.0
+
+    def isbuy(self) -> bool:
+        return self.size > 0
+
+
+class Position:
+    """持仓记录：数量（空头为负）和持仓均价"""
+    __slots__ = ('size', 'price')
+
+    def __init__(self, size: float = 0.0, price: float = 0.0):
+        self.size = size
+        self.price = price
+
+    def __bool__(self) -> bool:
+        return self.size != 0
+
+    def split(self, size: float) -> Tuple[float, float]:
+        """把成交数量拆分为 (平仓部分, 开仓部分)"""
+        if self.size == 0 or (self.size > 0) == (size > 0):
+            return 0.0, size
+        closed = size if abs(size) <= abs(self.size) else -self.size
+        return closed, size - closed
+
+    def update(self, size: float, price: float) -> None:
+        new_size = self.size + size
+        if new_size == 0:
+            self.price = 0.0
+        elif self.size == 0 or (self.size > 0) != (new_size > 0):
+            self.price = price
+        elif (self.size > 0) == (size > 0):
+            self.price = (self.price * self.size + price * size) / new_size
+        self.size = new_size
+
+
+class EventBroker:
+    """
+    单标的经纪商：现金、持仓、待处理订单和已完成交易的盈亏
+
+    Args:
+        cash: 初始资金
+        commission: 佣金费率（成交金额的比例）
+    """
+    __slots__ = ('startingcash', 'cash', 'commission', 'position', 'value', 'trades',
+                 '_submitted', '_index', '_close', '_ref', '_trade_gross', '_trade_net')
+
+    def __init__(self, cash: float, commission: float):
+        self.startingcash = cash
+        self.cash = cash
+        self.commission = commission
+        self.position = Position()
+        self.value = cash
+        # 已平仓交易的 (毛利润, 净利润)
+        self.trades: List[Tuple[float, float]] = []
+        self._submitted: List[Order] = []
+        self._index = -1
+        self._close = np.nan
+        self._ref = 0
+        self._trade_gross = 0.0
+        self._trade_net = 0.0
+
+    def getcash(self) -> float:
+        return self.cash
+
+    def getvalue(self) -> float:
+        return self.value
+
+    def submit(self, size: float) -> Order:
+        """在当前K线按收盘价创建市价单，下一根K线开盘成交"""
+        self._ref += 1
+        order = Order(self._ref, size, self._index, self._close)
+        self._submitted.append(order)
+        return order
+
+    def _fill(self, size: float, price: float) -> float:
+        """按价格成交（平仓或开仓，不跨越零持仓），返回佣金"""
+        comm = abs(size) * price * self.commission
+        self.cash -= size * price + comm
+        self._trade_gross -= size * price
+        self._trade_net -= size * price + comm
+        self.position.update(size, price)
+        if self.position.size == 0:
+            self.trades.append((self._trade_gross, self._trade_net))
+            self._trade_gross = self._trade_net = 0.0
+        return comm
+
+    def next(self, index: int, open_: float, close: float) -> List[Order]:
+        """
+        处理一根K线：检查上一根K线提交的订单的资金，按开盘价成交，再按收盘价更新账户价值
+
+        Returns:
+            状态发生变化（成交或被拒绝）的订单
+        """
+        self._index = index
+        self._close = close
+        notifications = []
+        if self._submitted:
+            orders, self._submitted = self._submitted, []
+            # 按创建时的价格模拟成交，依次检查资金
+            cash, position = self.cash, Position(self.position.size, self.position.price)
+            for order in orders:
+                closed, opened = position.split(order.size)
+                price = order.created_price
+                cash -= (closed + opened) * price + (abs(closed) + abs(opened)) * price * self.commission
+                if cash < 0:
+                    order.status = Order.Margin
+                    notifications.append(order)
+                    cash += (closed + opened) * price + (abs(closed) + abs(opened)) * price * self.commission
+                    continue
+                position.update(order.size, price)
+                order.status = Order.Accepted
+            for order in orders:
+                if order.status != Order.Accepted:
+                    continue
+                closed, opened = self.position.split(order.size)
+                comm = self._fill(closed, open_) if closed else 0.0
+                if opened:
+                    cost = opened * open_ + abs(opened) * open_ * self.commission
+                    if self.cash - cost < 0:
+                        opened = 0.0
+                    else:
+                        comm += self._fill(opened, open_)
+                order.executed = index
+                order.executed_size = closed + opened
+                # 同 Backtrader 按成交数量加权计算成交均价（保证浮点结果一致）
+                order.executed_price = order.executed_size * open_ / order.executed_size if order.executed_size else open_
+                order.executed_comm = comm
+                order.status = Order.Completed if order.executed_size == order.size else Order.Margin
+                notifications.append(order)
+        self.value = self.cash + self.position.size * close
+        return notifications
+
+
+class _Analysis:
+    """与 Backtrader 分析器相同的 get_analysis() 接口"""
+    __slots__ = ('_result',)
+
+    def __init__(self, result: Dict[str, Any]):
+        self._result = result
+
+    def get_analysis(self) -> Dict[str, Any]:
+        return self._result
+
+
+def _sharpe_analysis(values: np.ndarray, dates: np.ndarray, initial_capital: float) -> Dict[str, Any]:
+    """年度收益的夏普比率（同 Backtrader SharpeRatio 默认参数：总体标准差，不年化）"""
+    years = dates.astype('datetime64[Y]')
+    last = np.r_[years[1:] != years[:-1], True]
+    ends = values[last]
+    starts = np.r_[initial_capital, ends[:-1]]
+    excess = ends / starts - 1 - RISK_FREE_RATE
+    std = excess.std()
+    return {'sharperatio': float(excess.mean() / std) if std != 0 and np.isfinite(std) else None}
+
+
+def _drawdown_analysis(values: np.ndarray) -> Dict[str, Any]:
+    """回撤（百分比）及回撤持续的K线数（同 Backtrader DrawDown）"""
+    peak = np.maximum.accumulate(values)
+    moneydown = peak - values
+    drawdown = 100.0 * moneydown / peak
+    # 连续处于回撤中的K线数
+    underwater = drawdown != 0
+    run_start = np.maximum.accumulate(np.where(underwater, 0, np.arange(len(values)) + 1))
+    length = np.where(underwater, np.arange(len(values)) + 1 - run_start, 0)
+    return {
+        'len': int(length[-1]),
+        'drawdown': float(drawdown[-1]),
+        'moneydown': float(moneydown[-1]),
+        'max': {'len': int(length.max()), 'drawdown': float(drawdown.max()), 'moneydown': float(moneydown.max())},
+    }
+
+
+def _returns_analysis(values: np.ndarray, initial_capital: float) -> Dict[str, float]:
+    """对数总收益、平均每根K线收益及年化收益（同 Backtrader Returns）"""
+    ratio = values[-1] / initial_capital
+    rtot = math.log(ratio) if ratio > 0 else float('-inf')
+    ravg = rtot / len(values)
+    rnorm = math.expm1(ravg * TRADING_DAYS_PER_YEAR) if ravg > float('-inf') else ravg
+    return {'rtot': rtot, 'ravg': ravg, 'rnorm': rnorm, 'rnorm100': rnorm * 100.0}
+
+
+def _trade_analysis(trades: List[Tuple[float, float]], position: Position) -> Dict[str, Any]:
+    """交易统计（Backtrader TradeAnalyzer 的笔数与盈亏字段）"""
+    is_open = int(bool(position))
+    if not trades and not is_open:
+        return {'total': {'total': 0}}
+    gross = np.array([t[0] for t in trades], dtype=np.float64)
+    net = np.array([t[1] for t in trades], dtype=np.float64)
+    won, lost = net[net > 0], net[net <= 0]
+    closed = len(trades)
+    return {
+        'total': {'total': closed + is_open, 'open': is_open, 'closed': closed},
+        'pnl': {
+            'gross': {'total': float(gross.sum()), 'average': float(gross.mean()) if closed else 0.0},
+            'net': {'total': float(net.sum()), 'average': float(net.mean()) if closed else 0.0},
+        },
+        'won': {'total': len(won), 'pnl': {'total': float(won.sum()), 'max': float(won.max()) if len(won) else 0.0}},
+        'lost': {'total': len(lost), 'pnl': {'total': float(lost.sum()), 'max': float(lost.min()) if len(lost) else 0.0}},
+    }
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """简单移动平均，前 period - 1 个值为 NaN"""
+    result = np.full(len(values), np.nan)
+    if 0 < period <= len(values):
+        result[period - 1:] = np.lib.stride_tricks.sliding_window_view(values, period).mean(axis=1)
+    return result
+
+
+def crossover(fast: np.ndarray, slow: np.ndarray, start: int) -> np.ndarray:
+    """
+    交叉信号（同 Backtrader CrossOver）：上穿为 1，下穿为 -1，否则为 0。
+    前一根K线的差值为 0 时沿用最近一次非零差值判断交叉前的位置。
+
+    Args:
+        start: 两条线都有效的第一个下标
+    """
+    diff = fast - slow
+    signal = np.zeros(len(diff))
+    if start + 1 >= len(diff):
+        return signal
+    nzd = pd.Series(diff[start:])
+    # 首个差值为 0 时保持为 0，之后的 0 沿用前值
+    nzd[1:] = nzd[1:].replace(0.0, np.nan)
+    prev = nzd.ffill().fillna(0.0).to_numpy()[:-1]
+    cur = diff[start + 1:]
+    signal[start + 1:] = (prev < 0) & (cur > 0)
+    signal[start + 1:] -= (prev > 0) & (cur < 0)
+    return signal
+
+
+class EventStrategy:
+    """
+    事件驱动策略基类
+
+    子类声明 params（同 Backtrader 的 (名称, 默认值) 元组），在 init() 中用 self.data 的数组计算指标
+    并设置最小周期 self.minperiod，在 next(i) 中按下标读取指标并调用 buy()/sell() 下单。
+
+    Args:
+        broker: 经纪商
+        data: 列名到数组的映射（open/high/low/close/volume），以及 datetime64[D] 日期数组 'date'
+        **kwargs: 策略参数，覆盖 params 中的默认值
+    """
+    params: Tuple[Tuple[str, Any], ...] = (('printlog', False),)
+
+    def __init__(self, broker: EventBroker, data: Dict[str, np.ndarray], **kwargs):
+        defaults = dict(self.params)
+        unknown = set(kwargs) - set(defaults)
+        if unknown:
+            raise TypeError(f'未知的策略参数: {", ".join(sorted(unknown))}')
+        defaults.update(kwargs)
+        self.params = self.p = SimpleNamespace(**defaults)
+        self.broker = broker
+        self.data = data
+        self.order: Optional[Order] = None
+        self.buy_signals: List[Dict[str, Any]] = []
+        self.sell_signals: List[Dict[str, Any]] = []
+        self.analyzers = SimpleNamespace()
+        self.minperiod = 1
+        self.init()
+
+    @property
+    def position(self) -> Position:
+        return self.broker.position
+
+    def init(self) -> None:
+        """计算指标并设置 self.minperiod"""
+
+    def next(self, i: int) -> None:
+        """第 i 根K线的交易逻辑"""
+
+    def log(self, txt: str, i: int, doprint: bool = False) -> None:
+        """记录策略日志"""
+        if self.p.printlog or doprint:
+            print(f'{self.data["date"][i]}: {txt}')
+
+    def buy(self, size: Optional[float] = None) -> Order:
+        return self.broker.submit(1 if size is None else abs(size))
+
+    def sell(self, size: Optional[float] = None) -> Order:
+        return self.broker.submit(-1 if size is None else -abs(size))
+
+    def close(self) -> Optional[Order]:
+        """平掉全部持仓，无持仓时返回 None"""
+        size = self.position.size
+        if size > 0:
+            return self.sell(size=size)
+        if size < 0:
+            return self.buy(size=-size)
+        return None
+
+    def notify_order(self, order: Order) -> None:
+        """处理订单状态：记录成交信号并清除挂单"""
+        if order.status == Order.Completed:
+            signal = {'date': str(self.data['date'][order.executed]), 'price': order.executed_price}
+            if order.isbuy():
+                self.log(f'买入执行: 价格={order.executed_price:.2f}, 佣金={order.executed_comm:.2f}', order.executed)
+                self.buy_signals.append(signal)
+            else:
+                self.log(f'卖出执行: 价格={order.executed_price:.2f}, 佣金={order.executed_comm:.2f}', order.executed)
+                self.sell_signals.append(signal)
+        else:
+            self.log('订单被取消/拒绝', self.broker._index)
+        self.order = None
+
+    def get_signals(self) -> Dict[str, List[Dict[str, Any]]]:
+        """获取交易信号"""
+        return {
+            'buy_signals': self.buy_signals,
+            'sell_signals': self.sell_signals
+        }
+
+
+class MaCrossEventStrategy(EventStrategy):
+    """
+    简单移动平均线交叉策略（strategies.ma_cross_strategy.MaCrossStrategy 的事件引擎版本）
+
+    参数:
+        short_ma: 短期移动平均线周期
+        long_ma: 长期移动平均线周期
+    """
+    params = (
+        ('short_ma', 20),
+        ('long_ma', 60),
+        ('printlog', False),
+    )
+
+    def init(self):
+        close = self.data['close']
+        start = max(self.p.short_ma, self.p.long_ma) - 1
+        self.crossover = crossover(sma(close, self.p.short_ma), sma(close, self.p.long_ma), start)
+        self.minperiod = start + 2
+
+    def next(self, i):
+        if self.order:
+            return
+        if not self.position:
+            if self.crossover[i] > 0:
+                self.order = self.buy()
+        elif self.crossover[i] < 0:
+            self.order = self.sell()
+
+
+class VolumeBreakoutEventStrategy(EventStrategy):
+    """
+    交易量突破策略（strategies.volume_breakout_strategy.VolumeBreakoutStrategy 的事件引擎版本）
+
+    参数:
+        volume_window: 交易量移动平均窗口周期
+        volume_mult: 交易量放大倍数阈值
+        price_change_threshold: 价格变化触发阈值(%)
+        lookback_days: 价格对比的回看天数
+        order_percentage: 订单金额占可用资金比例
+    """
+    params = (
+        ('volume_window', 20),
+        ('volume_mult', 2.0),
+        ('price_change_threshold', 2.0),
+        ('lookback_days', 3),
+        ('order_percentage', 0.95),
+        ('printlog', False),
+    )
+
+    def init(self):
+        close, volume = self.data['close'], self.data['volume']
+        volume_ma = sma(volume, self.p.volume_window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.volume_ratio = np.where(volume_ma > 0, volume / volume_ma, 0.0)
+            lookback = self.p.lookback_days
+            self.price_change_pct = np.full(len(close), np.nan)
+            self.price_change_pct[lookback:] = (close[lookback:] / close[:len(close) - lookback] - 1.0) * 100
+        self.minperiod = max(self.p.volume_window, lookback + 1)
+
+    def next(self, i):
+        if self.order:
+            return
+        volume_ratio = self.volume_ratio[i]
+        price_change_pct = self.price_change_pct[i]
+        if not self.position:
+            if volume_ratio > self.p.volume_mult and price_change_pct > self.p.price_change_threshold:
+                size = int(self.broker.getcash() * self.p.order_percentage / self.data['close'][i])
+                if size > 0:
+                    self.order = self.buy(size=size)
+        elif volume_ratio > self.p.volume_mult and price_change_pct < -self.p.price_change_threshold:
+            self.order = self.close()
+
+
+# 策略名称到事件引擎策略类的映射（名称同 backtest_runner.get_strategy_class）
+EVENT_STRATEGIES: Dict[str, Type[EventStrategy]] = {
+    'ma_cross': MaCrossEventStrategy,
+    'volume_breakout': VolumeBreakoutEventStrategy,
+}
+
+
+def get_event_strategy_class(strategy_name: str) -> Type[EventStrategy]:
+    """根据策略名称获取事件引擎策略类"""
+    try:
+        return EVENT_STRATEGIES[strategy_name]
+    except KeyError:
+        raise ValueError(f'事件引擎不支持的策略: {strategy_name}，可选: {", ".join(EVENT_STRATEGIES)}')
+
+
+class EventEngine:
+    """
+    事件驱动回测引擎
+
+    Args:
+        data: prepare_data 处理后的 DataFrame（DatetimeIndex，含 open/high/low/close/volume 列）
+        strategy_class: EventStrategy 子类
+        strategy_params: 策略参数
+        initial_capital: 初始资金
+        commission: 佣金费率
+    """
+
+    def __init__(self, data: pd.DataFrame, strategy_class: Type[EventStrategy],
+                 strategy_params: Optional[Dict[str, Any]] = None,
+                 initial_capital: float = 100000.0, commission: float = 0.001):
+        self.data = data
+        self.strategy_class = strategy_class
+        self.strategy_params = strategy_params or {}
+        self.broker = EventBroker(initial_capital, commission)
+        self.values: Optional[np.ndarray] = None
+
+    def run(self) -> EventStrategy:
+        """运行回测，返回带分析结果的策略实例；逐日账户价值保存在 self.values"""
+        arrays = {col: self.data[col].to_numpy(dtype=np.float64)
+                  for col in ('open', 'high', 'low', 'close', 'volume')}
+        arrays['date'] = self.data.index.to_numpy().astype('datetime64[D]')
+        if len(arrays['date']) == 0:
+            raise ValueError('行情数据为空')
+        broker = self.broker
+        strategy = self.strategy_class(broker, arrays, **self.strategy_params)
+        open_, close = arrays['open'], arrays['close']
+        values = np.empty(len(close))
+        first = strategy.minperiod - 1
+        for i in range(len(close)):
+            for order in broker.next(i, open_[i], close[i]):
+                strategy.notify_order(order)
+            if i >= first:
+                strategy.next(i)
+            values[i] = broker.value
+
+        initial_capital = broker.startingcash
+        strategy.analyzers = SimpleNamespace(
+            sharpe=_Analysis(_sharpe_analysis(values, arrays['date'], initial_capital)),
+            drawdown=_Analysis(_drawdown_analysis(values)),
+            returns=_Analysis(_returns_analysis(values, initial_capital)),
+            trade=_Analysis(_trade_analysis(broker.trades, broker.position)),
+        )
+        self.values = values
+        return strategy
@@ -119,7 +119,8 @@ class VolumeBreakoutStrategy(bt.Strategy):
             if (volume_ratio > self.params.volume_mult and 
                 price_change_pct < -self.params.price_change_threshold):
                 self.log(f'卖出信号: 价格={self.dataclose[0]:.2f}, 交易量倍数={volume_ratio:.2f}, 价格变化={price_change_pct:.2f}%')
-                self.order = self.sell()
+                # 清仓（不指定数量的 sell() 只按默认 sizer 卖出 1 股）
+                self.order = self.close()
     
     def stop(self):
         """策略结束时调用"""
@@ -0,0 +1,214 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+# 检查backtrader是否已安装
+try:
+    import backtrader as bt
+    BACKTRADER_AVAILABLE = True
+except ImportError:
+    BACKTRADER_AVAILABLE = False
+
+# 添加项目根目录到路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from quant_backend.bt_strategies.event_engine import (
+    EventBroker, EventEngine, MaCrossEventStrategy, Order, Position, crossover, get_event_strategy_class, sma
+)
+from quant_backend.api.strategy_routes import strategy_bp
+from quant_backend.bt_strategies.backtest_runner import run_backtest, run_backtest_returns, prepare_data
+from quant_backend.tests.helpers import make_bars
+
+
+class TestEventPrimitives(unittest.TestCase):
+    """测试订单、持仓、经纪商和指标"""
+
+    def test_position_split_and_update(self):
+        position = Position()
+        self.assertEqual(position.split(5), (0.0, 5))
+        position.update(5, 10.0)
+        position.update(5, 20.0)
+        self.assertEqual((position.size, position.price), (10, 15.0))
+        # 反手：先平 10 股，再开 3 股空头
+        self.assertEqual(position.split(-13), (-10, -3))
+        position.update(-4, 30.0)
+        self.assertEqual((position.size, position.price), (6, 15.0))
+        position.update(-6, 30.0)
+        self.assertFalse(position)
+
+    def test_broker_fills_at_next_open_with_commission(self):
+        broker = EventBroker(1000.0, 0.01)
+        broker.next(0, 10.0, 10.0)
+        order = broker.submit(50)
+        self.assertEqual(order.status, Order.Submitted)
+        notifications = broker.next(1, 11.0, 12.0)
+        self.assertEqual(notifications, [order])
+        self.assertEqual(order.status, Order.Completed)
+        self.assertEqual((order.executed, order.executed_price), (1, 11.0))
+        self.assertAlmostEqual(order.executed_comm, 5.5)
+        self.assertAlmostEqual(broker.getcash(), 1000.0 - 550.0 - 5.5)
+        self.assertAlmostEqual(broker.getvalue(), broker.getcash() + 50 * 12.0)
+        broker.submit(-50)
+        broker.next(2, 13.0, 13.0)
+        self.assertFalse(broker.position)
+        self.assertEqual(len(broker.trades), 1)
+        gross, net = broker.trades[0]
+        self.assertAlmostEqual(gross, 100.0)
+        self.assertAlmostEqual(net, 100.0 - 5.5 - 6.5)
+
+    def test_broker_margin(self):
+        # 提交时按创建时的收盘价检查资金
+        broker = EventBroker(100.0, 0.0)
+        broker.next(0, 10.0, 10.0)
+        order = broker.submit(11)
+        broker.next(1, 5.0, 5.0)
+        self.assertEqual(order.status, Order.Margin)
+        self.assertEqual(broker.getcash(), 100.0)
+        # 通过提交检查，但开盘跳空后资金不足，同样拒绝
+        order = broker.submit(10)
+        broker.next(2, 10.5, 10.5)
+        self.assertEqual(order.status, Order.Margin)
+        self.assertFalse(broker.position)
+
+    def test_crossover_matches_loop(self):
+        fast = np.array([np.nan, 1, 2, 2, 3, 3, 2, 2, 1, 2, 3, 3, 4], dtype=np.float64)
+        slow = np.full(len(fast), 2.0)
+        expected = np.zeros(len(fast))
+        nzd = fast[1] - slow[1]
+        for i in range(2, len(fast)):
+            diff = fast[i] - slow[i]
+            if nzd < 0 < diff:
+                expected[i] = 1
+            elif nzd > 0 > diff:
+                expected[i] = -1
+            nzd = diff if diff else nzd
+        np.testing.assert_array_equal(crossover(fast, slow, 1), expected)
+
+    def test_sma(self):
+        values = np.arange(1.0, 8.0)
+        np.testing.assert_allclose(sma(values, 3), [np.nan, np.nan, 2, 3, 4, 5, 6])
+        self.assertTrue(np.isnan(sma(values, 10)).all())
+
+    def test_strategy_parameters(self):
+        data = prepare_data(make_bars(100))
+        self.assertIs(get_event_strategy_class('ma_cross'), MaCrossEventStrategy)
+        with self.assertRaises(ValueError):
+            get_event_strategy_class('unknown_strategy')
+        with self.assertRaises(TypeError):
+            EventEngine(data, MaCrossEventStrategy, {'short_window': 5}).run()
+
+
+class TestWithoutBacktrader(unittest.TestCase):
+    """未安装 Backtrader 时事件驱动引擎仍可使用"""
+
+    def test_import_and_run_without_backtrader(self):
+        code = (
+            "import sys; sys.modules['backtrader'] = None\n"
+            "from quant_backend.api import strategy_routes\n"
+            "from quant_backend.bt_strategies.backtest_runner import run_backtest\n"
+            "from quant_backend.tests.helpers import make_bars\n"
+            "assert not strategy_routes.BACKTRADER_AVAILABLE\n"
+            "run_backtest(make_bars(100), 'ma_cross', {'short_ma': 5, 'long_ma': 20}, engine='event')\n"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=root))
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    @patch('quant_backend.api.strategy_routes.BACKTRADER_AVAILABLE', False)
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_routes_gate_only_backtrader_engine(self, mock_bars):
+        mock_bars.return_value = make_bars()
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        client = app.test_client()
+        body = {'symbol': '000001.SZ', 'start_date': '2018-03-01', 'end_date': '2020-04-30',
+                'short_window': 5, 'long_window': 20}
+        self.assertEqual(client.post('/api/strategy/backtest_bt', json=dict(body, engine='event')).status_code, 200)
+        self.assertEqual(client.post('/api/strategy/backtest_bt', json=body).status_code, 500)
+        for route in ('walk_forward', 'monte_carlo'):
+            resp = client.post(f'/api/strategy/{route}', json=dict(body, engine='backtrader', param_grid={}))
+            self.assertEqual(resp.status_code, 500, route)
+
+
+@pytest.mark.skipif(not BACKTRADER_AVAILABLE, reason="Backtrader not installed")
+class TestEventEngineParity(unittest.TestCase):
+    """事件驱动引擎与 Backtrader 引擎的回测结果应完全相同"""
+
+    cases = [
+        ('ma_cross', {'short_ma': 5, 'long_ma': 20}, 100000.0, 0.001),
+        ('ma_cross', {'short_ma': 3, 'long_ma': 8}, 25.0, 0.001),
+        ('volume_breakout', {}, 100000.0, 0.001),
+        ('volume_breakout', {'volume_mult': 1.2, 'price_change_threshold': 0.5, 'order_percentage': 1.0}, 10000.0, 0.003),
+    ]
+
+    def test_run_backtest(self):
+        signals = 0
+        # 不同的开盘跳空幅度，覆盖开盘价跳空导致资金不足的拒单
+        for seed in range(3):
+            bars = make_bars(seed=seed, gap=0.03 * (seed + 1))
+            for name, params, capital, commission in self.cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = run_backtest(bars, name, params, capital, commission)
+                actual = run_backtest(bars, name, params, capital, commission, engine='event')
+                self.assertEqual(actual, expected, f'{name} {params} seed={seed}')
+                signals += len(expected['chart_data']['buy_signals'])
+        self.assertGreater(signals, 0)
+
+    def test_run_backtest_returns(self):
+        bars = make_bars(seed=4)
+        for name, params, capital, commission in self.cases:
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = run_backtest_returns(bars, name, params, capital, commission)
+            actual = run_backtest_returns(bars, name, params, capital, commission, engine='event')
+            self.assertEqual(actual[0], expected[0])
+            pd.testing.assert_series_equal(actual[1], expected[1], rtol=1e-12)
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            run_backtest(make_bars(100), engine='zipline')
+
+
+@pytest.mark.skipif(not BACKTRADER_AVAILABLE, reason="Backtrader not installed")
+class TestBacktestBtRoute(unittest.TestCase):
+    """测试 /api/strategy/backtest_bt 的 engine 参数"""
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        self.client = app.test_client()
+        self.body = {'symbol': '000001.SZ', 'start_date': '2018-03-01', 'end_date': '2020-04-30',
+                     'short_window': 5, 'long_window': 20}
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_engine_parameter(self, mock_bars):
+        mock_bars.return_value = make_bars()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = self.client.post('/api/strategy/backtest_bt', json=self.body)
+        actual = self.client.post('/api/strategy/backtest_bt', json=dict(self.body, engine='event'))
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.get_json(), expected.get_json())
+        resp = self.client.post('/api/strategy/backtest_bt', json=dict(self.body, engine='zipline'))
+        self.assertEqual(resp.status_code, 400)
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_unsupported_event_strategy(self, mock_bars):
+        """事件引擎不支持的策略在获取行情前返回 400"""
+        resp = self.client.post('/api/strategy/backtest_bt',
+                                json=dict(self.body, engine='event', strategy_name='rsi_reversal'))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('rsi_reversal', resp.get_json()['error'])
+        mock_bars.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
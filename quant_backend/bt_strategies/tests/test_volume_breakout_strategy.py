@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import backtrader as bt
+    BACKTRADER_AVAILABLE = True
+except ImportError:
+    BACKTRADER_AVAILABLE = False
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+if BACKTRADER_AVAILABLE:
+    from quant_backend.bt_strategies.strategies.volume_breakout_strategy import VolumeBreakoutStrategy
+
+    class _BareSellExit(VolumeBreakoutStrategy):
+        """修复前的退出方式：不指定数量的 sell()"""
+
+        def close(self, *args, **kwargs):
+            return self.sell()
+
+
+def _breakout_data():
+    """平盘K线中先放量上涨（买入信号）、再放量下跌（卖出信号），之后不再出现信号"""
+    n = 60
+    close = np.full(n, 10.0)
+    close[30:45] = 11.0
+    close[45:] = 9.5
+    volume = np.full(n, 1000.0)
+    volume[[30, 45]] = 5000.0
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': volume,
+                         'openinterest': 0.0}, index=pd.bdate_range('2023-01-02', periods=n))
+
+
+@unittest.skipUnless(BACKTRADER_AVAILABLE, 'Backtrader not installed')
+class TestVolumeBreakoutExit(unittest.TestCase):
+    def _run(self, strategy):
+        cerebro = bt.Cerebro()
+        cerebro.adddata(bt.feeds.PandasData(dataname=_breakout_data()))
+        cerebro.addstrategy(strategy)
+        cerebro.broker.setcash(100000.0)
+        return cerebro.run()[0]
+
+    def test_exit_closes_whole_position(self):
+        strat = self._run(VolumeBreakoutStrategy)
+        self.assertEqual(len(strat.buy_signals), 1)
+        self.assertEqual(len(strat.sell_signals), 1)
+        self.assertEqual(strat.position.size, 0)
+
+    def test_bare_sell_left_position_open(self):
+        """回归：旧的 sell() 按默认 sizer 只卖出 1 股，剩余持仓一直留到回测结束"""
+        strat = self._run(_BareSellExit)
+        self.assertEqual(len(strat.sell_signals), 1)
+        self.assertEqual(strat.position.size, int(100000.0 * 0.95 / 11.0) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
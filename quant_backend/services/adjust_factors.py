@@ -0,0 +1,167 @@
+import os
+import logging
+import tempfile
+import threading
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.bar_file import BAR_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# 支持的复权方式：'' / 'raw' 不复权，'qfq' 前复权，'hfq' 后复权
+ADJUST_TYPES = ('raw', 'qfq', 'hfq')
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+# 复权因子序列: (生效日期 datetime64[D] 升序数组, 后复权因子数组)
+Factors = Tuple[np.ndarray, np.ndarray]
+
+
+def normalize_adjust(adjust: Optional[str]) -> str:
+    """将复权参数统一为 'raw' / 'qfq' / 'hfq'"""
+    adjust = (adjust or 'raw').lower()
+    if adjust not in ADJUST_TYPES:
+        raise ValueError(f'不支持的复权方式: {adjust}')
+    return adjust
+
+
+def _sina_symbol(code: str) -> str:
+    if code.startswith('6') or code.startswith('9'):
+        return f'sh{code}'
+    if code.startswith('4') or code.startswith('8'):
+        return f'bj{code}'
+    return f'sz{code}'
+
+
+def _default_loader(code: str) -> Optional[pd.DataFrame]:
+    return ak.stock_zh_a_daily(symbol=_sina_symbol(code), adjust='hfq-factor')
+
+
+def apply_adjustment(bars: np.ndarray, factors: Optional[Factors], adjust: str) -> np.ndarray:
+    """
+    对不复权K线做复权，一次向量化乘法完成。
+    - hfq: 价格 × 当日后复权因子
+    - qfq: 价格 × 当日后复权因子 / 最新后复权因子
+    成交量、成交额不做调整。
+    Args:
+        bars: 不复权的 BAR_DTYPE 数组（不会被修改）
+        factors: (因子生效日期, 后复权因子)，为 None 或 adjust='raw' 时原样返回
+        adjust: 'raw' / 'qfq' / 'hfq'
+    Returns:
+        复权后的新 BAR_DTYPE 数组（raw 时返回原数组）
+    """
+    adjust = normalize_adjust(adjust)
+    if adjust == 'raw' or factors is None or len(bars) == 0:
+        return bars
+    factor_dates, hfq_factors = factors
+    idx = np.searchsorted(factor_dates, bars['date'], side='right') - 1
+    multiplier = hfq_factors[np.clip(idx, 0, len(hfq_factors) - 1)]
+    if adjust == 'qfq':
+        multiplier = multiplier / hfq_factors[-1]
+    out = np.array(bars, dtype=BAR_DTYPE, copy=True)
+    for field in PRICE_FIELDS:
+        out[field] = bars[field] * multiplier
+    return out
+
+
+class AdjustFactorStore:
+    """
+    复权因子缓存
+
+    不复权K线在除权除息后不会改变，因此本地K线只存不复权数据；复权因子序列单独保存，
+    每只股票每天最多向上游刷新一次，读取时按需计算前/后复权价格。
+    """
+
+    def __init__(self, root: Optional[str], loader: Callable[[str], Optional[pd.DataFrame]] = _default_loader):
+        """
+        Args:
+            root: 因子文件目录，为空时只做进程内缓存
+            loader: 因子加载函数 loader(code)，返回包含 date、hfq_factor 列的 DataFrame
+        """
+        self.root = root
+        self.loader = loader
+        self._cache: Dict[str, Tuple[date, Factors]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, code: str) -> str:
+        return os.path.join(self.root, 'factors', f'{code}.npz')
+
+    def _read_disk(self, code: str) -> Optional[Tuple[date, Factors]]:
+        if not self.root or not os.path.exists(self._path(code)):
+            return None
+        try:
+            with np.load(self._path(code), allow_pickle=False) as npz:
+                loaded_on = date.fromisoformat(str(npz['loaded_on']))
+                return loaded_on, (npz['dates'].astype('datetime64[D]'), npz['factors'].astype(np.float64))
+        except Exception as e:
+            logger.warning(f'读取复权因子缓存失败: {code}, {e}')
+            return None
+
+    def _write_disk(self, code: str, loaded_on: date, factors: Factors) -> None:
+        if not self.root:
+            return
+        path = self._path(code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, dates=factors[0], factors=factors[1], loaded_on=np.array(loaded_on.isoformat()))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _parse(df: pd.DataFrame) -> Factors:
+        df = df[['date', 'hfq_factor']].copy()
+        df['date'] = pd.to_datetime(df['date'])
+        df['hfq_factor'] = pd.to_numeric(df['hfq_factor'], errors='coerce')
+        df = df.dropna().drop_duplicates(subset='date', keep='last').sort_values('date')
+        return df['date'].values.astype('datetime64[D]'), df['hfq_factor'].to_numpy(dtype=np.float64)
+
+    def peek(self, code: str) -> Optional[Tuple[date, Factors]]:
+        """
+        只读取进程内或磁盘上已有的复权因子（不论是否当天加载），从不请求上游。
+        Returns:
+            (加载日期, 因子)，没有缓存时返回 None；加载日期之后的除权除息不在因子中
+        """
+        cached = self._cache.get(code)
+        if cached is None:
+            cached = self._read_disk(code)
+            if cached is not None:
+                # 不覆盖并发 get() 刚写入的当天因子
+                cached = self._cache.setdefault(code, cached)
+        return cached
+
+    def get(self, code: str) -> Optional[Factors]:
+        """
+        获取股票的复权因子序列；当天已加载过则直接返回缓存。
+        上游刷新失败时退回使用旧因子，完全没有因子时返回 None。
+        """
+        today = date.today()
+        cached = self._cache.get(code)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        with self._lock:
+            cached = self._cache.get(code) or self._read_disk(code)
+            if cached is not None and cached[0] == today:
+                self._cache[code] = cached
+                return cached[1]
+            try:
+                df = self.loader(code)
+                if df is None or df.empty:
+                    raise ValueError('未获取到复权因子')
+                factors = self._parse(df)
+                if len(factors[1]) == 0:
+                    raise ValueError('复权因子为空')
+            except Exception as e:
+                logger.warning(f'刷新复权因子失败: {code}, {e}')
+                return cached[1] if cached is not None else None
+            self._cache[code] = (today, factors)
+            self._write_disk(code, today, factors)
+            return factors
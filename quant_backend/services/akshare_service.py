@@ -1,7 +1,20 @@
+import os
 import logging
 import akshare as ak
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, NamedTuple, Optional, Iterable, Iterator, Tuple
+from quant_backend.services.bar_file import bars_to_frame, frame_to_bars, normalize_precision, slice_by_date, to_precision
+from quant_backend.services.bar_store import BarStore, normalize_date
+from quant_backend.services.bar_resampler import n_day_start, parse_period, period_start, resample_bars
+from quant_backend.services.single_flight import SingleFlight
+from quant_backend.services.adjust_factors import AdjustFactorStore, apply_adjustment, normalize_adjust
+from quant_backend.services.rate_limiter import TokenBucket
+from quant_backend.services.stock_universe import StockUniverse
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -11,6 +24,46 @@ handler.setFormatter(formatter)
 if not logger.hasHandlers():
     logger.addHandler(handler)
 
+# 本地K线存储目录，可通过环境变量 QUANT_BAR_STORE_DIR 配置，设为空字符串时禁用本地缓存
+BAR_STORE_DIR = os.environ.get('QUANT_BAR_STORE_DIR', os.path.join(os.path.expanduser('~'), '.quant_trade', 'bar_store'))
+bar_store = BarStore(BAR_STORE_DIR)
+# 复权因子缓存（本地只存不复权K线，前/后复权在读取时按因子计算）
+factor_store = AdjustFactorStore(BAR_STORE_DIR)
+
+# AKShare 上游请求限流（所有线程共享），避免批量拉取时被数据源限流
+UPSTREAM_RATE_PER_SEC = float(os.environ.get('QUANT_AKSHARE_RATE', '5'))
+upstream_limiter = TokenBucket(rate=UPSTREAM_RATE_PER_SEC, capacity=max(1.0, UPSTREAM_RATE_PER_SEC * 2))
+# 相同参数的并发行情请求只执行一次，结果由所有调用方共享
+upstream_flight = SingleFlight()
+# 周线/月线/N 日K线聚合结果的记忆化缓存（LRU，按条目数限制）
+RESAMPLE_CACHE_SIZE = 256
+_resample_cache: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+_resample_cache_lock = threading.Lock()
+# 交易日历缓存
+_trade_calendar: Optional[np.ndarray] = None
+_trade_calendar_loaded_on = None
+# 批量拉取默认并发线程数
+DEFAULT_BATCH_WORKERS = 8
+# 全市场面板的记忆化缓存（LRU，按条目数限制；每个条目约为 交易日数 × 股票数 × 5 个 float64）
+UNIVERSE_PANEL_CACHE_SIZE = 2
+_universe_panel_cache: 'OrderedDict[tuple, UniversePanel]' = OrderedDict()
+_universe_panel_lock = threading.Lock()
+# 面板字段及其对应的K线字段
+UNIVERSE_PANEL_FIELDS = {'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'vol'}
+
+
+class UniversePanel(NamedTuple):
+    """get_universe_panel 的结果"""
+    # {'open'/'high'/'low'/'close'/'volume': 日期 × 股票 面板}，没有可用股票时为空字典
+    panels: Dict[str, pd.DataFrame]
+    # 因缺少复权因子或因子早于最后一根K线而未纳入面板的股票（ts_code）
+    unadjusted: List[str]
+
+
+def to_ts_code(code: str) -> str:
+    """6 位股票代码转为带交易所后缀的 ts_code（6 开头为上交所，其余为深交所）"""
+    return f"{code[:6]}.SH" if code.startswith('6') else f"{code[:6]}.SZ"
+
 def get_stock_list() -> Optional[List[Dict[str, Any]]]:
     """
     获取最新的 A 股股票列表。
@@ -19,37 +72,155 @@ def get_stock_list() -> Optional[List[Dict[str, Any]]]:
     """
     df = ak.stock_info_a_code_name()
     # AKShare 字段: code, name
-    df['ts_code'] = df['code'].apply(lambda x: f"{x[:6]}.SH" if x.startswith('6') else f"{x[:6]}.SZ")
+    df['ts_code'] = df['code'].apply(to_ts_code)
     stock_list = df[['ts_code', 'name']].to_dict(orient='records')
     logger.info(f'成功获取A股股票列表，共 {len(stock_list)} 条。')
     return stock_list
 
-def get_stock_historical_data(ts_code: str, period: str = 'daily', start_date: str = None, end_date: str = None) -> Optional[pd.DataFrame]:
+# 股票列表缓存（每日刷新一次），供股票列表与搜索接口使用
+stock_universe = StockUniverse(loader=lambda: get_stock_list())
+
+def get_stock_historical_data(ts_code: str, period: str = 'daily', start_date: str = None, end_date: str = None,
+                              adjust: str = 'qfq', precision: str = 'float64') -> Optional[pd.DataFrame]:
     """
     获取指定股票的历史行情数据。
+    优先从本地K线存储读取，只有缺失的头部/尾部日期区间才会请求 AKShare 并合并写回。
     :param ts_code: 股票代码（如 '000001.SZ'）
-    :param period: 数据周期，'daily'（日线）、'weekly'（周线）、'monthly'（月线）
+    周线、月线及 N 日K线由本地缓存的日线数据聚合得到，不单独请求上游。
+    :param period: 数据周期，'daily'（日线）、'weekly'（周线）、'monthly'（月线）、'Nd'（N 个交易日，如 '3d'）
     :param start_date: 开始日期，格式 YYYYMMDD
     :param end_date: 结束日期，格式 YYYYMMDD
+    :param adjust: 复权方式，'qfq'（前复权，默认）、'hfq'（后复权）、'raw'（不复权）
+    :param precision: 计算精度，'float64'（默认）或 'float32'（价格为 float32、成交量为 int64，见 bar_file.COMPACT_BAR_DTYPE）
     :return: 包含行情数据的 DataFrame 或 None（出错时）
     """
-    # 只取前6位数字
+    try:
+        parse_period(period)
+    except ValueError:
+        logger.warning(f'period 参数非法({period})')
+        raise
+    precision = normalize_precision(precision)
+    bars = _load_bars(ts_code, period, start_date, end_date, normalize_adjust(adjust))
+    if bars is None:
+        logger.warning(f'未获取到行情数据: {ts_code}, {period}, {start_date}-{end_date}')
+        return None
+    df = bars_to_frame(to_precision(bars, precision))
+    logger.info(f'成功获取{ts_code} {period} 行情数据 {len(df)} 条。')
+    return df
+
+def get_stock_bars(ts_code: str, period: str = 'daily', start_date: str = None, end_date: str = None,
+                   adjust: str = 'qfq', precision: str = 'float64') -> Optional[np.ndarray]:
+    """
+    获取指定股票的历史行情，返回 BAR_DTYPE 结构化数组（见 bar_file）。
+    不复权日线直接返回本地K线存储内存映射文件的只读视图；复权数据为一次向量化乘法得到的新数组。
+    可直接用 bar_file.bars_to_ohlcv 包装后交给回测和指标计算，不经过 DataFrame 解析和复制。
+    参数同 get_stock_historical_data。
+    :return: BAR_DTYPE 数组（precision='float32' 时为 COMPACT_BAR_DTYPE 新数组）或 None（无数据时）
+    """
+    parse_period(period)
+    precision = normalize_precision(precision)
+    bars = _load_bars(ts_code, period, start_date, end_date, normalize_adjust(adjust))
+    if bars is None:
+        logger.warning(f'未获取到行情数据: {ts_code}, {period}, {start_date}-{end_date}')
+        return None
+    return to_precision(bars, precision)
+
+def _load_bars(ts_code: str, period: str, start_date: Optional[str], end_date: Optional[str],
+               adjust: str = 'qfq') -> Optional[np.ndarray]:
+    """
+    经本地K线存储获取行情数组；相同 (股票, 周期, 区间, 复权方式) 的并发请求合并为一次。
+    非日线周期由日线聚合得到。返回的数组由并发调用方共享，调用方不应原地修改。
+    """
+    kind, _ = parse_period(period)
+    if kind != 'daily':
+        return _load_resampled_bars(ts_code, period, start_date, end_date, adjust)
     code = ts_code[:6]
-    period_map = {
-        'daily': 'daily',
-        'weekly': 'weekly',
-        'monthly': 'monthly',
-    }
-    if not period or period not in period_map:
-        logger.warning(f'period 参数非法({period})，自动设为 daily')
-        raise ValueError(f'不支持的周期类型: {period}')
+    raw = upstream_flight.do(
+        (code, 'daily', start_date, end_date, 'raw'),
+        bar_store.get_bars, code, 'daily', 'raw', start_date, end_date,
+        lambda start, end: _fetch_stock_hist(ts_code, code, 'daily', start, end, 'raw')
+    )
+    if raw is None or adjust == 'raw':
+        return raw
+    factors = factor_store.get(code)
+    if factors is None:
+        # 没有复权因子时退回直接向上游获取复权行情（不缓存）
+        logger.warning(f'{ts_code} 复权因子不可用，直接从 AKShare 获取 {adjust} 行情')
+        df = _fetch_stock_hist(ts_code, code, 'daily', raw['date'][0].item().strftime('%Y%m%d'),
+                               raw['date'][-1].item().strftime('%Y%m%d'), adjust)
+        return frame_to_bars(df) if df is not None else None
+    return apply_adjustment(raw, factors, adjust)
+
+def _load_resampled_bars(ts_code: str, period: str, start_date: Optional[str], end_date: Optional[str],
+                         adjust: str) -> Optional[np.ndarray]:
+    """
+    由日线聚合得到周线/月线/N 日K线，结果按底层日线数据的版本做 LRU 记忆化。
+    周线/月线会把起始日期扩展到所在周/月的第一天，N 日K线扩展到所在分组（以交易日历首日为原点）的第一个交易日，
+    保证首根K线完整、不同起始日期得到相同的K线。
+    """
+    kind, n = parse_period(period)
+    start = normalize_date(start_date) if start_date else None
+    calendar = get_trade_calendar() if kind == 'nday' else None
+    fetch_start = start
+    if start is not None and kind in ('weekly', 'monthly'):
+        fetch_start = str(period_start(np.datetime64(pd.Timestamp(start).date(), 'D'), kind)).replace('-', '')
+    elif start is not None and calendar is not None and len(calendar):
+        fetch_start = str(n_day_start(np.datetime64(pd.Timestamp(start).date(), 'D'), n, calendar)).replace('-', '')
+    daily = _load_bars(ts_code, 'daily', fetch_start, end_date, adjust)
+    if daily is None:
+        return None
+    # 日线数据变化（尾部补齐）时键随之变化，旧结果自然淘汰
+    # 复权因子变化时前复权改变首根价格、后复权改变末根价格，均会使键变化
+    key = (ts_code[:6], period, adjust, start, end_date, len(daily), str(daily['date'][-1]),
+           float(daily['close'][0]), float(daily['close'][-1]))
+    with _resample_cache_lock:
+        cached = _resample_cache.get(key)
+        if cached is not None:
+            _resample_cache.move_to_end(key)
+            return cached
+    bars = resample_bars(daily, period, calendar=calendar)
+    if start is not None:
+        bars = slice_by_date(bars, start, None)
+    if len(bars) == 0:
+        return None
+    # 结果会被多个调用方共享，设为只读
+    bars.flags.writeable = False
+    with _resample_cache_lock:
+        _resample_cache[key] = bars
+        while len(_resample_cache) > RESAMPLE_CACHE_SIZE:
+            _resample_cache.popitem(last=False)
+    return bars
+
+def get_trade_calendar() -> Optional[np.ndarray]:
+    """
+    获取 A 股交易日历（datetime64[D] 升序数组），每天最多请求一次上游；获取失败返回 None。
+    """
+    global _trade_calendar, _trade_calendar_loaded_on
+    today = datetime.now().date()
+    if _trade_calendar is not None and _trade_calendar_loaded_on == today:
+        return _trade_calendar
     try:
-        df = ak.stock_zh_a_hist(symbol=code, period=period_map[period], start_date=start_date, end_date=end_date, adjust="qfq")
+        df = ak.tool_trade_date_hist_sina()
+        _trade_calendar = np.sort(pd.to_datetime(df['trade_date']).values.astype('datetime64[D]'))
+        _trade_calendar_loaded_on = today
+    except Exception as e:
+        logger.warning(f'获取交易日历失败，N 日K线将按该股票自身的交易日分组: {e}')
+    return _trade_calendar
+
+def _fetch_stock_hist(ts_code: str, code: str, period: str, start_date: str, end_date: str, adjust: str) -> Optional[pd.DataFrame]:
+    """
+    直接调用 AKShare 获取行情并转换为标准字段，不经过本地缓存。
+    :param adjust: 'raw'（不复权）、'qfq'、'hfq'
+    :return: 包含 trade_date, open, high, low, close, vol, amount 的 DataFrame 或 None（无数据时）
+    """
+    upstream_limiter.acquire()
+    try:
+        df = ak.stock_zh_a_hist(symbol=code, period=period, start_date=start_date, end_date=end_date,
+                                adjust='' if adjust == 'raw' else adjust)
     except Exception as e:
         logger.error(f'调用 AKShare 获取行情异常: {e}, period={period}, ts_code={ts_code}, symbol={code}')
         raise RuntimeError(f'AKShare period参数异常: {e}, period={period}, ts_code={ts_code}, symbol={code}')
     if df is None or df.empty:
-        logger.warning(f'未获取到行情数据: {ts_code}, {period}, {start_date}-{end_date}')
         return None
     # 字段适配
     df = df.rename(columns={
@@ -65,6 +236,139 @@ def get_stock_historical_data(ts_code: str, period: str = 'daily', start_date: s
         if col not in df.columns:
             df[col] = None
     df = df[['trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount']]
-    df = df.sort_values('trade_date')
-    logger.info(f'成功获取{ts_code} {period} 行情数据 {len(df)} 条。')
-    return df 
\ No newline at end of file
+    return df.sort_values('trade_date')
+
+def iter_stock_historical_data(ts_codes: Iterable[str], period: str = 'daily', start_date: str = None,
+                               end_date: str = None, max_workers: int = DEFAULT_BATCH_WORKERS,
+                               adjust: str = 'qfq', precision: str = 'float64') -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+    """
+    并发批量获取多只股票的历史行情，按完成顺序流式返回 (ts_code, DataFrame)。
+    使用有界线程池并发执行 get_stock_historical_data，上游请求统一经过令牌桶限流；
+    已缓存在本地K线存储中的区间不会占用限流配额。
+    单只股票获取失败或无数据时返回 (ts_code, None)，不影响其余股票。
+    :param ts_codes: 股票代码列表（如 ['000001.SZ', '600000.SH']），重复代码只拉取一次
+    :param period: 数据周期，'daily'、'weekly'、'monthly'、'Nd'
+    :param start_date: 开始日期，格式 YYYYMMDD
+    :param end_date: 结束日期，格式 YYYYMMDD
+    :param max_workers: 最大并发线程数
+    :param adjust: 复权方式，'qfq'、'hfq'、'raw'
+    :param precision: 计算精度，'float64' 或 'float32'
+    :return: (ts_code, DataFrame 或 None) 的迭代器
+    """
+    parse_period(period)
+    normalize_adjust(adjust)
+    normalize_precision(precision)
+    codes = list(dict.fromkeys(ts_codes))
+    if not codes:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(codes))))
+    futures = {}
+    try:
+        futures = {
+            executor.submit(get_stock_historical_data, ts_code, period, start_date, end_date, adjust, precision): ts_code
+            for ts_code in codes
+        }
+        for future in as_completed(futures):
+            ts_code = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                logger.error(f'批量获取行情失败: {ts_code}, {period}, {start_date}-{end_date}, {e}')
+                df = None
+            yield ts_code, df
+    finally:
+        # 调用方提前停止迭代时取消尚未开始的任务
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def get_stock_historical_data_batch(ts_codes: Iterable[str], period: str = 'daily', start_date: str = None,
+                                    end_date: str = None, max_workers: int = DEFAULT_BATCH_WORKERS,
+                                    adjust: str = 'qfq', precision: str = 'float64') -> Dict[str, pd.DataFrame]:
+    """
+    批量获取多只股票的历史行情，返回 {ts_code: DataFrame}，无数据或失败的股票不包含在结果中。
+    参数同 iter_stock_historical_data。
+    """
+    result = {}
+    for ts_code, df in iter_stock_historical_data(ts_codes, period, start_date, end_date, max_workers, adjust,
+                                                    precision):
+        if df is not None and not df.empty:
+            result[ts_code] = df
+    logger.info(f'批量获取行情完成: 成功 {len(result)} 只')
+    return result
+
+def get_universe_panel(lookback: int = 250, adjust: str = 'qfq',
+                       ts_codes: Optional[Iterable[str]] = None) -> Optional[UniversePanel]:
+    """
+    由本地K线存储中已缓存的日线拼出全市场（或指定股票）最近 lookback 个交易日的 日期 × 股票 面板，不请求上游。
+    前/后复权只使用已缓存的复权因子（AdjustFactorStore.peek）。没有因子、或因子的加载日期早于最后一根K线
+    （之后的除权除息未计入）的股票无法得到与其他股票可比的复权价格，不纳入面板，而是列在 unadjusted 中。
+    结果按各分区的版本号和因子加载日期做 LRU 记忆化，分区或因子更新后自动重建；返回的面板由调用方共享，不应原地修改。
+    :param lookback: 面板的交易日数（取全部股票交易日并集中最近的 lookback 天）
+    :param adjust: 复权方式，'qfq'、'hfq'、'raw'
+    :param ts_codes: 股票代码列表，为 None 时使用全部已缓存的股票
+    :return: UniversePanel(panels, unadjusted)，面板列为 ts_code，停牌或未缓存的日期为 NaN；
+             没有任何缓存数据时返回 None
+    """
+    if lookback < 1:
+        raise ValueError('lookback 至少为 1')
+    adjust = normalize_adjust(adjust)
+    versions = bar_store.scan('daily', 'raw')
+    names = {}
+    if ts_codes is not None:
+        names = {ts_code[:6]: ts_code for ts_code in ts_codes}
+        versions = {code: versions[code] for code in names if code in versions}
+    codes = sorted(versions)
+    if not codes:
+        return None
+    factors = {code: factor_store.peek(code) for code in codes} if adjust != 'raw' else {}
+    loaded_on = {code: cached[0] for code, cached in factors.items() if cached is not None}
+    key = (lookback, adjust, tuple((code, versions[code], names.get(code), loaded_on.get(code)) for code in codes))
+    with _universe_panel_lock:
+        cached = _universe_panel_cache.get(key)
+        if cached is not None:
+            _universe_panel_cache.move_to_end(key)
+            return cached
+
+    parts, columns, unadjusted = [], [], []
+    for code in codes:
+        bars, _ = bar_store.load_bars(code, 'daily', 'raw')
+        if bars is None or len(bars) == 0:
+            continue
+        bars = bars[-lookback:]
+        ts_code = names.get(code) or to_ts_code(code)
+        if adjust != 'raw':
+            # 不复权与复权价格、或复权基准不同的价格放在一起排序没有意义
+            if code not in loaded_on or np.datetime64(loaded_on[code], 'D') < bars['date'][-1]:
+                unadjusted.append(ts_code)
+                continue
+            bars = apply_adjustment(bars, factors[code][1], adjust)
+        parts.append(bars)
+        columns.append(ts_code)
+    if not parts and not unadjusted:
+        return None
+    if unadjusted:
+        logger.warning(f'{len(unadjusted)} 只股票没有最新的复权因子，未纳入面板: {", ".join(unadjusted[:10])}')
+    result = UniversePanel(_scatter_panels(parts, columns, lookback) if parts else {}, unadjusted)
+    with _universe_panel_lock:
+        _universe_panel_cache[key] = result
+        while len(_universe_panel_cache) > UNIVERSE_PANEL_CACHE_SIZE:
+            _universe_panel_cache.popitem(last=False)
+    return result
+
+
+def _scatter_panels(parts: List[np.ndarray], columns: List[str], lookback: int) -> Dict[str, pd.DataFrame]:
+    """把各股票的K线拼成一个数组，按 (日期行, 股票列) 一次散列写入各字段面板，取日期并集中最近 lookback 天"""
+    stacked = np.concatenate(parts)
+    dates = np.unique(stacked['date'])[-lookback:]
+    col = np.repeat(np.arange(len(parts)), [len(bars) for bars in parts])
+    keep = stacked['date'] >= dates[0]
+    row, col, stacked = np.searchsorted(dates, stacked['date'][keep]), col[keep], stacked[keep]
+    index = pd.DatetimeIndex(dates)
+    panels = {}
+    for field, source in UNIVERSE_PANEL_FIELDS.items():
+        values = np.full((len(dates), len(parts)), np.nan)
+        values[row, col] = stacked[source]
+        panels[field] = pd.DataFrame(values, index=index, columns=columns, copy=False)
+    logger.info(f'全市场面板已构建: {len(parts)} 只股票, {len(dates)} 个交易日')
+    return panels
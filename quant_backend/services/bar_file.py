@@ -0,0 +1,198 @@
+"""
+二进制K线文件格式（.bars）
+
+文件布局:
+    [0:4]    魔数 b'QBAR'
+    [4:8]    格式版本 (uint32, little-endian)
+    [8:12]   JSON 头长度 N (uint32, little-endian)
+    [12:12+N] JSON 头（UTF-8，含行数、日期范围及调用方自定义元数据），以空格补齐到 64 字节对齐
+    [...]    数据区：BAR_DTYPE 结构化数组，按 date 升序排列
+
+date 字段有序，可直接作为日期索引用 np.searchsorted 做区间切片；
+读取时通过 np.memmap 映射数据区，切片得到的是视图，不涉及解析和复制。
+"""
+import os
+import json
+import struct
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'QBAR'
+VERSION = 1
+HEADER_ALIGN = 64
+_PREFIX = struct.Struct('<4sII')
+
+BAR_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('vol', '<f8'),
+    ('amount', '<f8'),
+])
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'vol', 'amount')
+
+# 精简精度的内存布局（只用于计算，不落盘）：价格、成交额 float32，成交量 int64
+COMPACT_BAR_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('vol', '<i8'),
+    ('amount', '<f4'),
+])
+PRECISIONS = ('float64', 'float32')
+
+
+def normalize_precision(precision: Optional[str]) -> str:
+    """将精度参数统一为 'float64' / 'float32'"""
+    precision = (precision or 'float64').lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f'不支持的计算精度: {precision}')
+    return precision
+
+
+def frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    """
+    将标准字段 DataFrame（trade_date, open, high, low, close, vol, amount）转换为 BAR_DTYPE 结构化数组。
+    trade_date 支持 'YYYYMMDD' / 'YYYY-MM-DD' 字符串或日期对象。
+    """
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    if len(df) == 0:
+        return bars
+    dates = df['trade_date']
+    if dates.dtype == object and isinstance(dates.iloc[0], str) and len(dates.iloc[0]) == 8:
+        dates = pd.to_datetime(dates, format='%Y%m%d')
+    else:
+        dates = pd.to_datetime(dates)
+    bars['date'] = dates.values.astype('datetime64[D]')
+    for field in PRICE_FIELDS:
+        if field in df.columns:
+            bars[field] = pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            bars[field] = np.nan
+    return bars
+
+
+def bars_to_frame(bars: np.ndarray, date_format: Optional[str] = '%Y%m%d') -> pd.DataFrame:
+    """
+    将 BAR_DTYPE 数组转换为标准字段 DataFrame（trade_date, open, ..., amount）。
+    :param date_format: trade_date 字符串格式，为 None 时保留 datetime64
+    """
+    df = pd.DataFrame({field: bars[field] for field in PRICE_FIELDS})
+    dates = pd.DatetimeIndex(bars['date'].astype('datetime64[ns]'))
+    df.insert(0, 'trade_date', dates.strftime(date_format) if date_format else dates)
+    return df
+
+
+def bars_to_ohlcv(bars: np.ndarray) -> pd.DataFrame:
+    """
+    将 BAR_DTYPE 数组包装为以 DatetimeIndex 为索引的 OHLCV DataFrame（open/high/low/close/volume）。
+    各列直接引用结构化数组的字段视图，不复制数据，供回测和指标计算直接使用。
+    """
+    index = pd.DatetimeIndex(bars['date'].astype('datetime64[ns]'), name='datetime')
+    columns = {
+        'open': bars['open'],
+        'high': bars['high'],
+        'low': bars['low'],
+        'close': bars['close'],
+        'volume': bars['vol'],
+        'amount': bars['amount'],
+    }
+    return pd.DataFrame({k: pd.Series(v, index=index, copy=False) for k, v in columns.items()}, copy=False)
+
+
+def to_precision(bars: np.ndarray, precision: str = 'float64') -> np.ndarray:
+    """
+    按计算精度转换K线数组。
+    :param precision: 'float64' 原样返回 BAR_DTYPE 数组；'float32' 返回 COMPACT_BAR_DTYPE 新数组
+                      （价格、成交额舍入为 float32，成交量四舍五入为整数，缺失的成交量记为 0）
+    """
+    if normalize_precision(precision) == 'float64':
+        return bars
+    out = np.empty(len(bars), dtype=COMPACT_BAR_DTYPE)
+    for field in COMPACT_BAR_DTYPE.names:
+        if field != 'vol':
+            out[field] = bars[field]
+    out['vol'] = np.nan_to_num(np.rint(bars['vol']), nan=0.0)
+    return out
+
+
+def write_bars(path: str, bars: np.ndarray, meta: Optional[dict] = None) -> None:
+    """
+    原子地写入 .bars 文件（先写临时文件再替换，已映射旧文件的读者不受影响）。
+    :param meta: 写入头部的自定义元数据（需可 JSON 序列化）
+    """
+    bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+    header = {
+        'rows': int(len(bars)),
+        'dtype': BAR_DTYPE.descr,
+        'first_date': str(bars['date'][0]) if len(bars) else None,
+        'last_date': str(bars['date'][-1]) if len(bars) else None,
+        'meta': meta or {},
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    total = _PREFIX.size + len(header_bytes)
+    header_bytes += b' ' * ((-total) % HEADER_ALIGN)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(bars.tobytes())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_header(path: str) -> Tuple[dict, int]:
+    """
+    读取 .bars 文件头。
+    :return: (header 字典, 数据区偏移量)
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) != _PREFIX.size:
+            raise ValueError(f'K线文件头不完整: {path}')
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f'不是有效的K线文件: {path}')
+        if version != VERSION:
+            raise ValueError(f'不支持的K线文件版本 {version}: {path}')
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    return header, _PREFIX.size + header_len
+
+
+def open_bars(path: str) -> Tuple[np.ndarray, dict]:
+    """
+    以只读内存映射方式打开 .bars 文件。
+    :return: (BAR_DTYPE 的 np.memmap（空文件时为空数组）, header 字典)
+    """
+    header, offset = read_header(path)
+    rows = header['rows']
+    if rows == 0:
+        return np.empty(0, dtype=BAR_DTYPE), header
+    expected = offset + rows * BAR_DTYPE.itemsize
+    if os.path.getsize(path) < expected:
+        raise ValueError(f'K线文件数据区不完整: {path}')
+    bars = np.memmap(path, dtype=BAR_DTYPE, mode='r', offset=offset, shape=(rows,))
+    return bars, header
+
+
+def slice_by_date(bars: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+    """
+    按日期区间 [start_date, end_date] 切片（二分查找），返回视图。
+    :param start_date: 'YYYYMMDD' 或 'YYYY-MM-DD'，为 None 表示不限
+    """
+    dates = bars['date']
+    lo = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left'))
+    hi = len(bars) if end_date is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right'))
+    return bars[lo:hi]
@@ -0,0 +1,92 @@
+import re
+import numpy as np
+from typing import Optional, Tuple
+
+from quant_backend.services.bar_file import BAR_DTYPE
+
+# 自定义 N 日周期，如 '3d'、'10d'
+_N_DAY_PATTERN = re.compile(r'^(\d+)d$')
+
+
+def parse_period(period: str) -> Tuple[str, int]:
+    """
+    解析K线周期。
+    Args:
+        period: 'daily' / 'weekly' / 'monthly' / 'Nd'（N 个交易日一根K线）
+    Returns:
+        (周期类型, N)，周期类型为 'daily'、'weekly'、'monthly' 或 'nday'
+    Raises:
+        ValueError: 不支持的周期
+    """
+    if period in ('daily', 'weekly', 'monthly'):
+        return period, 1
+    match = _N_DAY_PATTERN.match(period or '')
+    if match and int(match.group(1)) >= 1:
+        n = int(match.group(1))
+        return ('daily', 1) if n == 1 else ('nday', n)
+    raise ValueError(f'不支持的周期类型: {period}')
+
+
+def period_start(date: np.datetime64, period: str) -> np.datetime64:
+    """返回日期所在周（周一）或月（1日）的起始日；其他周期原样返回"""
+    date = np.datetime64(date, 'D')
+    if period == 'weekly':
+        # 1970-01-01 为周四，+3 后按 7 整除即以周一为一周起点
+        return date - ((date.astype(np.int64) + 3) % 7)
+    if period == 'monthly':
+        return date.astype('datetime64[M]').astype('datetime64[D]')
+    return date
+
+
+def _group_keys(dates: np.ndarray, kind: str, n: int, calendar: Optional[np.ndarray]) -> np.ndarray:
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    if kind == 'weekly':
+        return (days + 3) // 7
+    if kind == 'monthly':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    if calendar is not None and len(calendar):
+        # 按交易日历计数分组，以日历首日为固定原点：停牌日也计入交易日，不同股票、不同起始日期的 N 日K线边界一致
+        cal_idx = np.searchsorted(np.asarray(calendar, dtype='datetime64[D]'), dates.astype('datetime64[D]'))
+        return cal_idx // n
+    # 没有交易日历时只能从首根K线开始每 N 根一组
+    return np.arange(len(dates)) // n
+
+
+def n_day_start(date: np.datetime64, n: int, calendar: np.ndarray) -> np.datetime64:
+    """返回日期所在 N 日K线分组（以交易日历首日为原点）的第一个交易日"""
+    calendar = np.asarray(calendar, dtype='datetime64[D]')
+    idx = min(int(np.searchsorted(calendar, np.datetime64(date, 'D'))), len(calendar) - 1)
+    return calendar[idx // n * n]
+
+
+def resample_bars(bars: np.ndarray, period: str, calendar: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    将日线 BAR_DTYPE 数组向量化聚合为周线、月线或 N 日K线。
+
+    聚合规则：open 取首根、close 取末根、high/low 取最大/最小（忽略 NaN）、vol/amount 求和，
+    date 为该组内最后一个交易日（与交易所周线/月线的日期口径一致）。
+
+    Args:
+        bars: 按日期升序排列的日线 BAR_DTYPE 数组
+        period: 'weekly'、'monthly' 或 'Nd'；'daily' 直接返回原数组
+        calendar: 可选，完整的 A 股交易日历（datetime64[D] 升序数组），用于 N 日K线按交易日分组；
+                  分组以日历首日为原点，调用方应始终传入同一份日历
+    Returns:
+        聚合后的 BAR_DTYPE 数组
+    """
+    kind, n = parse_period(period)
+    if kind == 'daily' or len(bars) == 0:
+        return bars
+    keys = _group_keys(bars['date'], kind, n, calendar)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.concatenate((starts[1:], [len(bars)])) - 1
+
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    out['date'] = bars['date'][ends]
+    out['open'] = bars['open'][starts]
+    out['close'] = bars['close'][ends]
+    out['high'] = np.fmax.reduceat(bars['high'], starts)
+    out['low'] = np.fmin.reduceat(bars['low'], starts)
+    out['vol'] = np.add.reduceat(np.nan_to_num(bars['vol']), starts)
+    out['amount'] = np.add.reduceat(np.nan_to_num(bars['amount']), starts)
+    return out
@@ -0,0 +1,240 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.bar_file import (
+    bars_to_frame, frame_to_bars, open_bars, read_header, slice_by_date, write_bars
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
+handler.setFormatter(formatter)
+if not logger.hasHandlers():
+    logger.addHandler(handler)
+
+# 行情标准字段（与 akshare_service 输出保持一致）
+BAR_COLUMNS = ['trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount']
+DATE_FMT = '%Y%m%d'
+# 未指定日期范围时的默认起点（与 AKShare 默认值一致）
+DEFAULT_START_DATE = '19700101'
+
+# 上游拉取函数签名: fetcher(start_date, end_date) -> Optional[DataFrame]
+Fetcher = Callable[[str, str], Optional[pd.DataFrame]]
+
+
+def normalize_date(value) -> str:
+    """
+    将 'YYYYMMDD' / 'YYYY-MM-DD' / date / datetime 统一转换为 'YYYYMMDD' 字符串。
+    """
+    if isinstance(value, str) and len(value) == 8 and value.isdigit():
+        return value
+    return pd.Timestamp(value).strftime(DATE_FMT)
+
+
+def _shift_date(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, DATE_FMT) + timedelta(days=days)).strftime(DATE_FMT)
+
+
+def stable_until(period: str, today: Optional[datetime] = None) -> str:
+    """
+    返回该周期下"已定型"的最后日期：在此日期（含）之前的K线不会再变化。
+    - 日线：昨天
+    - 周线：上周日
+    - 月线：上月最后一天
+    当前未走完的周期K线每次都重新向上游获取，不计入已缓存区间。
+    """
+    today = today or datetime.now()
+    today = datetime(today.year, today.month, today.day)
+    if period == 'weekly':
+        last = today - timedelta(days=today.weekday() + 1)
+    elif period == 'monthly':
+        last = today.replace(day=1) - timedelta(days=1)
+    else:
+        last = today - timedelta(days=1)
+    return last.strftime(DATE_FMT)
+
+
+class BarStore:
+    """
+    本地K线存储
+
+    按 复权方式/周期/股票代码 分区，每个分区是一个 .bars 二进制文件（见 bar_file），
+    文件头中记录已向上游确认过的日期区间（covered_start ~ covered_end）。
+    读取时若请求区间已被覆盖则直接从磁盘内存映射返回；否则只向上游补齐缺失的头部/尾部区间并合并写回。
+    """
+
+    def __init__(self, root: Optional[str]):
+        """
+        Args:
+            root: 存储根目录，为空时禁用本地缓存（每次直接请求上游）
+        """
+        self.root = root
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    def _partition_path(self, code: str, period: str, adjust: str) -> str:
+        return os.path.join(self.root, adjust or 'raw', period, f'{code}.bars')
+
+    def scan(self, period: str, adjust: str) -> Dict[str, int]:
+        """
+        列出已缓存的分区，不读取文件内容。
+        :return: {股票代码: 分区文件修改时间（纳秒）}，可作为分区内容的版本号
+        """
+        if not self.enabled:
+            return {}
+        directory = os.path.dirname(self._partition_path('', period, adjust))
+        if not os.path.isdir(directory):
+            return {}
+        with os.scandir(directory) as entries:
+            return {entry.name[:-len('.bars')]: entry.stat().st_mtime_ns
+                    for entry in entries if entry.name.endswith('.bars') and entry.is_file()}
+
+    def _lock_for(self, code: str, period: str, adjust: str) -> threading.Lock:
+        key = (code, period, adjust)
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _read_meta(self, code: str, period: str, adjust: str) -> Optional[dict]:
+        path = self._partition_path(code, period, adjust)
+        if not os.path.exists(path):
+            return None
+        try:
+            header, _ = read_header(path)
+        except Exception as e:
+            logger.warning(f'读取本地K线分区失败，将视为未缓存: {path}, {e}')
+            return None
+        return header['meta']
+
+    def load_bars(self, code: str, period: str, adjust: str) -> Tuple[Optional[np.ndarray], Optional[dict]]:
+        """
+        以内存映射方式读取整个分区。
+        :return: (BAR_DTYPE 数组, meta)，分区不存在或损坏时返回 (None, None)
+        """
+        if not self.enabled:
+            return None, None
+        path = self._partition_path(code, period, adjust)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            bars, header = open_bars(path)
+        except Exception as e:
+            logger.warning(f'读取本地K线分区失败，将视为未缓存: {path}, {e}')
+            return None, None
+        return bars, header['meta']
+
+    def load(self, code: str, period: str, adjust: str) -> Tuple[Optional[pd.DataFrame], Optional[dict]]:
+        """
+        读取整个分区。
+        :return: (DataFrame, meta)，分区不存在或损坏时返回 (None, None)
+        """
+        bars, meta = self.load_bars(code, period, adjust)
+        if bars is None:
+            return None, None
+        return bars_to_frame(bars), meta
+
+    def save(self, code: str, period: str, adjust: str, df: pd.DataFrame,
+             covered_start: str, covered_end: str) -> None:
+        """
+        原子地写入整个分区。
+        """
+        if not self.enabled:
+            return
+        meta = {
+            'covered_start': covered_start,
+            'covered_end': covered_end,
+            'updated_at': datetime.now().isoformat(),
+        }
+        write_bars(self._partition_path(code, period, adjust), frame_to_bars(df), meta)
+
+    @staticmethod
+    def _normalize_frame(df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if df is None or df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        df = df[BAR_COLUMNS].copy()
+        df['trade_date'] = df['trade_date'].map(normalize_date)
+        return df
+
+    @staticmethod
+    def _merge(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        frames = [f for f in frames if f is not None and not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(subset='trade_date', keep='last')
+        return merged.sort_values('trade_date').reset_index(drop=True)
+
+    def _ensure_range(self, code: str, period: str, adjust: str, start: str, end: str,
+                      fetcher: Fetcher) -> None:
+        """
+        保证分区覆盖 [start, end]，缺失的头尾区间向上游补齐后写回。
+        已覆盖时只读取文件头，不加载数据。
+        """
+        with self._lock_for(code, period, adjust):
+            meta = self._read_meta(code, period, adjust)
+            if meta is not None and meta['covered_start'] <= start and end <= meta['covered_end']:
+                return
+            stable_end = stable_until(period)
+            cached, meta = self.load(code, period, adjust)
+            if cached is None:
+                merged = self._normalize_frame(fetcher(start, end))
+                self.save(code, period, adjust, merged, start, min(end, stable_end))
+                return
+            covered_start, covered_end = meta['covered_start'], meta['covered_end']
+            # 超出已确认区间的尾部数据（未定型K线）一律丢弃，由上游重新获取
+            frames = [cached[cached['trade_date'] <= covered_end]]
+            if start < covered_start:
+                logger.info(f'本地K线缓存补齐头部: {code} {period} {start}-{_shift_date(covered_start, -1)}')
+                frames.insert(0, self._normalize_frame(fetcher(start, _shift_date(covered_start, -1))))
+                covered_start = start
+            if end > covered_end:
+                logger.info(f'本地K线缓存补齐尾部: {code} {period} {_shift_date(covered_end, 1)}-{end}')
+                frames.append(self._normalize_frame(fetcher(_shift_date(covered_end, 1), end)))
+                covered_end = max(covered_end, min(end, stable_end))
+            self.save(code, period, adjust, self._merge(frames), covered_start, covered_end)
+
+    def get_bars(self, code: str, period: str, adjust: str,
+                 start_date: Optional[str], end_date: Optional[str],
+                 fetcher: Fetcher) -> Optional[np.ndarray]:
+        """
+        获取 [start_date, end_date] 区间的K线结构化数组（BAR_DTYPE）。
+        启用本地存储时返回内存映射文件的只读视图，不解析、不复制。
+        :return: BAR_DTYPE 数组；无数据时返回 None
+        """
+        start = normalize_date(start_date) if start_date else DEFAULT_START_DATE
+        end = normalize_date(end_date) if end_date else datetime.now().strftime(DATE_FMT)
+        if not self.enabled:
+            bars = frame_to_bars(self._normalize_frame(fetcher(start, end)))
+        else:
+            self._ensure_range(code, period, adjust, start, end, fetcher)
+            bars, _ = self.load_bars(code, period, adjust)
+            if bars is None:
+                return None
+            bars = slice_by_date(bars, start, end)
+        return bars if len(bars) else None
+
+    def get_range(self, code: str, period: str, adjust: str,
+                  start_date: Optional[str], end_date: Optional[str],
+                  fetcher: Fetcher) -> Optional[pd.DataFrame]:
+        """
+        获取 [start_date, end_date] 区间的K线，已缓存的部分直接读盘，只向上游补齐缺失的头尾区间。
+        :param fetcher: 上游拉取函数 fetcher(start_date, end_date)，返回标准字段 DataFrame 或 None
+        :return: 按 trade_date 升序、trade_date 为 'YYYYMMDD' 字符串的 DataFrame；无数据时返回 None
+        """
+        bars = self.get_bars(code, period, adjust, start_date, end_date, fetcher)
+        if bars is None:
+            return None
+        return bars_to_frame(bars)
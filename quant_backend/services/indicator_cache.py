@@ -0,0 +1,310 @@
+import copy
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.utils.indicator_graph import INDICATOR_BUILDERS, IndicatorPlan
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+from quant_backend.utils.incremental_indicators import (
+    IncrementalATR, IncrementalBollinger, IncrementalEMA, IncrementalIndicator, IncrementalMACD,
+    IncrementalMFI, IncrementalOBV, IncrementalPMA, IncrementalRSI, IncrementalSMA,
+    IncrementalStochastic, IncrementalVMA, IncrementalVR
+)
+
+logger = logging.getLogger(__name__)
+
+# 指标缓存内存上限（MB），可通过环境变量 QUANT_INDICATOR_CACHE_MB 配置
+INDICATOR_CACHE_MB = float(os.environ.get('QUANT_INDICATOR_CACHE_MB', '64'))
+# 尾部新增K线超过该数量时直接全量重算（向量化全量计算比逐根增量更快）
+MAX_EXTEND_BARS = 2000
+# 每个条目除数组外的固定开销估算（状态对象、键、字典槽位）
+ENTRY_OVERHEAD_BYTES = 2048
+
+
+class IndicatorSpec(NamedTuple):
+    """指标定义：全量计算函数与对应的增量状态工厂"""
+    compute: Callable[[pd.DataFrame, Dict[str, Any]], Any]
+    make_state: Callable[[Dict[str, Any]], IncrementalIndicator]
+
+
+class _MultiWindow(IncrementalIndicator):
+    """多个同类单窗口增量指标的组合，update 返回各窗口的值"""
+
+    def __init__(self, states):
+        super().__init__()
+        self.states = list(states)
+        self.inputs = self.states[0].inputs
+
+    def reset(self) -> None:
+        for state in self.states:
+            state.reset()
+
+    def update(self, *values):
+        self.value = tuple(state.update(*values) for state in self.states)
+        return self.value
+
+    def seed(self, data):
+        self.value = tuple(state.seed(data) for state in self.states)
+        return self.value
+
+
+# 仅收录因果指标（只依赖当前及之前的K线），前缀结果不会因后续K线改变
+INDICATORS: Dict[str, IndicatorSpec] = {
+    'ma': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_ma(df['close'], p['window']),
+                        lambda p: IncrementalSMA(p['window'])),
+    'ema': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_ema(df['close'], p['window']),
+                         lambda p: IncrementalEMA(p['window'])),
+    'rsi': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_rsi(df['close'], p.get('window', 14)),
+                         lambda p: IncrementalRSI(p.get('window', 14))),
+    'macd': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_macd(df['close'], **p),
+                          lambda p: IncrementalMACD(**p)),
+    'bollinger': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_bollinger_bands(df['close'], **p),
+                               lambda p: IncrementalBollinger(**p)),
+    'atr': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_atr(df['high'], df['low'], df['close'], **p),
+                         lambda p: IncrementalATR(**p)),
+    'stochastic': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_stochastic(df['high'], df['low'], df['close'], **p),
+                                lambda p: IncrementalStochastic(**p)),
+    'obv': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_obv(df),
+                         lambda p: IncrementalOBV()),
+    'vma': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_vma(df, **p),
+                         lambda p: IncrementalVMA(**p)),
+    'vr': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_vr(df, **p),
+                        lambda p: IncrementalVR(**p)),
+    'mfi': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_mfi(df, **p),
+                         lambda p: IncrementalMFI(**p)),
+    'pma': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_pma(df, **p),
+                         lambda p: IncrementalPMA(**p)),
+    # 多窗口版本：结果为 (K线数, 窗口数) 矩阵
+    'pma_matrix': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_pma_matrix(df, p['windows']),
+                                lambda p: _MultiWindow(IncrementalPMA(w) for w in p['windows'])),
+    'vma_matrix': IndicatorSpec(lambda df, p: TechnicalIndicators.calculate_vma_matrix(df, p['windows']),
+                                lambda p: _MultiWindow(IncrementalVMA(w) for w in p['windows'])),
+}
+
+
+def _to_array(result) -> np.ndarray:
+    """将指标函数的返回值（Series / DataFrame / Series 元组）统一为 ndarray，多输出时为二维"""
+    if isinstance(result, tuple):
+        return np.column_stack([np.asarray(r, dtype=np.float64) for r in result])
+    return np.asarray(result, dtype=np.float64)
+
+
+def _freeze(params: Mapping[str, Any]) -> Tuple:
+    return tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in params.items()))
+
+
+class _Entry:
+    """
+    缓存条目：某段K线（起始日期固定）上的指标结果。
+    state 是处理完倒数第二根K线后的增量状态快照——最后一根K线可能是盘中未收盘的K线，
+    扩展时总是从最后一根开始重新计算。
+    """
+    __slots__ = ('dates', 'values', 'state', 'inputs', 'nbytes')
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray, state: IncrementalIndicator, inputs: np.ndarray):
+        """
+        Args:
+            inputs: 计算时各输入字段的完整数据 (K线数, 字段数)，复用前逐根比对，
+                    前复权因子更新导致历史价格整体重算时不会返回旧结果
+        """
+        self.dates = dates
+        self.values = values
+        self.state = state
+        self.inputs = inputs
+        self.nbytes = dates.nbytes + values.nbytes + inputs.nbytes + ENTRY_OVERHEAD_BYTES
+
+
+class IndicatorCache:
+    """
+    技术指标结果缓存
+
+    以 (股票代码, 周期, 复权方式, 指标, 参数, 起始日期) 为键缓存指标序列。
+    请求区间是已缓存区间的前缀时直接切片返回；比已缓存区间更长时，从保存的增量状态快照出发只计算新增尾部。
+    get_many 一次请求多个指标时，未命中的指标放进同一个 IndicatorPlan 计算，共享中间量；
+    计算图支持但未登记增量状态的指标（如含未来位移的一目均衡图）一并计算，只是不缓存。
+    按估算字节数做 LRU 淘汰，并统计命中/扩展/未命中次数。
+    """
+
+    def __init__(self, max_bytes: int = int(INDICATOR_CACHE_MB * 1024 * 1024),
+                 indicators: Optional[Dict[str, IndicatorSpec]] = None):
+        """
+        Args:
+            max_bytes: 缓存字节预算
+            indicators: 指标定义表，默认使用 INDICATORS
+        """
+        self.max_bytes = max_bytes
+        self.indicators = INDICATORS if indicators is None else indicators
+        # 内置指标经计算图批量求值；自定义的指标定义仍调用其 compute
+        self._planned = {name for name, spec in self.indicators.items()
+                         if INDICATORS.get(name) is spec and name in INDICATOR_BUILDERS}
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """命中、增量扩展、未命中、淘汰次数及当前占用"""
+        with self._lock:
+            return {
+                'hits': self.hits, 'extensions': self.extensions, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self._entries), 'bytes': self.nbytes,
+            }
+
+    @staticmethod
+    def _inputs(df: pd.DataFrame, fields: Tuple[str, ...]) -> np.ndarray:
+        return np.column_stack([df[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in fields])
+
+    @staticmethod
+    def _same(a: np.ndarray, b: np.ndarray) -> bool:
+        return np.array_equal(a, b, equal_nan=True)
+
+    def get(self, symbol: str, period: str, adjust: str, name: str, params: Optional[Mapping[str, Any]],
+            df: pd.DataFrame) -> np.ndarray:
+        """
+        获取指标序列。
+        Args:
+            symbol, period, adjust: 行情标识，参与缓存键
+            name: 指标名（见 INDICATORS）
+            params: 指标参数
+            df: 按日期升序的行情 DataFrame，需包含 date 及指标所需的 open/high/low/close/volume 列
+        Returns:
+            与 df 行对齐的只读 ndarray（多输出指标为二维）
+        """
+        return self.get_many(symbol, period, adjust, [(name, params)], df)[0]
+
+    def get_many(self, symbol: str, period: str, adjust: str,
+                 requests: Sequence[Tuple[str, Optional[Mapping[str, Any]]]], df: pd.DataFrame) -> List[np.ndarray]:
+        """
+        批量获取同一行情上的多个指标序列。
+        Args:
+            requests: [(指标名, 参数), ...]
+            其余参数同 get
+        Returns:
+            与 requests 一一对应的只读 ndarray 列表
+        """
+        specs = []
+        for name, params in requests:
+            spec = self.indicators.get(name)
+            if spec is None and name not in INDICATOR_BUILDERS:
+                raise ValueError(f'不支持的指标: {name}')
+            specs.append((name, spec, dict(params or {})))
+        n = len(df)
+        if n == 0:
+            return self._compute(specs, df)
+        dates = np.asarray(df['date'])
+
+        results: List[Optional[np.ndarray]] = [None] * len(specs)
+        keys = []
+        for i, (name, spec, params) in enumerate(specs):
+            key = (symbol, period, adjust, name, _freeze(params), dates[0])
+            keys.append(key)
+            if spec is None:
+                continue
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is not None:
+                results[i] = self._from_entry(key, entry, spec, params, df, dates)
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+        with self._lock:
+            self.misses += len(missing)
+        computed = self._compute([specs[i] for i in missing], df)
+        for i, values in zip(missing, computed):
+            name, spec, params = specs[i]
+            if spec is None:
+                results[i] = self._readonly(values)
+                continue
+            state = spec.make_state(params)
+            if n > 1:
+                state.seed(df.iloc[:-1])
+            self._store(keys[i], _Entry(dates, values, state, self._inputs(df, state.inputs)))
+            results[i] = self._readonly(values)
+        return results
+
+    def _compute(self, specs, df: pd.DataFrame) -> List[np.ndarray]:
+        """全量计算一组指标：内置指标放入同一个计算图，共享的中间量只算一次"""
+        plan = IndicatorPlan()
+        labels = [plan.add(name, params, label=str(i)) if spec is None or name in self._planned else None
+                  for i, (name, spec, params) in enumerate(specs)]
+        planned = plan.compute(df) if plan.labels else {}
+        return [_to_array(planned[label] if label is not None else spec.compute(df, params))
+                for label, (_, spec, params) in zip(labels, specs)]
+
+    def _from_entry(self, key, entry: _Entry, spec: IndicatorSpec, params: Dict[str, Any],
+                    df: pd.DataFrame, dates: np.ndarray) -> Optional[np.ndarray]:
+        n, cached = len(dates), len(entry.dates)
+        inputs = entry.state.inputs
+        # 复用前比对全部输入数据：前复权因子更新后即使最后几根K线不变，更早的价格也会整体变化
+        data = self._inputs(df, inputs)
+        if n < cached:
+            # 前缀请求：日期与数据一致即可直接切片（因果指标的前缀结果不受后续K线影响）
+            if dates[n - 1] == entry.dates[n - 1] and self._same(data, entry.inputs[:n]):
+                with self._lock:
+                    self.hits += 1
+                return self._readonly(entry.values[:n])
+            return None
+        if dates[cached - 1] != entry.dates[cached - 1]:
+            return None
+        if n == cached and self._same(data, entry.inputs):
+            with self._lock:
+                self.hits += 1
+            return self._readonly(entry.values)
+        # 从倒数第二根K线后的状态快照出发，重算最后一根（可能已更新）并追加新增K线
+        committed = cached - 1
+        if n - committed > MAX_EXTEND_BARS:
+            return None
+        if not self._same(data[:committed], entry.inputs[:committed]):
+            return None
+        state = copy.deepcopy(entry.state)
+        rows = df.iloc[committed:][list(inputs)].to_dict('records')
+        tail = []
+        for i, bar in enumerate(rows):
+            if i == len(rows) - 1:
+                snapshot = copy.deepcopy(state)
+            tail.append(state.update_bar(bar))
+        tail = np.asarray(tail, dtype=np.float64).reshape((len(tail),) + entry.values.shape[1:])
+        values = np.concatenate([entry.values[:committed], tail])
+        with self._lock:
+            self.extensions += 1
+        self._store(key, _Entry(dates, values, snapshot, data))
+        return self._readonly(values)
+
+    def _store(self, key, entry: _Entry) -> None:
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    @staticmethod
+    def _readonly(values: np.ndarray) -> np.ndarray:
+        view = values.view()
+        view.flags.writeable = False
+        return view
+
+
+indicator_cache = IndicatorCache()
@@ -1,8 +1,9 @@
-import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
 import time
+from quant_backend.services.spot_snapshot import spot_snapshot
+from quant_backend.services import akshare_service
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,14 +16,15 @@ class MarketDataFetcher:
         self.retry_delay = retry_delay
         self.data = None
     
-    def fetch_stock_data(self, symbol: str, start_date: str, end_date: str = None) -> pd.DataFrame:
+    def fetch_stock_data(self, symbol: str, start_date: str, end_date: str = None, adjust: str = 'qfq') -> pd.DataFrame:
         """
-        获取股票历史数据
+        获取股票历史数据（经本地K线存储，复权价格按复权因子在本地计算）
         
         Args:
             symbol: 股票代码 (如: '000001', '600000')
             start_date: 开始日期 (格式: 'YYYY-MM-DD' 或 'YYYYMMDD')
             end_date: 结束日期，默认为今天 (格式: 'YYYY-MM-DD' 或 'YYYYMMDD')
+            adjust: 复权方式，'qfq'（前复权，默认）、'hfq'（后复权）、'raw'（不复权）
         
         Returns:
             DataFrame: 包含历史数据的DataFrame，列名包括 Date, Open, High, Low, Close, Volume
@@ -41,43 +43,36 @@ class MarketDataFetcher:
             
             for attempt in range(self.max_retries):
                 try:
-                    # 使用 AKShare 获取股票历史数据
                     # 只取前6位数字作为股票代码
                     stock_code = symbol[:6] if len(symbol) > 6 else symbol
                     
-                    df = ak.stock_zh_a_hist(
-                        symbol=stock_code, 
-                        period="daily", 
-                        start_date=start_date, 
-                        end_date=end_date, 
-                        adjust="qfq"  # 前复权
+                    bars = akshare_service.get_stock_bars(
+                        stock_code,
+                        period='daily',
+                        start_date=start_date,
+                        end_date=end_date,
+                        adjust=adjust
                     )
                     
-                    if df is None or df.empty:
+                    if bars is None or len(bars) == 0:
                         logger.warning(f"未获取到 {symbol} 的数据")
                         return None
                     
                     # 转换列名以匹配原有接口
-                    df = df.rename(columns={
-                        '日期': 'Date',
-                        '开盘': 'Open',
-                        '收盘': 'Close',
-                        '最高': 'High',
-                        '最低': 'Low',
-                        '成交量': 'Volume'
-                    })
-                    
-                    # 设置日期索引
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    df.set_index('Date', inplace=True)
-                    
-                    # 只保留需要的列
-                    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+                    df = pd.DataFrame({
+                        'Open': bars['open'],
+                        'High': bars['high'],
+                        'Low': bars['low'],
+                        'Close': bars['close'],
+                        'Volume': bars['vol']
+                    }, index=pd.DatetimeIndex(bars['date'].astype('datetime64[ns]'), name='Date'))
                     
                     logger.info(f"成功获取 {len(df)} 条数据记录")
                     self.data = df
                     return df
                     
+                except ValueError:
+                    raise
                 except Exception as e:
                     logger.error(f"获取 {symbol} 数据失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
                     if attempt < self.max_retries - 1:
@@ -86,13 +81,15 @@ class MarketDataFetcher:
                     
             return None
             
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"获取数据异常: {str(e)}")
             return None
     
     def fetch_latest_price(self, symbol: str) -> dict:
         """
-        获取股票最新价格
+        获取股票最新价格（从进程共享的全市场行情快照中查询，不再每次拉取全市场行情表）
         
         Args:
             symbol: 股票代码 (如: '000001', '600000')
@@ -101,39 +98,31 @@ class MarketDataFetcher:
             dict: 包含最新价格信息的字典，如果获取失败返回 None
         """
         try:
-            # 只取前6位数字作为股票代码
-            stock_code = symbol[:6] if len(symbol) > 6 else symbol
-            
-            # 获取实时行情数据 - 使用正确的AKShare API
-            df = ak.stock_zh_a_spot_em()
-            
-            if df is None or df.empty:
-                logger.warning(f"未获取到实时行情数据")
-                return None
-            
-            # 查找指定股票代码的数据
-            stock_data = df[df['代码'] == stock_code]
-            
-            if stock_data.empty:
+            latest_price = spot_snapshot.get(symbol)
+            if latest_price is None:
                 logger.warning(f"未找到股票代码 {symbol} 的数据")
-                return None
-            
-            # 提取最新价格信息
-            latest_price = {
-                'symbol': symbol,
-                'price': float(stock_data['最新价'].iloc[0]),
-                'change': float(stock_data['涨跌额'].iloc[0]),
-                'change_percent': float(stock_data['涨跌幅'].iloc[0]),
-                'volume': int(stock_data['成交量'].iloc[0]),
-                'timestamp': datetime.now().isoformat()
-            }
-            
             return latest_price
             
         except Exception as e:
             logger.error(f"获取 {symbol} 最新价格失败: {str(e)}")
             return None
     
+    def fetch_latest_prices(self, symbols: list) -> dict:
+        """
+        批量获取多只股票最新价格，一次快照查询完成
+        
+        Args:
+            symbols: 股票代码列表 (如: ['000001', '600000.SH'])
+        
+        Returns:
+            dict: {symbol: 最新价格信息}，未找到的股票不包含在结果中
+        """
+        try:
+            return spot_snapshot.get_many(symbols)
+        except Exception as e:
+            logger.error(f"批量获取最新价格失败: {str(e)}")
+            return {}
+    
     def get_data_info(self) -> dict:
         """
         获取数据基本信息
@@ -0,0 +1,66 @@
+import time
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器
+
+    以 rate 个/秒的速度补充令牌，桶容量为 capacity（允许的突发请求数）。
+    每次调用上游接口前调用 acquire()，令牌不足时阻塞等待。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数，必须大于0
+            capacity: 桶容量，默认与 rate 相同（至少为1）
+        """
+        if rate <= 0:
+            raise ValueError(f'rate 必须大于0: {rate}')
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """非阻塞地尝试获取令牌，成功返回 True"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞获取令牌。
+        Args:
+            tokens: 需要的令牌数
+            timeout: 最长等待秒数，None 表示一直等待
+        Returns:
+            是否成功获取（仅在超时时返回 False）
+        """
+        if tokens > self.capacity:
+            raise ValueError(f'单次请求的令牌数 {tokens} 超过桶容量 {self.capacity}')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,147 @@
+"""
+回测结果稳健性分析（蒙特卡洛 / 自助法）
+
+对一次回测的收益序列重抽样生成大量资金曲线，给出总收益率、最大回撤和夏普比率的分布：
+- 'block_bootstrap'：日收益率的循环分块自助法（保留块内的自相关）
+- 'trade_shuffle'：打乱逐笔交易收益的顺序（总收益不变，考察回撤对交易顺序的敏感性）
+- 'trade_bootstrap'：逐笔交易收益有放回抽样
+
+全部路径作为一个 路径 × 期数 的矩阵一次计算（累乘、滚动最高点、均值/标准差均沿轴向量化），
+路径按块处理（每块不超过 ROBUSTNESS_BLOCK_ELEMENTS 个元素），内存占用与路径数无关。
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('block_bootstrap', 'trade_shuffle', 'trade_bootstrap')
+ROBUSTNESS_METRICS = ('total_return', 'max_drawdown', 'sharpe_ratio')
+PERCENTILES = (5, 25, 50, 75, 95)
+# 每块 路径 × 期数 矩阵的元素数上限
+ROBUSTNESS_BLOCK_ELEMENTS = 1 << 21
+# 单次分析允许的最大路径数
+MAX_PATHS = 100_000
+HISTOGRAM_BINS = 20
+
+
+def daily_returns(result: Dict[str, Any]) -> pd.Series:
+    """
+    从回测结果（MACrossStrategy.backtest 的返回值）的资金曲线计算日收益率。
+    Backtrader 回测请使用 backtest_runner.run_backtest_returns 返回的真实账户收益率。
+    """
+    curve = result['chart_data']['equity_curve']
+    equity = pd.Series([point['value'] for point in curve],
+                       index=pd.DatetimeIndex([point['date'] for point in curve]), dtype=np.float64)
+    return equity.pct_change().dropna()
+
+
+def trade_returns(result: Dict[str, Any], basis: str = 'equity') -> np.ndarray:
+    """
+    逐笔交易收益率：按顺序配对买入/卖出信号，期末仍未平仓的交易按最后一日计算。
+    :param result: MACrossStrategy.backtest 或 backtest_runner.run_backtest 的返回值
+    :param basis: 'equity' 取两次成交日之间账户权益的变化（包含仓位大小的影响）；
+                  'price' 取卖出价 / 买入价 - 1（run_backtest 的资金曲线仅用于展示，应使用成交价）
+    """
+    if basis not in ('equity', 'price'):
+        raise ValueError(f'不支持的收益计算方式: {basis}')
+    chart = result['chart_data']
+    buys, sells = chart['buy_signals'], chart['sell_signals']
+    if basis == 'price':
+        last_price = chart['close_prices'][-1] if chart.get('close_prices') else np.nan
+        exits = [signal['price'] for signal in sells] + [last_price] * max(0, len(buys) - len(sells))
+        return np.asarray([exit / buy['price'] - 1 for buy, exit in zip(buys, exits)], dtype=np.float64)
+    curve = chart['equity_curve']
+    equity = pd.Series([point['value'] for point in curve], index=[point['date'] for point in curve])
+    returns = []
+    for i, buy in enumerate(buys):
+        sell = sells[i]['date'] if i < len(sells) else equity.index[-1]
+        returns.append(equity[sell] / equity[buy['date']] - 1)
+    return np.asarray(returns, dtype=np.float64)
+
+
+def _block_bootstrap(rng: np.random.Generator, returns: np.ndarray, n_paths: int, block_size: int) -> np.ndarray:
+    n = len(returns)
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+    index = (starts + np.arange(block_size)) % n
+    return returns[index.reshape(n_paths, -1)[:, :n]]
+
+
+def _sample(rng: np.random.Generator, method: str, returns: np.ndarray, n_paths: int, block_size: int) -> np.ndarray:
+    """生成 n_paths 条重抽样路径，返回 (n_paths, len(returns)) 矩阵"""
+    if method == 'block_bootstrap':
+        return _block_bootstrap(rng, returns, n_paths, block_size)
+    if method == 'trade_shuffle':
+        return rng.permuted(np.tile(returns, (n_paths, 1)), axis=1)
+    return returns[rng.integers(0, len(returns), size=(n_paths, len(returns)))]
+
+
+def path_statistics(paths: np.ndarray, periods_per_year: float) -> Dict[str, np.ndarray]:
+    """
+    计算每条收益路径的总收益率、最大回撤（负数）和年化夏普比率（无风险利率为 0）。
+    :param paths: (路径数, 期数) 的收益率矩阵
+    """
+    growth = np.cumprod(1 + paths, axis=1)
+    # 起始净值 1 也计入最高点
+    peak = np.maximum(np.maximum.accumulate(growth, axis=1), 1.0)
+    drawdown = np.minimum((growth / peak - 1).min(axis=1), 0.0)
+    std = paths.std(axis=1, ddof=1) if paths.shape[1] > 1 else np.zeros(len(paths))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, paths.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0)
+    return {'total_return': growth[:, -1] - 1, 'max_drawdown': drawdown, 'sharpe_ratio': sharpe}
+
+
+def _summary(values: np.ndarray) -> Dict[str, Any]:
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        'mean': round(float(values.mean()), 4),
+        'std': round(float(values.std()), 4),
+        'percentiles': {str(p): round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        'histogram': {'edges': np.round(edges, 4).tolist(), 'counts': counts.tolist()},
+    }
+
+
+def monte_carlo(returns: Sequence[float], method: str = 'block_bootstrap', n_paths: int = 10000,
+                block_size: int = 20, periods_per_year: float = 252, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    蒙特卡洛稳健性分析。
+    :param returns: 日收益率（block_bootstrap）或逐笔交易收益率（trade_shuffle / trade_bootstrap）
+    :param method: 重抽样方式，见 METHODS
+    :param n_paths: 路径数
+    :param block_size: 分块自助法的块长度（期数）
+    :param periods_per_year: 每年的期数，用于年化夏普比率（日收益为 252，逐笔交易为每年交易笔数）
+    :param seed: 随机种子，相同种子得到相同结果
+    :return: {'original': 原始序列的指标, 'distribution': {指标: 均值/标准差/分位数/直方图},
+              'probability_of_loss': 总收益为负的路径比例, ...}
+    """
+    if method not in METHODS:
+        raise ValueError(f'不支持的重抽样方式: {method}')
+    if not 1 <= n_paths <= MAX_PATHS:
+        raise ValueError(f'n_paths 需在 1 到 {MAX_PATHS} 之间')
+    if block_size < 1:
+        raise ValueError('block_size 至少为 1')
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    if len(returns) < 2:
+        raise ValueError('收益序列过短，至少需要 2 个观测值')
+    block_size = min(block_size, len(returns))
+
+    rng = np.random.default_rng(seed)
+    stats = {name: np.empty(n_paths) for name in ROBUSTNESS_METRICS}
+    step = max(1, ROBUSTNESS_BLOCK_ELEMENTS // len(returns))
+    for start in range(0, n_paths, step):
+        stop = min(start + step, n_paths)
+        block = path_statistics(_sample(rng, method, returns, stop - start, block_size), periods_per_year)
+        for name in ROBUSTNESS_METRICS:
+            stats[name][start:stop] = block[name]
+
+    original = path_statistics(returns[None, :], periods_per_year)
+    return {
+        'method': method,
+        'n_paths': n_paths,
+        'observations': len(returns),
+        'block_size': block_size if method == 'block_bootstrap' else None,
+        'original': {name: round(float(original[name][0]), 4) for name in ROBUSTNESS_METRICS},
+        'distribution': {name: _summary(stats[name]) for name in ROBUSTNESS_METRICS},
+        'probability_of_loss': round(float((stats['total_return'] < 0).mean()), 4),
+    }
@@ -0,0 +1,329 @@
+"""
+全市场条件选股
+
+在 日期 × 股票 面板上一次算出条件中用到的全部指标（PanelIndicators，停牌日不占用滚动窗口），
+取最后一个交易日的截面逐条比较，返回满足全部条件的股票并按得分排序。相同的指标（名称和参数相同）
+只计算一次，多输出指标的各输出共用一次计算。
+
+条件为字符串，多条条件之间为"且"：
+- 比较：<项> <运算符> <项或数值>，运算符为 > >= < <=，如 "vr > 2"、"mfi(14) < 20"、"close > ma(20)"、"macd.hist > 0"
+- 信号：当日出现的策略信号，如 "ma_cross(5,20)"（短均线上穿长均线）、"volume_breakout(20,2.0,2.0,3)"，见 SIGNALS
+项为行情字段（open/high/low/close/volume）、change(N)（N 日涨跌幅 %）或指标声明，指标声明语法同 /indicators 接口的
+indicators 参数，多输出指标写作 "声明.输出名"（如 "bollinger(20,2).upper"，输出名见 INDICATOR_OUTPUTS）。
+
+得分：每个比较条件左侧的值（右侧为项时取 左 / |右| - 1）在当日全部有效股票中的百分位排名
+（> / >= 越大越靠前，< / <= 越小越靠前），各条件取平均；也可用 sort_by 指定按某一项的值排序。
+"""
+import inspect
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.strategy_service import MACrossPortfolio, VolumeBreakoutStrategy
+from quant_backend.utils.indicator_graph import INDICATOR_OUTPUTS, _parse_value, parse_indicator_specs
+from quant_backend.utils.panel_indicators import PanelIndicators, _apply
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+OPERATORS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+# 单次选股允许的最大条件数
+MAX_CONDITIONS = 20
+
+# 支持在面板上计算的指标：名称 -> (输入字段, 面板计算函数)；参数名与 indicator_graph 中的指标声明一致
+PANEL_INDICATORS: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    'ma': (('close',), PanelIndicators.ma),
+    'pma': (('close',), PanelIndicators.pma),
+    'ema': (('close',), PanelIndicators.ema),
+    'rsi': (('close',), PanelIndicators.rsi),
+    'macd': (('close',), PanelIndicators.macd),
+    'bollinger': (('close',), PanelIndicators.bollinger_bands),
+    'atr': (('high', 'low', 'close'), PanelIndicators.atr),
+    'stochastic': (('high', 'low', 'close'), PanelIndicators.stochastic),
+    'donchian': (('high', 'low'), PanelIndicators.donchian),
+    'obv': (('close', 'volume'), PanelIndicators.obv),
+    'vma': (('volume',), PanelIndicators.vma),
+    'vr': (('volume',), PanelIndicators.vr),
+    'mfi': (('high', 'low', 'close', 'volume'), PanelIndicators.mfi),
+}
+
+
+def _pct_change(close: pd.DataFrame, window: int) -> pd.DataFrame:
+    c = close.to_numpy()
+    out = np.full_like(c, np.nan)
+    out[window:] = (c[window:] / c[:-window] - 1) * 100
+    return pd.DataFrame(out)
+
+
+def _change(panels: Dict[str, pd.DataFrame], window: int = 1) -> pd.DataFrame:
+    """window 个交易日的涨跌幅（%），停牌日不计入"""
+    return _apply(lambda c: _pct_change(c, window), [panels['close']], skip_suspended=True)
+
+
+def _ma_cross(panels: Dict[str, pd.DataFrame], short_window: int = 5, long_window: int = 20,
+              direction: int = 1) -> pd.Series:
+    hold = MACrossPortfolio(short_window, long_window).generate_signals(panels['close'])
+    if len(hold) < 2:
+        return pd.Series(False, index=hold.columns)
+    return hold.iloc[-1] - hold.iloc[-2] == direction
+
+
+def _ma_cross_up(panels: Dict[str, pd.DataFrame], short_window: int = 5, long_window: int = 20) -> pd.Series:
+    """当日短均线上穿长均线（持有信号由空仓变为持有，规则同 MACrossPortfolio）"""
+    return _ma_cross(panels, short_window, long_window, 1)
+
+
+def _ma_cross_down(panels: Dict[str, pd.DataFrame], short_window: int = 5, long_window: int = 20) -> pd.Series:
+    """当日短均线下穿长均线"""
+    return _ma_cross(panels, short_window, long_window, -1)
+
+
+def _breakout(panels: Dict[str, pd.DataFrame], side: int, **params) -> pd.Series:
+    entry, exit_ = VolumeBreakoutStrategy(**params).generate_signals(panels['close'], panels['volume'])
+    return (entry if side == 0 else exit_).iloc[-1]
+
+
+def _volume_breakout(panels: Dict[str, pd.DataFrame], volume_window: int = 20, volume_mult: float = 2.0,
+                     price_change_threshold: float = 2.0, lookback_days: int = 3) -> pd.Series:
+    """当日出现 VolumeBreakoutStrategy 的买入信号（放量上涨）"""
+    return _breakout(panels, 0, volume_window=volume_window, volume_mult=volume_mult,
+                     price_change_threshold=price_change_threshold, lookback_days=lookback_days)
+
+
+def _volume_breakdown(panels: Dict[str, pd.DataFrame], volume_window: int = 20, volume_mult: float = 2.0,
+                      price_change_threshold: float = 2.0, lookback_days: int = 3) -> pd.Series:
+    """当日出现 VolumeBreakoutStrategy 的卖出信号（放量下跌）"""
+    return _breakout(panels, 1, volume_window=volume_window, volume_mult=volume_mult,
+                     price_change_threshold=price_change_threshold, lookback_days=lookback_days)
+
+
+# 策略信号：名称 -> 计算函数（参数为面板字典和信号参数，返回最后一个交易日每只股票是否出现信号）
+SIGNALS: Dict[str, Callable[..., pd.Series]] = {
+    'ma_cross': _ma_cross_up,
+    'ma_cross_down': _ma_cross_down,
+    'volume_breakout': _volume_breakout,
+    'volume_breakdown': _volume_breakdown,
+}
+
+
+class Term(NamedTuple):
+    """比较项：行情字段、change 或指标（output 为多输出指标的输出名）"""
+    label: str
+    name: str
+    params: Tuple
+    output: Optional[str] = None
+
+
+class Condition(NamedTuple):
+    """一条选股条件：比较（left op right）或策略信号（signal 及其参数）"""
+    label: str
+    left: Optional[Term] = None
+    op: Optional[str] = None
+    right: Union[Term, float, None] = None
+    signal: Optional[str] = None
+    params: Tuple = ()
+
+
+_TERM_RE = re.compile(r'([A-Za-z_]\w*)\s*(?:\(([^()]*)\))?\s*(?:\.\s*([A-Za-z_]\w*))?')
+_CONDITION_RE = re.compile(r'(.+?)\s*(>=|<=|>|<)\s*(.+)')
+
+
+def _bind_args(name: str, arg_text: Optional[str], fn: Callable) -> Dict[str, Any]:
+    """按函数签名（跳过第一个参数）解析 "5,20" / "short_window=5" 形式的参数"""
+    names = list(inspect.signature(fn).parameters)[1:]
+    args = [a.strip() for a in arg_text.split(',')] if arg_text and arg_text.strip() else []
+    params: Dict[str, Any] = {}
+    positional = [a for a in args if '=' not in a]
+    if len(positional) > len(names):
+        raise ValueError(f'{name} 参数过多')
+    for key, value in zip(names, positional):
+        params[key] = _parse_value(value)
+    for arg in args:
+        if '=' in arg:
+            key, value = (x.strip() for x in arg.split('=', 1))
+            if key in params:
+                raise ValueError(f'{name} 参数重复: {key}')
+            params[key] = _parse_value(value)
+    try:
+        inspect.signature(fn).bind(None, **params)
+    except TypeError as e:
+        raise ValueError(f'{name} 参数错误: {e}') from None
+    return params
+
+
+def parse_term(text: str) -> Union[Term, float]:
+    """
+    解析比较项，数值返回 float
+    Raises:
+        ValueError: 未知字段/指标、参数错误或输出名无效
+    """
+    text = text.strip()
+    try:
+        return float(_parse_value(text))
+    except ValueError:
+        pass
+    match = _TERM_RE.fullmatch(text)
+    if match is None:
+        raise ValueError(f'比较项格式错误: {text}')
+    name, arg_text, output = match.groups()
+    label = re.sub(r'\s+', '', text)
+    if name in PRICE_FIELDS:
+        if arg_text is not None or output is not None:
+            raise ValueError(f'行情字段 {name} 不接受参数')
+        return Term(label, name, ())
+    if name == 'change':
+        params = _bind_args(name, arg_text, _change)
+        if not isinstance(params.get('window', 1), int) or params.get('window', 1) < 1:
+            raise ValueError('change 参数 window 须为正整数')
+        if output is not None:
+            raise ValueError('change 没有多个输出')
+        return Term(label, name, tuple(sorted(params.items())))
+    if name not in PANEL_INDICATORS:
+        raise ValueError(f'不支持的选股指标: {name}')
+    (_, _, params), = parse_indicator_specs(name if arg_text is None else f'{name}({arg_text})')
+    outputs = INDICATOR_OUTPUTS.get(name)
+    if outputs is None and output is not None:
+        raise ValueError(f'指标 {name} 没有多个输出')
+    if outputs is not None and output not in outputs:
+        raise ValueError(f"指标 {name} 需指定输出: {', '.join(f'{name}.{o}' for o in outputs)}")
+    return Term(label, name, tuple(sorted(params.items())), output)
+
+
+def parse_condition(text: str) -> Condition:
+    """
+    解析一条选股条件
+    Raises:
+        ValueError: 语法错误、未知指标/信号或参数错误
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError('选股条件必须为非空字符串')
+    label = re.sub(r'\s+', '', text)
+    match = _CONDITION_RE.fullmatch(text.strip())
+    if match is None:
+        signal = _TERM_RE.fullmatch(text.strip())
+        if signal is None or signal.group(1) not in SIGNALS or signal.group(3) is not None:
+            raise ValueError(f'选股条件格式错误: {text}')
+        name = signal.group(1)
+        params = _bind_args(name, signal.group(2), SIGNALS[name])
+        return Condition(label, signal=name, params=tuple(sorted(params.items())))
+    left, op, right = match.groups()
+    left = parse_term(left)
+    if not isinstance(left, Term):
+        raise ValueError(f'比较条件左侧须为字段或指标: {text}')
+    return Condition(label, left=left, op=op, right=parse_term(right))
+
+
+def parse_conditions(conditions: Sequence[str]) -> List[Condition]:
+    """解析条件列表，条件数须在 1 到 MAX_CONDITIONS 之间"""
+    if isinstance(conditions, str) or not isinstance(conditions, (list, tuple)):
+        raise ValueError('conditions 必须为条件字符串列表')
+    if not 1 <= len(conditions) <= MAX_CONDITIONS:
+        raise ValueError(f'条件数需在 1 到 {MAX_CONDITIONS} 之间')
+    return [parse_condition(text) for text in conditions]
+
+
+class _Evaluator:
+    """在面板上计算各比较项最后一个交易日的截面值，相同指标只计算一次"""
+
+    def __init__(self, panels: Dict[str, pd.DataFrame]):
+        self.panels = panels
+        self._cache: Dict[Tuple, Any] = {}
+
+    def _compute(self, name: str, params: Tuple):
+        key = (name, params)
+        if key not in self._cache:
+            if name == 'change':
+                self._cache[key] = _change(self.panels, **dict(params))
+            else:
+                fields, fn = PANEL_INDICATORS[name]
+                self._cache[key] = fn(*(self.panels[f] for f in fields), **dict(params))
+        return self._cache[key]
+
+    def last(self, term: Union[Term, float]) -> np.ndarray:
+        if not isinstance(term, Term):
+            return np.full(self.panels['close'].shape[1], term)
+        if term.name in PRICE_FIELDS:
+            panel = self.panels[term.name]
+        else:
+            panel = self._compute(term.name, term.params)
+            if term.output is not None:
+                panel = panel[INDICATOR_OUTPUTS[term.name].index(term.output)]
+        return panel.iloc[-1].to_numpy(dtype=np.float64)
+
+    def signal(self, name: str, params: Tuple) -> np.ndarray:
+        return SIGNALS[name](self.panels, **dict(params)).to_numpy(dtype=bool)
+
+
+def _pct_rank(values: np.ndarray, valid: np.ndarray, ascending: bool) -> np.ndarray:
+    ranks = pd.Series(np.where(valid, values, np.nan)).rank(pct=True, ascending=ascending)
+    return ranks.fillna(0.0).to_numpy()
+
+
+def screen(panels: Dict[str, pd.DataFrame], conditions: Sequence[Union[str, Condition]],
+           sort_by: Optional[str] = None, ascending: bool = False, limit: int = 50) -> Dict[str, Any]:
+    """
+    在面板最后一个交易日上筛选股票
+    Args:
+        panels: {'open'/'high'/'low'/'close'/'volume': 日期 × 股票 面板}（如 akshare_service.get_universe_panel 返回的 panels），
+                最后一个交易日收盘价缺失（停牌或数据未更新）的股票不参与筛选
+        conditions: 条件字符串或 parse_conditions 的结果
+        sort_by: 按该比较项的值排序（语法同条件中的项），为空时按条件得分降序
+        ascending: sort_by 是否升序
+        limit: 最多返回的股票数
+    Returns:
+        {'date': 截面日期, 'universe': 参与筛选的股票数, 'matched': 满足条件的股票数,
+         'data': [{'ts_code', 'score', 'close', 'values': {比较项: 当日值}}, ...]}
+    """
+    conditions = [c if isinstance(c, Condition) else parse_condition(c) for c in conditions]
+    sort_term = parse_term(sort_by) if sort_by else None
+    if sort_by and not isinstance(sort_term, Term):
+        raise ValueError(f'sort_by 须为字段或指标: {sort_by}')
+    close = panels['close']
+    if close.empty:
+        raise ValueError('面板数据为空')
+    evaluator = _Evaluator(panels)
+    valid = ~np.isnan(close.iloc[-1].to_numpy(dtype=np.float64))
+    matched = valid.copy()
+    ranks, values = [], {}
+    for condition in conditions:
+        if condition.signal is not None:
+            matched &= evaluator.signal(condition.signal, condition.params)
+            continue
+        left = evaluator.last(condition.left)
+        right = evaluator.last(condition.right)
+        values[condition.left.label] = left
+        if isinstance(condition.right, Term):
+            values[condition.right.label] = right
+        with np.errstate(invalid='ignore'):
+            matched &= OPERATORS[condition.op](left, right)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            margin = left if not isinstance(condition.right, Term) else left / np.abs(right) - 1
+        ranks.append(_pct_rank(margin, valid & np.isfinite(margin), ascending=condition.op.startswith('>')))
+    if sort_term is not None:
+        score = evaluator.last(sort_term)
+        values[sort_term.label] = score
+    elif ranks:
+        score = np.mean(ranks, axis=0)
+    else:
+        score = np.full(len(valid), np.nan)
+
+    hits = np.flatnonzero(matched)
+    # NaN 得分排在最后；得分相同时按代码排序
+    keys = np.where(np.isnan(score[hits]), np.inf, score[hits] if ascending and sort_term is not None else -score[hits])
+    order = hits[np.lexsort((close.columns.to_numpy()[hits].astype(str), keys))][:max(limit, 0)]
+    last_close = close.iloc[-1].to_numpy(dtype=np.float64)
+
+    def _value(x: float) -> Optional[float]:
+        return None if np.isnan(x) else round(float(x), 4)
+
+    return {
+        'date': close.index[-1].strftime('%Y-%m-%d'),
+        'universe': int(valid.sum()),
+        'matched': int(len(hits)),
+        'data': [{
+            'ts_code': str(close.columns[j]),
+            'score': _value(score[j]),
+            'close': _value(last_close[j]),
+            'values': {label: _value(v[j]) for label, v in values.items()},
+        } for j in order],
+    }
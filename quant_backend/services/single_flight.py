@@ -0,0 +1,73 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """一次进行中的调用"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    并发请求合并（single-flight）
+
+    同一 key 的调用在进行中时，后到的调用者不会重复执行，而是等待并共享第一个调用的结果（或异常）。
+    调用结束后立即移除，不做结果缓存；返回值会被多个调用方共享，调用方不应原地修改。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行 fn(*args, **kwargs)，同一 key 的并发调用只执行一次。
+        Args:
+            key: 合并键，需可哈希
+            fn: 实际执行的函数
+        Returns:
+            fn 的返回值；fn 抛出异常时所有等待者都会收到同一异常
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """当前进行中的调用数"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """执行次数与被合并的调用次数"""
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import akshare as ak
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# AKShare 实时行情字段 -> 标准字段
+SPOT_COLUMNS = {
+    '代码': 'code',
+    '名称': 'name',
+    '最新价': 'price',
+    '涨跌额': 'change',
+    '涨跌幅': 'change_percent',
+    '成交量': 'volume',
+}
+
+
+def _to_float_list(series: pd.Series) -> list:
+    values = pd.to_numeric(series, errors='coerce')
+    return [None if pd.isna(v) else float(v) for v in values]
+
+
+def _default_loader() -> Optional[pd.DataFrame]:
+    return ak.stock_zh_a_spot_em()
+
+
+class SpotSnapshotService:
+    """
+    全市场实时行情快照服务（进程内共享）
+
+    后台线程定时拉取一次全市场 A 股实时行情（ak.stock_zh_a_spot_em），
+    并按6位股票代码建立字典索引，单只/多只股票查询均为 O(1)。
+    后台线程在首次查询时启动，连续 idle_timeout 秒无查询后自动停止，空闲进程不会持续轮询上游。
+    """
+
+    def __init__(self,
+                 refresh_interval: float = 10.0,
+                 max_age: float = 60.0,
+                 idle_timeout: float = 300.0,
+                 loader: Callable[[], Optional[pd.DataFrame]] = _default_loader):
+        """
+        Args:
+            refresh_interval: 后台刷新间隔（秒）
+            max_age: 快照最大允许年龄（秒），超过时查询会同步刷新
+            idle_timeout: 无查询多久后停止后台刷新（秒）
+            loader: 全市场行情加载函数
+        """
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.loader = loader
+        self._index: Dict[str, dict] = {}
+        self._updated_at: Optional[float] = None
+        self._updated_at_iso: Optional[str] = None
+        self._last_access = 0.0
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def build_index(df: pd.DataFrame) -> Dict[str, dict]:
+        """将全市场行情表转换为 {code: 行情字典} 索引"""
+        df = df.rename(columns=SPOT_COLUMNS)
+        codes = df['code'].astype(str).str[:6].tolist()
+        price = _to_float_list(df['price'])
+        change = _to_float_list(df['change'])
+        change_percent = _to_float_list(df['change_percent'])
+        volume = _to_float_list(df['volume'])
+        names = df['name'].tolist() if 'name' in df.columns else [None] * len(codes)
+        return {
+            code: {'name': name, 'price': p, 'change': c, 'change_percent': cp, 'volume': v}
+            for code, name, p, c, cp, v in zip(codes, names, price, change, change_percent, volume)
+        }
+
+    def refresh(self) -> bool:
+        """
+        同步刷新一次快照，多个线程同时调用时只会执行一次上游请求。
+        Returns:
+            是否刷新成功
+        """
+        started = time.monotonic()
+        with self._refresh_lock:
+            # 等锁期间已有其他线程完成刷新，直接复用
+            if self._updated_at is not None and self._updated_at >= started:
+                return True
+            try:
+                df = self.loader()
+            except Exception as e:
+                logger.error(f'刷新全市场行情快照失败: {e}')
+                return False
+            if df is None or df.empty:
+                logger.warning('刷新全市场行情快照: 未获取到数据')
+                return False
+            self._index = self.build_index(df)
+            self._updated_at = time.monotonic()
+            self._updated_at_iso = datetime.now().isoformat()
+            logger.info(f'全市场行情快照已刷新，共 {len(self._index)} 只股票')
+            return True
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            if time.monotonic() - self._last_access > self.idle_timeout:
+                logger.info('行情快照长时间无查询，停止后台刷新')
+                break
+            self.refresh()
+        with self._thread_lock:
+            self._thread = None
+
+    def _ensure_running(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name='spot-snapshot-refresher', daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台刷新线程"""
+        self._stop_event.set()
+
+    @property
+    def age(self) -> Optional[float]:
+        """当前快照年龄（秒），尚未加载时为 None"""
+        if self._updated_at is None:
+            return None
+        return time.monotonic() - self._updated_at
+
+    def _ensure_fresh(self) -> None:
+        self._last_access = time.monotonic()
+        self._ensure_running()
+        age = self.age
+        if age is None or age > self.max_age:
+            self.refresh()
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """
+        获取单只股票的最新行情。
+        Args:
+            symbol: 股票代码 (如: '000001', '000001.SZ')
+        Returns:
+            dict: 包含 symbol, price, change, change_percent, volume, timestamp；未找到返回 None
+        """
+        return self.get_many([symbol]).get(symbol)
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """
+        批量获取多只股票的最新行情，只做一次快照查询。
+        Returns:
+            {symbol: 行情字典}，未找到的股票不包含在结果中
+        """
+        self._ensure_fresh()
+        index = self._index
+        result = {}
+        for symbol in symbols:
+            row = index.get(symbol[:6])
+            if row is None:
+                continue
+            result[symbol] = {
+                'symbol': symbol,
+                'price': row['price'],
+                'change': row['change'],
+                'change_percent': row['change_percent'],
+                'volume': int(row['volume']) if row['volume'] is not None else None,
+                'timestamp': self._updated_at_iso,
+            }
+        return result
+
+
+# 进程级共享实例
+spot_snapshot = SpotSnapshotService()
@@ -0,0 +1,149 @@
+import json
+import bisect
+import hashlib
+import logging
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 拼音索引为可选功能，未安装 pypinyin 时仅支持代码/名称前缀搜索
+try:
+    from pypinyin import lazy_pinyin, Style
+    PYPINYIN_AVAILABLE = True
+except ImportError:
+    PYPINYIN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 匹配类型优先级（数值越小越靠前）
+MATCH_PRIORITY = ('code', 'name', 'pinyin_initials', 'pinyin')
+
+
+def _name_keys(name: str) -> Dict[str, str]:
+    """生成名称相关的索引键（名称本身，及可用时的拼音首字母/全拼）"""
+    keys = {'name': name.lower()}
+    if PYPINYIN_AVAILABLE:
+        keys['pinyin_initials'] = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+        keys['pinyin'] = ''.join(lazy_pinyin(name)).lower()
+    return keys
+
+
+class PrefixIndex:
+    """
+    基于有序数组 + 二分查找的前缀索引
+
+    每种匹配类型（代码、名称、拼音首字母、全拼）各维护一个按键排序的数组，
+    查询时对每个数组二分定位前缀区间，按优先级依次取结果，复杂度 O(log n + k)。
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self._keys: Dict[str, List[str]] = {}
+        self._ids: Dict[str, List[int]] = {}
+        entries: Dict[str, List[Tuple[str, int]]] = {kind: [] for kind in MATCH_PRIORITY}
+        for i, record in enumerate(records):
+            ts_code = str(record.get('ts_code', '')).lower()
+            entries['code'].append((ts_code, i))
+            name = record.get('name')
+            if name:
+                for kind, key in _name_keys(str(name)).items():
+                    entries[kind].append((key, i))
+        for kind, items in entries.items():
+            items.sort()
+            self._keys[kind] = [key for key, _ in items]
+            self._ids[kind] = [i for _, i in items]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        前缀搜索，返回最多 limit 条记录，代码匹配优先于名称/拼音匹配。
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        seen = set()
+        results = []
+        for kind in MATCH_PRIORITY:
+            keys = self._keys.get(kind)
+            if not keys:
+                continue
+            pos = bisect.bisect_left(keys, query)
+            ids = self._ids[kind]
+            while pos < len(keys) and keys[pos].startswith(query):
+                i = ids[pos]
+                if i not in seen:
+                    seen.add(i)
+                    results.append(self.records[i])
+                    if len(results) >= limit:
+                        return results
+                pos += 1
+        return results
+
+
+class StockUniverse:
+    """
+    A 股股票列表缓存
+
+    股票列表每天最多向上游拉取一次，缓存列表、ETag 和前缀索引。
+    刷新失败时若已有旧数据则继续使用旧数据。
+    """
+
+    def __init__(self, loader: Callable[[], Optional[List[Dict[str, Any]]]]):
+        """
+        Args:
+            loader: 股票列表加载函数，返回 [{'ts_code': ..., 'name': ...}] 或 None
+        """
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._etag: Optional[str] = None
+        self._index: Optional[PrefixIndex] = None
+        self._loaded_on: Optional[date] = None
+
+    def invalidate(self) -> None:
+        """清空缓存，下次访问时重新加载"""
+        with self._lock:
+            self._records = None
+            self._etag = None
+            self._index = None
+            self._loaded_on = None
+
+    def _ensure_loaded(self) -> bool:
+        today = date.today()
+        if self._records is not None and self._loaded_on == today:
+            return True
+        with self._lock:
+            if self._records is not None and self._loaded_on == today:
+                return True
+            try:
+                records = self.loader()
+            except Exception:
+                if self._records is None:
+                    raise
+                logger.exception('刷新股票列表失败，继续使用旧数据')
+                return True
+            if records is None:
+                return self._records is not None
+            payload = json.dumps(records, ensure_ascii=False, sort_keys=True).encode('utf-8')
+            self._index = PrefixIndex(records)
+            self._etag = hashlib.sha1(payload).hexdigest()
+            self._records = records
+            self._loaded_on = today
+            logger.info(f'股票列表缓存已刷新，共 {len(records)} 条')
+            return True
+
+    def get(self) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """
+        Returns:
+            (股票列表, ETag)，加载失败时返回 (None, None)
+        """
+        if not self._ensure_loaded():
+            return None, None
+        return self._records, self._etag
+
+    def search(self, query: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        按代码/名称/拼音前缀搜索股票，加载失败时返回 None
+        """
+        if not self._ensure_loaded():
+            return None
+        return self._index.search(query, limit)
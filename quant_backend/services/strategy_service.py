@@ -1,7 +1,14 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Mapping, Tuple, Union
 import pandas as pd
 import numpy as np
 from quant_backend.utils.technical_indicators import TechnicalIndicators
+from quant_backend.utils.indicator_graph import IndicatorPlan
+from quant_backend.utils.panel_indicators import PanelIndicators, _apply, _rolling_mean
+from quant_backend.services.bar_file import bars_to_ohlcv
+
+# 组合回测的资金分配方式：equal 每只股票等额分配，volatility 按近期波动率倒数分配
+ALLOCATIONS = ('equal', 'volatility')
+TRADING_DAYS_PER_YEAR = 252
 
 class MACrossStrategy:
     """移动平均线交叉策略"""
@@ -17,15 +24,20 @@ class MACrossStrategy:
         self.indicators = TechnicalIndicators()
 
     def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
-        """生成交易信号"""
-        data = data.copy()
+        """生成交易信号（data 可为 DataFrame 或 BAR_DTYPE 结构化数组）"""
+        if isinstance(data, np.ndarray):
+            data = bars_to_ohlcv(data)
         
-        # 统一字段名为小写
-        data.columns = data.columns.str.lower()
+        # 统一字段名为小写（新 DataFrame 只引用原有列，不复制数据，也不修改调用方的 data）
+        data = pd.DataFrame({str(col).lower(): data[col] for col in data.columns}, index=data.index, copy=False)
         
-        # 使用技术指标类计算移动平均线
-        data['short_ma'] = self.indicators.calculate_pma(data, self.short_window)
-        data['long_ma'] = self.indicators.calculate_pma(data, self.long_window)
+        # 两条均线声明在同一计算图中（公式同 calculate_pma），策略增加指标时共享的中间量只计算一次
+        plan = IndicatorPlan()
+        short_label = plan.add('pma', {'window': self.short_window})
+        long_label = plan.add('pma', {'window': self.long_window})
+        ma = plan.compute(data)
+        data['short_ma'] = ma[short_label]
+        data['long_ma'] = ma[long_label]
         
         # 生成交易信号
         data['signal'] = 0.0
@@ -103,4 +115,406 @@ class MACrossStrategy:
                     "sell_signals": [],
                     "equity_curve": []
                 }
-            } 
\ No newline at end of file
+            }
+
+
+def close_panel(data: Mapping[str, Union[pd.DataFrame, np.ndarray]]) -> pd.DataFrame:
+    """
+    将多只股票的行情拼成收盘价面板（日期 × 股票），某只股票缺失的日期（停牌、未上市）为 NaN。
+    Args:
+        data: {股票代码: 行情}，行情可为 BAR_DTYPE 数组、以 DatetimeIndex 为索引含 close/Close 列的 DataFrame，
+              或含 trade_date（YYYYMMDD）、close 列的标准字段 DataFrame
+    Returns:
+        按日期升序排列的收盘价面板，列顺序与 data 一致
+    """
+    columns = {}
+    for symbol, frame in data.items():
+        if isinstance(frame, np.ndarray):
+            frame = bars_to_ohlcv(frame)
+        if 'trade_date' in frame.columns:
+            index = pd.to_datetime(frame['trade_date'].astype(str), format='%Y%m%d')
+            columns[symbol] = pd.Series(frame['close'].to_numpy(dtype=np.float64), index=index)
+        else:
+            close = frame['close'] if 'close' in frame.columns else frame['Close']
+            columns[symbol] = close.astype(np.float64)
+    panel = pd.DataFrame(columns)
+    return panel.sort_index()
+
+
+class MACrossPortfolio:
+    """
+    多股票组合的均线交叉策略（面板向量化回测）
+
+    每只股票的信号规则同 MACrossStrategy（短均线在长均线之上持有，上市满 long_window 个交易日后才开仓，
+    停牌日不参与均线计算并沿用停牌前的信号）。持有信号的股票按分配规则获得目标权重，
+    每个交易日收盘按目标权重调仓，佣金按换手金额收取；资金曲线在 日期 × 股票 面板上一次计算完成。
+    """
+    def __init__(self, short_window: int = 20, long_window: int = 50, allocation: str = 'equal',
+                 commission: float = 0.0003, vol_window: int = 20):
+        """
+        初始化策略
+        Args:
+            short_window: 短期移动平均线窗口
+            long_window: 长期移动平均线窗口
+            allocation: 资金分配方式，'equal'（每只股票 1/N）或 'volatility'（按日收益率波动率倒数分配）
+            commission: 佣金费率（按成交金额计，买卖双向收取）
+            vol_window: 计算波动率的窗口（allocation='volatility' 时使用）
+        """
+        if short_window < 1 or long_window <= short_window:
+            raise ValueError('窗口参数无效：需满足 0 < short_window < long_window')
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f'不支持的资金分配方式: {allocation}')
+        if commission < 0:
+            raise ValueError('佣金费率不能为负')
+        if vol_window < 2:
+            raise ValueError('vol_window 至少为 2')
+        self.short_window = short_window
+        self.long_window = long_window
+        self.allocation = allocation
+        self.commission = commission
+        self.vol_window = vol_window
+
+    def generate_signals(self, close: pd.DataFrame) -> pd.DataFrame:
+        """生成持有信号面板（1.0 持有 / 0.0 空仓）"""
+        valid = close.notna()
+        short_ma = PanelIndicators.pma(close, self.short_window)
+        long_ma = PanelIndicators.pma(close, self.long_window)
+        # 上市（有数据）满 long_window 个交易日之后才产生信号，同 MACrossStrategy
+        signal = (short_ma > long_ma) & (valid.cumsum() > self.long_window)
+        # 停牌日无法交易，沿用停牌前的信号
+        return signal.astype(np.float64).where(valid).ffill().fillna(0.0)
+
+    def allocate(self, close: pd.DataFrame) -> pd.DataFrame:
+        """每只股票可分配的资金比例面板（各行之和不超过 1）"""
+        n_symbols = close.shape[1]
+        if self.allocation == 'equal':
+            return pd.DataFrame(1.0 / n_symbols, index=close.index, columns=close.columns)
+        # 只用交易日的收益率估计波动率，停牌日沿用停牌前的估计
+        returns = close / close.ffill().shift(1) - 1
+        vol = returns.rolling(self.vol_window, min_periods=self.vol_window).std().ffill()
+        inverse = 1.0 / vol.where(vol > 0)
+        return inverse.div(inverse.sum(axis=1), axis=0).fillna(0.0)
+
+    def target_weights(self, close: pd.DataFrame) -> pd.DataFrame:
+        """收盘调仓后的目标权重面板"""
+        return self.generate_signals(close) * self.allocate(close)
+
+    def backtest(self, close: pd.DataFrame, initial_capital: float = 100000.0,
+                 start_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        回测组合
+        Args:
+            close: 收盘价面板（日期 × 股票，DatetimeIndex 升序，停牌/未上市为 NaN），可由 close_panel 构造
+            initial_capital: 初始资金
+            start_date: 从该日期起计算资金曲线，之前的数据只用于计算均线和波动率；为空时从第一天开始
+        Returns:
+            绩效指标、每只股票的交易统计和资金曲线
+        """
+        if close.empty:
+            raise ValueError('收盘价面板为空')
+        close = close.astype(np.float64)
+        weights = self.target_weights(close)
+        if start_date is not None:
+            keep = close.index >= pd.Timestamp(start_date)
+            close, weights = close.loc[keep], weights.loc[keep]
+            if close.empty:
+                raise ValueError('start_date 之后没有行情数据')
+        w = weights.to_numpy()
+        prices = close.ffill().to_numpy()
+        returns = np.zeros_like(prices)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[1:] = prices[1:] / prices[:-1] - 1
+        returns[~np.isfinite(returns)] = 0.0
+
+        # 第 t 日的收益来自第 t-1 日收盘调仓后的权重；调仓前的权重随当日涨跌漂移
+        held = np.zeros_like(w)
+        held[1:] = w[:-1]
+        gross = (held * returns).sum(axis=1)
+        drifted = held * (1 + returns) / (1 + gross)[:, None]
+        turnover = np.abs(w - drifted).sum(axis=1)
+        cost = self.commission * turnover
+        growth = (1 + gross) * (1 - cost)
+        equity = initial_capital * np.cumprod(growth)
+        equity_before_cost = np.concatenate(([initial_capital], equity[:-1])) * (1 + gross)
+
+        daily = growth - 1
+        peak = np.maximum.accumulate(equity)
+        total_return = equity[-1] / initial_capital - 1
+        days = (close.index[-1] - close.index[0]).days
+        annual_return = (1 + total_return) ** (365.0 / days) - 1 if days > 0 and total_return > -1 else 0.0
+        volatility = float(daily[1:].std() * np.sqrt(TRADING_DAYS_PER_YEAR)) if len(daily) > 2 else 0.0
+        sharpe = float(daily[1:].mean() * TRADING_DAYS_PER_YEAR / volatility) if volatility > 0 else 0.0
+
+        entries = (np.diff(w > 0, axis=0, prepend=False) & (w > 0)).sum(axis=0)
+        symbols = {
+            str(symbol): {
+                'trades': int(entries[j]),
+                'avg_weight': round(float(w[:, j].mean()), 4),
+                'final_weight': round(float(w[-1, j]), 4),
+            }
+            for j, symbol in enumerate(close.columns)
+        }
+        dates = close.index.strftime('%Y-%m-%d')
+        return {
+            "performance": {
+                "total_return": round(float(total_return), 4),
+                "annual_return": round(float(annual_return), 4),
+                "max_drawdown": round(float(((equity - peak) / peak).min()), 4),
+                "annual_volatility": round(volatility, 4),
+                "sharpe_ratio": round(sharpe, 4),
+                "turnover": round(float(turnover.sum()), 4),
+                "total_commission": round(float((equity_before_cost * cost).sum()), 2),
+            },
+            "symbols": symbols,
+            "chart_data": {
+                "dates": dates.tolist(),
+                "equity_curve": [{"date": d, "value": float(v)} for d, v in zip(dates, equity)],
+                "exposure": np.round(w.sum(axis=1), 4).tolist(),
+            }
+        }
+
+
+def _breakout_indicators(close: pd.DataFrame, volume: pd.DataFrame, volume_window: int,
+                         lookback_days: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """量比（成交量 / 成交量均线，均线为 0 时为 0）和 lookback_days 日涨跌幅（%）"""
+    c, v = close.to_numpy(), volume.to_numpy()
+    volume_ma = _rolling_mean(v, volume_window, center=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.where(volume_ma > 0, v / volume_ma, np.where(np.isnan(volume_ma), np.nan, 0.0))
+        change = np.full_like(c, np.nan)
+        change[lookback_days:] = (c[lookback_days:] / c[:-lookback_days] - 1.0) * 100
+    return pd.DataFrame(ratio), pd.DataFrame(change)
+
+
+class VolumeBreakoutStrategy:
+    """
+    交易量突破策略（向量化，规则同 bt_strategies 中的 Backtrader 版 VolumeBreakoutStrategy）
+
+    空仓时放量（成交量 / 成交量均线 > volume_mult）且 lookback_days 日涨幅超过阈值，按可用资金的 order_percentage
+    买入整数股；持仓时放量且跌幅超过阈值则清仓。信号在收盘产生、下一交易日开盘成交，佣金按成交金额收取，
+    开盘跳空导致资金不足时放弃该次买入。
+
+    指标和信号在整个序列或 日期 × 股票 面板上一次计算（停牌日不占用滚动窗口）；开平仓状态由预先累计的
+    “下一个信号”下标矩阵在所有股票上同时推进，每轮每只股票完成一笔交易，资金曲线由各成交点的现金和持股数一次展开。
+    """
+    def __init__(self, volume_window: int = 20, volume_mult: float = 2.0, price_change_threshold: float = 2.0,
+                 lookback_days: int = 3, order_percentage: float = 0.95, commission: float = 0.001):
+        """
+        初始化策略
+        Args:
+            volume_window: 成交量移动平均窗口
+            volume_mult: 放量倍数阈值
+            price_change_threshold: 价格变化阈值（%），买入要求涨幅大于该值，卖出要求跌幅大于该值
+            lookback_days: 计算价格变化的回看天数
+            order_percentage: 买入金额占可用资金的比例
+            commission: 佣金费率（按成交金额计，买卖双向收取）
+        """
+        if volume_window < 1 or lookback_days < 1:
+            raise ValueError('volume_window 和 lookback_days 至少为 1')
+        if price_change_threshold < 0:
+            raise ValueError('price_change_threshold 不能为负')
+        if not 0 < order_percentage <= 1:
+            raise ValueError('order_percentage 需在 (0, 1] 之间')
+        if commission < 0:
+            raise ValueError('佣金费率不能为负')
+        self.volume_window = volume_window
+        self.volume_mult = volume_mult
+        self.price_change_threshold = price_change_threshold
+        self.lookback_days = lookback_days
+        self.order_percentage = order_percentage
+        self.commission = commission
+
+    def indicators(self, close: Union[pd.DataFrame, pd.Series],
+                   volume: Union[pd.DataFrame, pd.Series]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        计算量比和价格变化（%）
+        Args:
+            close: 收盘价序列或面板（日期 × 股票，停牌为 NaN）
+            volume: 与 close 同形状的成交量
+        Returns:
+            (量比面板, 价格变化面板)，序列输入时为单列 DataFrame
+        """
+        if isinstance(close, pd.Series):
+            close, volume = close.to_frame(), volume.to_frame()
+        return _apply(lambda c, v: _breakout_indicators(c, v, self.volume_window, self.lookback_days),
+                      [close, volume], skip_suspended=True)
+
+    def generate_signals(self, close: Union[pd.DataFrame, pd.Series],
+                         volume: Union[pd.DataFrame, pd.Series]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        生成买入/卖出信号面板（布尔值，当日收盘满足条件为 True，指标无效的日期为 False）
+        Returns:
+            (买入信号, 卖出信号)
+        """
+        return self._signals(*self.indicators(close, volume))
+
+    def _signals(self, ratio: pd.DataFrame, change: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        surge = ratio > self.volume_mult
+        return surge & (change > self.price_change_threshold), surge & (change < -self.price_change_threshold)
+
+    def _simulate(self, open_: np.ndarray, close: np.ndarray, entry: np.ndarray, exit_: np.ndarray,
+                  valid: np.ndarray, initial_capital: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        在 日期 × 股票 矩阵上同时推进所有股票的开平仓状态。
+        先用反向 np.minimum.accumulate 求出每个位置及之后最近的有效K线、买入信号和卖出信号下标；
+        之后每一轮所有股票各完成一次 找买点 → 次日开盘买入 → 找卖点 → 次日开盘卖出，
+        循环轮数等于单只股票的最多买入尝试次数，与股票数量无关。
+        Args:
+            open_, close: (日期数, 股票数) 价格矩阵
+            entry, exit_: 同形状的买入/卖出信号
+            valid: 同形状的有效K线掩码（停牌/未上市为 False，不参与成交）
+            initial_capital: 每只股票的初始资金
+        Returns:
+            (逐日账户价值矩阵（无效K线为 NaN）, 交易数组，每行为 (股票列, 买入成交下标, 卖出成交下标或 -1, 股数))
+        """
+        n, m = close.shape
+        rows = np.arange(n)[:, None]
+
+        def next_index(mask: np.ndarray) -> np.ndarray:
+            # 末尾两行哨兵：查询位置为 n 或 n+1 时结果为 n（不存在）
+            index = np.full((n + 2, m), n)
+            index[:n] = np.where(mask, rows, n)
+            return np.minimum.accumulate(index[::-1], axis=0)[::-1]
+
+        next_valid = next_index(valid)
+        next_entry = next_index(entry & valid)
+        next_exit = next_index(exit_ & valid)
+        cash = np.full(m, float(initial_capital))
+        t = np.zeros(m, dtype=np.int64)
+        cols = np.flatnonzero(valid.any(axis=0))
+        # 买入、卖出成交日的现金变动和持股变动，最后按日期累加
+        cash_change = np.zeros((n, m))
+        shares = np.zeros((n, m))
+        trades = []
+        while len(cols):
+            signal = next_entry[t[cols], cols]
+            fill = next_valid[signal + 1, cols]
+            # 没有后续买入信号，或信号在最后一根有效K线上（没有下一根K线成交）
+            pending = fill < n
+            cols, signal, fill = cols[pending], signal[pending], fill[pending]
+            signal_close, fill_open = close[signal, cols], open_[fill, cols]
+            size = np.trunc(cash[cols] * self.order_percentage / signal_close)
+            # 提交时按信号日收盘价、成交时按次日开盘价检查资金（同 Backtrader 经纪商），资金不足时放弃该次买入
+            bought = (size > 0) & ~(np.maximum(signal_close, fill_open) * size * (1 + self.commission) > cash[cols])
+            retry = cols[~bought]
+            t[retry] = fill[~bought]
+            cols, fill, fill_open, size = cols[bought], fill[bought], fill_open[bought], size[bought]
+            cost = size * fill_open + size * self.commission * fill_open
+            cash[cols] -= cost
+            cash_change[fill, cols] -= cost
+            shares[fill, cols] += size
+            sell = next_valid[next_exit[fill, cols] + 1, cols]
+            held = sell == n
+            trades.append(np.column_stack([cols, fill, np.where(held, -1, sell), size]).astype(np.int64))
+            cols, sell, size = cols[~held], sell[~held], size[~held]
+            sell_open = open_[sell, cols]
+            proceeds = size * sell_open - size * self.commission * sell_open
+            cash[cols] += proceeds
+            cash_change[sell, cols] += proceeds
+            shares[sell, cols] -= size
+            t[cols] = sell
+            cols = np.concatenate([retry, cols])
+        trades = np.concatenate(trades) if trades else np.empty((0, 4), dtype=np.int64)
+        values = initial_capital + np.cumsum(cash_change, axis=0) + np.cumsum(shares, axis=0) * close
+        values[~valid] = np.nan
+        return values, trades
+
+    def _performance(self, values: np.ndarray, valid: np.ndarray, index: pd.DatetimeIndex, initial_capital: float,
+                     trades: np.ndarray, open_: np.ndarray) -> Dict[str, list]:
+        """
+        按列计算 _simulate 结果的绩效指标（只统计各股票的有效K线）
+        Returns:
+            {指标名: 逐列取值列表}：total_return、annual_return、max_drawdown、trades、win_rate、holding（期末是否持仓）
+        """
+        n, m = values.shape
+        columns = np.arange(m)
+        first = valid.argmax(axis=0)
+        last = n - 1 - valid[::-1].argmax(axis=0)
+        total_return = values[last, columns] / initial_capital - 1
+        dates = index.to_numpy(dtype='datetime64[ns]')
+        days = (dates[last] - dates[first]) // np.timedelta64(1, 'D')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annual_return = np.where((days > 0) & (total_return > -1),
+                                     (1 + total_return) ** (365.0 / days) - 1, 0.0)
+        peak = np.fmax.accumulate(np.vstack([np.full(m, float(initial_capital)), values]), axis=0)[1:]
+        max_drawdown = np.nanmin((values - peak) / peak, axis=0)
+        col, buy_at, sell_at = trades[:, 0], trades[:, 1], trades[:, 2]
+        closed = sell_at >= 0
+        # 扣除双向佣金后盈利的交易
+        wins = open_[sell_at[closed], col[closed]] * (1 - self.commission) > \
+            open_[buy_at[closed], col[closed]] * (1 + self.commission)
+        n_trades = np.bincount(col, minlength=m)
+        n_closed = np.bincount(col[closed], minlength=m)
+        n_wins = np.bincount(col[closed], weights=wins, minlength=m)
+        return {
+            "total_return": [round(float(v), 4) for v in total_return],
+            "annual_return": [round(float(v), 4) for v in annual_return],
+            "max_drawdown": [round(float(v), 4) for v in max_drawdown],
+            "trades": n_trades.tolist(),
+            "win_rate": [round(w / c, 4) if c else 0.0 for w, c in zip(n_wins.tolist(), n_closed.tolist())],
+            "holding": (n_trades > n_closed).tolist(),
+        }
+
+    def backtest(self, data: Union[pd.DataFrame, np.ndarray], initial_capital: float = 100000.0) -> Dict[str, Any]:
+        """
+        回测单只股票
+        Args:
+            data: 含 open/close/volume（或 vol）列、以 DatetimeIndex 为索引的 DataFrame，或 BAR_DTYPE 结构化数组；
+                  含缺失值的K线视为停牌，不参与计算
+            initial_capital: 初始资金
+        Returns:
+            绩效指标与图表数据（买卖点为成交日和成交价）
+        """
+        if isinstance(data, np.ndarray):
+            data = bars_to_ohlcv(data)
+        data = pd.DataFrame({str(col).lower(): data[col] for col in data.columns}, index=data.index, copy=False)
+        volume = data['volume'] if 'volume' in data.columns else data['vol']
+        frame = pd.DataFrame({'open': data['open'], 'close': data['close'], 'volume': volume}).astype(np.float64).dropna()
+        if frame.empty:
+            raise ValueError('行情数据为空')
+        ratio, change = self.indicators(frame['close'], frame['volume'])
+        entry, exit_ = self._signals(ratio, change)
+        open_, close = frame[['open']].to_numpy(), frame[['close']].to_numpy()
+        valid = np.ones(open_.shape, dtype=bool)
+        values, trades = self._simulate(open_, close, entry.to_numpy(), exit_.to_numpy(), valid, initial_capital)
+        performance = self._performance(values, valid, frame.index, initial_capital, trades, open_)
+        buy_at, sell_at = trades[:, 1], trades[:, 2]
+        dates = frame.index.strftime('%Y-%m-%d')
+        return {
+            "performance": {key: performance[key][0]
+                            for key in ('total_return', 'annual_return', 'max_drawdown', 'trades', 'win_rate')},
+            "chart_data": {
+                "dates": dates.tolist(),
+                "close_prices": np.round(close[:, 0], 2).tolist(),
+                "volume_ratio": ratio.iloc[:, 0].round(4).fillna(0).tolist(),
+                "price_change": change.iloc[:, 0].round(4).fillna(0).tolist(),
+                "buy_signals": [{"date": dates[b], "price": float(open_[b, 0])} for b in buy_at],
+                "sell_signals": [{"date": dates[s], "price": float(open_[s, 0])} for s in sell_at if s >= 0],
+                "equity_curve": [{"date": d, "value": float(v)} for d, v in zip(dates, values[:, 0])],
+            }
+        }
+
+    def backtest_panel(self, open_: pd.DataFrame, close: pd.DataFrame, volume: pd.DataFrame,
+                       initial_capital: float = 100000.0) -> pd.DataFrame:
+        """
+        对面板中的每只股票独立回测（每只股票各自使用 initial_capital），用于批量筛选。
+        信号、开平仓状态和绩效均在整个面板上按列同时计算（见 _simulate），不逐只股票循环。
+        Args:
+            open_, close, volume: 同形状的 日期 × 股票 面板（DatetimeIndex 升序，停牌/未上市为 NaN）
+            initial_capital: 每只股票的初始资金
+        Returns:
+            以股票代码为索引的绩效表：total_return、annual_return、max_drawdown、trades、win_rate、
+            holding（期末是否持仓）；没有有效K线的股票不在表中
+        """
+        if not (open_.shape == close.shape == volume.shape):
+            raise ValueError('各输入面板的形状必须一致')
+        o, c = open_.to_numpy(dtype=np.float64), close.to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(o) | np.isnan(c) | np.isnan(volume.to_numpy(dtype=np.float64)))
+        # 任一字段缺失的K线都按停牌处理，与单只股票回测一致
+        entry, exit_ = self.generate_signals(close.where(valid), volume.where(valid))
+        listed = valid.any(axis=0)
+        o, c, valid = o[:, listed], c[:, listed], valid[:, listed]
+        values, trades = self._simulate(o, c, entry.to_numpy()[:, listed], exit_.to_numpy()[:, listed], valid,
+                                        initial_capital)
+        performance = self._performance(values, valid, close.index, initial_capital, trades, o)
+        return pd.DataFrame(performance, index=close.columns[listed])
@@ -0,0 +1,161 @@
+"""
+均线交叉策略参数扫描
+
+一次评估所有 (short_window, long_window) 组合（short_window < long_window），每个组合的回测规则与
+MACrossStrategy.backtest 完全一致（持有 1 股、长期窗口之前不开仓），结果组织为二维绩效网格，可直接绘制热力图。
+
+实现上所有窗口的均线只做一次累加求和（K线 × 窗口矩阵），各组合的信号由均线矩阵按列广播比较得到，
+持仓、资金曲线和回撤在 K线 × 组合 矩阵上沿时间轴向量化计算。组合按块处理（每块不超过 SWEEP_BLOCK_ELEMENTS 个元素），
+内存占用与组合数无关。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.utils.technical_indicators import _check_windows, _rolling_mean_matrix
+
+# 每块 K线 × 组合 矩阵的元素数上限
+SWEEP_BLOCK_ELEMENTS = 1 << 21
+# 单次扫描允许的最大组合数
+MAX_SWEEP_COMBINATIONS = 20_000
+SWEEP_METRICS = ('total_return', 'annual_return', 'max_drawdown', 'trades')
+
+WindowSpec = Union[Iterable[int], Dict[str, int]]
+
+
+def window_range(spec: WindowSpec) -> List[int]:
+    """
+    解析窗口取值范围。
+    :param spec: 窗口列表（如 [5, 10, 20]），或 {'start': 5, 'stop': 60, 'step': 5}（包含 stop，step 默认 1）
+    :return: 去重后升序的窗口列表
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop, step = int(spec['start']), int(spec['stop']), int(spec.get('step', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('窗口范围需包含整数 start、stop（可选 step）')
+        if step < 1 or start > stop:
+            raise ValueError('窗口范围无效：需满足 start <= stop 且 step >= 1')
+        windows = range(start, stop + 1, step)
+    elif isinstance(spec, (list, tuple)):
+        if any(isinstance(w, bool) or not isinstance(w, (int, np.integer)) for w in spec):
+            raise ValueError('窗口必须为整数')
+        windows = spec
+    else:
+        raise ValueError('窗口参数应为整数列表或 {start, stop, step}')
+    return sorted(set(_check_windows(windows).tolist()))
+
+
+def _close_series(data: Union[pd.DataFrame, np.ndarray]) -> pd.Series:
+    if isinstance(data, np.ndarray):
+        data = bars_to_ohlcv(data)
+    for col in data.columns:
+        if str(col).lower() == 'close':
+            return data[col]
+    raise ValueError('行情数据缺少 close 列')
+
+
+def _grid(values: np.ndarray, rows: np.ndarray, cols: np.ndarray, shape, digits: Optional[int]) -> List[List[Any]]:
+    """按 (短期窗口, 长期窗口) 下标排列成二维列表，无效组合和缺失值为 None；digits 为 None 时不舍入"""
+    grid: List[List[Any]] = [[None] * shape[1] for _ in range(shape[0])]
+    for r, c, v in zip(rows.tolist(), cols.tolist(), values.tolist()):
+        if v == v:
+            grid[r][c] = v if digits is None else round(v, digits)
+    return grid
+
+
+def sweep_ma_cross(data: Union[pd.DataFrame, np.ndarray], short_windows: WindowSpec, long_windows: WindowSpec,
+                   initial_capital: float = 100000.0, digits: Optional[int] = 4) -> Dict[str, Any]:
+    """
+    均线交叉策略参数扫描。
+    :param data: 行情 DataFrame（含 close/Close 列，DatetimeIndex）或 BAR_DTYPE 结构化数组
+    :param short_windows: 短期窗口取值（见 window_range）
+    :param long_windows: 长期窗口取值（见 window_range）
+    :param initial_capital: 初始资金
+    :param digits: 收益率和回撤保留的小数位数（同 MACrossStrategy.backtest），为 None 时不做舍入
+    :return: {
+        'short_windows': [...], 'long_windows': [...], 'combinations': 有效组合数,
+        'metrics': {指标名: 二维列表 [短期窗口][长期窗口]，short >= long 的格子为 None},
+        'best': 总收益率最高的组合 {'short_window', 'long_window', 'performance'}
+    }
+    """
+    shorts = np.asarray(window_range(short_windows), dtype=np.int64)
+    longs = np.asarray(window_range(long_windows), dtype=np.int64)
+    pair_rows, pair_cols = np.nonzero(shorts[:, None] < longs[None, :])
+    n_pairs = len(pair_rows)
+    if n_pairs == 0:
+        raise ValueError('没有满足 短期窗口 < 长期窗口 的参数组合')
+    if n_pairs > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f'参数组合过多（{n_pairs}），最多 {MAX_SWEEP_COMBINATIONS} 个')
+    close_series = _close_series(data)
+    close = close_series.to_numpy(dtype=np.float64, na_value=np.nan)
+    n = len(close)
+    if n < 2:
+        raise ValueError('行情数据不足，至少需要 2 根K线')
+
+    # 所有窗口的均线（与 calculate_pma 一致，min_periods=1）只计算一次
+    windows = np.union1d(shorts, longs)
+    ma = _rolling_mean_matrix(close, windows, min_periods=1)
+    short_cols = np.searchsorted(windows, shorts[pair_rows])
+    long_cols = np.searchsorted(windows, longs[pair_cols])
+    long_w = longs[pair_cols]
+
+    final_total = np.empty(n_pairs)
+    max_drawdown = np.empty(n_pairs)
+    trades = np.empty(n_pairs)
+    time_index = np.arange(n)[:, None]
+    close_col = close[:, None]
+    step = max(1, SWEEP_BLOCK_ELEMENTS // n)
+    for start in range(0, n_pairs, step):
+        block = slice(start, start + step)
+        # 信号：长期窗口之后短均线在长均线之上持有 1 股（同 MACrossStrategy.generate_signals）
+        signal = ((ma[:, short_cols[block]] > ma[:, long_cols[block]])
+                  & (time_index >= long_w[block])).astype(np.float64)
+        position = np.empty_like(signal)
+        position[0] = np.nan
+        np.subtract(signal[1:], signal[:-1], out=position[1:])
+        trades[block] = (position[1:] > 0).sum(axis=0)
+        # 现金 = 初始资金 - 累计成交额；与 pandas cumsum 一致，缺失值不参与累加且结果保持缺失
+        flows = position * close_col
+        missing = np.isnan(flows)
+        spent = np.nancumsum(flows, axis=0)
+        spent[missing] = np.nan
+        total = initial_capital - spent + signal * close_col
+        peak = np.fmax.accumulate(total, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            drawdown = (total - peak) / peak
+        drawdown[np.isnan(total)] = np.nan
+        final_total[block] = total[-1]
+        with np.errstate(invalid='ignore'):
+            all_missing = np.isnan(drawdown).all(axis=0)
+            drawdown[:, all_missing] = 0.0
+            max_drawdown[block] = np.where(all_missing, np.nan, np.nanmin(drawdown, axis=0))
+
+    total_return = (final_total - initial_capital) / initial_capital
+    index = close_series.index
+    days = (index[-1] - index[0]).days if isinstance(index, pd.DatetimeIndex) else 0
+    with np.errstate(invalid='ignore'):
+        annual_return = (1 + total_return) ** (365.0 / days) - 1 if days > 0 else np.zeros(n_pairs)
+
+    shape = (len(shorts), len(longs))
+    values = {'total_return': total_return, 'annual_return': annual_return,
+              'max_drawdown': max_drawdown, 'trades': trades.astype(np.int64)}
+    metrics = {name: _grid(values[name], pair_rows, pair_cols, shape, None if name == 'trades' else digits)
+               for name in SWEEP_METRICS}
+    best = None
+    if not np.isnan(total_return).all():
+        i = int(np.nanargmax(total_return))
+        best = {
+            'short_window': int(shorts[pair_rows[i]]),
+            'long_window': int(longs[pair_cols[i]]),
+            'performance': {name: metrics[name][pair_rows[i]][pair_cols[i]] for name in SWEEP_METRICS},
+        }
+    return {
+        'short_windows': shorts.tolist(),
+        'long_windows': longs.tolist(),
+        'combinations': int(n_pairs),
+        'metrics': metrics,
+        'best': best,
+    }
@@ -1,8 +1,12 @@
 import os
 import logging
+import numpy as np
 import tushare as ts
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from quant_backend.services.rate_limiter import TokenBucket
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -18,6 +22,21 @@ TS_TOKEN = '2abb38fa6b00dde66bea48baff0477f13d35d67cbaef1c443c6eae63'
 pro = ts.pro_api(TS_TOKEN)
 logger.info('Tushare Pro 初始化成功。')
 
+# 行情接口单次调用的最大返回行数，超出部分会被 Tushare 截断
+ROW_LIMITS = {
+    'daily': 6000,
+    'weekly': 4500,
+    'monthly': 4500,
+}
+# 多股票查询时单次调用的最大股票数
+MAX_CODES_PER_CALL = 100
+# 账号每分钟调用次数配额
+CALLS_PER_MINUTE = int(os.environ.get('TUSHARE_CALLS_PER_MIN', '500'))
+# 令牌桶：桶容量占配额的10%，补充速率占90%，任意一分钟内的调用次数不超过配额
+quota_limiter = TokenBucket(rate=CALLS_PER_MINUTE * 0.9 / 60, capacity=max(1.0, CALLS_PER_MINUTE * 0.1))
+HIST_FIELDS = "ts_code,trade_date,open,high,low,close,vol,amount"
+DATE_FMT = '%Y%m%d'
+
 def check_tushare_permission():
     try:
         df = pro.query('api_permission', fields='api_name,is_granted')
@@ -74,8 +93,7 @@ def get_stock_historical_data(ts_code: str, period: str, start_date: str, end_da
         return None
     try:
         func = tushare_func_map[period]
-        df = func(ts_code=ts_code, start_date=start_date, end_date=end_date,
-                  fields="ts_code,trade_date,open,high,low,close,vol,amount")
+        df = _query_paginated(func, period, ts_code, start_date, end_date)
         if df is None or df.empty:
             logger.warning(f'未获取到行情数据: {ts_code}, {period}, {start_date}-{end_date}')
             return None
@@ -85,4 +103,189 @@ def get_stock_historical_data(ts_code: str, period: str, start_date: str, end_da
         return df
     except Exception as e:
         logger.error(f'获取{ts_code} {period} 行情数据失败: {e}')
-        return None 
\ No newline at end of file
+        return None
+
+def _rows_per_code(period: str, start_date: str, end_date: str) -> int:
+    """估算单只股票在区间内的K线条数上限"""
+    start = datetime.strptime(start_date, DATE_FMT)
+    end = datetime.strptime(end_date, DATE_FMT)
+    if end < start:
+        return 0
+    if period == 'weekly':
+        return (end - start).days // 7 + 2
+    if period == 'monthly':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return int(np.busday_count(start.date(), (end + timedelta(days=1)).date())) + 1
+
+def _split_date_range(period: str, start_date: str, end_date: str, rows_per_code: int) -> List[Tuple[str, str]]:
+    """
+    将日期区间切分为若干片，使每片内单只股票的K线条数不超过 rows_per_code。
+    """
+    rows_per_code = max(1, rows_per_code)
+    step_days = {
+        'weekly': rows_per_code * 7 - 7,
+        'monthly': rows_per_code * 28 - 28,
+    }.get(period)
+    slices = []
+    start = datetime.strptime(start_date, DATE_FMT)
+    end = datetime.strptime(end_date, DATE_FMT)
+    while start <= end:
+        if step_days is None:
+            # 日线按工作日步进
+            slice_end = pd.Timestamp(np.busday_offset(start.date(), rows_per_code - 1, roll='forward')).to_pydatetime()
+        else:
+            slice_end = start + timedelta(days=max(0, step_days))
+        slice_end = min(slice_end, end)
+        slices.append((start.strftime(DATE_FMT), slice_end.strftime(DATE_FMT)))
+        start = slice_end + timedelta(days=1)
+    return slices
+
+def _query_paginated(func, period: str, ts_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    """
+    按行数上限自动分页查询（ts_code 可为逗号分隔的多只股票）。
+    区间预估超过上限时先按日期切片；某次返回恰好达到上限（可能被截断）时再对半切分重查。
+    """
+    row_limit = ROW_LIMITS[period]
+    n_codes = len(ts_code.split(','))
+    rows_per_code = max(1, row_limit // n_codes)
+    if _rows_per_code(period, start_date, end_date) <= rows_per_code:
+        slices = [(start_date, end_date)]
+    else:
+        slices = _split_date_range(period, start_date, end_date, rows_per_code)
+    frames = []
+    for slice_start, slice_end in slices:
+        quota_limiter.acquire()
+        df = func(ts_code=ts_code, start_date=slice_start, end_date=slice_end, fields=HIST_FIELDS)
+        if df is not None and not df.empty and len(df) >= row_limit and slice_start < slice_end:
+            # 结果可能被截断，对半切分后重新查询
+            mid = datetime.strptime(slice_start, DATE_FMT) + (datetime.strptime(slice_end, DATE_FMT) - datetime.strptime(slice_start, DATE_FMT)) / 2
+            logger.info(f'Tushare 返回行数达到上限 {row_limit}，切分区间重查: {ts_code[:40]} {slice_start}-{slice_end}')
+            df = _concat_frames([
+                _query_paginated(func, period, ts_code, slice_start, mid.strftime(DATE_FMT)),
+                _query_paginated(func, period, ts_code, (mid + timedelta(days=1)).strftime(DATE_FMT), slice_end),
+            ])
+        frames.append(df)
+    if len(frames) == 1:
+        return frames[0]
+    return _concat_frames(frames)
+
+def _concat_frames(frames: List[Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates(subset=['ts_code', 'trade_date'])
+
+def get_stock_historical_data_bulk(ts_codes: Iterable[str], period: str, start_date: str, end_date: str,
+                                   max_workers: int = 4) -> Dict[str, pd.DataFrame]:
+    """
+    批量获取多只股票的历史行情。
+    每次调用查询最多 MAX_CODES_PER_CALL 只股票（Tushare 多代码查询），按行数上限自动分页，
+    各分组在线程池中并发执行，整体调用频率受 quota_limiter 限制在账号每分钟配额内。
+    :param ts_codes: 股票代码列表（如 ['000001.SZ', '600000.SH']）
+    :param period: 数据周期，'daily'、'weekly'、'monthly'
+    :param start_date: 开始日期，格式 YYYYMMDD
+    :param end_date: 结束日期，格式 YYYYMMDD
+    :param max_workers: 最大并发线程数
+    :return: {ts_code: 按日期升序的 DataFrame}，失败或无数据的股票不包含在结果中
+    """
+    if pro is None:
+        logger.error('Tushare Pro 未初始化，无法获取历史行情数据。')
+        return {}
+    if period not in ROW_LIMITS:
+        logger.error(f'不支持的周期类型: {period}')
+        return {}
+    func = {'daily': pro.daily, 'weekly': pro.weekly, 'monthly': pro.monthly}[period]
+    codes = list(dict.fromkeys(ts_codes))
+    groups = [','.join(codes[i:i + MAX_CODES_PER_CALL]) for i in range(0, len(codes), MAX_CODES_PER_CALL)]
+    frames = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups) or 1))) as executor:
+        futures = {executor.submit(_query_paginated, func, period, group, start_date, end_date): group for group in groups}
+        for future in as_completed(futures):
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                logger.error(f'批量获取行情失败: {futures[future][:40]}..., {period}, {start_date}-{end_date}, {e}')
+    df = _concat_frames(frames)
+    if df is None:
+        logger.warning(f'批量获取行情无数据: {len(codes)} 只, {period}, {start_date}-{end_date}')
+        return {}
+    result = {code: group.sort_values('trade_date').reset_index(drop=True) for code, group in df.groupby('ts_code')}
+    logger.info(f'批量获取{period}行情完成: {len(result)}/{len(codes)} 只, 共 {len(df)} 条。')
+    return result
+
+def get_market_data_by_trade_date(trade_date: str, period: str = 'daily') -> Optional[pd.DataFrame]:
+    """
+    获取全市场股票在某一交易日的行情（通常一次调用）。
+    周线/月线需传入该周/月的最后一个交易日。
+    返回行数达到 ROW_LIMITS 上限时结果可能被截断，改为按股票列表分组（每组 MAX_CODES_PER_CALL 只）重新查询；
+    股票列表不可用时返回 None，不返回被截断的数据。
+    :return: 全市场行情 DataFrame 或 None（出错或无数据时）
+    """
+    if pro is None:
+        logger.error('Tushare Pro 未初始化，无法获取行情数据。')
+        return None
+    if period not in ROW_LIMITS:
+        logger.error(f'不支持的周期类型: {period}')
+        return None
+    func = {'daily': pro.daily, 'weekly': pro.weekly, 'monthly': pro.monthly}[period]
+    try:
+        quota_limiter.acquire()
+        df = func(trade_date=trade_date, fields=HIST_FIELDS)
+        if df is None or df.empty:
+            return None
+        if len(df) < ROW_LIMITS[period]:
+            return df
+        logger.warning(f'Tushare 全市场{period}行情返回行数达到上限 {ROW_LIMITS[period]}，按股票分组重新查询: {trade_date}')
+        stock_list = get_stock_list()
+        if not stock_list:
+            logger.error(f'获取股票列表失败，无法分组重查全市场{period}行情: {trade_date}')
+            return None
+        codes = [item['ts_code'] for item in stock_list]
+        return _concat_frames([
+            _query_paginated(func, period, ','.join(codes[i:i + MAX_CODES_PER_CALL]), trade_date, trade_date)
+            for i in range(0, len(codes), MAX_CODES_PER_CALL)
+        ])
+    except Exception as e:
+        logger.error(f'获取全市场{period}行情失败: {trade_date}, {e}')
+        return None
+
+def get_trade_dates(start_date: str, end_date: str, period: str = 'daily') -> List[str]:
+    """
+    获取区间内的交易日（周线/月线返回每周/每月最后一个交易日）。
+    """
+    quota_limiter.acquire()
+    cal = pro.trade_cal(exchange='SSE', start_date=start_date, end_date=end_date, is_open='1', fields='cal_date')
+    if cal is None or cal.empty:
+        return []
+    dates = pd.to_datetime(cal['cal_date'].sort_values(), format=DATE_FMT)
+    if period == 'weekly':
+        dates = dates.groupby(dates.dt.to_period('W')).max()
+    elif period == 'monthly':
+        dates = dates.groupby(dates.dt.to_period('M')).max()
+    return [d.strftime(DATE_FMT) for d in dates]
+
+def get_market_data_by_date_range(start_date: str, end_date: str, period: str = 'daily',
+                                  max_workers: int = 4) -> Optional[pd.DataFrame]:
+    """
+    按交易日切片获取全市场行情：每个交易日一次调用，在配额内并发执行。
+    适用于全市场夜间刷新，调用次数等于区间内交易日数，与股票数量无关。
+    :return: 全市场行情 DataFrame（按 ts_code, trade_date 排序）或 None
+    """
+    if pro is None:
+        logger.error('Tushare Pro 未初始化，无法获取行情数据。')
+        return None
+    try:
+        trade_dates = get_trade_dates(start_date, end_date, period)
+    except Exception as e:
+        logger.error(f'获取交易日历失败: {start_date}-{end_date}, {e}')
+        return None
+    if not trade_dates:
+        return None
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(trade_dates)))) as executor:
+        frames = list(executor.map(lambda d: get_market_data_by_trade_date(d, period), trade_dates))
+    df = _concat_frames(frames)
+    if df is None:
+        return None
+    logger.info(f'获取全市场{period}行情完成: {len(trade_dates)} 个交易日, 共 {len(df)} 条。')
+    return df.sort_values(['ts_code', 'trade_date']).reset_index(drop=True)
@@ -0,0 +1,287 @@
+"""
+滚动前推（walk-forward）参数优化
+
+把历史行情切成若干折，每折先在样本内区间优化参数，再用最优参数回测紧随其后的样本外区间，
+各折样本外收益首尾相接得到整体资金曲线。支持两类引擎：
+- 'vectorized'：strategy_service.MACrossStrategy，样本内用 strategy_sweep 一次评估全部窗口组合
+- 'backtrader'：bt_strategies/strategies 中的 Backtrader 策略，参数网格逐组合回测
+- 'event'：同一组策略在 bt_strategies/event_engine 事件驱动引擎上回测，撮合结果与 'backtrader' 相同、速度快得多
+
+计算分散到进程池：行情（BAR_DTYPE 数组）只在父进程写入一次共享内存，各工作进程启动时映射同一块内存，
+任务只传递切片下标和参数，不会为每个任务序列化行情数据。
+样本外区间回测时从样本内起点开始运行（之前的数据只用于指标预热），只统计样本外日期的收益，不会用到未来数据。
+"""
+import contextlib
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.bar_file import BAR_DTYPE, bars_to_ohlcv
+from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.services.strategy_sweep import sweep_ma_cross, window_range
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('vectorized', 'backtrader', 'event')
+# 可作为样本内优化目标的指标；max_drawdown 取回撤幅度最小者，其余取最大者
+METRICS = ('total_return', 'annual_return', 'sharpe_ratio', 'max_drawdown')
+# 默认工作进程数，可通过环境变量 QUANT_WALK_FORWARD_WORKERS 配置
+DEFAULT_WORKERS = int(os.environ.get('QUANT_WALK_FORWARD_WORKERS', '0')) or (os.cpu_count() or 1)
+# 工作进程启动方式：在多线程的 Flask 服务进程中 fork 可能复制被其他线程持有的锁，
+# 改用 forkserver（平台不支持时用 spawn）
+MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+# 单次优化允许的最大回测任务数（折数 × 参数组合数）
+MAX_WALK_FORWARD_TASKS = 100_000
+
+# (样本内起点, 样本外起点, 样本外终点)，均为K线下标，区间左闭右开
+Fold = Tuple[int, int, int]
+
+# 工作进程中映射的共享行情
+_bars: Optional[np.ndarray] = None
+_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def walk_forward_folds(n_bars: int, n_folds: int, in_sample: Optional[int] = None,
+                       out_of_sample: Optional[int] = None) -> List[Fold]:
+    """
+    划分滚动的样本内/样本外区间。
+    :param n_bars: K线数量
+    :param n_folds: 折数
+    :param in_sample: 样本内K线数，默认为样本外的 3 倍
+    :param out_of_sample: 样本外K线数，默认按折数均分样本内区间之后的全部K线（余数并入最后一折）
+    :return: [(样本内起点, 样本外起点, 样本外终点), ...]，第 k 折整体向后平移 k 个样本外长度
+    """
+    if n_folds < 1:
+        raise ValueError('n_folds 至少为 1')
+    if out_of_sample is None:
+        if in_sample is None:
+            out_of_sample = n_bars // (n_folds + 3)
+        else:
+            out_of_sample = (n_bars - in_sample) // n_folds
+    if in_sample is None:
+        in_sample = 3 * out_of_sample
+    if in_sample < 2 or out_of_sample < 1 or in_sample + n_folds * out_of_sample > n_bars:
+        raise ValueError(f'K线数量不足以划分 {n_folds} 折（样本内 {in_sample}，样本外 {out_of_sample}，共 {n_bars}）')
+    folds = []
+    for k in range(n_folds):
+        start = k * out_of_sample
+        oos_start = start + in_sample
+        oos_end = oos_start + out_of_sample if k < n_folds - 1 else n_bars
+        folds.append((start, oos_start, oos_end))
+    return folds
+
+
+def _score(performance: Dict[str, Any], metric: str) -> float:
+    value = performance.get(metric)
+    if value is None or value != value:
+        return float('-inf')
+    return -abs(value) if metric == 'max_drawdown' else float(value)
+
+
+def _attach_bars(name: Optional[str], rows: int, bars: Optional[np.ndarray] = None) -> None:
+    """工作进程初始化：映射父进程创建的共享内存（串行执行时直接使用传入的数组）"""
+    global _bars, _shm
+    if name is None:
+        _bars = bars
+        return
+    _shm = shared_memory.SharedMemory(name=name)
+    _bars = np.ndarray((rows,), dtype=BAR_DTYPE, buffer=_shm.buf)
+
+
+def _oos_returns(equity: pd.Series, oos_start: int, offset: int) -> pd.Series:
+    """从运行区间的资金曲线中取样本外日期的日收益率（首日相对样本外前一日）"""
+    returns = equity.pct_change().fillna(0.0)
+    return returns.iloc[oos_start - offset:]
+
+
+def _vectorized_optimize(start: int, oos_start: int, grid: Dict[str, List[int]], metric: str,
+                         initial_capital: float) -> Tuple[Dict[str, int], float]:
+    """样本内一次扫描全部 (short_window, long_window) 组合，返回最优参数及得分"""
+    # 按未舍入的指标比较，避免收益率很小时舍入后并列
+    result = sweep_ma_cross(bars_to_ohlcv(_bars[start:oos_start]), grid['short_window'], grid['long_window'],
+                            initial_capital, digits=None)
+    best, best_score = None, float('-inf')
+    for i, short in enumerate(result['short_windows']):
+        for j, long in enumerate(result['long_windows']):
+            if short >= long:
+                continue
+            score = _score({metric: result['metrics'][metric][i][j]}, metric)
+            if best is None or score > best_score:
+                best, best_score = {'short_window': short, 'long_window': long}, score
+    return best, best_score
+
+
+def _vectorized_evaluate(params: Dict[str, int], start: int, oos_start: int, oos_end: int,
+                         initial_capital: float) -> pd.Series:
+    data = bars_to_ohlcv(_bars[start:oos_end])
+    result = MACrossStrategy(params['short_window'], params['long_window']).backtest(data, initial_capital)
+    equity = pd.Series([point['value'] for point in result['chart_data']['equity_curve']], index=data.index)
+    return _oos_returns(equity, oos_start, start)
+
+
+def _backtrader_run(engine: str, strategy_name: str, params: Dict[str, Any], start: int, stop: int,
+                    initial_capital: float, commission: float):
+    from quant_backend.bt_strategies.backtest_runner import run_backtest_returns
+    # 策略在 stop() 中打印期末资产，批量回测时丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_backtest_returns(_bars[start:stop], strategy_name, params, initial_capital, commission, engine)
+
+
+def _backtrader_score(engine: str, strategy_name: str, params: Dict[str, Any], start: int, oos_start: int,
+                      metric: str, initial_capital: float, commission: float) -> float:
+    performance, _ = _backtrader_run(engine, strategy_name, params, start, oos_start, initial_capital, commission)
+    return _score(performance, metric)
+
+
+def _backtrader_evaluate(engine: str, strategy_name: str, params: Dict[str, Any], start: int, oos_start: int,
+                         oos_end: int, initial_capital: float, commission: float) -> pd.Series:
+    _, returns = _backtrader_run(engine, strategy_name, params, start, oos_end, initial_capital, commission)
+    equity = (1 + returns).cumprod()
+    return _oos_returns(equity, oos_start, start)
+
+
+def _param_combinations(engine: str, param_grid: Dict[str, Any]) -> Tuple[Any, int]:
+    """解析参数网格，返回 (引擎使用的网格, 组合数)"""
+    if engine == 'vectorized':
+        missing = {'short_window', 'long_window'} - set(param_grid)
+        if missing:
+            raise ValueError(f'参数网格缺少: {", ".join(sorted(missing))}')
+        grid = {name: window_range(param_grid[name]) for name in ('short_window', 'long_window')}
+        count = sum(1 for s in grid['short_window'] for l in grid['long_window'] if s < l)
+        if count == 0:
+            raise ValueError('没有满足 short_window < long_window 的参数组合')
+        return grid, count
+    if not param_grid:
+        raise ValueError('参数网格不能为空')
+    names = list(param_grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in param_grid.values()]
+    if any(len(v) == 0 for v in values):
+        raise ValueError('参数取值列表不能为空')
+    combos = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    return combos, len(combos)
+
+
+def _map(executor: Optional[ProcessPoolExecutor], fn: Callable, tasks: Sequence[tuple]) -> list:
+    """在进程池中执行任务并按提交顺序返回结果；executor 为 None 时在当前进程串行执行"""
+    if executor is None:
+        return [fn(*args) for args in tasks]
+    futures = [executor.submit(fn, *args) for args in tasks]
+    return [future.result() for future in futures]
+
+
+def _performance(returns: pd.Series, initial_capital: float) -> Tuple[Dict[str, float], np.ndarray]:
+    equity = initial_capital * np.cumprod(1 + returns.to_numpy())
+    total_return = equity[-1] / initial_capital - 1 if len(equity) else 0.0
+    days = (returns.index[-1] - returns.index[0]).days if len(returns) > 1 else 0
+    annual_return = (1 + total_return) ** (365.0 / days) - 1 if days > 0 and total_return > -1 else 0.0
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    max_drawdown = float(((equity - peak) / peak).min()) if len(equity) else 0.0
+    return {
+        'total_return': round(float(total_return), 4),
+        'annual_return': round(float(annual_return), 4),
+        'max_drawdown': round(max_drawdown, 4),
+    }, equity
+
+
+def walk_forward(bars: np.ndarray, param_grid: Dict[str, Any], engine: str = 'vectorized',
+                 strategy_name: str = 'ma_cross', n_folds: int = 10, in_sample: Optional[int] = None,
+                 out_of_sample: Optional[int] = None, metric: str = 'total_return',
+                 initial_capital: float = 100000.0, commission: float = 0.001,
+                 max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    滚动前推参数优化。
+    :param bars: BAR_DTYPE 结构化数组（按日期升序）
+    :param param_grid: 参数网格。vectorized 引擎为 {'short_window': 窗口取值, 'long_window': 窗口取值}（见 window_range）；
+                       backtrader / event 引擎为 {参数名: 取值列表}，评估全部组合
+    :param engine: 'vectorized'（MACrossStrategy）、'backtrader' 或 'event'（事件驱动引擎）
+    :param strategy_name: backtrader / event 引擎的策略名称（见 backtest_runner.get_strategy_class）
+    :param n_folds: 折数
+    :param in_sample: 样本内K线数（见 walk_forward_folds）
+    :param out_of_sample: 样本外K线数（见 walk_forward_folds）
+    :param metric: 样本内优化目标，见 METRICS（vectorized 引擎不支持 sharpe_ratio）
+    :param initial_capital: 初始资金
+    :param commission: 佣金费率（backtrader / event 引擎使用；MACrossStrategy 不计佣金）
+    :param max_workers: 工作进程数，默认 DEFAULT_WORKERS；为 1 时在当前进程串行执行
+    :return: {'folds': 每折的区间、最优参数、样本内得分和样本外绩效, 'performance': 拼接后的样本外绩效,
+              'equity_curve': 拼接后的样本外资金曲线}
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的引擎: {engine}')
+    if metric not in METRICS or (engine == 'vectorized' and metric == 'sharpe_ratio'):
+        raise ValueError(f'不支持的优化目标: {metric}')
+    bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+    folds = walk_forward_folds(len(bars), n_folds, in_sample, out_of_sample)
+    grid, n_combos = _param_combinations(engine, param_grid)
+    if engine != 'vectorized' and n_combos * len(folds) > MAX_WALK_FORWARD_TASKS:
+        raise ValueError(f'回测任务过多（{n_combos * len(folds)}），最多 {MAX_WALK_FORWARD_TASKS} 个')
+
+    workers = max(1, min(max_workers or DEFAULT_WORKERS, len(folds) * (n_combos if engine != 'vectorized' else 1)))
+    executor, shm = None, None
+    if workers > 1:
+        shm = shared_memory.SharedMemory(create=True, size=max(bars.nbytes, 1))
+        np.ndarray(bars.shape, dtype=BAR_DTYPE, buffer=shm.buf)[:] = bars
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT, initializer=_attach_bars,
+                                       initargs=(shm.name, len(bars)))
+    else:
+        _attach_bars(None, len(bars), bars)
+    try:
+        # 样本内优化
+        if engine == 'vectorized':
+            optimized = _map(executor, _vectorized_optimize,
+                             [(start, oos_start, grid, metric, initial_capital) for start, oos_start, _ in folds])
+        else:
+            scores = _map(executor, _backtrader_score,
+                          [(engine, strategy_name, params, start, oos_start, metric, initial_capital, commission)
+                           for start, oos_start, _ in folds for params in grid])
+            optimized = []
+            for k in range(len(folds)):
+                fold_scores = scores[k * n_combos:(k + 1) * n_combos]
+                best = int(np.argmax(fold_scores))
+                optimized.append((grid[best], fold_scores[best]))
+        # 样本外回测
+        if engine == 'vectorized':
+            oos_returns = _map(executor, _vectorized_evaluate,
+                               [(params, *fold, initial_capital) for fold, (params, _) in zip(folds, optimized)])
+        else:
+            oos_returns = _map(executor, _backtrader_evaluate,
+                               [(engine, strategy_name, params, *fold, initial_capital, commission)
+                                for fold, (params, _) in zip(folds, optimized)])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    dates = bars_to_ohlcv(bars).index
+    fold_results = []
+    for (start, oos_start, oos_end), (params, score), returns in zip(folds, optimized, oos_returns):
+        fold_results.append({
+            'in_sample': [str(dates[start].date()), str(dates[oos_start - 1].date())],
+            'out_of_sample': [str(dates[oos_start].date()), str(dates[oos_end - 1].date())],
+            'best_params': params,
+            'in_sample_score': round(score, 4) if np.isfinite(score) else None,
+            'out_of_sample_performance': _performance(returns, initial_capital)[0],
+        })
+    stitched = pd.concat(oos_returns)
+    performance, equity = _performance(stitched, initial_capital)
+    logger.info(f'滚动前推优化完成: {engine}, {len(folds)} 折 × {n_combos} 组参数, 样本外总收益 {performance["total_return"]:.2%}')
+    return {
+        'engine': engine,
+        'strategy_name': 'ma_cross' if engine == 'vectorized' else strategy_name,
+        'metric': metric,
+        'combinations': n_combos,
+        'folds': fold_results,
+        'performance': performance,
+        'equity_curve': [{'date': str(d.date()), 'value': float(v)} for d, v in zip(stitched.index, equity)],
+    }
+
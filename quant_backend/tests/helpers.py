@@ -0,0 +1,67 @@
+"""
+测试公用的模拟行情数据
+"""
+import numpy as np
+import pandas as pd
+
+from quant_backend.services.bar_file import frame_to_bars
+
+
+def make_ohlcv(n=300, seed=0, start='2020-01-02'):
+    """
+    随机游走的日线 DataFrame（以交易日为索引），用于技术指标测试。
+    Args:
+        n: K线数量
+        seed: 随机种子
+        start: 首个交易日
+    Returns:
+        包含 open/high/low/close/volume 列的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close, 'high': close + rng.uniform(0.1, 2, n), 'low': close - rng.uniform(0.1, 2, n),
+        'close': close, 'volume': rng.integers(1000, 9000, n).astype(float),
+    }, index=pd.bdate_range(start, periods=n))
+
+
+def make_bars(n=600, seed=0, start='2018-01-02', volatility=0.03, gap=None):
+    """
+    带开盘跳空和随机成交量的几何随机游走K线，用于回测测试。
+    Args:
+        n: K线数量
+        seed: 随机种子
+        start: 首个交易日
+        volatility: 日收益率标准差
+        gap: 开盘价相对收盘价偏离的标准差，默认与 volatility 相同
+    Returns:
+        BAR_DTYPE 结构化数组
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    volume = rng.lognormal(11, 0.8, n)
+    gap = volatility if gap is None else gap
+    return frame_to_bars(pd.DataFrame({
+        'trade_date': dates.strftime('%Y%m%d'), 'open': close * (1 + rng.normal(0, gap, n)),
+        'high': close * (1 + 2 * volatility), 'low': close * (1 - 2 * volatility), 'close': close,
+        'vol': volume, 'amount': close * volume
+    }))
+
+
+def make_panel(n_dates=120, n_symbols=5, seed=0, start='2023-01-02', volatility=0.02):
+    """
+    多只股票的几何随机游走收盘价面板，用于截面/组合测试。
+    Args:
+        n_dates: 交易日数量
+        n_symbols: 股票数量，代码为 000000.SZ、000001.SZ ...
+        seed: 随机种子
+        start: 首个交易日
+        volatility: 日收益率标准差
+    Returns:
+        以交易日为索引、股票代码为列的收盘价 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    values = 20 * np.exp(np.cumsum(rng.normal(0, volatility, (n_dates, n_symbols)), axis=0))
+    return pd.DataFrame(values, index=pd.bdate_range(start, periods=n_dates),
+                        columns=[f'{i:06d}.SZ' for i in range(n_symbols)])
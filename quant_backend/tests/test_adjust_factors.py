@@ -0,0 +1,106 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services import adjust_factors
+from quant_backend.services.adjust_factors import AdjustFactorStore, apply_adjustment, normalize_adjust
+from quant_backend.services.bar_file import frame_to_bars
+
+
+def _raw_bars():
+    return frame_to_bars(pd.DataFrame({
+        'trade_date': ['20230103', '20230104', '20230105'],
+        'open': [10.0, 10.0, 5.0], 'high': [11.0, 11.0, 5.5], 'low': [9.0, 9.0, 4.5],
+        'close': [10.0, 10.0, 5.0], 'vol': [100.0, 100.0, 200.0], 'amount': [1000.0, 1000.0, 1000.0]
+    }))
+
+
+def _factors():
+    # 2023-01-05 除权，后复权因子由 1 变为 2
+    return np.array(['2000-01-01', '2023-01-05'], dtype='datetime64[D]'), np.array([1.0, 2.0])
+
+
+class TestApplyAdjustment(unittest.TestCase):
+    def test_hfq_multiplies_by_factor(self):
+        out = apply_adjustment(_raw_bars(), _factors(), 'hfq')
+        np.testing.assert_allclose(out['close'], [10.0, 10.0, 10.0])
+        np.testing.assert_allclose(out['high'], [11.0, 11.0, 11.0])
+
+    def test_qfq_anchored_to_latest_factor(self):
+        raw = _raw_bars()
+        out = apply_adjustment(raw, _factors(), 'qfq')
+        np.testing.assert_allclose(out['close'], [5.0, 5.0, 5.0])
+        # 成交量不复权，原数组不被修改
+        np.testing.assert_allclose(out['vol'], raw['vol'])
+        self.assertEqual(raw['close'][0], 10.0)
+
+    def test_raw_returns_input(self):
+        raw = _raw_bars()
+        self.assertIs(apply_adjustment(raw, _factors(), 'raw'), raw)
+        self.assertIs(apply_adjustment(raw, None, 'qfq'), raw)
+
+    def test_normalize_adjust(self):
+        self.assertEqual(normalize_adjust('QFQ'), 'qfq')
+        self.assertEqual(normalize_adjust(''), 'raw')
+        with self.assertRaises(ValueError):
+            normalize_adjust('xfq')
+
+
+class TestAdjustFactorStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.calls = 0
+
+    def _loader(self, code):
+        self.calls += 1
+        return pd.DataFrame({'date': ['2023-01-05', '2000-01-01'], 'hfq_factor': ['2.0', '1.0']})
+
+    def test_loaded_once_per_day_and_persisted(self):
+        store = AdjustFactorStore(self.root, loader=self._loader)
+        dates, factors = store.get('000001')
+        store.get('000001')
+        self.assertEqual(self.calls, 1)
+        np.testing.assert_allclose(factors, [1.0, 2.0])
+        self.assertEqual(str(dates[0]), '2000-01-01')
+        # 新实例当天直接读取磁盘缓存
+        AdjustFactorStore(self.root, loader=self._loader).get('000001')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_factors_used_when_refresh_fails(self):
+        AdjustFactorStore(self.root, loader=self._loader).get('000001')
+
+        def failing(code):
+            raise RuntimeError('upstream down')
+        store = AdjustFactorStore(self.root, loader=failing)
+        tomorrow = date.fromordinal(date.today().toordinal() + 1)
+        with patch.object(adjust_factors, 'date') as mock_date:
+            mock_date.today.return_value = tomorrow
+            mock_date.fromisoformat = date.fromisoformat
+            factors = store.get('000001')
+        self.assertIsNotNone(factors)
+        np.testing.assert_allclose(factors[1], [1.0, 2.0])
+        self.assertIsNone(store.get('600000'))
+
+    def test_peek_never_loads(self):
+        store = AdjustFactorStore(self.root, loader=self._loader)
+        self.assertIsNone(store.peek('000001'))
+        self.assertEqual(self.calls, 0)
+        store.get('000001')
+        # 新实例只读取磁盘缓存，返回加载日期与因子
+        loaded_on, (dates, factors) = AdjustFactorStore(self.root, loader=self._loader).peek('000001')
+        self.assertEqual(loaded_on, date.today())
+        np.testing.assert_allclose(factors, [1.0, 2.0])
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
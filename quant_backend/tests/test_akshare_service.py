@@ -1,14 +1,36 @@
 import os
 import sys
+import shutil
+import tempfile
 import unittest
 from unittest import mock
 from unittest.mock import patch, MagicMock
 
+import pandas as pd
+
 # 保证可以导入服务模块
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from quant_backend.services import akshare_service
+from quant_backend.services.bar_store import BarStore
+from quant_backend.services.adjust_factors import AdjustFactorStore
+
+
+def _unit_factors(code):
+    # 复权因子恒为 1，复权价格与不复权价格相同
+    return pd.DataFrame({'date': ['1990-01-01'], 'hfq_factor': [1.0]})
 
 class TestAkshareService(unittest.TestCase):
+    def setUp(self):
+        # 每个用例使用独立的本地K线存储，避免用例间互相命中缓存
+        self.store_dir = tempfile.mkdtemp()
+        patcher = patch.object(akshare_service, 'bar_store', BarStore(self.store_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        factor_patcher = patch.object(akshare_service, 'factor_store', AdjustFactorStore(self.store_dir, loader=_unit_factors))
+        factor_patcher.start()
+        self.addCleanup(factor_patcher.stop)
+        self.addCleanup(shutil.rmtree, self.store_dir, ignore_errors=True)
+
     @patch('akshare.stock_info_a_code_name')
     def test_get_stock_list_success(self, mock_stock_info):
         import pandas as pd
@@ -49,6 +71,21 @@ class TestAkshareService(unittest.TestCase):
         self.assertIn('close', df.columns)
         self.assertIn('vol', df.columns)
 
+    @patch('akshare.stock_zh_a_hist')
+    def test_get_stock_historical_data_float32(self, mock_hist):
+        mock_hist.return_value = pd.DataFrame({
+            '日期': ['20230103', '20230104'], '开盘': [10, 10.5], '收盘': [10.5, 11.1], '最高': [11, 12],
+            '最低': [9, 10], '成交量': [1000, 1200], '成交额': [10000, 12000]
+        })
+        df = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230103', '20230104', 'raw', 'float32')
+        self.assertEqual(df['close'].dtype, 'float32')
+        self.assertEqual(df['vol'].dtype, 'int64')
+        self.assertEqual(df['vol'].tolist(), [1000, 1200])
+        bars = akshare_service.get_stock_bars('000001.SZ', 'daily', '20230103', '20230104', 'raw', 'float32')
+        self.assertEqual(bars.dtype['close'], 'float32')
+        with self.assertRaises(ValueError):
+            akshare_service.get_stock_bars('000001.SZ', 'daily', precision='half')
+
     @patch('akshare.stock_zh_a_hist')
     def test_get_stock_historical_data_empty(self, mock_hist):
         import pandas as pd
@@ -63,6 +100,94 @@ class TestAkshareService(unittest.TestCase):
         with self.assertRaises(Exception):
             akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230101', '20230131')
 
+    @patch('akshare.stock_zh_a_hist')
+    def test_get_stock_historical_data_incremental_fill(self, mock_hist):
+        import pandas as pd
+        def fake_hist(symbol, period, start_date, end_date, adjust):
+            dates = pd.date_range(start_date, end_date, freq='B')
+            return pd.DataFrame({
+                '日期': dates.strftime('%Y-%m-%d'),
+                '开盘': 10.0, '收盘': 10.5, '最高': 11.0, '最低': 9.5,
+                '成交量': 1000, '成交额': 10000.0
+            })
+        mock_hist.side_effect = fake_hist
+        df = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230102', '20230131')
+        self.assertEqual(mock_hist.call_count, 1)
+        # 已缓存区间直接读盘
+        cached = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230109', '20230120')
+        self.assertEqual(mock_hist.call_count, 1)
+        self.assertEqual(cached['trade_date'].iloc[0], '20230109')
+        self.assertEqual(cached['trade_date'].iloc[-1], '20230120')
+        # 只补齐尾部缺失区间
+        extended = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230102', '20230228')
+        self.assertEqual(mock_hist.call_count, 2)
+        self.assertEqual(mock_hist.call_args.kwargs['start_date'], '20230201')
+        self.assertEqual(mock_hist.call_args.kwargs['end_date'], '20230228')
+        self.assertEqual(len(extended), len(df) + 20)
+        self.assertTrue(extended['trade_date'].is_monotonic_increasing)
+
+    @patch('akshare.stock_zh_a_hist')
+    def test_iter_stock_historical_data_batch(self, mock_hist):
+        import pandas as pd
+        def fake_hist(symbol, period, start_date, end_date, adjust):
+            if symbol == '000002':
+                raise Exception('API error')
+            return pd.DataFrame({
+                '日期': ['2023-01-03', '2023-01-04'],
+                '开盘': [10, 10.5], '收盘': [10.5, 11], '最高': [11, 12], '最低': [9, 10],
+                '成交量': [1000, 1200], '成交额': [10000, 12000]
+            })
+        mock_hist.side_effect = fake_hist
+        codes = ['000001.SZ', '000002.SZ', '600000.SH', '000001.SZ']
+        results = dict(akshare_service.iter_stock_historical_data(codes, 'daily', '20230101', '20230131', max_workers=4))
+        self.assertEqual(set(results), {'000001.SZ', '000002.SZ', '600000.SH'})
+        self.assertIsNone(results['000002.SZ'])
+        self.assertEqual(len(results['600000.SH']), 2)
+        batch = akshare_service.get_stock_historical_data_batch(codes, 'daily', '20230101', '20230131')
+        self.assertEqual(set(batch), {'000001.SZ', '600000.SH'})
+
+    @patch('akshare.stock_zh_a_hist')
+    def test_weekly_resampled_from_cached_daily(self, mock_hist):
+        import pandas as pd
+        def fake_hist(symbol, period, start_date, end_date, adjust):
+            dates = pd.bdate_range(start_date, end_date)
+            return pd.DataFrame({
+                '日期': dates.strftime('%Y-%m-%d'),
+                '开盘': 10.0, '收盘': 10.5, '最高': 11.0, '最低': 9.5,
+                '成交量': 1000, '成交额': 10000.0
+            })
+        mock_hist.side_effect = fake_hist
+        akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230101', '20230331')
+        weekly = akshare_service.get_stock_historical_data('000001.SZ', 'weekly', '20230102', '20230331')
+        monthly = akshare_service.get_stock_historical_data('000001.SZ', 'monthly', '20230102', '20230331')
+        # 周线/月线全部由本地日线聚合，不再请求上游
+        self.assertEqual(mock_hist.call_count, 1)
+        self.assertTrue(all(call.kwargs['period'] == 'daily' for call in mock_hist.call_args_list))
+        self.assertEqual(weekly['trade_date'].iloc[0], '20230106')
+        self.assertEqual(weekly['vol'].iloc[0], 5000)
+        self.assertEqual(list(monthly['trade_date']), ['20230131', '20230228', '20230331'])
+
+    @patch('akshare.stock_zh_a_hist')
+    def test_adjusted_prices_computed_from_raw_bars(self, mock_hist):
+        mock_hist.return_value = pd.DataFrame({
+            '日期': ['2023-01-03', '2023-01-04'],
+            '开盘': [10, 5], '收盘': [10, 5], '最高': [11, 5.5], '最低': [9, 4.5],
+            '成交量': [1000, 2000], '成交额': [10000, 10000]
+        })
+        factors = AdjustFactorStore(None, loader=lambda code: pd.DataFrame({
+            'date': ['1990-01-01', '2023-01-04'], 'hfq_factor': [1.0, 2.0]
+        }))
+        with patch.object(akshare_service, 'factor_store', factors):
+            qfq = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230103', '20230104', 'qfq')
+            hfq = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230103', '20230104', 'hfq')
+            raw = akshare_service.get_stock_historical_data('000001.SZ', 'daily', '20230103', '20230104', 'raw')
+        # 只向上游请求一次不复权数据，三种复权方式都由本地计算
+        self.assertEqual(mock_hist.call_count, 1)
+        self.assertEqual(mock_hist.call_args.kwargs['adjust'], '')
+        self.assertEqual(list(qfq['close']), [5.0, 5.0])
+        self.assertEqual(list(hfq['close']), [10.0, 10.0])
+        self.assertEqual(list(raw['close']), [10.0, 5.0])
+
     def test_get_stock_historical_data_invalid_period(self):
         with self.assertRaises(ValueError):
             akshare_service.get_stock_historical_data('000001.SZ', 'invalid', '20230101', '20230131')
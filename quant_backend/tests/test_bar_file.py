@@ -0,0 +1,99 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.bar_file import (
+    BAR_DTYPE, COMPACT_BAR_DTYPE, bars_to_frame, bars_to_ohlcv, frame_to_bars, open_bars, slice_by_date,
+    to_precision, write_bars
+)
+from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+
+def make_frame(n=120):
+    dates = pd.bdate_range('2023-01-02', periods=n)
+    close = 10 + np.sin(np.arange(n) / 8.0)
+    return pd.DataFrame({
+        'trade_date': dates.strftime('%Y%m%d'),
+        'open': close - 0.1, 'high': close + 0.2, 'low': close - 0.2, 'close': close,
+        'vol': np.arange(n) * 100.0 + 1000, 'amount': close * 1000
+    })
+
+
+class TestBarFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'daily', '000001.bars')
+        self.df = make_frame()
+        write_bars(self.path, frame_to_bars(self.df), {'covered_end': '20230630'})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        bars, header = open_bars(self.path)
+        self.assertIsInstance(bars, np.memmap)
+        self.assertEqual(bars.dtype, BAR_DTYPE)
+        self.assertEqual(header['rows'], len(self.df))
+        self.assertEqual(header['meta']['covered_end'], '20230630')
+        pd.testing.assert_frame_equal(bars_to_frame(bars), self.df, check_dtype=False)
+
+    def test_slice_by_date_is_view(self):
+        bars, _ = open_bars(self.path)
+        part = slice_by_date(bars, '20230105', '2023-01-10')
+        self.assertEqual(str(part['date'][0]), '2023-01-05')
+        self.assertEqual(str(part['date'][-1]), '2023-01-10')
+        self.assertTrue(np.shares_memory(part, bars))
+
+    def test_ohlcv_frame_shares_memory(self):
+        bars, _ = open_bars(self.path)
+        ohlcv = bars_to_ohlcv(bars)
+        self.assertIsInstance(ohlcv.index, pd.DatetimeIndex)
+        self.assertTrue(np.shares_memory(ohlcv['close'].to_numpy(), bars))
+        pma = TechnicalIndicators.calculate_pma(ohlcv, window=5)
+        self.assertTrue(np.isclose(pma.iloc[4], self.df['close'].iloc[:5].mean()))
+
+    def test_strategy_accepts_bars(self):
+        bars, _ = open_bars(self.path)
+        strategy = MACrossStrategy(short_window=5, long_window=20)
+        from_bars = strategy.backtest(bars)
+        hist = pd.DataFrame({
+            'Open': self.df['open'].values, 'High': self.df['high'].values, 'Low': self.df['low'].values,
+            'Close': self.df['close'].values, 'Volume': self.df['vol'].values
+        }, index=pd.to_datetime(self.df['trade_date'], format='%Y%m%d'))
+        from_frame = strategy.backtest(hist)
+        self.assertEqual(from_bars['performance'], from_frame['performance'])
+
+    def test_compact_precision(self):
+        bars, _ = open_bars(self.path)
+        self.assertIs(to_precision(bars, 'float64'), bars)
+        frame = self.df.copy()
+        frame.loc[3, 'vol'] = np.nan
+        compact = to_precision(frame_to_bars(frame), 'float32')
+        self.assertEqual(compact.dtype, COMPACT_BAR_DTYPE)
+        np.testing.assert_allclose(compact['close'], self.df['close'], rtol=1e-6)
+        self.assertEqual(compact['vol'][3], 0)
+        self.assertEqual(compact['vol'][4], self.df['vol'][4])
+        ohlcv = bars_to_ohlcv(compact)
+        self.assertEqual(ohlcv['close'].dtype, np.float32)
+        self.assertEqual(ohlcv['volume'].dtype, np.int64)
+        self.assertEqual(TechnicalIndicators.calculate_mfi(ohlcv).dtype, np.float32)
+        with self.assertRaises(ValueError):
+            to_precision(bars, 'float16')
+
+    def test_invalid_file(self):
+        bad_path = os.path.join(self.tmp_dir, 'bad.bars')
+        with open(bad_path, 'wb') as f:
+            f.write(b'not a bar file')
+        with self.assertRaises(ValueError):
+            open_bars(bad_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.bar_file import frame_to_bars, bars_to_frame
+from quant_backend.services.bar_resampler import n_day_start, parse_period, period_start, resample_bars
+
+
+def make_daily(start='2023-01-02', periods=250, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=periods)
+    close = 10 + rng.normal(0, 0.2, periods).cumsum()
+    return pd.DataFrame({
+        'trade_date': dates.strftime('%Y%m%d'),
+        'open': close + rng.normal(0, 0.05, periods),
+        'high': close + 0.3,
+        'low': close - 0.3,
+        'close': close,
+        'vol': rng.integers(1000, 5000, periods).astype(float),
+        'amount': rng.uniform(1e4, 5e4, periods),
+    })
+
+
+class TestBarResampler(unittest.TestCase):
+    def setUp(self):
+        self.df = make_daily()
+        self.bars = frame_to_bars(self.df)
+
+    def _pandas_resample(self, rule):
+        df = self.df.copy()
+        df.index = pd.to_datetime(df['trade_date'], format='%Y%m%d')
+        grouped = df.groupby(df.index.to_period(rule))
+        expected = pd.DataFrame({
+            'trade_date': grouped['trade_date'].last(),
+            'open': grouped['open'].first(),
+            'high': grouped['high'].max(),
+            'low': grouped['low'].min(),
+            'close': grouped['close'].last(),
+            'vol': grouped['vol'].sum(),
+            'amount': grouped['amount'].sum(),
+        })
+        return expected.reset_index(drop=True)
+
+    def test_weekly_matches_pandas(self):
+        result = bars_to_frame(resample_bars(self.bars, 'weekly'))
+        pd.testing.assert_frame_equal(result, self._pandas_resample('W'), check_dtype=False)
+
+    def test_monthly_matches_pandas(self):
+        result = bars_to_frame(resample_bars(self.bars, 'monthly'))
+        pd.testing.assert_frame_equal(result, self._pandas_resample('M'), check_dtype=False)
+
+    def test_n_day_bars(self):
+        result = resample_bars(self.bars, '5d')
+        self.assertEqual(len(result), 50)
+        self.assertEqual(result['vol'][0], self.bars['vol'][:5].sum())
+        self.assertEqual(result['date'][0], self.bars['date'][4])
+
+    def test_n_day_bars_follow_calendar(self):
+        calendar = self.bars['date'].copy()
+        # 删除第3个交易日模拟停牌，按日历分组时前5个交易日仍为一组
+        suspended = np.delete(self.bars, 2)
+        result = resample_bars(suspended, '5d', calendar=calendar)
+        self.assertEqual(result['date'][0], self.bars['date'][4])
+        self.assertEqual(result['vol'][0], suspended['vol'][:4].sum())
+
+    def test_n_day_bars_independent_of_start(self):
+        calendar = pd.bdate_range('2022-06-01', '2024-12-31').values.astype('datetime64[D]')
+        late = resample_bars(self.bars[7:], '5d', calendar=calendar)
+        early = resample_bars(self.bars[3:], '5d', calendar=calendar)
+        # 分组以日历首日为原点：除首根不完整的K线外，两个起始日期得到的K线完全相同
+        np.testing.assert_array_equal(late[1:], early[-(len(late) - 1):])
+        self.assertEqual(n_day_start(self.bars['date'][9], 5, calendar),
+                         calendar[np.searchsorted(calendar, self.bars['date'][9]) // 5 * 5])
+        # 从所在分组的首日开始取数时，首根K线也与更早起始日期的结果相同
+        first = np.searchsorted(self.bars['date'], n_day_start(self.bars['date'][7], 5, calendar))
+        aligned = resample_bars(self.bars[first:], '5d', calendar=calendar)
+        np.testing.assert_array_equal(aligned, early[-len(aligned):])
+
+    def test_daily_is_identity(self):
+        self.assertIs(resample_bars(self.bars, 'daily'), self.bars)
+
+    def test_parse_period(self):
+        self.assertEqual(parse_period('weekly'), ('weekly', 1))
+        self.assertEqual(parse_period('10d'), ('nday', 10))
+        self.assertEqual(parse_period('1d'), ('daily', 1))
+        with self.assertRaises(ValueError):
+            parse_period('hourly')
+
+    def test_period_start(self):
+        self.assertEqual(str(period_start(np.datetime64('2024-05-15'), 'weekly')), '2024-05-13')
+        self.assertEqual(str(period_start(np.datetime64('2024-05-15'), 'monthly')), '2024-05-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
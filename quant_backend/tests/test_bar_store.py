@@ -0,0 +1,76 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.bar_store import BarStore, stable_until
+
+
+def make_bars(start_date, end_date):
+    dates = pd.date_range(start_date, end_date, freq='B')
+    return pd.DataFrame({
+        'trade_date': dates.strftime('%Y%m%d'),
+        'open': 10.0, 'high': 11.0, 'low': 9.0, 'close': 10.5,
+        'vol': 1000, 'amount': 10000.0
+    })
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.store = BarStore(self.store_dir)
+        self.fetcher = MagicMock(side_effect=make_bars)
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_cached_range_served_from_disk(self):
+        first = self.store.get_range('000001', 'daily', 'qfq', '20230102', '20230331', self.fetcher)
+        again = self.store.get_range('000001', 'daily', 'qfq', '20230102', '20230331', self.fetcher)
+        self.assertEqual(self.fetcher.call_count, 1)
+        pd.testing.assert_frame_equal(first, again, check_dtype=False)
+
+    def test_head_and_tail_fill(self):
+        self.store.get_range('000001', 'daily', 'qfq', '20230301', '20230331', self.fetcher)
+        df = self.store.get_range('000001', 'daily', 'qfq', '20230201', '20230428', self.fetcher)
+        calls = [c.args for c in self.fetcher.call_args_list]
+        self.assertEqual(calls, [('20230301', '20230331'), ('20230201', '20230228'), ('20230401', '20230428')])
+        self.assertEqual(df['trade_date'].iloc[0], '20230201')
+        self.assertEqual(df['trade_date'].iloc[-1], '20230428')
+        self.assertFalse(df['trade_date'].duplicated().any())
+
+    def test_partitions_are_independent(self):
+        self.store.get_range('000001', 'daily', 'qfq', '20230102', '20230131', self.fetcher)
+        self.store.get_range('000001', 'weekly', 'qfq', '20230102', '20230131', self.fetcher)
+        self.store.get_range('600000', 'daily', 'qfq', '20230102', '20230131', self.fetcher)
+        self.assertEqual(self.fetcher.call_count, 3)
+
+    def test_upstream_error_does_not_update_coverage(self):
+        self.store.get_range('000001', 'daily', 'qfq', '20230102', '20230131', self.fetcher)
+        self.fetcher.side_effect = RuntimeError('upstream down')
+        with self.assertRaises(RuntimeError):
+            self.store.get_range('000001', 'daily', 'qfq', '20230102', '20230228', self.fetcher)
+        _, meta = self.store.load('000001', 'daily', 'qfq')
+        self.assertEqual(meta['covered_end'], '20230131')
+
+    def test_disabled_store_always_fetches(self):
+        store = BarStore(None)
+        store.get_range('000001', 'daily', 'qfq', '20230102', '20230131', self.fetcher)
+        store.get_range('000001', 'daily', 'qfq', '20230102', '20230131', self.fetcher)
+        self.assertEqual(self.fetcher.call_count, 2)
+
+    def test_stable_until(self):
+        today = datetime(2024, 5, 15)  # 周三
+        self.assertEqual(stable_until('daily', today), '20240514')
+        self.assertEqual(stable_until('weekly', today), '20240512')
+        self.assertEqual(stable_until('monthly', today), '20240430')
+
+
+if __name__ == '__main__':
+    unittest.main()
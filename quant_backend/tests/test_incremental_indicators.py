@@ -0,0 +1,128 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.tests.helpers import make_ohlcv
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+from quant_backend.utils.incremental_indicators import (
+    IncrementalATR, IncrementalIndicator, IncrementalBollinger, IncrementalEMA, IncrementalMACD, IncrementalMFI,
+    IncrementalOBV, IncrementalPMA, IncrementalRSI, IncrementalSMA, IncrementalStochastic,
+    IncrementalVMA, IncrementalVR, RollingExtremum, RollingWindow
+)
+
+SEED_BARS = 150
+
+
+def _make_df(n=300, seed=7):
+    df = make_ohlcv(n, seed)
+    close, volume = df.columns.get_loc('close'), df.columns.get_loc('volume')
+    # 平盘、缺失值等边界
+    df.iloc[40:46, close] = 100.0
+    df.iloc[[60, 200], close] = np.nan
+    df.iloc[[80, 210], volume] = np.nan
+    return df
+
+
+class TestIncrementalIndicators(unittest.TestCase):
+    """增量指标：用前 SEED_BARS 根K线初始化，其余逐根更新，结果与批量函数一致"""
+
+    def setUp(self):
+        self.df = _make_df()
+
+    def _stream(self, indicator):
+        head, tail = self.df.iloc[:SEED_BARS], self.df.iloc[SEED_BARS:]
+        data = head[indicator.inputs[0]] if len(indicator.inputs) == 1 else head
+        seeded = indicator.seed(data)
+        values = [indicator.update_bar(bar) for bar in tail.to_dict('records')]
+        return seeded, np.array(values, dtype=np.float64)
+
+    def _assert_matches(self, indicator, expected):
+        expected = np.column_stack([np.asarray(e, dtype=np.float64) for e in expected]) \
+            if isinstance(expected, tuple) else np.asarray(expected, dtype=np.float64)
+        seeded, streamed = self._stream(indicator)
+        np.testing.assert_allclose(np.asarray(seeded, dtype=np.float64), expected[SEED_BARS - 1], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(streamed, expected[SEED_BARS:], rtol=1e-9, atol=1e-9)
+
+    def test_moving_averages(self):
+        df = self.df
+        self._assert_matches(IncrementalSMA(20), TechnicalIndicators.calculate_ma(df['close'], 20))
+        self._assert_matches(IncrementalPMA(5), TechnicalIndicators.calculate_pma(df, 5))
+        self._assert_matches(IncrementalVMA(10), TechnicalIndicators.calculate_vma(df, 10))
+        self._assert_matches(IncrementalEMA(12), TechnicalIndicators.calculate_ema(df['close'], 12))
+
+    def test_oscillators(self):
+        df = self.df
+        self._assert_matches(IncrementalRSI(14), TechnicalIndicators.calculate_rsi(df['close'], 14))
+        self._assert_matches(IncrementalMACD(), TechnicalIndicators.calculate_macd(df['close']))
+        self._assert_matches(IncrementalStochastic(14, 3),
+                             TechnicalIndicators.calculate_stochastic(df['high'], df['low'], df['close']))
+
+    def test_volatility(self):
+        df = self.df
+        self._assert_matches(IncrementalBollinger(20, 2.0), TechnicalIndicators.calculate_bollinger_bands(df['close']))
+        self._assert_matches(IncrementalATR(14), TechnicalIndicators.calculate_atr(df['high'], df['low'], df['close']))
+
+    def test_volume_indicators(self):
+        df = self.df
+        self._assert_matches(IncrementalOBV(), TechnicalIndicators.calculate_obv(df))
+        self._assert_matches(IncrementalVR(5), TechnicalIndicators.calculate_vr(df, 5))
+        self._assert_matches(IncrementalMFI(14), TechnicalIndicators.calculate_mfi(df, 14))
+
+    def test_stream_from_scratch(self):
+        """不初始化、从第一根开始逐根更新，也与批量结果一致"""
+        df = self.df
+        ema = IncrementalEMA(26)
+        np.testing.assert_allclose(ema.update_many(df['close']),
+                                   TechnicalIndicators.calculate_ema(df['close'], 26), rtol=1e-12)
+        rsi = IncrementalRSI(14)
+        np.testing.assert_allclose(rsi.update_many(df['close']),
+                                   TechnicalIndicators.calculate_rsi(df['close'], 14), rtol=1e-9)
+        obv = IncrementalOBV()
+        np.testing.assert_allclose(obv.update_many(df['close'], df['volume']),
+                                   TechnicalIndicators.calculate_obv(df))
+
+    def test_leading_nan_ema(self):
+        series = pd.Series([np.nan, np.nan, 10.0, np.nan, 12.0, 11.0])
+        ema = IncrementalEMA(3)
+        np.testing.assert_allclose(ema.update_many(series),
+                                   TechnicalIndicators.calculate_ema(series, 3), equal_nan=True)
+        # 末尾有缺失时初始化，后续更新仍与批量一致
+        ema.seed(series.iloc[:4])
+        self.assertAlmostEqual(ema.update(12.0), TechnicalIndicators.calculate_ema(series, 3).iloc[4])
+
+
+class TestRollingPrimitives(unittest.TestCase):
+    def test_rolling_window_constant_is_exact(self):
+        roll = RollingWindow(3)
+        for v in [0.1, 0.7, 0.3, 0.0, 0.0, 0.0]:
+            roll.push(v)
+        self.assertEqual(roll.mean(), 0.0)
+        self.assertEqual(roll.var(), 0.0)
+
+    def test_rolling_extremum_matches_pandas(self):
+        rng = np.random.default_rng(3)
+        values = rng.normal(size=200)
+        values[[5, 50, 51]] = np.nan
+        for mode in ('max', 'min'):
+            ext = RollingExtremum(7, mode)
+            result = [ext.push(v) for v in values]
+            expected = getattr(pd.Series(values).rolling(7), mode)()
+            np.testing.assert_array_equal(result, expected.to_numpy())
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            RollingWindow(0)
+        with self.assertRaises(ValueError):
+            RollingExtremum(3, 'median')
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            IncrementalIndicator()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.indicator_cache import IndicatorCache
+from quant_backend.tests.helpers import make_ohlcv
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+
+def _make_df(n=300, seed=5):
+    df = make_ohlcv(n, seed)
+    return df.assign(date=df.index.strftime('%Y%m%d')).reset_index(drop=True)
+
+
+class TestIndicatorCache(unittest.TestCase):
+    def setUp(self):
+        self.df = _make_df()
+        self.cache = IndicatorCache()
+
+    def _get(self, name, params, df):
+        return self.cache.get('000001.SZ', 'daily', 'qfq', name, params, df)
+
+    def test_hit_and_prefix_slice(self):
+        first = self._get('rsi', {'window': 14}, self.df)
+        again = self._get('rsi', {'window': 14}, self.df)
+        prefix = self._get('rsi', {'window': 14}, self.df.iloc[:100])
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        np.testing.assert_array_equal(again, first)
+        np.testing.assert_array_equal(prefix, first[:100])
+        self.assertFalse(first.flags.writeable)
+
+    def test_extension_computes_only_tail(self):
+        expected = TechnicalIndicators.calculate_macd(self.df['close'])
+        self._get('macd', {}, self.df.iloc[:200])
+        extended = self._get('macd', {}, self.df)
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['extensions']), (1, 1))
+        self.assertEqual(extended.shape, (300, 3))
+        for j, series in enumerate(expected):
+            np.testing.assert_allclose(extended[:, j], series.to_numpy(), rtol=1e-9)
+
+    def test_last_bar_update_recomputed(self):
+        """最后一根K线（盘中）数据变化时只重算该根"""
+        self._get('pma_matrix', {'windows': [5, 20]}, self.df)
+        live = self.df.copy()
+        live.loc[live.index[-1], 'close'] += 3
+        values = self._get('pma_matrix', {'windows': [5, 20]}, live)
+        self.assertEqual(self.cache.stats()['extensions'], 1)
+        expected = TechnicalIndicators.calculate_pma_matrix(live, [5, 20]).to_numpy()
+        np.testing.assert_allclose(values, expected, rtol=1e-9)
+
+    def test_changed_history_is_recomputed(self):
+        self._get('obv', {}, self.df.iloc[:200])
+        rescaled = self.df.copy()
+        rescaled['close'] *= 0.5
+        values = self._get('obv', {}, rescaled)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+        np.testing.assert_allclose(values, TechnicalIndicators.calculate_obv(rescaled).to_numpy())
+
+    def test_qfq_rebase_of_history_is_recomputed(self):
+        """前复权因子更新：除最后两根外的历史价格整体缩放，同长度、前缀、扩展请求都不能复用旧结果"""
+        rebased = self.df.copy()
+        rebased.loc[rebased.index[:-2], ['open', 'high', 'low', 'close']] *= 0.9
+        expected = TechnicalIndicators.calculate_ma(rebased['close'], 20).to_numpy()
+        self._get('ma', {'window': 20}, self.df)
+        np.testing.assert_allclose(self._get('ma', {'window': 20}, rebased), expected, rtol=1e-9)
+        self.assertEqual((self.cache.stats()['misses'], self.cache.stats()['hits']), (2, 0))
+        # 前缀：缓存的是缩放后的完整区间，旧价格的前缀请求未命中
+        prefix = self._get('ma', {'window': 20}, self.df.iloc[:298])
+        self.assertEqual(self.cache.stats()['misses'], 3)
+        np.testing.assert_allclose(prefix, TechnicalIndicators.calculate_ma(self.df['close'].iloc[:298], 20).to_numpy(),
+                                   rtol=1e-9)
+        # 扩展：缓存的是旧价格的前 298 根，缩放后的完整区间不从旧状态扩展
+        values = self._get('ma', {'window': 20}, rebased)
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['extensions'], stats['hits']), (4, 0, 0))
+        np.testing.assert_allclose(values, expected, rtol=1e-9)
+
+    def test_keys_separate_params_and_start(self):
+        self._get('ma', {'window': 5}, self.df)
+        self._get('ma', {'window': 10}, self.df)
+        self._get('ma', {'window': 5}, self.df.iloc[50:])
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_lru_byte_budget(self):
+        cache = IndicatorCache(max_bytes=12000)
+        for w in (5, 10, 20):
+            cache.get('000001.SZ', 'daily', 'qfq', 'ma', {'window': w}, self.df)
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 12000)
+        self.assertGreater(stats['evictions'], 0)
+        # 最近使用的条目仍在缓存中
+        cache.get('000001.SZ', 'daily', 'qfq', 'ma', {'window': 20}, self.df)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_unknown_indicator(self):
+        with self.assertRaises(ValueError):
+            self._get('foo', {}, self.df)
+
+    def test_get_many_computes_misses_together(self):
+        """批量请求：已缓存的直接命中，其余在同一计算图中求值，结果与逐个计算一致"""
+        longer = _make_df(320)
+        df = longer.iloc[:300]
+        self._get('vr', {'window': 5}, df)
+        requests = [('vr', {'window': 5}), ('vma', {'window': 5}), ('macd', None), ('rsi', {'window': 14})]
+        values = self.cache.get_many('000001.SZ', 'daily', 'qfq', requests, df)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 4))
+        np.testing.assert_array_equal(values[1], TechnicalIndicators.calculate_vma(df, 5).to_numpy())
+        np.testing.assert_array_equal(values[3], TechnicalIndicators.calculate_rsi(df['close']).to_numpy())
+        self.assertEqual(values[2].shape, (300, 3))
+        # 批量计算的条目同样可以增量扩展
+        extended = self.cache.get_many('000001.SZ', 'daily', 'qfq', requests, longer)
+        self.assertEqual(self.cache.stats()['extensions'], 4)
+        np.testing.assert_allclose(extended[1], TechnicalIndicators.calculate_vma(longer, 5).to_numpy(), rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.tests.helpers import make_ohlcv
+from quant_backend.utils.indicator_graph import IndicatorPlan, compute_indicators, output_names, parse_indicator_specs
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+
+def _make_df(n=400, seed=9):
+    df = make_ohlcv(n, seed, '2021-01-04')
+    df.iloc[[30, 31, 200], df.columns.get_loc('close')] = np.nan
+    df.iloc[120, df.columns.get_loc('volume')] = np.nan
+    return df
+
+
+class TestIndicatorGraph(unittest.TestCase):
+    def setUp(self):
+        self.df = _make_df()
+
+    def _assert_same(self, actual, expected):
+        if isinstance(expected, tuple):
+            self.assertEqual(len(actual), len(expected))
+            for a, e in zip(actual, expected):
+                self._assert_same(a, e)
+        elif isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual, expected)
+        else:
+            pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+    def test_matches_technical_indicators(self):
+        """计算图结果与逐个调用 TechnicalIndicators 完全一致（含缺失值）"""
+        df, T = self.df, TechnicalIndicators
+        expected = {
+            'ma_20': T.calculate_ma(df['close'], 20),
+            'pma_5': T.calculate_pma(df, 5),
+            'ema_12': T.calculate_ema(df['close'], 12),
+            'rsi': T.calculate_rsi(df['close']),
+            'macd': T.calculate_macd(df['close']),
+            'bollinger': T.calculate_bollinger_bands(df['close']),
+            'atr': T.calculate_atr(df['high'], df['low'], df['close']),
+            'stochastic': T.calculate_stochastic(df['high'], df['low'], df['close']),
+            'obv': T.calculate_obv(df),
+            'vma_5': T.calculate_vma(df, 5),
+            'vr': T.calculate_vr(df),
+            'mfi': T.calculate_mfi(df),
+            'ichimoku': T.calculate_ichimoku(df['high'], df['low']),
+            'donchian': T.calculate_donchian(df['high'], df['low']),
+            'pma_matrix_5_20': T.calculate_pma_matrix(df, [5, 20]),
+        }
+        results = compute_indicators(df, [
+            ('ma', {'window': 20}), ('pma', {'window': 5}), ('ema', {'window': 12}), ('rsi', None),
+            ('macd', None), ('bollinger', None), ('atr', None), ('stochastic', None), ('obv', None),
+            ('vma', {'window': 5}), ('vr', None), ('mfi', None), ('ichimoku', None), ('donchian', None),
+            ('pma_matrix', {'windows': [5, 20]}),
+        ])
+        self.assertEqual(list(results), list(expected))
+        for label, value in expected.items():
+            self._assert_same(results[label], value)
+
+    def test_shared_intermediates_computed_once(self):
+        plan = IndicatorPlan()
+        plan.add('ema', {'window': 12})
+        plan.add('ema', {'window': 26})
+        plan.add('macd')
+        plan.add('rsi')
+        plan.add('obv')
+        plan.add('vma', {'window': 5})
+        plan.add('vr', {'window': 5})
+        plan.add('ma', {'window': 20})
+        plan.add('bollinger', {'window': 20})
+        ops = [key[0] for key in plan.nodes]
+        # EMA12/EMA26 与 MACD 共用，另有 MACD 信号线
+        self.assertEqual(ops.count('ewm'), 3)
+        # RSI 与 OBV 共用收盘价差分
+        self.assertEqual(ops.count('diff'), 1)
+        # 成交量(5)、收盘价(20) 各一个滚动和；RSI 的涨跌幅各一个
+        self.assertEqual(ops.count('rolling_sum'), 4)
+        # 布林带中轨即 MA20
+        results = plan.compute(self.df)
+        self.assertIs(results['bollinger_20'][0], results['ma_20'])
+        self.assertEqual(len(plan.nodes), len(set(plan.nodes)))
+
+    def test_invalid_requests(self):
+        plan = IndicatorPlan()
+        plan.add('rsi')
+        size = len(plan.nodes)
+        with self.assertRaises(ValueError):
+            plan.add('unknown')
+        with self.assertRaises(ValueError):
+            plan.add('rsi', {'period': 14})
+        self.assertEqual(len(plan.nodes), size)
+        with self.assertRaises(ValueError):
+            plan.compute(self.df.drop(columns=['close']))
+        # 自定义标签；空行情
+        plan.add('ma', {'window': 5}, label='ma_fast')
+        self.assertEqual(plan.labels, ('rsi', 'ma_fast'))
+        self.assertEqual(len(plan.compute(self.df.iloc[:0])['ma_fast']), 0)
+
+
+    def test_parse_indicator_specs(self):
+        specs = parse_indicator_specs('rsi(14), macd(12, 26, 9);bollinger(window=20,num_std=2.5),obv,pma_matrix(5,20)')
+        self.assertEqual(specs, [
+            ('rsi(14)', 'rsi', {'window': 14}),
+            ('macd(12,26,9)', 'macd', {'fast_period': 12, 'slow_period': 26, 'signal_period': 9}),
+            ('bollinger(window=20,num_std=2.5)', 'bollinger', {'window': 20, 'num_std': 2.5}),
+            ('obv', 'obv', {}),
+            ('pma_matrix(5,20)', 'pma_matrix', {'windows': [5, 20]}),
+        ])
+        self.assertEqual(parse_indicator_specs(' '), [])
+        self.assertEqual(output_names('pma_matrix', {'windows': [5, 20]}), ('5', '20'))
+        self.assertEqual(output_names('stochastic'), ('k', 'd'))
+        self.assertIsNone(output_names('rsi'))
+        for bad in ['foo', 'rsi(14', 'rsi(14,3)', 'rsi(x)', 'rsi(1.5)', 'rsi(0)', 'pma_matrix',
+                    'rsi(window=1,window=2)', 'macd(1) x', 'rsi(period=3)']:
+            with self.assertRaises(ValueError, msg=bad):
+                parse_indicator_specs(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,16 +3,23 @@ import sys
 import unittest
 from unittest.mock import patch, MagicMock
 from flask import Flask
+import base64
+import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from quant_backend.api.market_data_routes import market_data_bp
+from quant_backend.services import akshare_service
+from quant_backend.services.indicator_cache import indicator_cache
 
 class TestMarketDataRoutes(unittest.TestCase):
     def setUp(self):
         app = Flask(__name__)
         app.register_blueprint(market_data_bp)
         self.client = app.test_client()
+        # 股票列表按天缓存，每个用例前清空
+        akshare_service.stock_universe.invalidate()
+        indicator_cache.clear()
 
     @patch('quant_backend.services.akshare_service.get_stock_list')
     def test_stock_list_success(self, mock_get_stock_list):
@@ -29,6 +36,35 @@ class TestMarketDataRoutes(unittest.TestCase):
         self.assertIn('ts_code', data['data'][0])
         self.assertIn('name', data['data'][0])
 
+    @patch('quant_backend.services.akshare_service.get_stock_list')
+    def test_stock_list_cached_with_etag(self, mock_get_stock_list):
+        mock_get_stock_list.return_value = [
+            {'ts_code': '000001.SZ', 'name': '平安银行'},
+            {'ts_code': '600000.SH', 'name': '浦发银行'}
+        ]
+        resp = self.client.get('/api/market_data/stock_list')
+        self.assertEqual(resp.status_code, 200)
+        etag = resp.headers.get('ETag')
+        self.assertTrue(etag)
+        resp = self.client.get('/api/market_data/stock_list', headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(mock_get_stock_list.call_count, 1)
+
+    @patch('quant_backend.services.akshare_service.get_stock_list')
+    def test_stock_search(self, mock_get_stock_list):
+        mock_get_stock_list.return_value = [
+            {'ts_code': '000001.SZ', 'name': '平安银行'},
+            {'ts_code': '000002.SZ', 'name': '万科A'},
+            {'ts_code': '600000.SH', 'name': '浦发银行'}
+        ]
+        resp = self.client.get('/api/market_data/stock_search?q=0000&limit=1')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()['data'], [{'ts_code': '000001.SZ', 'name': '平安银行'}])
+        resp = self.client.get('/api/market_data/stock_search?q=浦发')
+        self.assertEqual([r['ts_code'] for r in resp.get_json()['data']], ['600000.SH'])
+        resp = self.client.get('/api/market_data/stock_search')
+        self.assertEqual(resp.status_code, 400)
+
     @patch('quant_backend.services.akshare_service.get_stock_list')
     def test_stock_list_fail(self, mock_get_stock_list):
         mock_get_stock_list.return_value = None
@@ -46,6 +82,24 @@ class TestMarketDataRoutes(unittest.TestCase):
         self.assertIn('error', data)
         self.assertIn('mock error', data['error'])
 
+    @patch('quant_backend.services.market_data_service.spot_snapshot')
+    def test_latest_price_multiple_symbols(self, mock_snapshot):
+        mock_snapshot.get_many.return_value = {
+            '000001.SZ': {'symbol': '000001.SZ', 'price': 10.5},
+            '600000.SH': {'symbol': '600000.SH', 'price': 7.2},
+        }
+        resp = self.client.get('/api/market_data/latest_price?symbols=000001.SZ,600000.SH')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(set(data['data']), {'000001.SZ', '600000.SH'})
+        mock_snapshot.get_many.assert_called_once_with(['000001.SZ', '600000.SH'])
+
+    @patch('quant_backend.services.market_data_service.spot_snapshot')
+    def test_latest_price_not_found(self, mock_snapshot):
+        mock_snapshot.get.return_value = None
+        resp = self.client.get('/api/market_data/latest_price?symbol=999999')
+        self.assertEqual(resp.status_code, 404)
+
     @patch('quant_backend.services.akshare_service.get_stock_historical_data')
     def test_historical_data_success(self, mock_get_hist):
         mock_df = pd.DataFrame({
@@ -68,6 +122,13 @@ class TestMarketDataRoutes(unittest.TestCase):
         self.assertIn('trade_date', data['data'][0])
         self.assertIn('open', data['data'][0])
 
+    @patch('quant_backend.services.akshare_service.get_stock_historical_data')
+    def test_historical_data_invalid_adjust(self, mock_get_hist):
+        params = '?ts_code=000001.SZ&period=daily&start_date=20230101&end_date=20230131&adjust=xfq'
+        resp = self.client.get(f'/api/market_data/historical_data{params}')
+        self.assertEqual(resp.status_code, 400)
+        mock_get_hist.assert_not_called()
+
     @patch('quant_backend.services.akshare_service.get_stock_historical_data')
     def test_historical_data_no_data(self, mock_get_hist):
         mock_get_hist.return_value = None
@@ -150,5 +211,54 @@ class TestMarketDataRoutes(unittest.TestCase):
         self.assertIn('error', data)
         self.assertIn('未来', data['error'])
 
+    @patch('quant_backend.services.akshare_service.get_stock_historical_data')
+    def test_indicators_specs_columnar(self, mock_get_hist):
+        close = np.linspace(10, 20, 40) + np.sin(np.arange(40))
+        mock_get_hist.return_value = pd.DataFrame({
+            'trade_date': pd.bdate_range('2024-01-01', periods=40).strftime('%Y%m%d'),
+            'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'vol': np.arange(1000, 1040, dtype=float), 'amount': close * 1000,
+        })
+        params = ('?ts_code=000001.SZ&period=daily&start_date=20240101&end_date=20240226'
+                  '&indicators=rsi(14), macd(12,26,9),bollinger(window=20),ichimoku,donchian(10)')
+        resp = self.client.get(f'/api/market_data/indicators{params}')
+        self.assertEqual(resp.status_code, 200)
+        columns = resp.get_json()['indicators']
+        self.assertEqual(set(columns), {
+            'rsi(14)', 'macd(12,26,9).line', 'macd(12,26,9).signal', 'macd(12,26,9).hist',
+            'bollinger(window=20).middle', 'bollinger(window=20).upper', 'bollinger(window=20).lower',
+            'ichimoku.conversion', 'ichimoku.base', 'ichimoku.span_a', 'ichimoku.span_b', 'ichimoku.lagging',
+            'donchian(10).upper', 'donchian(10).middle', 'donchian(10).lower',
+        })
+        # NaN 编码为 null
+        self.assertIsNone(columns['rsi(14)'][0])
+        self.assertAlmostEqual(columns['donchian(10).upper'][-1], float((close + 1)[-10:].max()))
+        # base64 编码：小端 float64 原始字节
+        resp = self.client.get(f'/api/market_data/indicators{params}&encoding=base64')
+        data = resp.get_json()
+        self.assertEqual(data['encoding'], 'base64')
+        rsi = np.frombuffer(base64.b64decode(data['indicators']['rsi(14)']), dtype='<f8')
+        self.assertEqual(len(rsi), 40)
+        self.assertTrue(np.isnan(rsi[0]))
+        self.assertEqual(rsi[-1], columns['rsi(14)'][-1])
+
+    @patch('quant_backend.services.akshare_service.get_stock_historical_data')
+    def test_indicators_invalid_specs(self, mock_get_hist):
+        base = '?ts_code=000001.SZ&period=daily&start_date=20240101&end_date=20240105'
+        for query in ['&indicators=foo(3)', '&indicators=rsi(14', '&indicators=rsi(0)', '&indicators=',
+                      '&encoding=csv']:
+            resp = self.client.get(f'/api/market_data/indicators{base}{query}')
+            self.assertEqual(resp.status_code, 400, query)
+            self.assertIn('error', resp.get_json())
+        mock_get_hist.assert_not_called()
+
+    def test_indicator_catalog(self):
+        resp = self.client.get('/api/market_data/indicators/catalog')
+        self.assertEqual(resp.status_code, 200)
+        catalog = {item['name']: item for item in resp.get_json()['indicators']}
+        self.assertEqual(catalog['macd']['params'], {'fast_period': 12, 'slow_period': 26, 'signal_period': 9})
+        self.assertEqual(catalog['macd']['outputs'], ['line', 'signal', 'hist'])
+        self.assertIn('ichimoku', catalog)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
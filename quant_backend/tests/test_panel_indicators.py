@@ -0,0 +1,133 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.utils import panel_indicators
+from quant_backend.utils.panel_indicators import PanelIndicators
+from quant_backend.tests.helpers import make_panel
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+
+def _make_panel(n_dates=120, n_symbols=6, seed=11):
+    close = make_panel(n_dates, n_symbols, seed)
+    rng = np.random.default_rng(seed + 1)
+    high = close + rng.uniform(0.1, 1, close.shape)
+    low = close - rng.uniform(0.1, 1, close.shape)
+    volume = pd.DataFrame(rng.integers(1000, 9000, close.shape).astype(float), close.index, close.columns)
+    return high, low, close, volume
+
+
+class TestPanelIndicators(unittest.TestCase):
+    def setUp(self):
+        self.high, self.low, self.close, self.volume = _make_panel()
+
+    def _column_df(self, col, rows=None):
+        df = pd.DataFrame({'high': self.high[col], 'low': self.low[col],
+                           'close': self.close[col], 'volume': self.volume[col]})
+        return df if rows is None else df.loc[rows]
+
+    def test_matches_per_series_functions(self):
+        rsi = PanelIndicators.rsi(self.close)
+        macd, signal, _ = PanelIndicators.macd(self.close)
+        middle, upper, _ = PanelIndicators.bollinger_bands(self.close)
+        atr = PanelIndicators.atr(self.high, self.low, self.close)
+        k, d = PanelIndicators.stochastic(self.high, self.low, self.close)
+        obv = PanelIndicators.obv(self.close, self.volume)
+        mfi = PanelIndicators.mfi(self.high, self.low, self.close, self.volume)
+        vr = PanelIndicators.vr(self.volume)
+        pma = PanelIndicators.pma(self.close, 10)
+        upper_dc, _, lower_dc = PanelIndicators.donchian(self.high, self.low, 10)
+        for col in self.close.columns:
+            df = self._column_df(col)
+            c = df['close']
+            pd.testing.assert_series_equal(rsi[col], TechnicalIndicators.calculate_rsi(c), check_names=False)
+            pd.testing.assert_series_equal(macd[col], TechnicalIndicators.calculate_macd(c)[0], check_names=False)
+            pd.testing.assert_series_equal(signal[col], TechnicalIndicators.calculate_macd(c)[1], check_names=False)
+            pd.testing.assert_series_equal(upper[col], TechnicalIndicators.calculate_bollinger_bands(c)[1], check_names=False)
+            pd.testing.assert_series_equal(atr[col], TechnicalIndicators.calculate_atr(df['high'], df['low'], c), check_names=False)
+            pd.testing.assert_series_equal(k[col], TechnicalIndicators.calculate_stochastic(df['high'], df['low'], c)[0], check_names=False)
+            pd.testing.assert_series_equal(obv[col], TechnicalIndicators.calculate_obv(df), check_names=False, check_dtype=False)
+            pd.testing.assert_series_equal(mfi[col], TechnicalIndicators.calculate_mfi(df), check_names=False)
+            pd.testing.assert_series_equal(vr[col], TechnicalIndicators.calculate_vr(df), check_names=False)
+            pd.testing.assert_series_equal(pma[col], TechnicalIndicators.calculate_pma(df, 10), check_names=False)
+            dc = TechnicalIndicators.calculate_donchian(df['high'], df['low'], 10)
+            pd.testing.assert_series_equal(upper_dc[col], dc[0], check_names=False)
+            pd.testing.assert_series_equal(lower_dc[col], dc[2], check_names=False)
+
+    def test_suspended_days_skipped(self):
+        """停牌日不占用窗口：结果等于只在交易日上计算，停牌日为 NaN"""
+        col = self.close.columns[2]
+        suspended = self.close.index[30:40]
+        for panel in (self.high, self.low, self.close, self.volume):
+            panel.loc[suspended, col] = np.nan
+        # 另一只股票晚上市
+        late = self.close.columns[4]
+        self.close.loc[self.close.index[:25], late] = np.nan
+
+        rsi = PanelIndicators.rsi(self.close)
+        mfi = PanelIndicators.mfi(self.high, self.low, self.close, self.volume)
+        trading = self.close.index.difference(suspended)
+        expected = TechnicalIndicators.calculate_rsi(self.close.loc[trading, col])
+        pd.testing.assert_series_equal(rsi.loc[trading, col], expected, check_names=False)
+        self.assertTrue(rsi.loc[suspended, col].isna().all())
+        expected_mfi = TechnicalIndicators.calculate_mfi(self._column_df(col, trading))
+        pd.testing.assert_series_equal(mfi.loc[trading, col], expected_mfi, check_names=False)
+        listed = self.close.index[25:]
+        pd.testing.assert_series_equal(rsi.loc[listed, late],
+                                       TechnicalIndicators.calculate_rsi(self.close.loc[listed, late]), check_names=False)
+        # 不跳过停牌时与逐只计算的 NaN 语义一致
+        raw = PanelIndicators.rsi(self.close, skip_suspended=False)
+        pd.testing.assert_series_equal(raw[col], TechnicalIndicators.calculate_rsi(self.close[col]), check_names=False)
+
+    def test_ndarray_input_and_rank(self):
+        values = self.close.to_numpy()
+        ema = PanelIndicators.ema(values, 12)
+        self.assertIsInstance(ema, pd.DataFrame)
+        self.assertEqual(ema.shape, values.shape)
+        ranks = PanelIndicators.rank(PanelIndicators.rsi(self.close))
+        last = ranks.iloc[-1]
+        self.assertAlmostEqual(last.max(), 1.0)
+        self.assertEqual(last.idxmax(), PanelIndicators.rsi(self.close).iloc[-1].idxmax())
+
+    def test_float32_panels_and_blocks(self):
+        """float32 面板按 float32 输出且与 float64 结果接近；按列分块与整体计算结果一致"""
+        self.close.iloc[10:20, 2] = np.nan
+        compact = [p.astype(np.float32) for p in (self.high, self.low, self.close)]
+        volume = self.volume.astype(np.int64)
+        cases = [
+            lambda h, l, c, v: PanelIndicators.rsi(c),
+            lambda h, l, c, v: PanelIndicators.macd(c),
+            lambda h, l, c, v: PanelIndicators.atr(h, l, c),
+            lambda h, l, c, v: PanelIndicators.stochastic(h, l, c),
+            lambda h, l, c, v: PanelIndicators.obv(c, v),
+            lambda h, l, c, v: PanelIndicators.mfi(h, l, c, v),
+            lambda h, l, c, v: PanelIndicators.donchian(h, l),
+        ]
+        for fn in cases:
+            expected = fn(self.high, self.low, self.close, self.volume)
+            actual = fn(*compact, volume)
+            with mock.patch.object(panel_indicators, 'BLOCK_ELEMENTS', len(self.close) * 4):
+                blocked = fn(*compact, volume)
+            if not isinstance(expected, tuple):
+                expected, actual, blocked = (expected,), (actual,), (blocked,)
+            for e, a, b in zip(expected, actual, blocked):
+                self.assertTrue((a.dtypes == np.float32).all())
+                pd.testing.assert_frame_equal(b, a)
+                e, a = e.to_numpy(), a.to_numpy(dtype=np.float64)
+                np.testing.assert_array_equal(np.isnan(a), np.isnan(e))
+                mask = ~np.isnan(e)
+                self.assertLess(np.max(np.abs(a[mask] - e[mask]) / np.maximum(np.abs(e[mask]), 1.0)), 1e-4)
+        self.assertEqual(PanelIndicators.rank(compact[2]).dtypes.iloc[0], np.float32)
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            PanelIndicators.obv(self.close, self.volume.iloc[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
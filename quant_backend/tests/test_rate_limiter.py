@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        self.assertTrue(all(bucket.try_acquire() for _ in range(3)))
+        self.assertFalse(bucket.try_acquire())
+
+    def test_acquire_waits_for_refill(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        bucket.acquire()
+        start = time.monotonic()
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+    def test_acquire_timeout(self):
+        bucket = TokenBucket(rate=0.5, capacity=1)
+        bucket.acquire()
+        self.assertFalse(bucket.acquire(timeout=0.01))
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
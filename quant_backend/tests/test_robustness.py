@@ -0,0 +1,150 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.api.strategy_routes import strategy_bp
+from quant_backend.services import robustness as robustness_module
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.services.robustness import daily_returns, monte_carlo, path_statistics, trade_returns
+from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.tests.helpers import make_bars
+
+try:
+    import backtrader  # noqa: F401
+    BACKTRADER_AVAILABLE = True
+except ImportError:
+    BACKTRADER_AVAILABLE = False
+
+
+def _make_bars(n=500, seed=4):
+    return make_bars(n, seed, '2020-01-02', volatility=0.02)
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.returns = np.random.default_rng(1).normal(0.0005, 0.015, 300)
+
+    def test_path_statistics_match_loop(self):
+        paths = np.random.default_rng(2).normal(0, 0.02, (5, 50))
+        stats = path_statistics(paths, 252)
+        for i, path in enumerate(paths):
+            equity, peak, worst = 1.0, 1.0, 0.0
+            for r in path:
+                equity *= 1 + r
+                peak = max(peak, equity)
+                worst = min(worst, equity / peak - 1)
+            self.assertAlmostEqual(stats['total_return'][i], equity - 1, places=12)
+            self.assertAlmostEqual(stats['max_drawdown'][i], worst, places=12)
+            self.assertAlmostEqual(stats['sharpe_ratio'][i], path.mean() / path.std(ddof=1) * np.sqrt(252), places=10)
+
+    def test_trade_shuffle_preserves_total_return(self):
+        result = monte_carlo(self.returns, method='trade_shuffle', n_paths=500, seed=0)
+        total = result['distribution']['total_return']
+        self.assertAlmostEqual(total['mean'], result['original']['total_return'], places=4)
+        self.assertAlmostEqual(total['std'], 0.0, places=4)
+        # 打乱顺序只改变回撤，原始回撤落在分布范围内
+        drawdown = result['distribution']['max_drawdown']['histogram']['edges']
+        self.assertTrue(drawdown[0] <= result['original']['max_drawdown'] <= drawdown[-1])
+
+    def test_seed_and_chunking(self):
+        for method in robustness_module.METHODS:
+            full = monte_carlo(self.returns, method=method, n_paths=2000, block_size=10, seed=7)
+            self.assertEqual(full, monte_carlo(self.returns, method=method, n_paths=2000, block_size=10, seed=7))
+            self.assertEqual(sum(full['distribution']['sharpe_ratio']['histogram']['counts']), 2000)
+            with patch.object(robustness_module, 'ROBUSTNESS_BLOCK_ELEMENTS', 300 * 64):
+                chunked = monte_carlo(self.returns, method=method, n_paths=2000, block_size=10, seed=7)
+            # 分块改变随机数的消耗顺序，只要求分布一致
+            for name in robustness_module.ROBUSTNESS_METRICS:
+                self.assertAlmostEqual(chunked['distribution'][name]['mean'], full['distribution'][name]['mean'], delta=0.05)
+        self.assertEqual(full['block_size'], None)
+
+    def test_block_bootstrap_blocks_are_contiguous(self):
+        returns = np.arange(1, 101, dtype=np.float64)
+        paths = robustness_module._block_bootstrap(np.random.default_rng(0), returns, 20, 10)
+        self.assertEqual(paths.shape, (20, 100))
+        steps = np.diff(paths.reshape(20, 10, 10), axis=2)
+        # 块内为原序列的连续片段（循环衔接处从 100 回到 1）
+        self.assertTrue(np.isin(steps, (1, -99)).all())
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            monte_carlo(self.returns, method='parametric')
+        with self.assertRaises(ValueError):
+            monte_carlo(self.returns, n_paths=0)
+        with self.assertRaises(ValueError):
+            monte_carlo(self.returns, block_size=0)
+        with self.assertRaises(ValueError):
+            monte_carlo([0.01, np.nan])
+        with self.assertRaises(ValueError):
+            trade_returns({'chart_data': {}}, basis='log')
+
+
+class TestBacktestReturns(unittest.TestCase):
+    def setUp(self):
+        self.frame = bars_to_ohlcv(_make_bars())
+        self.result = MACrossStrategy(5, 20).backtest(self.frame, 100000.0)
+
+    def test_daily_returns_rebuild_equity(self):
+        returns = daily_returns(self.result)
+        # 首根K线没有持仓变动，权益为缺失值
+        self.assertEqual(len(returns), len(self.frame) - 2)
+        equity = self.result['chart_data']['equity_curve']
+        self.assertAlmostEqual(equity[1]['value'] * np.prod(1 + returns.to_numpy()), equity[-1]['value'], places=6)
+
+    def test_trade_returns(self):
+        chart = self.result['chart_data']
+        trades = trade_returns(self.result)
+        self.assertEqual(len(trades), len(chart['buy_signals']))
+        values = {p['date']: p['value'] for p in chart['equity_curve']}
+        buy, sell = chart['buy_signals'][0], chart['sell_signals'][0]
+        self.assertAlmostEqual(trades[0], values[sell['date']] / values[buy['date']] - 1)
+        prices = trade_returns(self.result, basis='price')
+        self.assertAlmostEqual(prices[0], sell['price'] / buy['price'] - 1)
+
+
+class TestMonteCarloRoute(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        self.client = app.test_client()
+        self.body = {'symbol': '000001.SZ', 'start_date': '2020-01-02', 'end_date': '2021-12-31',
+                     'short_window': 5, 'long_window': 20, 'n_paths': 1000, 'seed': 3}
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_monte_carlo(self, mock_bars):
+        mock_bars.return_value = _make_bars()
+        for method in ('block_bootstrap', 'trade_shuffle'):
+            resp = self.client.post('/api/strategy/monte_carlo', json=dict(self.body, method=method))
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_json()
+            self.assertEqual(data['n_paths'], 1000)
+            self.assertEqual(set(data['distribution']), set(robustness_module.ROBUSTNESS_METRICS))
+            self.assertTrue(0 <= data['probability_of_loss'] <= 1)
+
+    @unittest.skipUnless(BACKTRADER_AVAILABLE, 'Backtrader 未安装')
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_monte_carlo_backtrader(self, mock_bars):
+        mock_bars.return_value = _make_bars()
+        for method in ('block_bootstrap', 'trade_bootstrap'):
+            resp = self.client.post('/api/strategy/monte_carlo', json=dict(
+                self.body, engine='backtrader', method=method, strategy_params={'short_ma': 5, 'long_ma': 20}))
+            self.assertEqual(resp.status_code, 200)
+            self.assertGreater(resp.get_json()['observations'], 1)
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_monte_carlo_invalid(self, mock_bars):
+        mock_bars.return_value = _make_bars()
+        for bad in ({'method': 'parametric'}, {'engine': 'zipline'}, {'n_paths': 0},
+                    {'short_window': 30, 'long_window': 10}, {'block_size': 'x'},
+                    {'engine': 'event', 'strategy_name': 'rsi_reversal'}):
+            resp = self.client.post('/api/strategy/monte_carlo', json=dict(self.body, **bad))
+            self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
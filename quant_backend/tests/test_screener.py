@@ -0,0 +1,212 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.api.market_data_routes import market_data_bp
+from quant_backend.services import akshare_service
+from quant_backend.services.adjust_factors import AdjustFactorStore
+from quant_backend.services.bar_store import BarStore
+from quant_backend.services.screener import Term, parse_condition, parse_conditions, parse_term, screen
+from quant_backend.services.strategy_service import MACrossPortfolio
+from quant_backend.tests.helpers import make_panel
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+
+def _make_panels(n_dates=120, n_symbols=30, seed=5):
+    close = make_panel(n_dates, n_symbols, seed)
+    rng = np.random.default_rng(seed + 1)
+    volume = pd.DataFrame(rng.lognormal(11, 0.8, close.shape), close.index, close.columns)
+    panels = {'open': close * (1 + rng.normal(0, 0.01, close.shape)), 'high': close * 1.02, 'low': close * 0.98,
+              'close': close, 'volume': volume}
+    # 停牌：第 0 只最后一日停牌，第 1 只中途停牌
+    for panel in panels.values():
+        panel.iloc[-1, 0] = np.nan
+        panel.iloc[50:60, 1] = np.nan
+    return panels
+
+
+def _frame(panels, symbol):
+    return pd.DataFrame({field: panels[field][symbol] for field in panels}).dropna()
+
+
+class TestScreener(unittest.TestCase):
+    def setUp(self):
+        self.panels = _make_panels()
+
+    def test_matches_per_symbol_indicators(self):
+        result = screen(self.panels, ['vr(5) > 1', 'mfi(14) < 60', 'close > ma(10)'], limit=100)
+        expected = set()
+        for symbol in self.panels['close'].columns[1:]:
+            df = _frame(self.panels, symbol)
+            vr = TechnicalIndicators.calculate_vr(df, 5).iloc[-1]
+            mfi = TechnicalIndicators.calculate_mfi(df, 14).iloc[-1]
+            ma = TechnicalIndicators.calculate_ma(df['close'], 10).iloc[-1]
+            if vr > 1 and mfi < 60 and df['close'].iloc[-1] > ma:
+                expected.add(symbol)
+                item = next(x for x in result['data'] if x['ts_code'] == symbol)
+                self.assertAlmostEqual(item['values']['vr(5)'], round(vr, 4), places=4)
+        self.assertEqual({x['ts_code'] for x in result['data']}, expected)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(result['universe'], 29)
+        self.assertEqual(result['matched'], len(expected))
+        self.assertEqual(result['date'], self.panels['close'].index[-1].strftime('%Y-%m-%d'))
+        scores = [x['score'] for x in result['data']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_signals(self):
+        hold = MACrossPortfolio(3, 8).generate_signals(self.panels['close'])
+        crossed = hold.columns[(hold.iloc[-1] == 1) & (hold.iloc[-2] == 0)]
+        result = screen(self.panels, ['ma_cross(3,8)'], limit=100)
+        self.assertEqual({x['ts_code'] for x in result['data']}, set(crossed) - {hold.columns[0]})
+        result = screen(self.panels, ['volume_breakout(volume_window=5,volume_mult=0.5,price_change_threshold=0)'],
+                        limit=100)
+        for item in result['data']:
+            df = _frame(self.panels, item['ts_code'])
+            self.assertGreater(df['close'].iloc[-1], df['close'].iloc[-4])
+
+    def test_sort_by_and_limit(self):
+        result = screen(self.panels, ['rsi(14) > 0'], sort_by='change(5)', ascending=True, limit=5)
+        self.assertEqual(len(result['data']), 5)
+        changes = [x['values']['change(5)'] for x in result['data']]
+        self.assertEqual(changes, sorted(changes))
+        df = _frame(self.panels, result['data'][0]['ts_code'])
+        self.assertAlmostEqual(changes[0], round((df['close'].iloc[-1] / df['close'].iloc[-6] - 1) * 100, 4), places=4)
+
+    def test_parse(self):
+        self.assertEqual(parse_term(' bollinger(20, 2).upper '), Term('bollinger(20,2).upper', 'bollinger',
+                                                                      (('num_std', 2), ('window', 20)), 'upper'))
+        self.assertEqual(parse_term('2.5'), 2.5)
+        condition = parse_condition('macd.hist >= macd.signal')
+        self.assertEqual((condition.left.output, condition.op, condition.right.output), ('hist', '>=', 'signal'))
+        self.assertEqual(parse_condition('ma_cross(5, long_window=30)').params, (('long_window', 30), ('short_window', 5)))
+        for bad in ('ma > 2', 'macd > 0', 'rsi.line < 30', 'close(5) > 1', 'ichimoku.base > 1', '2 > close',
+                    'ma_cross(5,20,3)', 'unknown_signal', 'rsi(0) < 30', ''):
+            with self.assertRaises(ValueError, msg=bad):
+                parse_condition(bad)
+        with self.assertRaises(ValueError):
+            parse_conditions('vr > 2')
+        with self.assertRaises(ValueError):
+            parse_conditions([])
+        with self.assertRaises(ValueError):
+            screen(self.panels, ['ma_cross(20,5)'])
+
+
+class TestUniversePanel(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store_dir, ignore_errors=True)
+        self.store = BarStore(self.store_dir)
+        self.factors = AdjustFactorStore(self.store_dir, loader=lambda code: None)
+        for target, value in (('bar_store', self.store), ('factor_store', self.factors)):
+            patcher = patch.object(akshare_service, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        akshare_service._universe_panel_cache.clear()
+        dates = pd.bdate_range('2024-01-02', periods=10)
+        for code, offset in (('000001', 0), ('000002', 0), ('600000', 3)):
+            close = np.arange(10, 20, dtype=np.float64)[offset:]
+            df = pd.DataFrame({'trade_date': dates[offset:].strftime('%Y%m%d'), 'open': close, 'high': close,
+                               'low': close, 'close': close, 'vol': 100.0, 'amount': close * 100})
+            self.store.save(code, 'daily', 'raw', df, df['trade_date'].iloc[0], df['trade_date'].iloc[-1])
+
+    def _cache_factors(self, code, loaded_on):
+        # 只放入缓存的复权因子（因子加载函数不可用，不会请求上游），2024-01-10 除权
+        self.factors._cache[code] = (pd.Timestamp(loaded_on).date(),
+                                     (np.array(['2024-01-01', '2024-01-10'], dtype='datetime64[D]'),
+                                      np.array([1.0, 2.0])))
+
+    def test_panel_from_cached_partitions(self):
+        # 000001 没有复权因子；000002 的因子早于最后一根K线加载，之后的除权可能未计入
+        self._cache_factors('600000', '2024-01-15')
+        self._cache_factors('000002', '2024-01-12')
+        universe = akshare_service.get_universe_panel(lookback=8, adjust='qfq')
+        panels = universe.panels
+        self.assertEqual(universe.unadjusted, ['000001.SZ', '000002.SZ'])
+        self.assertEqual(list(panels['close'].columns), ['600000.SH'])
+        self.assertEqual(panels['close'].index[-1], pd.Timestamp('2024-01-15'))
+        # 除权日前价格按 1/2 前复权
+        self.assertEqual(panels['close']['600000.SH'].iloc[0], 6.5)
+        self.assertEqual(panels['close']['600000.SH'].iloc[-1], 19.0)
+        self.assertIs(akshare_service.get_universe_panel(lookback=8, adjust='qfq'), universe)
+        # 因子刷新后重建面板
+        self._cache_factors('000002', '2024-01-15')
+        universe = akshare_service.get_universe_panel(lookback=8, adjust='qfq')
+        self.assertEqual(universe.unadjusted, ['000001.SZ'])
+        self.assertEqual(list(universe.panels['close'].columns), ['000002.SZ', '600000.SH'])
+        self.assertEqual(universe.panels['close']['000002.SZ'].iloc[-1], 19.0)
+        # 全部股票都没有可用因子
+        universe = akshare_service.get_universe_panel(lookback=8, adjust='hfq', ts_codes=['000001.SZ'])
+        self.assertEqual(universe, ({}, ['000001.SZ']))
+
+    def test_raw_panel(self):
+        universe = akshare_service.get_universe_panel(lookback=8, adjust='raw')
+        panels = universe.panels
+        self.assertEqual(universe.unadjusted, [])
+        self.assertEqual(list(panels['close'].columns), ['000001.SZ', '000002.SZ', '600000.SH'])
+        self.assertEqual(len(panels['close']), 8)
+        self.assertEqual(panels['close']['000001.SZ'].iloc[0], 12.0)
+        # 600000 晚 3 个交易日上市，面板首日缺失
+        self.assertTrue(panels['close']['600000.SH'].iloc[:1].isna().all())
+        self.assertEqual(panels['volume'].iloc[-1].tolist(), [100.0, 100.0, 100.0])
+        subset = akshare_service.get_universe_panel(lookback=8, adjust='raw', ts_codes=['600000.SH', '300001.SZ'])
+        self.assertEqual(list(subset.panels['close'].columns), ['600000.SH'])
+        self.assertEqual(subset.panels['close']['600000.SH'].tolist(), list(np.arange(13.0, 20.0)))
+
+    def test_no_cached_data(self):
+        self.assertIsNone(akshare_service.get_universe_panel(ts_codes=['300001.SZ']))
+        with patch.object(akshare_service, 'bar_store', BarStore(None)):
+            self.assertIsNone(akshare_service.get_universe_panel())
+
+
+class TestScreenRoute(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(market_data_bp)
+        self.client = app.test_client()
+        akshare_service.stock_universe.invalidate()
+
+    @patch('quant_backend.services.akshare_service.get_stock_list')
+    @patch('quant_backend.services.akshare_service.get_universe_panel')
+    def test_screen(self, mock_panel, mock_list):
+        mock_panel.return_value = akshare_service.UniversePanel(_make_panels(), ['600001.SH'])
+        mock_list.return_value = [{'ts_code': '000002.SZ', 'name': '测试'}]
+        resp = self.client.post('/api/market_data/screen', json={'conditions': ['vr > 0'], 'sort_by': 'close',
+                                                                 'limit': 3, 'lookback': 120})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data['universe'], 29)
+        self.assertEqual(len(data['data']), 3)
+        closes = [x['close'] for x in data['data']]
+        self.assertEqual(closes, sorted(closes, reverse=True))
+        mock_panel.assert_called_once_with(120, 'qfq', None)
+        names = {x['ts_code']: x['name'] for x in data['data']}
+        self.assertTrue(all(name is None for code, name in names.items() if code != '000002.SZ'))
+        self.assertEqual(data['unadjusted'], ['600001.SH'])
+
+    @patch('quant_backend.services.akshare_service.get_universe_panel')
+    def test_screen_invalid(self, mock_panel):
+        for body in ({}, {'conditions': 'vr > 2'}, {'conditions': ['vr >> 2']}, {'conditions': ['vr > 2'], 'limit': 0},
+                     {'conditions': ['vr > 2'], 'lookback': 5000}, {'conditions': ['vr > 2'], 'adjust': 'xx'},
+                     {'conditions': ['vr > 2'], 'sort_by': '3'}, {'conditions': ['vr > 2'], 'symbols': [1]}):
+            resp = self.client.post('/api/market_data/screen', json=body)
+            self.assertEqual(resp.status_code, 400, body)
+        mock_panel.assert_not_called()
+        mock_panel.return_value = None
+        resp = self.client.post('/api/market_data/screen', json={'conditions': ['vr > 2']})
+        self.assertEqual(resp.status_code, 404)
+        mock_panel.return_value = akshare_service.UniversePanel({}, ['600001.SH'])
+        resp = self.client.post('/api/market_data/screen', json={'conditions': ['vr > 2']})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.get_json()['unadjusted'], ['600001.SH'])
+
+
+if __name__ == '__main__':
+    unittest.main()
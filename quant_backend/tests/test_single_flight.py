@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.single_flight import SingleFlight
+from quant_backend.services import akshare_service
+from quant_backend.services.bar_store import BarStore
+from quant_backend.services.adjust_factors import AdjustFactorStore
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch(x):
+            calls.append(x)
+            release.wait(1)
+            return x * 2
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flight.do, 'key', slow_fetch, 21) for _ in range(5)]
+            # 等待所有调用方进入合并等待后再放行
+            deadline = time.monotonic() + 1
+            while flight.stats()['coalesced'] < 4 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            results = [f.result() for f in futures]
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {'executed': 1, 'coalesced': 4, 'in_flight': 0})
+
+    def test_error_propagates_to_all_waiters(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(1)
+            raise RuntimeError('upstream down')
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flight.do, 'key', failing) for _ in range(3)]
+            deadline = time.monotonic() + 1
+            while flight.stats()['coalesced'] < 2 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            for f in futures:
+                with self.assertRaises(RuntimeError):
+                    f.result()
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+    @patch('akshare.stock_zh_a_hist')
+    def test_akshare_concurrent_requests_coalesced(self, mock_hist):
+        release = threading.Event()
+
+        def fake_hist(symbol, period, start_date, end_date, adjust):
+            release.wait(1)
+            return pd.DataFrame({
+                '日期': ['2023-01-03', '2023-01-04'],
+                '开盘': [10, 10.5], '收盘': [10.5, 11], '最高': [11, 12], '最低': [9, 10],
+                '成交量': [1000, 1200], '成交额': [10000, 12000]
+            })
+        mock_hist.side_effect = fake_hist
+        flight = SingleFlight()
+        factors = AdjustFactorStore(None, loader=lambda code: pd.DataFrame({'date': ['1990-01-01'], 'hfq_factor': [1.0]}))
+        with patch.object(akshare_service, 'bar_store', BarStore(None)), \
+                patch.object(akshare_service, 'factor_store', factors), \
+                patch.object(akshare_service, 'upstream_flight', flight):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(akshare_service.get_stock_historical_data, '000001.SZ', 'daily', '20230101', '20230131')
+                           for _ in range(4)]
+                deadline = time.monotonic() + 1
+                while flight.stats()['coalesced'] < 3 and time.monotonic() < deadline:
+                    time.sleep(0.001)
+                release.set()
+                frames = [f.result() for f in futures]
+        self.assertEqual(mock_hist.call_count, 1)
+        self.assertTrue(all(len(df) == 2 for df in frames))
+        # 每个调用方拿到独立的 DataFrame
+        self.assertEqual(len({id(df) for df in frames}), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
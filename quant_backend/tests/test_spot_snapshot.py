@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.spot_snapshot import SpotSnapshotService
+
+
+def make_spot_df():
+    return pd.DataFrame({
+        '代码': ['000001', '600000', '000002'],
+        '名称': ['平安银行', '浦发银行', '万科A'],
+        '最新价': [10.5, 7.2, np.nan],
+        '涨跌额': [0.1, -0.05, np.nan],
+        '涨跌幅': [0.96, -0.69, np.nan],
+        '成交量': [123456, 65432, np.nan],
+    })
+
+
+class TestSpotSnapshotService(unittest.TestCase):
+    def setUp(self):
+        self.loader = MagicMock(return_value=make_spot_df())
+        # 刷新间隔设得足够大，测试期间后台线程不会触发刷新
+        self.service = SpotSnapshotService(refresh_interval=3600, loader=self.loader)
+
+    def tearDown(self):
+        self.service.stop()
+
+    def test_get_single_symbol(self):
+        price = self.service.get('000001.SZ')
+        self.assertEqual(price['symbol'], '000001.SZ')
+        self.assertEqual(price['price'], 10.5)
+        self.assertEqual(price['volume'], 123456)
+        self.assertIsNotNone(price['timestamp'])
+        self.assertIsNone(self.service.get('999999'))
+
+    def test_get_many_uses_one_snapshot(self):
+        prices = self.service.get_many(['000001', '600000.SH', '999999'])
+        self.assertEqual(set(prices), {'000001', '600000.SH'})
+        self.service.get('000001')
+        self.assertEqual(self.loader.call_count, 1)
+
+    def test_missing_values_become_none(self):
+        price = self.service.get('000002')
+        self.assertIsNone(price['price'])
+        self.assertIsNone(price['volume'])
+
+    def test_stale_snapshot_refreshes(self):
+        self.service.max_age = 0
+        self.service.get('000001')
+        self.service.get('000001')
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_loader_failure_keeps_previous_snapshot(self):
+        self.service.get('000001')
+        self.loader.side_effect = Exception('API error')
+        self.assertFalse(self.service.refresh())
+        self.assertEqual(self.service.get('000001')['price'], 10.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
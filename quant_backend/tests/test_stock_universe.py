@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.services.stock_universe import PrefixIndex, StockUniverse, PYPINYIN_AVAILABLE
+
+RECORDS = [
+    {'ts_code': '000001.SZ', 'name': '平安银行'},
+    {'ts_code': '000002.SZ', 'name': '万科A'},
+    {'ts_code': '600000.SH', 'name': '浦发银行'},
+    {'ts_code': '601318.SH', 'name': '中国平安'},
+]
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = PrefixIndex(RECORDS)
+
+    def test_code_prefix(self):
+        self.assertEqual([r['ts_code'] for r in self.index.search('00000')], ['000001.SZ', '000002.SZ'])
+        self.assertEqual([r['ts_code'] for r in self.index.search('6013')], ['601318.SH'])
+
+    def test_name_prefix(self):
+        self.assertEqual([r['ts_code'] for r in self.index.search('平安')], ['000001.SZ'])
+        self.assertEqual(self.index.search('万科a')[0]['ts_code'], '000002.SZ')
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.index.search('0', limit=1)), 1)
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(self.index.search('zzz'), [])
+
+    @unittest.skipUnless(PYPINYIN_AVAILABLE, '未安装 pypinyin')
+    def test_pinyin_prefix(self):
+        self.assertEqual(self.index.search('payh')[0]['ts_code'], '000001.SZ')
+        self.assertEqual(self.index.search('zhongguo')[0]['ts_code'], '601318.SH')
+
+
+class TestStockUniverse(unittest.TestCase):
+    def test_loads_once_per_day(self):
+        loader = MagicMock(return_value=RECORDS)
+        universe = StockUniverse(loader)
+        records, etag = universe.get()
+        universe.get()
+        universe.search('600')
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(records, RECORDS)
+        self.assertTrue(etag)
+
+    def test_refresh_failure_keeps_stale_data(self):
+        loader = MagicMock(return_value=RECORDS)
+        universe = StockUniverse(loader)
+        universe.get()
+        universe._loaded_on = None
+        loader.side_effect = Exception('API error')
+        records, _ = universe.get()
+        self.assertEqual(records, RECORDS)
+
+    def test_initial_failure(self):
+        universe = StockUniverse(MagicMock(return_value=None))
+        self.assertEqual(universe.get(), (None, None))
+        self.assertIsNone(universe.search('000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.api.strategy_routes import strategy_bp
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.services.strategy_service import MACrossPortfolio, MACrossStrategy, VolumeBreakoutStrategy, close_panel
+from quant_backend.tests.helpers import make_bars, make_panel
+
+from quant_backend.bt_strategies.backtest_runner import BACKTRADER_AVAILABLE, run_backtest
+
+
+def _loop_reference(close, weights, commission, initial_capital):
+    """逐日按股数记账的参考实现：收盘按目标权重调仓，佣金按成交金额从权益中扣除"""
+    prices = close.ffill().to_numpy()
+    w = weights.to_numpy()
+    shares = np.zeros(close.shape[1])
+    cash = initial_capital
+    equity = []
+    for t in range(len(close)):
+        price = np.nan_to_num(prices[t])
+        values = shares * price
+        pre = cash + values.sum()
+        turnover = np.abs(w[t] - values / pre).sum()
+        post = pre * (1 - commission * turnover)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(price > 0, w[t] * post / price, 0.0)
+        cash = post - (shares * price).sum()
+        equity.append(post)
+    return np.array(equity)
+
+
+class TestMACrossPortfolio(unittest.TestCase):
+    def setUp(self):
+        self.close = make_panel(400, 5, 3, '2021-01-04')
+
+    def test_signals_match_single_symbol_strategy(self):
+        portfolio = MACrossPortfolio(short_window=5, long_window=20)
+        signals = portfolio.generate_signals(self.close)
+        for symbol in self.close.columns:
+            single = self.close[[symbol]].set_axis(['close'], axis=1)
+            expected = MACrossStrategy(5, 20).generate_signals(single)['signal']
+            pd.testing.assert_series_equal(signals[symbol], expected, check_names=False)
+
+    def test_equity_matches_loop_reference(self):
+        self.close.iloc[50:60, 1] = np.nan
+        self.close.iloc[:80, 2] = np.nan
+        for allocation in ('equal', 'volatility'):
+            portfolio = MACrossPortfolio(5, 20, allocation=allocation, commission=0.001)
+            result = portfolio.backtest(self.close, initial_capital=100000.0)
+            weights = portfolio.target_weights(self.close)
+            self.assertTrue((weights.sum(axis=1) <= 1 + 1e-12).all())
+            expected = _loop_reference(self.close, weights, 0.001, 100000.0)
+            actual = np.array([p['value'] for p in result['chart_data']['equity_curve']])
+            np.testing.assert_allclose(actual, expected, rtol=1e-10)
+            self.assertAlmostEqual(result['performance']['total_return'], round(expected[-1] / 100000.0 - 1, 4))
+            # 停牌与未上市期间不会开仓
+            self.assertTrue((weights.iloc[:80, 2] == 0).all())
+
+    def test_allocation_and_commission(self):
+        free = MACrossPortfolio(5, 20, commission=0.0).backtest(self.close)
+        paid = MACrossPortfolio(5, 20, commission=0.002).backtest(self.close)
+        self.assertEqual(free['performance']['total_commission'], 0.0)
+        self.assertGreater(paid['performance']['total_commission'], 0.0)
+        self.assertLess(paid['performance']['total_return'], free['performance']['total_return'])
+        self.assertEqual(free['performance']['turnover'], paid['performance']['turnover'])
+        self.assertEqual(set(free['symbols']), set(self.close.columns))
+
+        # 波动率分配：低波动股票获得更大的资金比例
+        close = self.close.copy()
+        close.iloc[:, 0] = 20 * np.exp(np.cumsum(np.random.default_rng(9).normal(0, 0.002, len(close))))
+        slots = MACrossPortfolio(5, 20, allocation='volatility').allocate(close)
+        last = slots.iloc[-1]
+        self.assertAlmostEqual(last.sum(), 1.0)
+        self.assertEqual(last.idxmax(), close.columns[0])
+
+    def test_start_date_and_invalid_parameters(self):
+        result = MACrossPortfolio(5, 20).backtest(self.close, start_date='2021-06-01')
+        self.assertEqual(result['chart_data']['dates'][0], '2021-06-01')
+        self.assertEqual(result['chart_data']['equity_curve'][0]['value'], 100000.0 * (
+            1 - 0.0003 * sum(MACrossPortfolio(5, 20).target_weights(self.close).loc['2021-06-01'])))
+        with self.assertRaises(ValueError):
+            MACrossPortfolio(20, 5)
+        with self.assertRaises(ValueError):
+            MACrossPortfolio(allocation='kelly')
+        with self.assertRaises(ValueError):
+            MACrossPortfolio(commission=-0.1)
+
+    def test_close_panel(self):
+        frame = pd.DataFrame({'trade_date': ['20230104', '20230103'], 'close': [11.0, 10.0]})
+        hist = pd.DataFrame({'Close': [20.0, 21.0]}, index=pd.to_datetime(['2023-01-03', '2023-01-05']))
+        panel = close_panel({'A': frame, 'B': hist})
+        self.assertEqual(list(panel.columns), ['A', 'B'])
+        self.assertEqual(list(panel.index.strftime('%Y%m%d')), ['20230103', '20230104', '20230105'])
+        self.assertTrue(np.isnan(panel.loc['2023-01-04', 'B']))
+        self.assertEqual(panel.loc['2023-01-03', 'A'], 10.0)
+
+
+class TestVolumeBreakoutStrategy(unittest.TestCase):
+    cases = [
+        ({}, 100000.0, 0.001),
+        ({'volume_mult': 1.2, 'price_change_threshold': 0.5, 'order_percentage': 1.0}, 10000.0, 0.003),
+        ({'volume_window': 5, 'lookback_days': 1, 'volume_mult': 1.5, 'price_change_threshold': 1.0}, 100000.0, 0.0),
+    ]
+
+    def test_indicators(self):
+        frame = bars_to_ohlcv(make_bars(100))
+        ratio, change = VolumeBreakoutStrategy(volume_window=10, lookback_days=3).indicators(
+            frame['close'], frame['volume'])
+        expected_ratio = frame['volume'] / frame['volume'].rolling(10).mean()
+        np.testing.assert_allclose(ratio.iloc[:, 0], expected_ratio, rtol=1e-10)
+        np.testing.assert_allclose(change.iloc[:, 0], frame['close'].pct_change(3) * 100, rtol=1e-10)
+
+    @unittest.skipUnless(BACKTRADER_AVAILABLE, 'Backtrader 未安装')
+    def test_matches_backtrader(self):
+        """成交日、成交价和总收益与 Backtrader 版策略一致"""
+        trades = 0
+        for seed in range(4):
+            bars = make_bars(seed=seed)
+            for params, capital, commission in self.cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = run_backtest(bars, 'volume_breakout', params, capital, commission)
+                actual = VolumeBreakoutStrategy(commission=commission, **params).backtest(bars, capital)
+                for key in ('buy_signals', 'sell_signals'):
+                    exp, act = expected['chart_data'][key], actual['chart_data'][key]
+                    self.assertEqual([p['date'] for p in act], [p['date'] for p in exp])
+                    # Backtrader 的成交均价按 数量 × 价格 / 数量 计算，可能相差 1 ulp
+                    np.testing.assert_allclose([p['price'] for p in act], [p['price'] for p in exp], rtol=1e-14)
+                self.assertEqual(actual['performance']['total_return'], expected['performance']['total_return'])
+                self.assertEqual(actual['performance']['trades'], len(expected['chart_data']['buy_signals']))
+                trades += actual['performance']['trades']
+        self.assertGreater(trades, 0)
+
+    def test_panel_matches_single_runs(self):
+        frames = {f'{i:06d}.SZ': bars_to_ohlcv(make_bars(seed=i)) for i in range(4)}
+        panels = {field: pd.DataFrame({s: f[field] for s, f in frames.items()}) for field in ('open', 'close', 'volume')}
+        # 停牌与晚上市
+        panels['close'].iloc[200:230, 1] = np.nan
+        panels['volume'].iloc[400:410, 1] = np.nan
+        panels['open'].iloc[:150, 2] = np.nan
+        panels['open'].iloc[300, 3] = np.nan
+        strategy = VolumeBreakoutStrategy(volume_mult=1.5, price_change_threshold=1.0)
+        result = strategy.backtest_panel(panels['open'], panels['close'], panels['volume'], 10000.0)
+        self.assertEqual(list(result.index), list(frames))
+        for symbol in frames:
+            single = strategy.backtest(pd.DataFrame({
+                'open': panels['open'][symbol], 'close': panels['close'][symbol], 'volume': panels['volume'][symbol]
+            }), 10000.0)
+            row = result.loc[symbol]
+            for key in ('total_return', 'max_drawdown', 'trades', 'win_rate'):
+                self.assertEqual(row[key], single['performance'][key], f'{symbol} {key}')
+            self.assertEqual(row['holding'], len(single['chart_data']['buy_signals']) > len(single['chart_data']['sell_signals']))
+
+    def test_invalid_parameters(self):
+        for bad in ({'volume_window': 0}, {'lookback_days': 0}, {'price_change_threshold': -1},
+                    {'order_percentage': 0}, {'order_percentage': 1.5}, {'commission': -0.001}):
+            with self.assertRaises(ValueError):
+                VolumeBreakoutStrategy(**bad)
+        close = make_panel(400, 5, 3, '2021-01-04')
+        with self.assertRaises(ValueError):
+            VolumeBreakoutStrategy().backtest_panel(close, close, close.iloc[:, :2])
+
+
+class TestPortfolioRoute(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        self.client = app.test_client()
+        close = make_panel(400, 3, 3, '2021-01-04')
+        self.frames = {
+            symbol: pd.DataFrame({'trade_date': close.index.strftime('%Y%m%d'), 'close': close[symbol].values})
+            for symbol in close.columns
+        }
+
+    @patch('quant_backend.services.akshare_service.get_stock_historical_data_batch')
+    def test_portfolio_backtest(self, mock_batch):
+        mock_batch.return_value = self.frames
+        resp = self.client.post('/api/strategy/portfolio_backtest', json={
+            'symbols': list(self.frames) + ['600000.SH'], 'start_date': '2021-03-01', 'end_date': '2022-06-01',
+            'short_window': 5, 'long_window': 20, 'allocation': 'volatility'
+        })
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data['missing_symbols'], ['600000.SH'])
+        self.assertEqual(set(data['symbols']), set(self.frames))
+        self.assertEqual(data['chart_data']['dates'][0], '2021-03-01')
+
+    @patch('quant_backend.services.akshare_service.get_stock_historical_data_batch')
+    def test_portfolio_backtest_invalid(self, mock_batch):
+        body = {'symbols': list(self.frames), 'start_date': '2021-03-01', 'end_date': '2022-06-01'}
+        for bad in ({'symbols': []}, {'allocation': 'kelly'}, {'short_window': 30, 'long_window': 10}):
+            resp = self.client.post('/api/strategy/portfolio_backtest', json=dict(body, **bad))
+            self.assertEqual(resp.status_code, 400)
+        mock_batch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.api.strategy_routes import strategy_bp
+from quant_backend.services import strategy_sweep
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.services.strategy_sweep import sweep_ma_cross, window_range
+from quant_backend.tests.helpers import make_bars
+
+
+def _make_bars():
+    return make_bars(300, 5, '2022-01-03', volatility=0.02)
+
+
+class TestStrategySweep(unittest.TestCase):
+    def setUp(self):
+        self.bars = _make_bars()
+        # yfinance 风格的首字母大写列名
+        self.hist = bars_to_ohlcv(self.bars).rename(columns=str.capitalize)
+
+    def test_matches_single_backtests(self):
+        """网格中每个组合的绩效与 MACrossStrategy.backtest 完全一致"""
+        result = sweep_ma_cross(self.hist, [3, 5, 10, 20], {'start': 10, 'stop': 50, 'step': 10})
+        self.assertEqual(result['short_windows'], [3, 5, 10, 20])
+        self.assertEqual(result['long_windows'], [10, 20, 30, 40, 50])
+        self.assertEqual(result['combinations'], 17)
+        metrics = result['metrics']
+        for i, short in enumerate(result['short_windows']):
+            for j, long in enumerate(result['long_windows']):
+                if short >= long:
+                    self.assertIsNone(metrics['total_return'][i][j])
+                    continue
+                expected = MACrossStrategy(short, long).backtest(self.hist)
+                for name in ('total_return', 'annual_return', 'max_drawdown'):
+                    self.assertEqual(metrics[name][i][j], expected['performance'][name], (short, long, name))
+                self.assertEqual(metrics['trades'][i][j], len(expected['chart_data']['buy_signals']))
+        best = result['best']
+        i, j = result['short_windows'].index(best['short_window']), result['long_windows'].index(best['long_window'])
+        self.assertEqual(best['performance']['total_return'], metrics['total_return'][i][j])
+        self.assertEqual(best['performance']['total_return'],
+                         max(v for row in metrics['total_return'] for v in row if v is not None))
+
+    def test_blocks_and_bars_input(self):
+        expected = sweep_ma_cross(self.hist, [2, 4, 6], [8, 16])
+        with patch.object(strategy_sweep, 'SWEEP_BLOCK_ELEMENTS', len(self.hist)):
+            blocked = sweep_ma_cross(self.hist, [2, 4, 6], [8, 16])
+        self.assertEqual(blocked, expected)
+        self.assertEqual(sweep_ma_cross(self.bars, [2, 4, 6], [8, 16]), expected)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(window_range({'start': 5, 'stop': 20, 'step': 5}), [5, 10, 15, 20])
+        self.assertEqual(window_range([10, 5, 10]), [5, 10])
+        for spec in ({'start': 5}, {'start': 10, 'stop': 5}, [0, 5], [1.5], 'abc', None):
+            with self.assertRaises(ValueError):
+                window_range(spec)
+        with self.assertRaises(ValueError):
+            sweep_ma_cross(self.hist, [20, 30], [5, 10])
+        with patch.object(strategy_sweep, 'MAX_SWEEP_COMBINATIONS', 3):
+            with self.assertRaises(ValueError):
+                sweep_ma_cross(self.hist, [2, 3], [5, 6])
+
+
+class TestSweepRoute(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        self.client = app.test_client()
+        self.bars = _make_bars()
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_sweep(self, mock_bars):
+        mock_bars.return_value = self.bars
+        resp = self.client.post('/api/strategy/sweep', json={
+            'symbol': '000001.SZ', 'start_date': '2022-03-01', 'end_date': '2023-02-01',
+            'short_windows': {'start': 5, 'stop': 15, 'step': 5}, 'long_windows': [20, 40]
+        })
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data['combinations'], 6)
+        self.assertEqual(len(data['metrics']['max_drawdown']), 3)
+        self.assertEqual(len(data['metrics']['max_drawdown'][0]), 2)
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_sweep_invalid(self, mock_bars):
+        mock_bars.return_value = self.bars
+        body = {'symbol': '000001.SZ', 'start_date': '2022-03-01', 'end_date': '2023-02-01'}
+        resp = self.client.post('/api/strategy/sweep', json=body)
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/api/strategy/sweep', json=dict(body, short_windows={'start': 5}, long_windows=[20]))
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/api/strategy/sweep', json=dict(body, short_windows=[30], long_windows=[20]))
+        self.assertEqual(resp.status_code, 400)
+        mock_bars.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,9 @@ import os
 
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.technical_indicators import TechnicalIndicators
+from unittest import mock
+import utils.technical_indicators as technical_indicators
+from utils.technical_indicators import RollingExtrema, TechnicalIndicators, _rolling_extremum
 
 class TestTechnicalIndicators(unittest.TestCase):
     """技术指标计算工具类测试"""
@@ -116,6 +118,51 @@ class TestTechnicalIndicators(unittest.TestCase):
         obv_nan = TechnicalIndicators.calculate_obv(df_nan)
         self.assertEqual(len(obv_nan), len(df_nan))
         self.assertTrue(obv_nan.notna().all())
+
+    def test_obv_matches_loop_reference(self):
+        """向量化OBV与逐行循环参考实现结果一致（含收盘价/成交量缺失、平盘）"""
+        from quant_backend.benchmarks.bench_indicators import make_bars, obv_loop_reference
+        df = make_bars(2000, nan_ratio=0.05, seed=1)
+        df.iloc[10:13, 0] = 100.0
+        df.iloc[0, 0] = np.nan
+        expected = obv_loop_reference(df)
+        obv = TechnicalIndicators.calculate_obv(df)
+        np.testing.assert_allclose(obv.to_numpy(), expected.to_numpy(dtype=np.float64))
+        self.assertTrue(obv.index.equals(df.index))
+        # 单根K线
+        self.assertEqual(TechnicalIndicators.calculate_obv(df.iloc[:1]).tolist(), [0.0])
+    
+    def test_ma_ema_matrix_match_single_window(self):
+        """多窗口矩阵与逐窗口计算结果一致（含缺失值、窗口大于序列长度）"""
+        windows = [1, 5, 20, 60, 200]
+        close = self.close.copy()
+        close.iloc[[3, 50]] = np.nan
+        df = pd.DataFrame({'close': close, 'volume': self.volume})
+        ma = TechnicalIndicators.calculate_ma_matrix(close, windows)
+        pma = TechnicalIndicators.calculate_pma_matrix(df, windows)
+        vma = TechnicalIndicators.calculate_vma_matrix(df, windows)
+        ema = TechnicalIndicators.calculate_ema_matrix(self.close, windows)
+        self.assertEqual(ma.shape, (len(close), len(windows)))
+        self.assertEqual(list(ma.columns), windows)
+        for w in windows:
+            pd.testing.assert_series_equal(ma[w], TechnicalIndicators.calculate_ma(close, w), check_names=False)
+            pd.testing.assert_series_equal(pma[w], TechnicalIndicators.calculate_pma(df, w), check_names=False)
+            pd.testing.assert_series_equal(vma[w], TechnicalIndicators.calculate_vma(df, w), check_names=False)
+            pd.testing.assert_series_equal(ema[w], TechnicalIndicators.calculate_ema(self.close, w), check_names=False)
+        # 中间有缺失值时 EMA 与 pandas 的衰减规则一致
+        ema_nan = TechnicalIndicators.calculate_ema_matrix(close, [12])
+        pd.testing.assert_series_equal(ema_nan[12], TechnicalIndicators.calculate_ema(close, 12), check_names=False)
+        # 窗口 1 即原序列（含前导缺失值），单独处理后不影响其他窗口
+        lead = self.close.copy()
+        lead.iloc[:3] = np.nan
+        ema_lead = TechnicalIndicators.calculate_ema_matrix(lead, [1, 12])
+        pd.testing.assert_series_equal(ema_lead[1], lead, check_names=False)
+        pd.testing.assert_series_equal(ema_lead[12], TechnicalIndicators.calculate_ema(lead, 12), check_names=False)
+        pd.testing.assert_series_equal(TechnicalIndicators.calculate_ema_matrix(lead, [1])[1], lead, check_names=False)
+        # 边界
+        self.assertTrue(TechnicalIndicators.calculate_pma_matrix(pd.DataFrame({'volume': [1.0]}), [5]).isna().all().all())
+        with self.assertRaises(ValueError):
+            TechnicalIndicators.calculate_ma_matrix(close, [0, 5])
     
     def test_ichimoku(self):
         """测试一目均衡图计算"""
@@ -131,6 +178,58 @@ class TestTechnicalIndicators(unittest.TestCase):
         self.assertTrue(span_a.dropna().size > 0)
         self.assertTrue(span_b.dropna().size > 0)
     
+    def test_ichimoku_matches_rolling_reference(self):
+        """一目均衡图各线与 pandas rolling 极值写法一致"""
+        high = self.high.copy()
+        high.iloc[[7, 40]] = np.nan
+        conversion, base, span_a, span_b, lagging = TechnicalIndicators.calculate_ichimoku(high, self.low)
+        ref_conversion = (high.rolling(9).max() + self.low.rolling(9).min()) / 2
+        ref_base = (high.rolling(26).max() + self.low.rolling(26).min()) / 2
+        ref_span_b = ((high.rolling(52).max() + self.low.rolling(52).min()) / 2).shift(26)
+        pd.testing.assert_series_equal(conversion, ref_conversion, check_names=False)
+        pd.testing.assert_series_equal(base, ref_base, check_names=False)
+        pd.testing.assert_series_equal(span_a, ((ref_conversion + ref_base) / 2).shift(26), check_names=False)
+        pd.testing.assert_series_equal(span_b, ref_span_b, check_names=False)
+        pd.testing.assert_series_equal(lagging, self.low.shift(-26), check_names=False)
+
+    def test_rolling_extremum_matches_pandas(self):
+        """分块滚动极值与 pandas rolling max/min 逐值一致（含缺失值、min_periods、窗口大于序列长度）"""
+        rng = np.random.default_rng(3)
+        values = rng.normal(size=257)
+        values[rng.random(len(values)) < 0.1] = np.nan
+        series = pd.Series(values)
+        for window in [1, 2, 7, 64, 300]:
+            for min_periods in [None, 1, min(3, window)]:
+                for mode in ['max', 'min']:
+                    expected = getattr(series.rolling(window, min_periods=min_periods), mode)()
+                    np.testing.assert_array_equal(_rolling_extremum(values, window, mode, min_periods), expected.to_numpy())
+        # 二维时沿第 0 轴逐列计算
+        panel = rng.normal(size=(40, 3))
+        np.testing.assert_array_equal(_rolling_extremum(panel, 5, 'min'), pd.DataFrame(panel).rolling(5).min().to_numpy())
+        self.assertEqual(len(_rolling_extremum(np.array([]), 5)), 0)
+        with self.assertRaises(ValueError):
+            _rolling_extremum(values, 0)
+
+    def test_shared_extrema_and_donchian(self):
+        """随机指标、一目均衡图、唐奇安通道共享同一 RollingExtrema 时相同窗口的极值只计算一次"""
+        upper, middle, lower = TechnicalIndicators.calculate_donchian(self.high, self.low, 20)
+        pd.testing.assert_series_equal(upper, self.high.rolling(20).max(), check_names=False)
+        pd.testing.assert_series_equal(lower, self.low.rolling(20).min(), check_names=False)
+        pd.testing.assert_series_equal(middle, (upper + lower) / 2, check_names=False)
+
+        expected_k, expected_d = TechnicalIndicators.calculate_stochastic(self.high, self.low, self.close, k_window=9)
+        with mock.patch.object(technical_indicators, '_rolling_extremum', wraps=_rolling_extremum) as kernel:
+            extrema = RollingExtrema(self.high, self.low)
+            k, d = TechnicalIndicators.calculate_stochastic(self.high, self.low, self.close, k_window=9, extrema=extrema)
+            TechnicalIndicators.calculate_ichimoku(self.high, self.low, extrema=extrema)
+            TechnicalIndicators.calculate_donchian(self.high, self.low, 26, extrema=extrema)
+        # 窗口 9/26/52 的最高、最低各一次
+        self.assertEqual(kernel.call_count, 6)
+        pd.testing.assert_series_equal(k, expected_k)
+        pd.testing.assert_series_equal(d, expected_d)
+        with self.assertRaises(ValueError):
+            TechnicalIndicators.calculate_donchian(self.high.iloc[:10], self.low.iloc[:10], extrema=extrema)
+    
     def test_vma(self):
         """测试VMA计算"""
         df = pd.DataFrame({'volume': self.volume})
@@ -230,5 +329,36 @@ class TestTechnicalIndicators(unittest.TestCase):
         self.assertEqual(len(pma_nan), len(df_nan))
         self.assertTrue(np.isclose(pma_nan.iloc[5], df_nan['close'].iloc[1:6].mean(), equal_nan=True))
 
+    def test_float32_mode(self):
+        """float32 输入得到 float32 结果，与 float64 计算结果的相对误差在 1e-4 以内"""
+        df = pd.DataFrame({'high': self.high, 'low': self.low, 'close': self.close, 'volume': self.volume})
+        compact = df[['high', 'low', 'close']].astype(np.float32).assign(volume=self.volume.astype(np.int64))
+        T = TechnicalIndicators
+        cases = [
+            (lambda d: T.calculate_ema(d['close'], 12)),
+            (lambda d: T.calculate_rsi(d['close'])),
+            (lambda d: T.calculate_macd(d['close'])),
+            (lambda d: T.calculate_bollinger_bands(d['close'])),
+            (lambda d: T.calculate_atr(d['high'], d['low'], d['close'])),
+            (lambda d: T.calculate_stochastic(d['high'], d['low'], d['close'])),
+            (lambda d: T.calculate_ichimoku(d['high'], d['low'])),
+            (lambda d: T.calculate_obv(d)),
+            (lambda d: T.calculate_mfi(d)),
+            (lambda d: T.calculate_vr(d)),
+            (lambda d: T.calculate_pma_matrix(d, [5, 20])),
+        ]
+        for fn in cases:
+            expected, actual = fn(df), fn(compact)
+            if not isinstance(expected, tuple):
+                expected, actual = (expected,), (actual,)
+            for e, a in zip(expected, actual):
+                self.assertEqual(a.to_numpy().dtype, np.float32)
+                e, a = e.to_numpy(dtype=np.float64), a.to_numpy(dtype=np.float64)
+                np.testing.assert_array_equal(np.isnan(a), np.isnan(e))
+                mask = ~np.isnan(e)
+                self.assertLess(np.max(np.abs(a[mask] - e[mask]) / np.maximum(np.abs(e[mask]), 1.0)), 1e-4)
+        # 混合精度（含 float64 输入）时仍按 float64 计算
+        self.assertEqual(T.calculate_atr(df['high'].astype(np.float32), df['low'], df['close']).dtype, np.float64)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -95,6 +95,85 @@ class TestTushareService(unittest.TestCase):
         df = tushare_service.get_stock_historical_data('000001.SZ', 'daily', '20230101', '20230131')
         self.assertIsNone(df)
 
+    @patch.dict(os.environ, {'TUSHARE_TOKEN': 'FAKE_TOKEN'})
+    @patch('tushare.pro_api')
+    def test_get_stock_historical_data_paginated(self, mock_pro_api):
+        import pandas as pd
+        def fake_daily(ts_code, start_date, end_date, fields):
+            dates = pd.bdate_range(start_date, end_date)
+            return pd.DataFrame({'ts_code': ts_code, 'trade_date': dates.strftime('%Y%m%d'), 'close': 10.0})
+        mock_pro = MagicMock()
+        mock_pro.daily.side_effect = fake_daily
+        mock_pro_api.return_value = mock_pro
+        import importlib
+        importlib.reload(tushare_service)
+        with patch.dict(tushare_service.ROW_LIMITS, {'daily': 100}):
+            df = tushare_service.get_stock_historical_data('000001.SZ', 'daily', '20200101', '20201231')
+        self.assertGreater(mock_pro.daily.call_count, 1)
+        self.assertEqual(len(df), len(pd.bdate_range('20200101', '20201231')))
+        self.assertFalse(df['trade_date'].duplicated().any())
+        self.assertTrue(df['trade_date'].is_monotonic_increasing)
+
+    @patch.dict(os.environ, {'TUSHARE_TOKEN': 'FAKE_TOKEN'})
+    @patch('tushare.pro_api')
+    def test_get_stock_historical_data_bulk(self, mock_pro_api):
+        import pandas as pd
+        def fake_daily(ts_code, start_date, end_date, fields):
+            dates = pd.bdate_range(start_date, end_date).strftime('%Y%m%d')
+            rows = [(code, d) for code in ts_code.split(',') for d in dates]
+            return pd.DataFrame(rows, columns=['ts_code', 'trade_date']).assign(close=10.0)
+        mock_pro = MagicMock()
+        mock_pro.daily.side_effect = fake_daily
+        mock_pro_api.return_value = mock_pro
+        import importlib
+        importlib.reload(tushare_service)
+        codes = [f'{i:06d}.SZ' for i in range(1, 251)]
+        result = tushare_service.get_stock_historical_data_bulk(codes, 'daily', '20230101', '20230131')
+        self.assertEqual(len(result), 250)
+        self.assertEqual(len(result['000001.SZ']), len(pd.bdate_range('20230101', '20230131')))
+        # 250 只股票按每次100只分组，共3次调用
+        self.assertEqual(mock_pro.daily.call_count, 3)
+
+    @patch.dict(os.environ, {'TUSHARE_TOKEN': 'FAKE_TOKEN'})
+    @patch('tushare.pro_api')
+    def test_get_market_data_by_date_range(self, mock_pro_api):
+        import pandas as pd
+        mock_pro = MagicMock()
+        mock_pro.trade_cal.return_value = pd.DataFrame({'cal_date': ['20230103', '20230104', '20230105']})
+        mock_pro.daily.side_effect = lambda trade_date, fields: pd.DataFrame({
+            'ts_code': ['000001.SZ', '600000.SH'], 'trade_date': [trade_date, trade_date], 'close': [10.0, 7.0]
+        })
+        mock_pro_api.return_value = mock_pro
+        import importlib
+        importlib.reload(tushare_service)
+        df = tushare_service.get_market_data_by_date_range('20230101', '20230105')
+        self.assertEqual(mock_pro.daily.call_count, 3)
+        self.assertEqual(len(df), 6)
+
+    @patch.dict(os.environ, {'TUSHARE_TOKEN': 'FAKE_TOKEN'})
+    @patch('tushare.pro_api')
+    def test_get_market_data_by_trade_date_truncated(self, mock_pro_api):
+        import pandas as pd
+        codes = [f'{i:06d}.SZ' for i in range(1, 251)]
+        def fake_daily(fields, trade_date=None, ts_code=None, start_date=None, end_date=None):
+            selected = codes if ts_code is None else ts_code.split(',')
+            return pd.DataFrame({'ts_code': selected, 'trade_date': trade_date or start_date, 'close': 10.0})
+        mock_pro = MagicMock()
+        mock_pro.daily.side_effect = fake_daily
+        mock_pro.stock_basic.return_value = pd.DataFrame({'ts_code': codes, 'name': 'x'})
+        mock_pro_api.return_value = mock_pro
+        import importlib
+        importlib.reload(tushare_service)
+        # 全市场一次调用恰好达到行数上限，视为被截断，按每组 100 只重新查询
+        with patch.dict(tushare_service.ROW_LIMITS, {'daily': 250}):
+            df = tushare_service.get_market_data_by_trade_date('20230103')
+        self.assertEqual(mock_pro.daily.call_count, 1 + 3)
+        self.assertEqual(sorted(df['ts_code']), codes)
+        # 股票列表不可用时不返回截断的数据
+        mock_pro.stock_basic.side_effect = Exception('network')
+        with patch.dict(tushare_service.ROW_LIMITS, {'daily': 250}):
+            self.assertIsNone(tushare_service.get_market_data_by_trade_date('20230103'))
+
     def test_get_stock_historical_data_invalid_period(self):
         import importlib
         importlib.reload(tushare_service)
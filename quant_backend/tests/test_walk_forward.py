@@ -0,0 +1,148 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from quant_backend.api import strategy_routes
+from quant_backend.api.strategy_routes import strategy_bp
+from quant_backend.services import walk_forward as walk_forward_module
+from quant_backend.services.bar_file import bars_to_ohlcv
+from quant_backend.services.strategy_service import MACrossStrategy
+from quant_backend.services.walk_forward import walk_forward, walk_forward_folds
+from quant_backend.tests.helpers import make_bars
+
+try:
+    import backtrader  # noqa: F401
+    BACKTRADER_AVAILABLE = True
+except ImportError:
+    BACKTRADER_AVAILABLE = False
+
+
+def _make_bars(n=600, seed=2):
+    return make_bars(n, seed, '2019-01-02', volatility=0.02)
+
+
+class TestWalkForward(unittest.TestCase):
+    def setUp(self):
+        self.bars = _make_bars()
+        self.grid = {'short_window': {'start': 2, 'stop': 10, 'step': 2}, 'long_window': [15, 20, 30]}
+
+    def test_folds(self):
+        folds = walk_forward_folds(600, 4)
+        self.assertEqual(folds[0], (0, 255, 340))
+        self.assertEqual(folds[-1], (255, 510, 600))
+        # 各折样本外区间首尾相接
+        for prev, cur in zip(folds, folds[1:]):
+            self.assertEqual(prev[2], cur[1])
+        self.assertEqual(walk_forward_folds(100, 2, in_sample=40, out_of_sample=20), [(0, 40, 60), (20, 60, 100)])
+        with self.assertRaises(ValueError):
+            walk_forward_folds(100, 5, in_sample=98)
+
+    def test_vectorized_folds_match_direct_runs(self):
+        """每折最优参数为样本内全部组合中收益最高者，样本外收益与直接回测一致"""
+        result = walk_forward(self.bars, self.grid, n_folds=3, initial_capital=100.0, max_workers=1)
+        self.assertEqual(result['combinations'], 15)
+        folds = walk_forward_folds(len(self.bars), 3)
+        frame = bars_to_ohlcv(self.bars)
+        stitched = []
+        for (start, oos_start, oos_end), fold in zip(folds, result['folds']):
+            scores = {}
+            for short in (2, 4, 6, 8, 10):
+                for long in (15, 20, 30):
+                    backtest = MACrossStrategy(short, long).backtest(frame.iloc[start:oos_start], 100.0)
+                    scores[(short, long)] = backtest['performance']['total_return']
+            best = fold['best_params']
+            self.assertEqual(scores[(best['short_window'], best['long_window'])], max(scores.values()))
+            strategy = MACrossStrategy(best['short_window'], best['long_window'])
+            run = strategy.backtest(frame.iloc[start:oos_end], 100.0)
+            equity = np.array([p['value'] for p in run['chart_data']['equity_curve']])
+            stitched.append(equity[oos_start - start:] / equity[oos_start - start - 1:-1] - 1)
+        expected = 100.0 * np.cumprod(1 + np.concatenate(stitched))
+        actual = np.array([p['value'] for p in result['equity_curve']])
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+        self.assertEqual(result['equity_curve'][0]['date'], result['folds'][0]['out_of_sample'][0])
+
+    def test_process_pool_matches_serial(self):
+        serial = walk_forward(self.bars, self.grid, n_folds=3, metric='max_drawdown', max_workers=1)
+        pooled = walk_forward(self.bars, self.grid, n_folds=3, metric='max_drawdown', max_workers=2)
+        self.assertEqual(pooled, serial)
+
+    @unittest.skipUnless(BACKTRADER_AVAILABLE, 'Backtrader 未安装')
+    def test_backtrader_engine(self):
+        grid = {'short_ma': [5, 10], 'long_ma': [20, 30]}
+        pooled = walk_forward(self.bars, grid, engine='backtrader', n_folds=2, max_workers=2)
+        self.assertEqual(pooled['combinations'], 4)
+        self.assertEqual(len(pooled['folds']), 2)
+        self.assertEqual(set(pooled['folds'][0]['best_params']), {'short_ma', 'long_ma'})
+        serial = walk_forward(self.bars, grid, engine='backtrader', n_folds=2, max_workers=1)
+        self.assertEqual(pooled, serial)
+
+    @unittest.skipUnless(BACKTRADER_AVAILABLE, 'Backtrader 未安装')
+    def test_event_engine_matches_backtrader(self):
+        grid = {'short_ma': [5, 10], 'long_ma': [20, 30]}
+        expected = walk_forward(self.bars, grid, engine='backtrader', n_folds=2, max_workers=1)
+        actual = walk_forward(self.bars, grid, engine='event', n_folds=2, max_workers=1)
+        self.assertEqual(actual['engine'], 'event')
+        self.assertEqual(actual['folds'], expected['folds'])
+        np.testing.assert_allclose([p['value'] for p in actual['equity_curve']],
+                                   [p['value'] for p in expected['equity_curve']], rtol=1e-12)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            walk_forward(self.bars, self.grid, engine='zipline')
+        with self.assertRaises(ValueError):
+            walk_forward(self.bars, self.grid, metric='sharpe_ratio')
+        with self.assertRaises(ValueError):
+            walk_forward(self.bars, {'short_window': [5]}, max_workers=1)
+        with self.assertRaises(ValueError):
+            walk_forward(self.bars, {'short_ma': []}, engine='backtrader', max_workers=1)
+        with patch.object(walk_forward_module, 'MAX_WALK_FORWARD_TASKS', 10):
+            with self.assertRaises(ValueError):
+                walk_forward(self.bars, {'short_ma': [5, 10], 'long_ma': [20, 30]}, engine='backtrader', n_folds=3)
+
+
+class TestWalkForwardRoute(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(strategy_bp)
+        self.client = app.test_client()
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_walk_forward(self, mock_bars):
+        mock_bars.return_value = _make_bars()
+        # 路由限制每个请求的工作进程数，不使用按 CPU 核数确定的 DEFAULT_WORKERS
+        with patch.object(strategy_routes, 'WALK_FORWARD_ROUTE_WORKERS', 1), \
+                patch.object(strategy_routes, 'walk_forward', wraps=walk_forward) as mock_walk_forward:
+            resp = self.client.post('/api/strategy/walk_forward', json={
+                'symbol': '000001.SZ', 'start_date': '2019-01-02', 'end_date': '2021-06-30',
+                'param_grid': {'short_window': [5, 10], 'long_window': [20, 40]}, 'n_folds': 4
+            })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_walk_forward.call_args.kwargs['max_workers'], 1)
+        data = resp.get_json()
+        self.assertEqual(len(data['folds']), 4)
+        self.assertIn('total_return', data['performance'])
+
+    @patch('quant_backend.services.akshare_service.get_stock_bars')
+    def test_walk_forward_invalid(self, mock_bars):
+        mock_bars.return_value = _make_bars()
+        body = {'symbol': '000001.SZ', 'start_date': '2019-01-02', 'end_date': '2021-06-30',
+                'param_grid': {'short_window': [5, 10], 'long_window': [20, 40]}}
+        resp = self.client.post('/api/strategy/walk_forward', json=dict(body, engine='zipline'))
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/api/strategy/walk_forward', json=dict(body, n_folds=0))
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/api/strategy/walk_forward', json=dict(body, param_grid=[5, 10]))
+        self.assertEqual(resp.status_code, 400)
+        mock_bars.reset_mock()
+        resp = self.client.post('/api/strategy/walk_forward', json=dict(body, engine='event', strategy_name='rsi_reversal'))
+        self.assertEqual(resp.status_code, 400)
+        mock_bars.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,567 @@
+"""
+增量（流式）技术指标
+
+TechnicalIndicators 中的函数每次都对全部历史重新计算；本模块提供对应的有状态版本，
+每来一根新K线只做 O(1)（滚动极值为均摊 O(1)）的更新，用于盘中实时推送指标。
+
+- 滚动均值/求和/方差采用与 pandas rolling 相同的在线算法（Kahan 补偿求和、Welford 方差、
+  窗口内数值全部相同时直接返回该值），因此与批量函数的结果在浮点舍入误差内一致。
+- 每个指标都可以用 seed() 从历史数据初始化状态：递推型指标（EMA/MACD/OBV）直接取批量函数的
+  最后结果，窗口型指标只回放最近的窗口数据。
+"""
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.utils.technical_indicators import TechnicalIndicators
+
+NAN = float('nan')
+
+
+def _to_float(value: Any) -> float:
+    if value is None:
+        return NAN
+    return float(value)
+
+
+def _div(a: float, b: float) -> float:
+    """与 numpy 一致的除法：除以 0 得到 ±inf，0/0 得到 NaN"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _clip(value: float, lower: float, upper: float) -> float:
+    if math.isnan(value):
+        return value
+    return min(max(value, lower), upper)
+
+
+class RollingWindow:
+    """
+    固定长度滚动窗口统计量（均值、求和、样本方差）
+
+    窗口按位置计数，NaN 占据窗口位置但不计入有效观测数；有效观测数不足 min_periods 时结果为 NaN。
+    """
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        """
+        Args:
+            window: 窗口大小
+            min_periods: 最少有效观测数，默认等于 window（与 pandas rolling 默认一致）
+        """
+        if window < 1:
+            raise ValueError('window 必须为正整数')
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self._values = deque()
+        self.nobs = 0
+        self._sum = 0.0
+        self._sum_comp = 0.0
+        self._neg_ct = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._mean_comp = 0.0
+        self._same_ct = 0
+        self._prev = NAN
+
+    def push(self, value: float) -> None:
+        """加入一个新值，超出窗口的最旧值被移出"""
+        self._values.append(value)
+        if len(self._values) > self.window:
+            self._remove(self._values.popleft())
+        self._add(value)
+
+    def _add(self, val: float) -> None:
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self._sum_comp
+        t = self._sum + y
+        self._sum_comp = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, val) < 0:
+            self._neg_ct += 1
+        if val == self._prev:
+            self._same_ct += 1
+        else:
+            self._same_ct = 1
+        self._prev = val
+        prev_mean = self._mean - self._mean_comp
+        y = val - self._mean_comp
+        t = y - self._mean
+        self._mean_comp = t + self._mean - y
+        self._mean += t / self.nobs
+        self._ssqdm += (val - prev_mean) * (val - self._mean)
+
+    def _remove(self, val: float) -> None:
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self._sum_comp
+        t = self._sum + y
+        self._sum_comp = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, val) < 0:
+            self._neg_ct -= 1
+        if self.nobs:
+            prev_mean = self._mean - self._mean_comp
+            y = val - self._mean_comp
+            t = y - self._mean
+            self._mean_comp = t + self._mean - y
+            self._mean -= t / self.nobs
+            self._ssqdm -= (val - prev_mean) * (val - self._mean)
+        else:
+            self._mean = 0.0
+            self._ssqdm = 0.0
+            self._mean_comp = 0.0
+
+    def mean(self) -> float:
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return NAN
+        if self._same_ct >= self.nobs:
+            return self._prev
+        result = self._sum / self.nobs
+        if self._neg_ct == 0 and result < 0:
+            return 0.0
+        if self._neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def sum(self) -> float:
+        if self.nobs == 0 and self.min_periods == 0:
+            return 0.0
+        if self.nobs < self.min_periods:
+            return NAN
+        if self._same_ct >= self.nobs:
+            return self._prev * self.nobs
+        return self._sum
+
+    def var(self, ddof: int = 1) -> float:
+        if self.nobs < self.min_periods or self.nobs <= ddof:
+            return NAN
+        if self.nobs == 1 or self._same_ct >= self.nobs:
+            return 0.0
+        return max(self._ssqdm / (self.nobs - ddof), 0.0)
+
+    def std(self, ddof: int = 1) -> float:
+        return math.sqrt(self.var(ddof))
+
+
+class RollingExtremum:
+    """
+    单调队列实现的滚动最大/最小值，每次更新均摊 O(1)
+
+    与 pandas rolling().max()/min() 一致：窗口内有效观测数不足 min_periods 时结果为 NaN。
+    """
+
+    def __init__(self, window: int, mode: str = 'max', min_periods: Optional[int] = None):
+        """
+        Args:
+            window: 窗口大小
+            mode: 'max' 或 'min'
+            min_periods: 最少有效观测数，默认等于 window
+        """
+        if window < 1:
+            raise ValueError('window 必须为正整数')
+        if mode not in ('max', 'min'):
+            raise ValueError(f'不支持的 mode: {mode}')
+        self.window = window
+        self.mode = mode
+        self.min_periods = window if min_periods is None else min_periods
+        self._deque = deque()  # (位置, 值)，值单调
+        self._nans = deque()   # 窗口内 NaN 的位置
+        self._i = -1
+
+    def push(self, value: float) -> float:
+        """加入一个新值并返回当前窗口的极值"""
+        self._i += 1
+        oldest = self._i - self.window
+        while self._deque and self._deque[0][0] <= oldest:
+            self._deque.popleft()
+        while self._nans and self._nans[0] <= oldest:
+            self._nans.popleft()
+        if value != value:
+            self._nans.append(self._i)
+        elif self.mode == 'max':
+            while self._deque and self._deque[-1][1] <= value:
+                self._deque.pop()
+            self._deque.append((self._i, value))
+        else:
+            while self._deque and self._deque[-1][1] >= value:
+                self._deque.pop()
+            self._deque.append((self._i, value))
+        return self.value
+
+    @property
+    def value(self) -> float:
+        nobs = min(self._i + 1, self.window) - len(self._nans)
+        if not self._deque or nobs < self.min_periods:
+            return NAN
+        return self._deque[0][1]
+
+
+class IncrementalIndicator(ABC):
+    """
+    增量指标基类
+
+    子类实现 update(*values) 与 seed(data)，inputs 声明 update 的参数依次对应的K线字段，
+    lookback 为窗口型指标回放历史时需要的K线数量。
+    """
+
+    inputs: Tuple[str, ...] = ('close',)
+    lookback: int = 0
+
+    def __init__(self):
+        self.value = NAN
+
+    @abstractmethod
+    def update(self, *values):
+        """用一根K线的 inputs 各字段更新状态，返回更新后的指标值"""
+
+    def reset(self) -> None:
+        """清空状态"""
+        self.__init__(**self._params())
+
+    def _params(self) -> dict:
+        return {}
+
+    def update_bar(self, bar: Mapping[str, Any]):
+        """用一根K线（含 inputs 中各字段的字典）更新"""
+        return self.update(*(bar.get(field) for field in self.inputs))
+
+    def update_many(self, *columns) -> np.ndarray:
+        """
+        用一小批K线依次更新。
+        Args:
+            columns: 与 inputs 一一对应的等长序列
+        Returns:
+            每根K线更新后的指标值数组（多输出指标为二维数组）
+        """
+        results = [self.update(*row) for row in zip(*columns)]
+        return np.array(results, dtype=np.float64)
+
+    def _columns(self, data: Union[pd.DataFrame, pd.Series]) -> Tuple[np.ndarray, ...]:
+        if isinstance(data, pd.Series):
+            if len(self.inputs) != 1:
+                raise ValueError(f'{type(self).__name__} 需要包含 {", ".join(self.inputs)} 列的 DataFrame')
+            return (data.to_numpy(dtype=np.float64, na_value=np.nan),)
+        return tuple(data[field].to_numpy(dtype=np.float64, na_value=np.nan) for field in self.inputs)
+
+    def seed(self, data: Union[pd.DataFrame, pd.Series]):
+        """
+        用历史数据初始化状态（默认回放最近 lookback 根K线），返回最后一根K线的指标值。
+        Args:
+            data: 单输入指标可传 Series，否则传包含 inputs 各列的 DataFrame
+        """
+        self.reset()
+        columns = self._columns(data)
+        tail = [c[-self.lookback:] for c in columns] if self.lookback else columns
+        for row in zip(*tail):
+            self.update(*row)
+        return self.value
+
+
+class IncrementalSMA(IncrementalIndicator):
+    """简单移动平均，对应 TechnicalIndicators.calculate_ma（窗口不满时为 NaN）"""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        super().__init__()
+        self.window = window
+        self.min_periods = min_periods
+        self.lookback = window
+        self._roll = RollingWindow(window, min_periods)
+
+    def _params(self) -> dict:
+        return {'window': self.window, 'min_periods': self.min_periods}
+
+    def update(self, value) -> float:
+        self._roll.push(_to_float(value))
+        self.value = self._roll.mean()
+        return self.value
+
+
+class IncrementalPMA(IncrementalSMA):
+    """价格移动平均，对应 TechnicalIndicators.calculate_pma（min_periods=1）"""
+
+    def __init__(self, window: int = 5):
+        super().__init__(window, min_periods=1)
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+
+class IncrementalVMA(IncrementalPMA):
+    """成交量移动平均，对应 TechnicalIndicators.calculate_vma（min_periods=1）"""
+
+    inputs = ('volume',)
+
+
+class IncrementalEMA(IncrementalIndicator):
+    """
+    指数移动平均，对应 TechnicalIndicators.calculate_ema（ewm(span, adjust=False)）
+    缺失值处理与 pandas 一致：缺失期间旧值的权重继续衰减，下一个有效值到来时一并计入。
+    """
+
+    def __init__(self, window: int):
+        super().__init__()
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self._weighted = NAN
+        self._old_wt = 1.0
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+    def update(self, value) -> float:
+        cur = _to_float(value)
+        if self._weighted == self._weighted:
+            self._old_wt *= 1.0 - self.alpha
+            if cur == cur:
+                if self._weighted != cur:
+                    self._weighted = (self._old_wt * self._weighted + self.alpha * cur) / (self._old_wt + self.alpha)
+                self._old_wt = 1.0
+        elif cur == cur:
+            self._weighted = cur
+        self.value = self._weighted
+        return self.value
+
+    def seed(self, data: Union[pd.DataFrame, pd.Series]) -> float:
+        self.reset()
+        values = self._columns(data)[0]
+        if len(values) == 0:
+            return self.value
+        self._weighted = float(TechnicalIndicators.calculate_ema(pd.Series(values), self.window).iloc[-1])
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid):
+            # 最后一个有效值之后的缺失期间，旧值权重继续衰减
+            self._old_wt = (1.0 - self.alpha) ** (len(values) - 1 - valid[-1])
+        self.value = self._weighted
+        return self.value
+
+
+class IncrementalRSI(IncrementalIndicator):
+    """相对强弱指标，对应 TechnicalIndicators.calculate_rsi"""
+
+    def __init__(self, window: int = 14):
+        super().__init__()
+        self.window = window
+        self.lookback = window + 1
+        self._prev_close = NAN
+        self._gain = RollingWindow(window)
+        self._loss = RollingWindow(window)
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+    def update(self, close) -> float:
+        close = _to_float(close)
+        delta = close - self._prev_close
+        self._prev_close = close
+        # 与 Series.where 一致：差值缺失时涨跌幅均记为 0
+        self._gain.push(delta if delta > 0 else 0.0)
+        self._loss.push(-delta if delta < 0 else 0.0)
+        rs = _div(self._gain.mean(), self._loss.mean())
+        self.value = 100 - _div(100, 1 + rs)
+        return self.value
+
+
+class IncrementalMACD(IncrementalIndicator):
+    """MACD，对应 TechnicalIndicators.calculate_macd，update 返回 (MACD线, 信号线, 柱状图)"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        super().__init__()
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self._fast = IncrementalEMA(fast_period)
+        self._slow = IncrementalEMA(slow_period)
+        self._signal = IncrementalEMA(signal_period)
+        self.value = (NAN, NAN, NAN)
+
+    def _params(self) -> dict:
+        return {'fast_period': self.fast_period, 'slow_period': self.slow_period, 'signal_period': self.signal_period}
+
+    def update(self, close) -> Tuple[float, float, float]:
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+    def seed(self, data: Union[pd.DataFrame, pd.Series]) -> Tuple[float, float, float]:
+        self.reset()
+        close = pd.Series(self._columns(data)[0])
+        if close.empty:
+            return self.value
+        self._fast.seed(close)
+        self._slow.seed(close)
+        macd, signal, histogram = TechnicalIndicators.calculate_macd(
+            close, self.fast_period, self.slow_period, self.signal_period
+        )
+        self._signal.seed(macd)
+        self.value = (float(macd.iloc[-1]), float(signal.iloc[-1]), float(histogram.iloc[-1]))
+        return self.value
+
+
+class IncrementalBollinger(IncrementalIndicator):
+    """布林带，对应 TechnicalIndicators.calculate_bollinger_bands，update 返回 (中轨, 上轨, 下轨)"""
+
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        super().__init__()
+        self.window = window
+        self.num_std = num_std
+        self.lookback = window
+        self._roll = RollingWindow(window)
+        self.value = (NAN, NAN, NAN)
+
+    def _params(self) -> dict:
+        return {'window': self.window, 'num_std': self.num_std}
+
+    def update(self, close) -> Tuple[float, float, float]:
+        self._roll.push(_to_float(close))
+        middle = self._roll.mean()
+        std = self._roll.std()
+        self.value = (middle, middle + std * self.num_std, middle - std * self.num_std)
+        return self.value
+
+
+class IncrementalATR(IncrementalIndicator):
+    """平均真实波幅，对应 TechnicalIndicators.calculate_atr"""
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, window: int = 14):
+        super().__init__()
+        self.window = window
+        self.lookback = window + 1
+        self._prev_close = NAN
+        self._roll = RollingWindow(window)
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+    def update(self, high, low, close) -> float:
+        high, low, close = _to_float(high), _to_float(low), _to_float(close)
+        ranges = [r for r in (high - low, abs(high - self._prev_close), abs(low - self._prev_close)) if r == r]
+        self._prev_close = close
+        self._roll.push(max(ranges) if ranges else NAN)
+        self.value = self._roll.mean()
+        return self.value
+
+
+class IncrementalStochastic(IncrementalIndicator):
+    """随机指标，对应 TechnicalIndicators.calculate_stochastic，update 返回 (%K, %D)"""
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, k_window: int = 14, d_window: int = 3):
+        super().__init__()
+        self.k_window = k_window
+        self.d_window = d_window
+        self.lookback = k_window + d_window - 1
+        self._highest = RollingExtremum(k_window, 'max')
+        self._lowest = RollingExtremum(k_window, 'min')
+        self._d = RollingWindow(d_window)
+        self.value = (NAN, NAN)
+
+    def _params(self) -> dict:
+        return {'k_window': self.k_window, 'd_window': self.d_window}
+
+    def update(self, high, low, close) -> Tuple[float, float]:
+        highest = self._highest.push(_to_float(high))
+        lowest = self._lowest.push(_to_float(low))
+        k = 100 * _div(_to_float(close) - lowest, highest - lowest)
+        self._d.push(k)
+        self.value = (_clip(k, 0, 100), _clip(self._d.mean(), 0, 100))
+        return self.value
+
+
+class IncrementalOBV(IncrementalIndicator):
+    """能量潮，对应 TechnicalIndicators.calculate_obv（首根为 0，缺失值时沿用前值）"""
+
+    inputs = ('close', 'volume')
+
+    def __init__(self):
+        super().__init__()
+        self._prev_close = NAN
+        self._started = False
+
+    def update(self, close, volume) -> float:
+        close, volume = _to_float(close), _to_float(volume)
+        if not self._started:
+            self._started = True
+            self.value = 0.0
+        elif volume == volume:
+            diff = close - self._prev_close
+            if diff > 0:
+                self.value += volume
+            elif diff < 0:
+                self.value -= volume
+        self._prev_close = close
+        return self.value
+
+    def seed(self, data: pd.DataFrame) -> float:
+        self.reset()
+        if len(data) == 0:
+            return self.value
+        self.value = float(TechnicalIndicators.calculate_obv(data).iloc[-1])
+        self._prev_close = _to_float(data['close'].iloc[-1])
+        self._started = True
+        return self.value
+
+
+class IncrementalVR(IncrementalIndicator):
+    """量比，对应 TechnicalIndicators.calculate_vr（当日成交量 / 前 window 日均量）"""
+
+    inputs = ('volume',)
+
+    def __init__(self, window: int = 5):
+        super().__init__()
+        self.window = window
+        self.lookback = window + 1
+        self._roll = RollingWindow(window)
+        self._prev_avg = NAN
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+    def update(self, volume) -> float:
+        volume = _to_float(volume)
+        self.value = _div(volume, self._prev_avg)
+        self._roll.push(volume)
+        self._prev_avg = self._roll.mean()
+        return self.value
+
+
+class IncrementalMFI(IncrementalIndicator):
+    """资金流量指标，对应 TechnicalIndicators.calculate_mfi"""
+
+    inputs = ('high', 'low', 'close', 'volume')
+
+    def __init__(self, window: int = 14):
+        super().__init__()
+        self.window = window
+        self.lookback = window + 1
+        self._prev_tp = NAN
+        self._pos = RollingWindow(window)
+        self._neg = RollingWindow(window)
+
+    def _params(self) -> dict:
+        return {'window': self.window}
+
+    def update(self, high, low, close, volume) -> float:
+        tp = (_to_float(high) + _to_float(low) + _to_float(close)) / 3
+        mf = tp * _to_float(volume)
+        tp_diff = tp - self._prev_tp
+        self._prev_tp = tp
+        self._pos.push(mf if tp_diff > 0 else 0.0)
+        self._neg.push(abs(mf) if tp_diff < 0 else 0.0)
+        mr = _div(self._pos.sum(), self._neg.sum())
+        self.value = 100 - _div(100, 1 + mr)
+        return self.value
@@ -0,0 +1,481 @@
+"""
+声明式指标计算图
+
+调用方一次声明要计算的一组指标，IndicatorPlan 把每个指标展开成由中间量组成的有向无环图：
+节点以 (运算, 输入节点, 参数) 为键去重，不同指标用到的同一中间量只计算一次（公共子表达式消除）。
+例如 EMA(12)/EMA(26) 与 MACD 共用指数均线，RSI 与 OBV 共用收盘价差分，VMA 与 VR 共用成交量滚动和，
+MA/PMA/布林带中轨共用收盘价滚动和，随机指标、一目均衡图、唐奇安通道共用滚动极值。
+
+各指标的计算公式与 TechnicalIndicators 中对应方法一致，返回值类型（Series 或 Series 元组）也相同；
+所用价格列为 float32 时结果同样为 float32（精简精度模式）。
+
+用法:
+    plan = IndicatorPlan()
+    plan.add('macd')
+    plan.add('ema', {'window': 12})
+    results = plan.compute(df)   # {'macd': (macd, signal, hist), 'ema_12': Series}
+
+接口层可用 parse_indicator_specs 解析 "rsi(14),macd(12,26,9),ichimoku" 形式的指标声明。
+"""
+import inspect
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.utils.technical_indicators import TechnicalIndicators, _cast_result, _result_dtype, _rolling_extremum
+
+# 节点键：(运算名, 输入节点键元组, 参数元组)
+Key = Tuple
+Outputs = Union[Key, Tuple[Key, ...]]
+
+
+# ---- 节点运算：输入为 pd.Series（与行情行对齐），参数在输入之后 ----
+
+def _rolling_count(x: pd.Series, window: int) -> np.ndarray:
+    """窗口内有效值个数（不满窗口时按已有K线数计）"""
+    valid = x.notna().to_numpy()
+    n = len(valid)
+    if valid.all():
+        return np.minimum(np.arange(1, n + 1, dtype=np.float64), window)
+    counts = np.zeros(n + 1)
+    np.cumsum(valid, out=counts[1:])
+    result = counts[1:].copy()
+    if n > window:
+        result[window:] -= counts[1:n + 1 - window]
+    return result
+
+
+def _masked_mean(total: pd.Series, count: np.ndarray, min_periods: int) -> pd.Series:
+    # 与 rolling(window, min_periods).mean() 相同：和 / 有效个数，个数不足 min_periods 为 NaN
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = total.to_numpy(dtype=np.float64, na_value=np.nan) / count
+    values[count < min_periods] = np.nan
+    return pd.Series(values, index=total.index)
+
+
+def _masked_sum(total: pd.Series, count: np.ndarray, min_periods: int) -> pd.Series:
+    values = total.to_numpy(dtype=np.float64, na_value=np.nan).copy()
+    values[count < min_periods] = np.nan
+    return pd.Series(values, index=total.index)
+
+
+def _extremum(x: pd.Series, window: int, mode: str) -> pd.Series:
+    return pd.Series(_rolling_extremum(x.to_numpy(dtype=np.float64, na_value=np.nan), window, mode), index=x.index)
+
+
+def _true_range(high: pd.Series, low: pd.Series, prev_close: pd.Series) -> pd.Series:
+    # np.fmax 忽略 NaN，与 calculate_atr 中 concat(...).max(axis=1) 的跳过缺失一致
+    h, l, pc = (s.to_numpy(dtype=np.float64, na_value=np.nan) for s in (high, low, prev_close))
+    return pd.Series(np.fmax(np.fmax(h - l, np.abs(h - pc)), np.abs(l - pc)), index=high.index)
+
+
+def _obv(delta: pd.Series, volume: pd.Series) -> pd.Series:
+    # 与 calculate_obv 一致：增量 = sign(收盘价差分) * 成交量，缺失时为 0，首日为 0
+    step = np.sign(delta.to_numpy(dtype=np.float64, na_value=np.nan)) * volume.to_numpy(dtype=np.float64, na_value=np.nan)
+    step[np.isnan(step)] = 0.0
+    return pd.Series(np.cumsum(step), index=delta.index)
+
+
+def _rsi(gain: pd.Series, loss: pd.Series) -> pd.Series:
+    return 100 - (100 / (1 + gain / loss))
+
+
+def _stochastic_k(close: pd.Series, lowest: pd.Series, highest: pd.Series) -> pd.Series:
+    return 100 * ((close - lowest) / (highest - lowest))
+
+
+def _mfi(pos_sum: pd.Series, neg_sum: pd.Series) -> pd.Series:
+    return 100 - 100 / (1 + pos_sum / neg_sum)
+
+
+_OPS: Dict[str, Callable[..., Any]] = {
+    'diff': lambda x: x.diff(),
+    'shift': lambda x, periods: x.shift(periods),
+    'rolling_sum': lambda x, window: x.rolling(window=window, min_periods=1).sum(),
+    'rolling_count': _rolling_count,
+    'masked_mean': _masked_mean,
+    'masked_sum': _masked_sum,
+    'rolling_std': lambda x, window: x.rolling(window=window).std(),
+    'ewm': lambda x, span: x.ewm(span=span, adjust=False).mean(),
+    'extremum': _extremum,
+    'sub': lambda a, b: a - b,
+    'div': lambda a, b: a / b,
+    'mul': lambda a, b: a * b,
+    'half_sum': lambda a, b: (a + b) / 2,
+    'band': lambda middle, std, num_std: middle + (std * num_std),
+    'clip': lambda x, lower, upper: x.clip(lower, upper),
+    'gain': lambda delta: delta.where(delta > 0, 0),
+    'loss': lambda delta: -delta.where(delta < 0, 0),
+    'typical_price': lambda high, low, close: (high + low + close) / 3,
+    'pos_flow': lambda mf, tp_diff: mf.where(tp_diff > 0, 0),
+    'neg_flow': lambda mf, tp_diff: mf.where(tp_diff < 0, 0).abs(),
+    'true_range': _true_range,
+    'obv': _obv,
+    'rsi': _rsi,
+    'stochastic_k': _stochastic_k,
+    'mfi': _mfi,
+    'ma_matrix': lambda x, windows, min_periods: TechnicalIndicators.calculate_ma_matrix(x, list(windows), min_periods),
+}
+
+
+class IndicatorPlan:
+    """
+    指标计算计划
+
+    add() 声明指标并把它展开为计算图节点（相同节点只保留一个），compute() 按拓扑顺序对一份行情求值，
+    中间量在最后一个使用者算完后即释放。同一个计划可以对多份行情重复 compute。
+    """
+
+    def __init__(self):
+        # 节点按创建顺序保存；输入节点总是先于使用它的节点创建，因此插入顺序即拓扑顺序
+        self._nodes: 'OrderedDict[Key, None]' = OrderedDict()
+        self._outputs: 'OrderedDict[str, Outputs]' = OrderedDict()
+
+    @property
+    def nodes(self) -> Tuple[Key, ...]:
+        """去重后的全部节点（拓扑顺序）"""
+        return tuple(self._nodes)
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return tuple(self._outputs)
+
+    def node(self, op: str, inputs: Sequence[Key] = (), params: Sequence = ()) -> Key:
+        """添加（或复用已有的）一个节点，返回节点键"""
+        if op != 'column' and op not in _OPS:
+            raise ValueError(f'未知的节点运算: {op}')
+        key = (op, tuple(inputs), tuple(params))
+        self._nodes.setdefault(key, None)
+        return key
+
+    # ---- 常用中间量 ----
+
+    def column(self, name: str) -> Key:
+        return self.node('column', params=(name,))
+
+    def diff(self, x: Key) -> Key:
+        return self.node('diff', (x,))
+
+    def shift(self, x: Key, periods: int) -> Key:
+        return self.node('shift', (x,), (periods,))
+
+    def rolling_sum(self, x: Key, window: int, min_periods: Optional[int] = None) -> Key:
+        """rolling(window, min_periods).sum()；底层的滚动和与有效个数按窗口共享"""
+        minp = window if min_periods is None else min_periods
+        total = self.node('rolling_sum', (x,), (window,))
+        return self.node('masked_sum', (total, self.node('rolling_count', (x,), (window,))), (minp,))
+
+    def rolling_mean(self, x: Key, window: int, min_periods: Optional[int] = None) -> Key:
+        """rolling(window, min_periods).mean()；与同窗口的滚动和共享累加结果"""
+        minp = window if min_periods is None else min_periods
+        total = self.node('rolling_sum', (x,), (window,))
+        return self.node('masked_mean', (total, self.node('rolling_count', (x,), (window,))), (minp,))
+
+    def ewm(self, x: Key, span: int) -> Key:
+        return self.node('ewm', (x,), (span,))
+
+    def highest(self, window: int) -> Key:
+        return self.node('extremum', (self.column('high'),), (window, 'max'))
+
+    def lowest(self, window: int) -> Key:
+        return self.node('extremum', (self.column('low'),), (window, 'min'))
+
+    def midpoint(self, window: int) -> Key:
+        return self.node('half_sum', (self.highest(window), self.lowest(window)))
+
+    # ---- 声明与求值 ----
+
+    def add(self, name: str, params: Optional[Mapping[str, Any]] = None, label: Optional[str] = None) -> str:
+        """
+        声明一个指标。
+        Args:
+            name: 指标名（见 INDICATOR_BUILDERS）
+            params: 指标参数，与 TechnicalIndicators 对应方法的关键字参数一致
+            label: 结果字典中的名称，默认为 指标名_参数值（无参数时为指标名）
+        Returns:
+            结果标签
+        """
+        builder = INDICATOR_BUILDERS.get(name)
+        if builder is None:
+            raise ValueError(f'不支持的指标: {name}')
+        params = dict(params or {})
+        size = len(self._nodes)
+        try:
+            outputs = builder(self, **params)
+        except TypeError as e:
+            # 参数错误时撤销本次已添加的节点
+            while len(self._nodes) > size:
+                self._nodes.popitem()
+            raise ValueError(f'指标 {name} 参数错误: {e}') from None
+        if label is None:
+            label = name if not params else '_'.join([name] + [
+                '_'.join(str(x) for x in v) if isinstance(v, (list, tuple)) else str(v) for v in params.values()])
+        self._outputs[label] = outputs
+        return label
+
+    def compute(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        对一份行情求值。
+        Args:
+            df: 包含所需 open/high/low/close/volume 列的 DataFrame
+        Returns:
+            {标签: Series 或 Series 元组}，与 TechnicalIndicators 对应方法的返回值一致
+        """
+        keys = list(self._nodes)
+        wanted = set()
+        for outputs in self._outputs.values():
+            wanted.update(outputs if isinstance(outputs[0], tuple) else (outputs,))
+        # 每个中间量最后一次被使用的位置，用完即释放
+        last_use = {}
+        for i, (_, inputs, _) in enumerate(keys):
+            for key in inputs:
+                last_use[key] = i
+        values: Dict[Key, Any] = {}
+        sources = []
+        for i, key in enumerate(keys):
+            op, inputs, params = key
+            if op == 'column':
+                column = params[0]
+                if column not in df.columns:
+                    raise ValueError(f'行情数据缺少 {column} 列')
+                sources.append(df[column])
+                values[key] = df[column].astype(np.float64)
+            else:
+                values[key] = _OPS[op](*(values[k] for k in inputs), *params)
+            for k in inputs:
+                if last_use[k] == i and k not in wanted:
+                    del values[k]
+        results = {label: tuple(values[k] for k in outputs) if isinstance(outputs[0], tuple) else values[outputs]
+                   for label, outputs in self._outputs.items()}
+        dtype = _result_dtype(sources)
+        if dtype is not None:
+            results = {label: _cast_result(result, dtype) for label, result in results.items()}
+        return results
+
+
+def compute_indicators(df: pd.DataFrame, specs: Iterable[Tuple[str, Optional[Mapping[str, Any]]]]) -> Dict[str, Any]:
+    """
+    一次计算一组指标（共享中间量）。
+    Args:
+        df: 行情 DataFrame
+        specs: [(指标名, 参数), ...]
+    Returns:
+        {标签: 结果}，标签规则见 IndicatorPlan.add
+    """
+    plan = IndicatorPlan()
+    for name, params in specs:
+        plan.add(name, params)
+    return plan.compute(df)
+
+
+# ---- 指标展开规则：与 TechnicalIndicators 对应方法的公式、参数一致 ----
+
+def _build_ma(plan: IndicatorPlan, window: int) -> Key:
+    return plan.rolling_mean(plan.column('close'), window)
+
+
+def _build_pma(plan: IndicatorPlan, window: int = 5) -> Key:
+    return plan.rolling_mean(plan.column('close'), window, 1)
+
+
+def _build_ema(plan: IndicatorPlan, window: int) -> Key:
+    return plan.ewm(plan.column('close'), window)
+
+
+def _build_rsi(plan: IndicatorPlan, window: int = 14) -> Key:
+    delta = plan.diff(plan.column('close'))
+    gain = plan.rolling_mean(plan.node('gain', (delta,)), window)
+    loss = plan.rolling_mean(plan.node('loss', (delta,)), window)
+    return plan.node('rsi', (gain, loss))
+
+
+def _build_macd(plan: IndicatorPlan, fast_period: int = 12, slow_period: int = 26,
+                signal_period: int = 9) -> Tuple[Key, Key, Key]:
+    close = plan.column('close')
+    macd = plan.node('sub', (plan.ewm(close, fast_period), plan.ewm(close, slow_period)))
+    signal = plan.ewm(macd, signal_period)
+    return macd, signal, plan.node('sub', (macd, signal))
+
+
+def _build_bollinger(plan: IndicatorPlan, window: int = 20, num_std: float = 2.0) -> Tuple[Key, Key, Key]:
+    close = plan.column('close')
+    middle = plan.rolling_mean(close, window)
+    std = plan.node('rolling_std', (close,), (window,))
+    return middle, plan.node('band', (middle, std), (num_std,)), plan.node('band', (middle, std), (-num_std,))
+
+
+def _build_atr(plan: IndicatorPlan, window: int = 14) -> Key:
+    prev_close = plan.shift(plan.column('close'), 1)
+    tr = plan.node('true_range', (plan.column('high'), plan.column('low'), prev_close))
+    return plan.rolling_mean(tr, window)
+
+
+def _build_stochastic(plan: IndicatorPlan, k_window: int = 14, d_window: int = 3) -> Tuple[Key, Key]:
+    k = plan.node('stochastic_k', (plan.column('close'), plan.lowest(k_window), plan.highest(k_window)))
+    d = plan.rolling_mean(k, d_window)
+    return plan.node('clip', (k,), (0, 100)), plan.node('clip', (d,), (0, 100))
+
+
+def _build_obv(plan: IndicatorPlan) -> Key:
+    return plan.node('obv', (plan.diff(plan.column('close')), plan.column('volume')))
+
+
+def _build_vma(plan: IndicatorPlan, window: int = 5) -> Key:
+    return plan.rolling_mean(plan.column('volume'), window, 1)
+
+
+def _build_vr(plan: IndicatorPlan, window: int = 5) -> Key:
+    volume = plan.column('volume')
+    return plan.node('div', (volume, plan.shift(plan.rolling_mean(volume, window), 1)))
+
+
+def _build_mfi(plan: IndicatorPlan, window: int = 14) -> Key:
+    tp = plan.node('typical_price', (plan.column('high'), plan.column('low'), plan.column('close')))
+    mf = plan.node('mul', (tp, plan.column('volume')))
+    tp_diff = plan.diff(tp)
+    pos_sum = plan.rolling_sum(plan.node('pos_flow', (mf, tp_diff)), window)
+    neg_sum = plan.rolling_sum(plan.node('neg_flow', (mf, tp_diff)), window)
+    return plan.node('mfi', (pos_sum, neg_sum))
+
+
+def _build_ichimoku(plan: IndicatorPlan, conversion_period: int = 9, base_period: int = 26,
+                    span_b_period: int = 52, displacement: int = 26) -> Tuple[Key, ...]:
+    conversion = plan.midpoint(conversion_period)
+    base = plan.midpoint(base_period)
+    span_a = plan.shift(plan.node('half_sum', (conversion, base)), displacement)
+    span_b = plan.shift(plan.midpoint(span_b_period), displacement)
+    return conversion, base, span_a, span_b, plan.shift(plan.column('low'), -displacement)
+
+
+def _build_donchian(plan: IndicatorPlan, window: int = 20) -> Tuple[Key, Key, Key]:
+    return plan.highest(window), plan.midpoint(window), plan.lowest(window)
+
+
+def _build_pma_matrix(plan: IndicatorPlan, windows: Sequence[int]) -> Key:
+    return plan.node('ma_matrix', (plan.column('close'),), (tuple(windows), 1))
+
+
+def _build_vma_matrix(plan: IndicatorPlan, windows: Sequence[int]) -> Key:
+    return plan.node('ma_matrix', (plan.column('volume'),), (tuple(windows), 1))
+
+
+INDICATOR_BUILDERS: Dict[str, Callable[..., Outputs]] = {
+    'ma': _build_ma,
+    'pma': _build_pma,
+    'ema': _build_ema,
+    'rsi': _build_rsi,
+    'macd': _build_macd,
+    'bollinger': _build_bollinger,
+    'atr': _build_atr,
+    'stochastic': _build_stochastic,
+    'obv': _build_obv,
+    'vma': _build_vma,
+    'vr': _build_vr,
+    'mfi': _build_mfi,
+    'ichimoku': _build_ichimoku,
+    'donchian': _build_donchian,
+    'pma_matrix': _build_pma_matrix,
+    'vma_matrix': _build_vma_matrix,
+}
+
+# 多输出指标各输出的名称（与返回元组顺序一致）；矩阵类指标的输出名为各窗口
+INDICATOR_OUTPUTS: Dict[str, Tuple[str, ...]] = {
+    'macd': ('line', 'signal', 'hist'),
+    'bollinger': ('middle', 'upper', 'lower'),
+    'stochastic': ('k', 'd'),
+    'ichimoku': ('conversion', 'base', 'span_a', 'span_b', 'lagging'),
+    'donchian': ('upper', 'middle', 'lower'),
+}
+
+_SPEC_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:\(([^()]*)\))?\s*(?:[,;]|$)')
+_INT_RE = re.compile(r'[+-]?\d+')
+
+
+def _builder_params(name: str) -> List[inspect.Parameter]:
+    return list(inspect.signature(INDICATOR_BUILDERS[name]).parameters.values())[1:]
+
+
+def output_names(name: str, params: Optional[Mapping[str, Any]] = None) -> Optional[Tuple[str, ...]]:
+    """多输出指标的各输出名称，单输出指标返回 None"""
+    if name.endswith('_matrix'):
+        return tuple(str(w) for w in (params or {})['windows'])
+    return INDICATOR_OUTPUTS.get(name)
+
+
+def describe_indicators() -> List[Dict[str, Any]]:
+    """指标目录：名称、参数（及默认值，无默认值为 None）、输出名称"""
+    catalogue = []
+    for name in INDICATOR_BUILDERS:
+        params = {p.name: (None if p.default is inspect.Parameter.empty else p.default) for p in _builder_params(name)}
+        outputs = ['<window>'] if name.endswith('_matrix') else list(INDICATOR_OUTPUTS.get(name, ()))
+        catalogue.append({'name': name, 'params': params, 'outputs': outputs or None})
+    return catalogue
+
+
+def _parse_value(text: str) -> Union[int, float]:
+    if _INT_RE.fullmatch(text):
+        return int(text)
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f'参数值无效: {text}') from None
+
+
+def parse_indicator_specs(text: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """
+    解析指标声明串，如 "rsi(14),macd(12,26,9),bollinger(window=20,num_std=2.5),obv"。
+    位置参数按指标参数顺序对应（矩阵类指标的位置参数全部作为窗口列表），也可用 参数名=值。
+    Args:
+        text: 逗号或分号分隔的指标声明
+    Returns:
+        [(标签, 指标名, 参数), ...]，标签为去掉空白后的声明原文
+    Raises:
+        ValueError: 语法错误、未知指标或参数不匹配
+    """
+    specs = []
+    pos, text = 0, text.strip()
+    while pos < len(text):
+        match = _SPEC_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f'指标声明格式错误: {text[pos:]}')
+        pos = match.end()
+        name, arg_text = match.group(1), match.group(2)
+        if name not in INDICATOR_BUILDERS:
+            raise ValueError(f'不支持的指标: {name}')
+        args = [a.strip() for a in arg_text.split(',')] if arg_text and arg_text.strip() else []
+        positional = [_parse_value(a) for a in args if '=' not in a]
+        params: Dict[str, Any] = {}
+        for arg in args:
+            if '=' in arg:
+                key, value = (x.strip() for x in arg.split('=', 1))
+                if key in params:
+                    raise ValueError(f'指标 {name} 参数重复: {key}')
+                params[key] = _parse_value(value)
+        names = [p.name for p in _builder_params(name)]
+        if names == ['windows']:
+            if positional:
+                params['windows'] = positional
+        elif len(positional) > len(names):
+            raise ValueError(f'指标 {name} 参数过多')
+        else:
+            for key, value in zip(names, positional):
+                if key in params:
+                    raise ValueError(f'指标 {name} 参数重复: {key}')
+                params[key] = value
+        try:
+            inspect.signature(INDICATOR_BUILDERS[name]).bind(None, **params)
+        except TypeError as e:
+            raise ValueError(f'指标 {name} 参数错误: {e}') from None
+        for key, value in params.items():
+            if key == 'windows' or key == 'window' or key.endswith(('_window', '_period')):
+                values = value if key == 'windows' else [value]
+                if not all(isinstance(v, int) and v >= 1 for v in values):
+                    raise ValueError(f'指标 {name} 参数 {key} 须为正整数')
+            elif key == 'displacement' and not isinstance(value, int):
+                raise ValueError(f'指标 {name} 参数 {key} 须为整数')
+        label = name if arg_text is None else f"{name}({','.join(args)})"
+        specs.append((label, name, params))
+    return specs
@@ -0,0 +1,332 @@
+"""
+截面（面板）技术指标
+
+面板为 日期 × 股票 的二维数据（DataFrame 或 ndarray），一次调用算出全部股票的指标，
+每一列的结果与对该股票单独调用 TechnicalIndicators 相同。
+
+停牌处理（skip_suspended=True，默认）：每只股票只在自己有数据的交易日上计算，
+停牌日不占用滚动窗口、不打断递推，输出中停牌日为 NaN。实现上先把每列的有效行稳定地
+压缩到顶部，在压缩后的面板上沿时间轴对所有列一起做累加求和/分块递推（不逐列循环），再放回原位置。
+
+精度与内存：输入面板的浮点数据全部为 float32 时按精简精度模式计算，输入、压缩后的面板和输出均为 float32，
+累加求和与递推仍用 float64。面板按列分块计算（每块不超过 BLOCK_ELEMENTS 个元素），中间数组的峰值内存与股票数无关。
+"""
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from quant_backend.utils.technical_indicators import _EMA_CHUNK_SCALE, _result_dtype, _rolling_extremum
+
+Panel = Union[pd.DataFrame, np.ndarray]
+
+# 按列分块计算时每块（每个输入）的元素数上限
+BLOCK_ELEMENTS = 1 << 18
+
+
+def _as_frame(panel: Panel) -> pd.DataFrame:
+    if isinstance(panel, pd.DataFrame):
+        return panel
+    panel = np.asarray(panel)
+    if panel.dtype != np.float32:
+        panel = panel.astype(np.float64)
+    if panel.ndim != 2:
+        raise ValueError('面板数据必须为二维（日期 × 股票）')
+    return pd.DataFrame(panel)
+
+
+def _compact(arrays: Sequence[np.ndarray]) -> Tuple[list, np.ndarray, np.ndarray]:
+    """
+    将每列中所有输入都有效的行按时间顺序移到顶部，其余行置为 NaN。
+    Returns:
+        (压缩后的数组列表, 行顺序 order, 有效行掩码 mask)
+    """
+    mask = ~np.isnan(np.stack(arrays)).any(axis=0)
+    order = np.argsort(~mask, axis=0, kind='stable')
+    valid_sorted = np.take_along_axis(mask, order, axis=0)
+    compacted = []
+    for a in arrays:
+        c = np.take_along_axis(a, order, axis=0)
+        c[~valid_sorted] = np.nan
+        compacted.append(c)
+    return compacted, order, mask
+
+
+def _expand(values: np.ndarray, order: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, values, axis=0)
+    out[~mask] = np.nan
+    return out
+
+
+def _apply(fn: Callable, panels: Sequence[Panel], skip_suspended: bool):
+    """
+    在面板上执行 fn（参数为与输入一一对应的 DataFrame，返回 DataFrame 或 DataFrame 元组），
+    按列分块执行后拼接，结果还原为输入的索引/列，精度与输入一致（float32 或 float64）。
+    """
+    frames = [_as_frame(p) for p in panels]
+    shape = frames[0].shape
+    if any(f.shape != shape for f in frames):
+        raise ValueError('各输入面板的形状必须一致')
+    index, columns = frames[0].index, frames[0].columns
+    dtype = _result_dtype(frames) or np.dtype(np.float64)
+    arrays = [f.to_numpy(dtype=dtype, na_value=np.nan) for f in frames]
+    n_rows, n_cols = shape
+    step = max(1, BLOCK_ELEMENTS // max(n_rows, 1))
+    outputs, is_tuple = None, False
+    for start in range(0, max(n_cols, 1), step):
+        block = [a[:, start:start + step] for a in arrays]
+        if skip_suspended:
+            block, order, mask = _compact(block)
+        result = fn(*(pd.DataFrame(a, copy=False) for a in block))
+        is_tuple = isinstance(result, tuple)
+        parts = result if is_tuple else (result,)
+        if outputs is None:
+            outputs = [np.empty(shape, dtype=dtype) for _ in parts]
+        for out, part in zip(outputs, parts):
+            values = np.asarray(part, dtype=dtype)
+            if skip_suspended:
+                values = _expand(values, order, mask)
+            out[:, start:start + step] = values
+    wrapped = [pd.DataFrame(out, index=index, columns=columns, copy=False) for out in outputs]
+    return tuple(wrapped) if is_tuple else wrapped[0]
+
+
+def _rolling_sum(a: np.ndarray, window: int, min_periods: Optional[int] = None,
+                 center: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    沿时间轴（axis=0）一次累加求和得到所有列的滚动和与窗口内有效值个数，NaN 不计入。
+    有效值不足 min_periods（默认等于 window）时和为 NaN。
+    Args:
+        center: 先减去每列首个有效值再累加（价格类数据避免长序列累加和过大损失精度）
+    """
+    n = a.shape[0]
+    valid = ~np.isnan(a)
+    offset = 0.0
+    if center:
+        first = np.argmax(valid, axis=0)
+        offset = np.take_along_axis(a, first[None, :], axis=0)[0]
+        offset = np.where(np.isnan(offset), 0.0, offset)
+    # float32 面板同样以 float64 累加
+    csum = np.zeros((n + 1,) + a.shape[1:])
+    np.cumsum(np.where(valid, a - offset, 0.0), axis=0, dtype=np.float64, out=csum[1:])
+    ccount = np.zeros((n + 1,) + a.shape[1:], dtype=np.int64)
+    np.cumsum(valid, axis=0, out=ccount[1:])
+    head = min(window - 1, n)
+    sums = np.empty(a.shape)
+    counts = np.empty(a.shape, dtype=np.int64)
+    sums[:head] = csum[1:head + 1]
+    np.subtract(csum[window:], csum[:-window], out=sums[head:])
+    counts[:head] = ccount[1:head + 1]
+    np.subtract(ccount[window:], ccount[:-window], out=counts[head:])
+    if center:
+        sums += counts * offset
+    minp = window if min_periods is None else min_periods
+    sums[(counts < minp) | (counts == 0)] = np.nan
+    return sums, counts
+
+
+def _rolling_mean(a: np.ndarray, window: int, min_periods: Optional[int] = None, center: bool = False) -> np.ndarray:
+    sums, counts = _rolling_sum(a, window, min_periods, center)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def _ema(a: np.ndarray, window: int) -> np.ndarray:
+    """
+    EMA（同 ewm(span, adjust=False)），沿时间轴对所有列一次分块递推。
+    仅当每列的有效值都连续位于开头（无前导/中间缺失，压缩后的面板即如此）时走向量化路径，
+    尾部缺失沿用最后的 EMA 值；否则退回 pandas 逐列计算以保持缺失期间的权重衰减规则。
+    """
+    valid = ~np.isnan(a)
+    if not (valid[1:] <= valid[:-1]).all():
+        return pd.DataFrame(a).ewm(span=window, adjust=False).mean().to_numpy()
+    n = a.shape[0]
+    out = np.full(a.shape, np.nan)
+    if n == 0:
+        return out
+    alpha = 2.0 / (window + 1.0)
+    decay = 1.0 - alpha
+    chunk = max(int(np.log(_EMA_CHUNK_SCALE) / -np.log(decay)), 1) if decay > 0 else 1
+    steps = np.arange(chunk, dtype=np.float64)[:, None]
+    grow = decay ** steps
+    shrink = decay ** -steps
+    x = np.where(valid, a, 0.0)
+    carry = x[0].copy()
+    for start in range(0, n, chunk):
+        block = x[start:start + chunk]
+        m = len(block)
+        csum = np.cumsum(block * shrink[:m], axis=0)
+        out[start:start + m] = grow[:m] * decay * carry[None, :] + alpha * grow[:m] * csum
+        carry = out[start + m - 1].copy()
+    # 尾部缺失行沿用最后一个有效 EMA 值；整列缺失的列保持 NaN
+    last_valid = valid.sum(axis=0) - 1
+    tail = ~valid
+    if tail.any():
+        fill = np.take_along_axis(out, np.maximum(last_valid, 0)[None, :], axis=0)[0]
+        fill[last_valid < 0] = np.nan
+        out = np.where(tail, fill[None, :], out)
+    return out
+
+
+def _rsi(close: pd.DataFrame, window: int) -> pd.DataFrame:
+    c = close.to_numpy()
+    delta = np.full_like(c, np.nan)
+    delta[1:] = c[1:] - c[:-1]
+    # 与 Series.where 一致：差值缺失时涨跌幅均记为 0
+    gain = _rolling_mean(np.where(delta > 0, delta, 0.0), window)
+    loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame(100 - 100 / (1 + gain / loss))
+
+
+def _macd(close: pd.DataFrame, fast_period: int, slow_period: int, signal_period: int):
+    c = close.to_numpy()
+    macd = _ema(c, fast_period) - _ema(c, slow_period)
+    signal = _ema(macd, signal_period)
+    return pd.DataFrame(macd), pd.DataFrame(signal), pd.DataFrame(macd - signal)
+
+
+def _bollinger(close: pd.DataFrame, window: int, num_std: float):
+    middle = _rolling_mean(close.to_numpy(), window, center=True)
+    std = close.rolling(window=window).std().to_numpy()
+    return pd.DataFrame(middle), pd.DataFrame(middle + std * num_std), pd.DataFrame(middle - std * num_std)
+
+
+def _stochastic(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, k_window: int, d_window: int):
+    lowest = _rolling_extremum(low.to_numpy(), k_window, 'min')
+    highest = _rolling_extremum(high.to_numpy(), k_window, 'max')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = 100 * ((close.to_numpy() - lowest) / (highest - lowest))
+    d = _rolling_mean(k, d_window)
+    return pd.DataFrame(k).clip(0, 100), pd.DataFrame(d).clip(0, 100)
+
+
+def _donchian(high: pd.DataFrame, low: pd.DataFrame, window: int):
+    upper = _rolling_extremum(high.to_numpy(), window, 'max')
+    lower = _rolling_extremum(low.to_numpy(), window, 'min')
+    return pd.DataFrame(upper), pd.DataFrame((upper + lower) / 2), pd.DataFrame(lower)
+
+
+def _obv(close: pd.DataFrame, volume: pd.DataFrame) -> pd.DataFrame:
+    c = close.to_numpy()
+    v = volume.to_numpy()
+    step = np.sign(c[1:] - c[:-1]) * v[1:]
+    step[np.isnan(step)] = 0.0
+    obv = np.zeros(c.shape)
+    np.cumsum(step, axis=0, dtype=np.float64, out=obv[1:])
+    return pd.DataFrame(obv)
+
+
+def _atr(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, window: int) -> pd.DataFrame:
+    h, l, c = high.to_numpy(), low.to_numpy(), close.to_numpy()
+    prev_close = np.full_like(c, np.nan)
+    prev_close[1:] = c[:-1]
+    # np.fmax 忽略 NaN，与逐只计算时 concat(...).max(axis=1) 的跳过缺失一致
+    tr = np.fmax(np.fmax(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+    return pd.DataFrame(_rolling_mean(tr, window))
+
+
+def _vr(volume: pd.DataFrame, window: int) -> pd.DataFrame:
+    v = volume.to_numpy()
+    avg = np.full_like(v, np.nan)
+    avg[1:] = _rolling_mean(v, window, center=True)[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame(v / avg)
+
+
+def _mfi(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, volume: pd.DataFrame, window: int) -> pd.DataFrame:
+    tp = (high.to_numpy() + low.to_numpy() + close.to_numpy()) / 3
+    mf = tp * volume.to_numpy()
+    tp_diff = np.full_like(tp, np.nan)
+    tp_diff[1:] = tp[1:] - tp[:-1]
+    pos_sum, _ = _rolling_sum(np.where(tp_diff > 0, mf, 0.0), window)
+    neg_sum, _ = _rolling_sum(np.abs(np.where(tp_diff < 0, mf, 0.0)), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame(100 - 100 / (1 + pos_sum / neg_sum))
+
+
+class PanelIndicators:
+    """面板技术指标：输入为 日期 × 股票 的面板，返回同形状的 DataFrame"""
+
+    @staticmethod
+    def ma(close: Panel, window: int, skip_suspended: bool = True) -> pd.DataFrame:
+        """移动平均线（每列同 TechnicalIndicators.calculate_ma）"""
+        return _apply(lambda c: pd.DataFrame(_rolling_mean(c.to_numpy(), window, center=True)), [close], skip_suspended)
+
+    @staticmethod
+    def pma(close: Panel, window: int = 5, skip_suspended: bool = True) -> pd.DataFrame:
+        """价格移动平均线（每列同 TechnicalIndicators.calculate_pma，min_periods=1）"""
+        return _apply(lambda c: pd.DataFrame(_rolling_mean(c.to_numpy(), window, 1, center=True)), [close], skip_suspended)
+
+    @staticmethod
+    def ema(close: Panel, window: int, skip_suspended: bool = True) -> pd.DataFrame:
+        """指数移动平均线（每列同 TechnicalIndicators.calculate_ema）"""
+        return _apply(lambda c: pd.DataFrame(_ema(c.to_numpy(), window)), [close], skip_suspended)
+
+    @staticmethod
+    def rsi(close: Panel, window: int = 14, skip_suspended: bool = True) -> pd.DataFrame:
+        """相对强弱指标（每列同 TechnicalIndicators.calculate_rsi）"""
+        return _apply(lambda c: _rsi(c, window), [close], skip_suspended)
+
+    @staticmethod
+    def macd(close: Panel, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9,
+             skip_suspended: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """MACD，返回 (MACD线, 信号线, 柱状图)"""
+        return _apply(lambda c: _macd(c, fast_period, slow_period, signal_period), [close], skip_suspended)
+
+    @staticmethod
+    def bollinger_bands(close: Panel, window: int = 20, num_std: float = 2.0,
+                        skip_suspended: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """布林带，返回 (中轨, 上轨, 下轨)"""
+        return _apply(lambda c: _bollinger(c, window, num_std), [close], skip_suspended)
+
+    @staticmethod
+    def atr(high: Panel, low: Panel, close: Panel, window: int = 14, skip_suspended: bool = True) -> pd.DataFrame:
+        """平均真实波幅（每列同 TechnicalIndicators.calculate_atr）"""
+        return _apply(lambda h, l, c: _atr(h, l, c, window), [high, low, close], skip_suspended)
+
+    @staticmethod
+    def stochastic(high: Panel, low: Panel, close: Panel, k_window: int = 14, d_window: int = 3,
+                   skip_suspended: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """随机指标，返回 (%K, %D)"""
+        return _apply(lambda h, l, c: _stochastic(h, l, c, k_window, d_window), [high, low, close], skip_suspended)
+
+    @staticmethod
+    def donchian(high: Panel, low: Panel, window: int = 20,
+                 skip_suspended: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """唐奇安通道，返回 (上轨, 中轨, 下轨)"""
+        return _apply(lambda h, l: _donchian(h, l, window), [high, low], skip_suspended)
+
+    @staticmethod
+    def obv(close: Panel, volume: Panel, skip_suspended: bool = True) -> pd.DataFrame:
+        """能量潮（每列同 TechnicalIndicators.calculate_obv）"""
+        return _apply(_obv, [close, volume], skip_suspended)
+
+    @staticmethod
+    def vma(volume: Panel, window: int = 5, skip_suspended: bool = True) -> pd.DataFrame:
+        """成交量移动平均线（每列同 TechnicalIndicators.calculate_vma）"""
+        return _apply(lambda v: pd.DataFrame(_rolling_mean(v.to_numpy(), window, 1, center=True)), [volume], skip_suspended)
+
+    @staticmethod
+    def vr(volume: Panel, window: int = 5, skip_suspended: bool = True) -> pd.DataFrame:
+        """量比（每列同 TechnicalIndicators.calculate_vr）"""
+        return _apply(lambda v: _vr(v, window), [volume], skip_suspended)
+
+    @staticmethod
+    def mfi(high: Panel, low: Panel, close: Panel, volume: Panel, window: int = 14,
+            skip_suspended: bool = True) -> pd.DataFrame:
+        """资金流量指标（每列同 TechnicalIndicators.calculate_mfi）"""
+        return _apply(lambda h, l, c, v: _mfi(h, l, c, v, window), [high, low, close, volume], skip_suspended)
+
+    @staticmethod
+    def rank(panel: Panel, ascending: bool = True, pct: bool = True) -> pd.DataFrame:
+        """
+        截面排名：每个交易日对全部股票排名，NaN（停牌/无值）不参与排名
+        Args:
+            pct: 为 True 时返回 0~1 的百分位排名
+        """
+        frame = _as_frame(panel)
+        ranks = frame.rank(axis=1, ascending=ascending, pct=pct)
+        dtype = _result_dtype([frame])
+        return ranks if dtype is None else ranks.astype(dtype)
@@ -1,11 +1,249 @@
+import functools
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional
+from typing import Any, Callable, Tuple, Optional, Sequence
+
+# EMA 矩阵分块时 c^-j 的上限，保证块内缩放后的累加不溢出且精度损失可忽略
+_EMA_CHUNK_SCALE = 1e100
+
+
+def _result_dtype(args: Sequence[Any]) -> Optional[np.dtype]:
+    """
+    精简精度模式判定：输入 Series/DataFrame 中的浮点数据全部为 float32 时返回 float32，否则返回 None（保持 float64）。
+    整数列（如 int64 成交量）不参与判定。
+    """
+    float_dtypes = []
+    for arg in args:
+        if isinstance(arg, pd.Series):
+            dtypes = [arg.dtype]
+        elif isinstance(arg, pd.DataFrame):
+            dtypes = list(arg.dtypes)
+        else:
+            continue
+        float_dtypes.extend(d for d in dtypes if d.kind == 'f')
+    if float_dtypes and all(d == np.float32 for d in float_dtypes):
+        return np.dtype(np.float32)
+    return None
+
+
+def _cast_result(result, dtype: np.dtype):
+    if isinstance(result, tuple):
+        return tuple(_cast_result(r, dtype) for r in result)
+    if isinstance(result, (pd.Series, pd.DataFrame)):
+        return result.astype(dtype, copy=False)
+    return result
+
+
+def _follow_precision(func: Callable) -> Callable:
+    """
+    指标结果跟随输入精度：价格为 float32 时结果也为 float32（中间计算仍按 float64 累加），
+    以便全市场面板等大数据量场景全程使用 float32，内存减半。float64 输入的行为不变。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        dtype = _result_dtype(list(args) + list(kwargs.values()))
+        return result if dtype is None else _cast_result(result, dtype)
+    return wrapper
+
+
+def _check_windows(windows: Sequence[int]) -> np.ndarray:
+    windows = np.asarray(list(windows), dtype=np.int64)
+    if windows.ndim != 1 or len(windows) == 0 or (windows < 1).any():
+        raise ValueError('windows 必须为非空的正整数序列')
+    return windows
+
+
+def _rolling_mean_matrix(values: np.ndarray, windows: np.ndarray, min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    一次累加求和计算多个窗口的滚动均值，返回 (len(values), len(windows)) 矩阵。
+    缺失值不计入均值；窗口内有效值个数不足 min_periods（默认等于各自窗口）时为 NaN。
+    """
+    n, k = len(values), len(windows)
+    # 按列连续存放，转置后每个窗口的结果是一段连续内存
+    result = np.full((k, n), np.nan)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return result.T
+    # 先减去首个有效值再累加，避免长序列累加和过大导致相减时损失精度
+    offset = values[valid][0]
+    csum = np.zeros(n + 1)
+    np.cumsum(np.where(valid, values - offset, 0.0), out=csum[1:])
+    has_nan = not valid.all()
+    if has_nan:
+        ccount = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(valid, out=ccount[1:])
+    for j, w in enumerate(windows):
+        w = int(w)
+        minp = w if min_periods is None else max(min(min_periods, w), 1)
+        row = result[j]
+        head = min(w - 1, n)
+        # 前 w-1 根为不满窗口（从序列开头累加），之后为满窗口
+        if has_nan:
+            counts = np.empty(n, dtype=np.int64)
+            counts[:head] = ccount[1:head + 1]
+            np.subtract(ccount[w:], ccount[:-w], out=counts[head:])
+            row[:head] = csum[1:head + 1]
+            np.subtract(csum[w:], csum[:-w], out=row[head:])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                row /= counts
+            row[counts < minp] = np.nan
+        else:
+            row[:head] = csum[1:head + 1] / np.arange(1, head + 1)
+            np.subtract(csum[w:], csum[:-w], out=row[head:])
+            row[head:] *= 1.0 / w
+            row[:min(minp - 1, n)] = np.nan
+        row += offset
+    return result.T
+
+
+def _ema_matrix(values: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """
+    计算多个窗口的 EMA（与 ewm(span, adjust=False) 一致），返回 (len(values), len(windows)) 矩阵。
+    递推 y[t] = c*y[t-1] + a*x[t] 改写为分块累加：y[s+i] = c^(i+1)*y[s-1] + a*c^i*cumsum(x*c^-j)，
+    各窗口在同一次分块扫描中一起计算。序列中间有缺失值时退回 pandas 逐窗口计算（缺失期间的权重衰减规则不同）。
+    """
+    n, k = len(values), len(windows)
+    result = np.full((n, k), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return result
+    first = valid[0]
+    if len(valid) != n - first:
+        for j, w in enumerate(windows):
+            result[:, j] = pd.Series(values).ewm(span=int(w), adjust=False).mean().to_numpy()
+        return result
+    alpha = 2.0 / (windows + 1.0)
+    decay = 1.0 - alpha
+    x = values[first:]
+    # 窗口为 1 时衰减为 0，EMA 即原序列；不参与分块扫描，避免其衰减把所有窗口的块长压到 1
+    scan = decay > 0
+    result[first:, ~scan] = x[:, None]
+    if not scan.any():
+        return result
+    alpha, decay = alpha[scan], decay[scan]
+    chunk = max(int(np.log(_EMA_CHUNK_SCALE) / -np.log(decay.min())), 1)
+    steps = np.arange(chunk, dtype=np.float64)[:, None]
+    grow = decay[None, :] ** steps            # c^i
+    shrink = decay[None, :] ** -steps         # c^-i
+    carry_weight = grow * decay[None, :]      # c^(i+1)
+    # 首个有效值即为初值，相当于 y[first-1] = x[first]
+    carry = np.full(len(decay), x[0])
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk, None]
+        m = len(block)
+        csum = np.cumsum(block * shrink[:m], axis=0)
+        out = carry_weight[:m] * carry[None, :] + alpha[None, :] * grow[:m] * csum
+        result[first + start:first + start + m, scan] = out
+        carry = out[-1]
+    return result
+
+
+def _rolling_extremum(values: np.ndarray, window: int, mode: str = 'max', min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    沿第 0 轴的滚动最大/最小值（一维或二维），与 rolling(window, min_periods).max()/min() 一致。
+    采用 van Herk/Gil-Werman 分块算法：按窗口长度分块，块内分别做前缀、后缀累计极值，
+    任一满窗口恰好跨越相邻两块，结果为 后缀[i-w+1] 与 前缀[i] 中的极值。
+    每个元素只参与常数次比较，耗时与窗口大小无关；全部为 numpy 向量运算，二维时所有列一起计算。
+    缺失值不参与比较，窗口内有效值个数不足 min_periods（默认等于 window）时为 NaN。
+    """
+    if window < 1:
+        raise ValueError('window 必须为正整数')
+    if mode not in ('max', 'min'):
+        raise ValueError(f'不支持的 mode: {mode}')
+    # 极值不涉及舍入，float32 输入直接按 float32 计算，其余按 float64
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        values = values.astype(np.float64)
+    minp = window if min_periods is None else max(min(min_periods, window), 1)
+    n = values.shape[0]
+    out = np.full(values.shape, np.nan, dtype=values.dtype)
+    if n == 0 or minp > n:
+        return out
+    # np.fmax/np.fmin 忽略 NaN（两者都为 NaN 时才是 NaN），补齐到整块用 NaN 填充
+    op = np.fmax if mode == 'max' else np.fmin
+    nblocks = -(-n // window)
+    padded = np.full((nblocks * window,) + values.shape[1:], np.nan, dtype=values.dtype)
+    padded[:n] = values
+    blocks = padded.reshape((nblocks, window) + values.shape[1:])
+    prefix = op.accumulate(blocks, axis=1).reshape(padded.shape)[:n]
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    # 不满窗口 i < w-1 都在第一块内，前缀即从序列开头起的极值
+    head = min(window - 1, n)
+    out[:head] = prefix[:head]
+    op(suffix[:n - head], prefix[head:], out=out[head:])
+    valid = ~np.isnan(values)
+    if valid.all():
+        out[:minp - 1] = np.nan
+        return out
+    counts = np.zeros((n + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(valid, axis=0, out=counts[1:])
+    nobs = counts[1:].copy()
+    if n > window:
+        nobs[window:] -= counts[1:n + 1 - window]
+    out[nobs < minp] = np.nan
+    return out
+
+
+class RollingExtrema:
+    """
+    滚动极值共享计算
+
+    同一组 high/low 序列上，随机指标、一目均衡图、唐奇安通道都要用到若干窗口的最高价最大值与最低价最小值。
+    把同一个 RollingExtrema 传给这些计算函数，相同窗口的极值（以及通道中线）只计算一次；
+    返回的序列是共享对象，调用方不应原地修改。
+    """
+
+    def __init__(self, high: pd.Series, low: pd.Series):
+        """
+        Args:
+            high: 最高价序列
+            low: 最低价序列（与 high 索引一致）
+        """
+        self.index = high.index
+        self._high = high.to_numpy(dtype=np.float64, na_value=np.nan)
+        self._low = low.to_numpy(dtype=np.float64, na_value=np.nan)
+        self._cache = {}
+
+    def _get(self, key, compute):
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = compute()
+        return result
+
+    def highest(self, window: int) -> pd.Series:
+        """window 日最高价的最大值"""
+        return self._get(('high', window), lambda: pd.Series(
+            _rolling_extremum(self._high, window, 'max'), index=self.index))
+
+    def lowest(self, window: int) -> pd.Series:
+        """window 日最低价的最小值"""
+        return self._get(('low', window), lambda: pd.Series(
+            _rolling_extremum(self._low, window, 'min'), index=self.index))
+
+    def midpoint(self, window: int) -> pd.Series:
+        """window 日最高价与最低价的中点（唐奇安中轨 / 一目均衡图各线）"""
+        return self._get(('mid', window), lambda: (self.highest(window) + self.lowest(window)) / 2)
+
+    @staticmethod
+    def for_series(extrema: Optional['RollingExtrema'], high: pd.Series, low: pd.Series) -> 'RollingExtrema':
+        """沿用传入的共享对象（须基于同一组 high/low 构造），未传入时新建"""
+        if extrema is None:
+            return RollingExtrema(high, low)
+        if len(extrema.index) != len(high):
+            raise ValueError('extrema 与 high/low 序列长度不一致')
+        return extrema
+
 
 class TechnicalIndicators:
-    """技术指标计算工具类"""
+    """
+    技术指标计算工具类
+
+    输入价格为 float32 时（精简精度模式）结果也为 float32，其余情况结果为 float64。
+    """
     
     @staticmethod
+    @_follow_precision
     def calculate_ma(data: pd.Series, window: int) -> pd.Series:
         """
         计算移动平均线 (Moving Average)
@@ -20,6 +258,7 @@ class TechnicalIndicators:
         return data.rolling(window=window).mean()
     
     @staticmethod
+    @_follow_precision
     def calculate_ema(data: pd.Series, window: int) -> pd.Series:
         """
         计算指数移动平均线 (Exponential Moving Average)
@@ -32,8 +271,45 @@ class TechnicalIndicators:
             指数移动平均线序列
         """
         return data.ewm(span=window, adjust=False).mean()
+
+    @staticmethod
+    @_follow_precision
+    def calculate_ma_matrix(data: pd.Series, windows: Sequence[int], min_periods: Optional[int] = None) -> pd.DataFrame:
+        """
+        一次计算多个窗口的移动平均线，只做一次累加求和
+
+        Args:
+            data: 价格数据序列
+            windows: 移动窗口大小列表
+            min_periods: 最少有效值个数，默认等于各自窗口（与 calculate_ma 一致）
+
+        Returns:
+            DataFrame，行与 data 对齐，列为各窗口
+        """
+        windows = _check_windows(windows)
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        return pd.DataFrame(_rolling_mean_matrix(values, windows, min_periods), index=data.index,
+                            columns=windows.tolist(), copy=False)
+
+    @staticmethod
+    @_follow_precision
+    def calculate_ema_matrix(data: pd.Series, windows: Sequence[int]) -> pd.DataFrame:
+        """
+        一次计算多个窗口的指数移动平均线，各窗口在同一次递推扫描中完成
+
+        Args:
+            data: 价格数据序列
+            windows: 移动窗口大小列表
+
+        Returns:
+            DataFrame，行与 data 对齐，列为各窗口，每列与 calculate_ema 一致
+        """
+        windows = _check_windows(windows)
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        return pd.DataFrame(_ema_matrix(values, windows), index=data.index, columns=windows.tolist(), copy=False)
     
     @staticmethod
+    @_follow_precision
     def calculate_rsi(data: pd.Series, window: int = 14) -> pd.Series:
         """
         计算相对强弱指标 (Relative Strength Index)
@@ -53,6 +329,7 @@ class TechnicalIndicators:
         return rsi
     
     @staticmethod
+    @_follow_precision
     def calculate_macd(data: pd.Series, 
                       fast_period: int = 12, 
                       slow_period: int = 26, 
@@ -77,6 +354,7 @@ class TechnicalIndicators:
         return macd, signal, histogram
     
     @staticmethod
+    @_follow_precision
     def calculate_bollinger_bands(data: pd.Series, 
                                 window: int = 20, 
                                 num_std: float = 2.0) -> Tuple[pd.Series, pd.Series, pd.Series]:
@@ -98,6 +376,7 @@ class TechnicalIndicators:
         return middle_band, upper_band, lower_band
     
     @staticmethod
+    @_follow_precision
     def calculate_atr(high: pd.Series, 
                      low: pd.Series, 
                      close: pd.Series, 
@@ -122,11 +401,13 @@ class TechnicalIndicators:
         return atr
     
     @staticmethod
+    @_follow_precision
     def calculate_stochastic(high: pd.Series, 
                            low: pd.Series, 
                            close: pd.Series, 
                            k_window: int = 14, 
-                           d_window: int = 3) -> Tuple[pd.Series, pd.Series]:
+                           d_window: int = 3,
+                           extrema: Optional[RollingExtrema] = None) -> Tuple[pd.Series, pd.Series]:
         """
         计算随机指标 (Stochastic Oscillator)
         
@@ -136,12 +417,14 @@ class TechnicalIndicators:
             close: 收盘价序列
             k_window: %K 计算窗口大小，默认14天
             d_window: %D 计算窗口大小，默认3天
+            extrema: 同一组 high/low 上的 RollingExtrema，与一目均衡图等同时计算时传入以共享滚动极值
             
         Returns:
             (%K线, %D线)
         """
-        lowest_low = low.rolling(window=k_window).min()
-        highest_high = high.rolling(window=k_window).max()
+        extrema = RollingExtrema.for_series(extrema, high, low)
+        lowest_low = extrema.lowest(k_window)
+        highest_high = extrema.highest(k_window)
         k = 100 * ((close - lowest_low) / (highest_high - lowest_low))
         d = k.rolling(window=d_window).mean()
         # 将超出范围的值限制在0-100之间
@@ -150,6 +433,7 @@ class TechnicalIndicators:
         return k, d
     
     @staticmethod
+    @_follow_precision
     def calculate_obv(df: pd.DataFrame) -> pd.Series:
         """
         计算能量潮指标 (On-Balance Volume, OBV)
@@ -159,6 +443,8 @@ class TechnicalIndicators:
             - 若本日收盘价 < 前一日收盘价，则 OBV = 前一日 OBV - 本日成交量
             - 若本日收盘价 = 前一日收盘价，则 OBV = 前一日 OBV
             - 首日 OBV 设为 0
+            - 本日或前一日收盘价缺失、或本日成交量缺失时，OBV 沿用前一日值
+        实现为一次向量化 cumsum，不逐行循环。
         参数:
             df: 必须包含 'close' 和 'volume' 列的 DataFrame
         返回:
@@ -174,27 +460,25 @@ class TechnicalIndicators:
             import logging
             logging.getLogger(__name__).warning('输入 DataFrame 缺少 close 或 volume 列，OBV 返回全 0 序列。')
             return pd.Series(0, index=df.index)
-        close = df['close']
-        volume = df['volume']
-        obv = [0]
-        for i in range(1, len(df)):
-            if pd.isna(close.iloc[i]) or pd.isna(close.iloc[i-1]) or pd.isna(volume.iloc[i]):
-                obv.append(obv[-1])
-            elif close.iloc[i] > close.iloc[i-1]:
-                obv.append(obv[-1] + volume.iloc[i])
-            elif close.iloc[i] < close.iloc[i-1]:
-                obv.append(obv[-1] - volume.iloc[i])
-            else:
-                obv.append(obv[-1])
+        close = df['close'].to_numpy(dtype=np.float64, na_value=np.nan)
+        volume = df['volume'].to_numpy(dtype=np.float64, na_value=np.nan)
+        # 每日增量 = sign(今收 - 昨收) * 今日成交量；今收/昨收/成交量任一缺失时增量为 0（沿用前一日 OBV）
+        step = np.sign(close[1:] - close[:-1]) * volume[1:]
+        step[np.isnan(step)] = 0.0
+        obv = np.empty(len(close), dtype=np.float64)
+        obv[0] = 0.0
+        np.cumsum(step, out=obv[1:])
         return pd.Series(obv, index=df.index)
     
     @staticmethod
+    @_follow_precision
     def calculate_ichimoku(high: pd.Series, 
                           low: pd.Series, 
                           conversion_period: int = 9, 
                           base_period: int = 26, 
                           span_b_period: int = 52, 
-                          displacement: int = 26) -> Tuple[pd.Series, pd.Series, pd.Series, pd.Series, pd.Series]:
+                          displacement: int = 26,
+                          extrema: Optional[RollingExtrema] = None) -> Tuple[pd.Series, pd.Series, pd.Series, pd.Series, pd.Series]:
         """
         计算一目均衡图 (Ichimoku Cloud)
         
@@ -205,31 +489,53 @@ class TechnicalIndicators:
             base_period: 基准线周期，默认26
             span_b_period: 先行带B周期，默认52
             displacement: 延迟线位移，默认26
+            extrema: 同一组 high/low 上的 RollingExtrema，与随机指标、唐奇安通道同时计算时传入以共享滚动极值
             
         Returns:
             (转换线, 基准线, 先行带A, 先行带B, 延迟线)
         """
+        extrema = RollingExtrema.for_series(extrema, high, low)
+        
         # 转换线 (Conversion Line)
-        conversion_line = (high.rolling(window=conversion_period).max() + 
-                         low.rolling(window=conversion_period).min()) / 2
+        conversion_line = extrema.midpoint(conversion_period)
         
         # 基准线 (Base Line)
-        base_line = (high.rolling(window=base_period).max() + 
-                    low.rolling(window=base_period).min()) / 2
+        base_line = extrema.midpoint(base_period)
         
         # 先行带A (Leading Span A)
         leading_span_a = ((conversion_line + base_line) / 2).shift(displacement)
         
         # 先行带B (Leading Span B)
-        leading_span_b = ((high.rolling(window=span_b_period).max() + 
-                          low.rolling(window=span_b_period).min()) / 2).shift(displacement)
+        leading_span_b = extrema.midpoint(span_b_period).shift(displacement)
         
         # 延迟线 (Lagging Span)
         lagging_span = low.shift(-displacement)
         
-        return conversion_line, base_line, leading_span_a, leading_span_b, lagging_span 
+        return conversion_line, base_line, leading_span_a, leading_span_b, lagging_span
+
+    @staticmethod
+    @_follow_precision
+    def calculate_donchian(high: pd.Series,
+                           low: pd.Series,
+                           window: int = 20,
+                           extrema: Optional[RollingExtrema] = None) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """
+        计算唐奇安通道 (Donchian Channels)
+        
+        Args:
+            high: 最高价序列
+            low: 最低价序列
+            window: 通道窗口大小，默认20天
+            extrema: 同一组 high/low 上的 RollingExtrema，与随机指标、一目均衡图同时计算时传入以共享滚动极值
+            
+        Returns:
+            (上轨: window 日最高价, 中轨: 上下轨均值, 下轨: window 日最低价)
+        """
+        extrema = RollingExtrema.for_series(extrema, high, low)
+        return extrema.highest(window), extrema.midpoint(window), extrema.lowest(window)
     
     @staticmethod
+    @_follow_precision
     def calculate_vma(df: pd.DataFrame, window: int = 5) -> pd.Series:
         """
         计算成交量移动平均线（Volume Moving Average, VMA）
@@ -253,8 +559,30 @@ class TechnicalIndicators:
             logging.getLogger(__name__).warning('输入 DataFrame 缺少 volume 列，VMA 返回全 NaN 序列。')
             return pd.Series([float('nan')] * len(df), index=df.index)
         return df['volume'].rolling(window=window, min_periods=1).mean()
+
+    @staticmethod
+    @_follow_precision
+    def calculate_vma_matrix(df: pd.DataFrame, windows: Sequence[int]) -> pd.DataFrame:
+        """
+        一次计算多个窗口的成交量移动平均线（每列与 calculate_vma 一致）
+        参数：
+            df: 必须包含 'volume' 列的 DataFrame
+            windows: 移动平均窗口大小列表
+        返回：
+            DataFrame，行与输入 df 对齐，列为各窗口
+        异常：
+            - 若 df 为空或缺少 volume 列，返回全 NaN 矩阵并记录警告日志
+        """
+        windows = _check_windows(windows)
+        if df is None or df.empty or 'volume' not in df.columns:
+            import logging
+            logging.getLogger(__name__).warning('输入 DataFrame 为空或缺少 volume 列，VMA 返回全 NaN 矩阵。')
+            index = df.index if df is not None else None
+            return pd.DataFrame(np.nan, index=index, columns=windows.tolist())
+        return TechnicalIndicators.calculate_ma_matrix(df['volume'], windows, min_periods=1)
     
     @staticmethod
+    @_follow_precision
     def calculate_vr(df: pd.DataFrame, window: int = 5) -> pd.Series:
         """
         计算量比（Volume Ratio, VR）
@@ -283,6 +611,7 @@ class TechnicalIndicators:
         return vr 
     
     @staticmethod
+    @_follow_precision
     def calculate_mfi(df: pd.DataFrame, window: int = 14) -> pd.Series:
         """
         计算资金流量指标（Money Flow Index, MFI）
@@ -323,6 +652,7 @@ class TechnicalIndicators:
         return mfi 
     
     @staticmethod
+    @_follow_precision
     def calculate_pma(df: pd.DataFrame, window: int = 5) -> pd.Series:
         """
         计算价格移动平均线（Price Moving Average, PMA/SMA）
@@ -345,4 +675,25 @@ class TechnicalIndicators:
             import logging
             logging.getLogger(__name__).warning('输入 DataFrame 缺少 close 列，PMA 返回全 NaN 序列。')
             return pd.Series([float('nan')] * len(df), index=df.index)
-        return df['close'].rolling(window=window, min_periods=1).mean() 
\ No newline at end of file
+        return df['close'].rolling(window=window, min_periods=1).mean()
+
+    @staticmethod
+    @_follow_precision
+    def calculate_pma_matrix(df: pd.DataFrame, windows: Sequence[int]) -> pd.DataFrame:
+        """
+        一次计算多个窗口的价格移动平均线（每列与 calculate_pma 一致）
+        参数：
+            df: 必须包含 'close' 列的 DataFrame
+            windows: 移动平均窗口大小列表
+        返回：
+            DataFrame，行与输入 df 对齐，列为各窗口
+        异常：
+            - 若 df 为空或缺少 close 列，返回全 NaN 矩阵并记录警告日志
+        """
+        windows = _check_windows(windows)
+        if df is None or df.empty or 'close' not in df.columns:
+            import logging
+            logging.getLogger(__name__).warning('输入 DataFrame 为空或缺少 close 列，PMA 返回全 NaN 矩阵。')
+            index = df.index if df is not None else None
+            return pd.DataFrame(np.nan, index=index, columns=windows.tolist())
+        return TechnicalIndicators.calculate_ma_matrix(df['close'], windows, min_periods=1)
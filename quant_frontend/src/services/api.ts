@@ -194,6 +194,11 @@ export const apiService = {
     return api.get('/api/market_data/latest_price', { params: { symbol } });
   },
 
+  // 批量获取最新价格（一次请求查询多只股票）
+  getLatestPrices: async (symbols: string[]): Promise<{ data: Record<string, { price: number; timestamp: string }> }> => {
+    return api.get('/api/market_data/latest_price', { params: { symbols: symbols.join(',') } });
+  },
+
   // 执行回测
   runBacktest: async (params: BacktestParams, engineType: BacktestEngineType = 'default'): Promise<BacktestResult> => {
     try {
@@ -254,6 +259,15 @@ export const apiService = {
     return [];
   },
 
+  // 股票联想搜索（服务端按代码/名称/拼音前缀匹配）
+  searchStocks: async (q: string, limit = 10): Promise<StockItem[]> => {
+    const res = await api.get('/api/market_data/stock_search', { params: { q, limit } });
+    if (res && Array.isArray(res.data)) {
+      return res.data;
+    }
+    return [];
+  },
+
   // 获取技术指标
   getIndicators: async (params: IndicatorParams): Promise<IndicatorResult> => {
     return api.get('/api/market_data/indicators', { params });